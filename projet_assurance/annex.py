@@ -0,0 +1,239 @@
+# =============================================================
+#  annex.py  —  Rapport PDF : chapitres par segment & annexe des contrats
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+#  Chapitres : indicateurs par type d'assurance, tranche d'âge et catégorie
+#  B/M (une agrégation groupby, colonnes formatées d'un bloc).
+#  Annexe : tous les contrats de la sélection, en colonnes à largeur fixe
+#  (police à chasse fixe). Lignes construites colonne par colonne
+#  (conversions NumPy vectorisées, aucune itération par contrat), par
+#  morceaux de ANNEX_CHUNK_PAGES pages : mémoire bornée quelle que soit la
+#  sélection. Une page = un objet texte de ANNEX_ROWS_PER_PAGE lignes, sans
+#  Table platypus. Au-delà de ANNEX_MAX_ROWS contrats, annexe tronquée (la
+#  liste complète relève de l'export Parquet / Arrow).
+#  Grosse annexe et pypdf installé : morceaux rendus en PDF séparés par un
+#  pool de processus (ASSUR_PDF_WORKERS), pendant que le processus principal
+#  compose le rapport, puis pages fusionnées. Sinon les pages de l'annexe
+#  sont ajoutées au document principal (même dessin, un seul processus).
+
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+
+ANNEX_ROWS_PER_PAGE = 62
+ANNEX_CHUNK_PAGES = int(os.environ.get('ASSUR_PDF_CHUNK_PAGES', 160))
+ANNEX_CHUNK_ROWS = ANNEX_CHUNK_PAGES * ANNEX_ROWS_PER_PAGE      # morceau = pages entières
+ANNEX_MAX_ROWS = int(os.environ.get('ASSUR_PDF_ANNEX_MAX_ROWS', 200_000))
+PDF_WORKERS = int(os.environ.get('ASSUR_PDF_WORKERS', min(4, os.cpu_count() or 1)))
+ANNEX_FONT_SIZE = 7.2
+ANNEX_LEADING = 10.5
+
+# Colonne → (en-tête, largeur en caractères, format)
+ANNEX_COLUMNS = [
+    ('id_assure',         "N°",        8,  'int'),
+    ('age',               "Âge",       4,  'int'),
+    ('sexe',              "Sexe",      8,  'str'),
+    ('type_assurance',    "Type",      11, 'str'),
+    ('region',            "Région",    12, 'str'),
+    ('duree_contrat',     "Durée",     5,  'int'),
+    ('montant_prime',     "Prime €",   10, 'num'),
+    ('nb_sinistres',      "Sin.",      4,  'int'),
+    ('montant_sinistres', "Montant €", 11, 'num'),
+    ('bonus_malus',       "B/M",       5,  'num'),
+    ('ratio_SP',          "S/P",       7,  'num'),
+]
+
+# Chapitres : colonne de segmentation → titre
+CHAPTERS = [
+    ('type_assurance', "Analyse par Type d'Assurance"),
+    ('tranche_age',    "Analyse par Tranche d'Âge"),
+    ('bm_cat',         "Analyse par Catégorie Bonus/Malus"),
+]
+
+
+# ════════════════════════════════════════════════════════════════
+# CHAPITRES PAR SEGMENT
+# ════════════════════════════════════════════════════════════════
+def _fmt(values, spec):
+    return values.map(lambda v: '—' if pd.isna(v) else format(v, spec))
+
+
+# Lignes du tableau d'un chapitre (en-tête compris), toutes en chaînes
+def segment_table(fdf, col):
+    grouped = fdf.assign(
+        _sinistre=fdf['nb_sinistres'] > 0,
+        _deficit=fdf['ratio_SP'] > 1,
+    ).groupby(col, observed=True).agg(
+        assures=('id_assure', 'count'),
+        sinistres=('nb_sinistres', 'sum'),
+        sinistres_assures=('_sinistre', 'sum'),
+        montant=('montant_sinistres', 'sum'),
+        primes=('montant_prime', 'sum'),
+        deficitaires=('_deficit', 'sum'),
+        sp_median=('ratio_SP', 'median'),
+    )
+    g = grouped[grouped['assures'] > 0]
+    columns = {
+        'Segment':        g.index.astype(str).to_series(index=g.index),
+        'Assurés':        _fmt(g['assures'], ',d'),
+        'Part':           _fmt(g['assures'] / len(fdf) * 100, '.1f') + ' %',
+        'Sinistres':      _fmt(g['sinistres'], ',d'),
+        'Sinistralité':   _fmt(g['sinistres_assures'] / g['assures'] * 100, '.1f') + ' %',
+        'Montant (€)':    _fmt(g['montant'], ',.0f'),
+        'Prime moy. (€)': _fmt(g['primes'] / g['assures'], ',.0f'),
+        'S/P global':     _fmt(g['montant'] / g['primes'].where(g['primes'] > 0), '.2f'),
+        'S/P médian':     _fmt(g['sp_median'], '.2f'),
+        '% déficit.':     _fmt(g['deficitaires'] / g['assures'] * 100, '.1f') + ' %',
+    }
+    frame = pd.DataFrame(columns)
+    return [list(frame.columns)] + frame.to_numpy().tolist()
+
+
+# ════════════════════════════════════════════════════════════════
+# ANNEXE : LIGNES À LARGEUR FIXE
+# ════════════════════════════════════════════════════════════════
+def annex_header():
+    return ' '.join(header[:width].rjust(width) if kind in ('int', 'num') else header.ljust(width)
+                    for _, header, width, kind in ANNEX_COLUMNS)
+
+
+def _cells(s, kind, width):
+    if kind == 'str':
+        text = s.astype(object).where(s.notna(), '—').astype(str).to_numpy().astype(f'<U{width}')
+        return np.char.ljust(text, width)
+    values = s.to_numpy(dtype=np.float64)
+    text = np.char.mod('%d' if kind == 'int' else '%.2f', np.nan_to_num(values))
+    text = np.where(np.isnan(values), '—', text).astype(f'<U{width}')
+    return np.char.rjust(text, width)
+
+
+# Morceau de la sélection → une ligne par contrat
+def annex_lines(frame):
+    line = None
+    for col, _, width, kind in ANNEX_COLUMNS:
+        cells = (_cells(frame[col], kind, width) if col in frame.columns
+                 else np.full(len(frame), ' ' * width))
+        line = cells if line is None else np.char.add(np.char.add(line, ' '), cells)
+    return line if line is not None else np.empty(0, dtype=str)
+
+
+def annex_pages(n_rows):
+    return -(-n_rows // ANNEX_ROWS_PER_PAGE)
+
+
+# ════════════════════════════════════════════════════════════════
+# ANNEXE : DESSIN D'UNE PAGE
+# ════════════════════════════════════════════════════════════════
+# Cadre (x, y, w, h) : marges de la page (canvas) ou cadre platypus (flowable)
+def draw_annex_page(c, lines, page, n_pages, x, y, w, h):
+    from reportlab.lib import colors
+    top = y + h
+    c.setFillColor(colors.HexColor('#1565C0'))
+    c.setFont('Helvetica-Bold', 11)
+    c.drawString(x, top - 12, "Annexe — Liste des contrats de la sélection")
+    c.setFillColor(colors.HexColor('#718096'))
+    c.setFont('Helvetica', 7.5)
+    c.drawRightString(x + w, top - 12, f"Page {page} / {n_pages} de l'annexe")
+
+    # En-tête des colonnes, puis bandes alternées sous les lignes
+    head = top - 34
+    c.setFillColor(colors.HexColor('#1565C0'))
+    c.rect(x, head - 3, w, ANNEX_LEADING + 1, stroke=0, fill=1)
+    c.setFillColor(colors.HexColor('#EBF8FF'))
+    for i in range(1, len(lines), 2):
+        c.rect(x, head - 3 - (i + 1) * ANNEX_LEADING, w, ANNEX_LEADING, stroke=0, fill=1)
+
+    text = c.beginText(x + 2, head)
+    text.setFont('Courier-Bold', ANNEX_FONT_SIZE, ANNEX_LEADING)
+    text.setFillColor(colors.white)
+    text.textLine(annex_header())
+    text.setFont('Courier', ANNEX_FONT_SIZE, ANNEX_LEADING)
+    text.setFillColor(colors.HexColor('#2d3748'))
+    text.textLines('\n'.join(lines), trim=0)
+    c.drawText(text)
+
+
+# Flowable platypus : une page d'annexe dans le document principal
+def annex_flowables(fdf):
+    from reportlab.platypus import Flowable, PageBreak
+
+    class AnnexPage(Flowable):
+        def __init__(self, lines, page, n_pages):
+            super().__init__()
+            self.lines, self.page, self.n_pages = lines, page, n_pages
+
+        def wrap(self, available_width, available_height):
+            self.width, self.height = available_width, available_height
+            return available_width, available_height
+
+        def draw(self):
+            draw_annex_page(self.canv, self.lines, self.page, self.n_pages,
+                            0, 0, self.width, self.height)
+
+    n_pages = annex_pages(len(fdf))
+    out, page = [], 1
+    for start in range(0, len(fdf), ANNEX_CHUNK_ROWS):
+        lines = annex_lines(fdf.iloc[start:start + ANNEX_CHUNK_ROWS])
+        for i in range(0, len(lines), ANNEX_ROWS_PER_PAGE):
+            out += [PageBreak(), AnnexPage(lines[i:i + ANNEX_ROWS_PER_PAGE].tolist(), page, n_pages)]
+            page += 1
+    return out
+
+
+# ════════════════════════════════════════════════════════════════
+# ANNEXE : RENDU PARALLÈLE & FUSION
+# ════════════════════════════════════════════════════════════════
+# Un morceau (processus du pool) → PDF autonome de ses pages
+def render_chunk(frame, first_page, n_pages, margins):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+    left, right, top, bottom = margins
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4, pageCompression=1)
+    lines = annex_lines(frame)
+    for p, i in enumerate(range(0, len(lines), ANNEX_ROWS_PER_PAGE)):
+        draw_annex_page(c, lines[i:i + ANNEX_ROWS_PER_PAGE].tolist(), first_page + p, n_pages,
+                        left, bottom, A4[0] - left - right, A4[1] - top - bottom)
+        c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+def parallel_available(n_rows):
+    try:
+        import pypdf  # noqa: F401
+    except ImportError:
+        return False
+    return PDF_WORKERS > 1 and n_rows > ANNEX_CHUNK_ROWS
+
+
+# Lance le rendu des morceaux ; compose(…) construit le rapport pendant ce temps
+# et renvoie ses octets. Résultat : rapport + annexe fusionnés.
+def render_with_annex(fdf, margins, compose):
+    from pypdf import PdfReader, PdfWriter
+    frame = fdf[[c for c, *_ in ANNEX_COLUMNS if c in fdf.columns]]
+    n_pages = annex_pages(len(fdf))
+    tasks = [(frame.iloc[s:s + ANNEX_CHUNK_ROWS], 1 + s // ANNEX_ROWS_PER_PAGE, n_pages, margins)
+             for s in range(0, len(frame), ANNEX_CHUNK_ROWS)]
+    try:
+        with ProcessPoolExecutor(max_workers=min(PDF_WORKERS, len(tasks))) as pool:
+            futures = [pool.submit(render_chunk, *t) for t in tasks]
+            report = compose()
+            parts = [f.result() for f in futures]
+    except (OSError, BrokenProcessPool) as e:
+        print(f"⚠️ Pool PDF indisponible ({e}) — annexe séquentielle")
+        report = compose()
+        parts = [render_chunk(*t) for t in tasks]
+
+    writer = PdfWriter()
+    for part in [report] + parts:
+        writer.append(PdfReader(io.BytesIO(part)))
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
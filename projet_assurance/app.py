@@ -5,11 +5,18 @@
 #  Mastère 2 Big Data & Data Stratégie
 # =============================================================
 
+import os
 import dash
 import dash_bootstrap_components as dbc
 from layout import create_layout
 from callbacks import register_callbacks
-import pandas as pd
+from clientside import encode_columnar, CLIENTSIDE_MAX_ROWS
+from sampling import SAMPLING_MIN_ROWS
+from profiling import install_profiler
+from coalescing import install_coalescing
+from scheduler import install_scheduler
+from portfolio import load_portfolio
+from catalogue import load_catalogue
 
 # ── Initialisation de l'application ───────────────────────────
 app = dash.Dash(
@@ -29,50 +36,47 @@ server = app.server
 app.title = "AssurAnalytics — Analyse des Sinistres & Profil des Assurés"
 
 # ── Chargement & Enrichissement des données ───────────────────
-try:
-    df = pd.read_csv('data/assurance_data_1000.csv', sep=';')
+# Lecture, sinistres, variables dérivées et scores GLM (portfolio.py, partagé avec batch.py)
+df, claims = load_portfolio()
 
-    # Conversion dates
-    df['date_derniere_sinistre'] = pd.to_datetime(
-        df['date_derniere_sinistre'], errors='coerce'
-    )
-
-    # Tranches d'âge
-    df['tranche_age'] = pd.cut(
-        df['age'],
-        bins=[17, 25, 35, 45, 55, 65, 79],
-        labels=['18-25', '26-35', '36-45', '46-55', '56-65', '66-79'],
-        include_lowest=True
-    )
+# ── Mode de filtrage navigateur ────────────────────────────────
+# ASSUR_CLIENTSIDE : '0' (défaut, désactivé), 'auto' (selon la taille) ou '1' (forcé).
+# Mode optionnel : activé explicitement par le déploiement
+_mode = os.environ.get('ASSUR_CLIENTSIDE', '0').lower()
+clientside = _mode in ('1', 'true', 'on') or (
+    _mode == 'auto' and 0 < len(df) <= CLIENTSIDE_MAX_ROWS
+)
+print(f"🖥️   Filtrage navigateur : {'activé' if clientside else 'désactivé'}")
 
-    # Ratio sinistre / prime (rentabilité)
-    df['ratio_SP'] = (df['montant_sinistres'] / df['montant_prime']).round(2)
+# ── Mode échantillon pendant le glissement des sliders ────────
+# ASSUR_SAMPLING : 'auto' (défaut, gros portefeuilles), '1' (forcé) ou '0' (désactivé)
+# Sans objet en mode navigateur (les KPIs y sont déjà instantanés et exacts)
+_mode = os.environ.get('ASSUR_SAMPLING', 'auto').lower()
+sampling = not clientside and len(df) > 0 and (
+    _mode in ('1', 'true', 'on') or (_mode == 'auto' and len(df) > SAMPLING_MIN_ROWS)
+)
+print(f"🎯  Échantillonnage      : {'activé' if sampling else 'désactivé'}")
 
-    # Catégorie bonus/malus
-    df['bm_cat'] = pd.cut(
-        df['bonus_malus'],
-        bins=[0.4, 0.8, 1.0, 1.2, 1.6],
-        labels=['Bonus fort', 'Bonus', 'Neutre', 'Malus']
-    )
+# ── Profilage à la demande (/admin/profils) ──────────────────
+install_profiler(server)
 
-    # Année et mois du sinistre
-    df['annee_sinistre'] = df['date_derniere_sinistre'].dt.year
-    df['mois_sinistre']  = df['date_derniere_sinistre'].dt.to_period('M').astype(str)
+# ── Abandon des requêtes dépassées (rafales de glissement) ────
+install_coalescing(server)
 
-    print(f"✅  Données chargées   : {len(df)} assurés")
-    print(f"📊  Colonnes           : {df.columns.tolist()}")
-    print(f"🗺️   Régions            : {df['region'].unique().tolist()}")
-    print(f"🛡️   Types              : {df['type_assurance'].unique().tolist()}")
-    print(f"📅  Âge                : {df['age'].min()} → {df['age'].max()} ans")
+# ── Ordonnanceur interactif / exports (/admin/ordonnanceur) ──
+install_scheduler(server)
 
-except Exception as e:
-    print(f"❌ Erreur chargement données : {e}")
-    import traceback; traceback.print_exc()
-    df = pd.DataFrame()
+# ── Catalogue des dimensions (options & bornes des filtres) ───
+catalogue = load_catalogue(df)
 
-# ── Layout & Callbacks ─────────────────────────────────────────
-app.layout = create_layout()
-register_callbacks(app, df)
+# ── Callbacks & Layout (état initial précalculé) ──────────────
+initial_state = register_callbacks(app, df, clientside=clientside, sampling=sampling,
+                                   claims=claims, catalogue=catalogue)
+app.layout = create_layout(
+    columnar=encode_columnar(df) if clientside else None,
+    initial=initial_state,
+    catalogue=catalogue,
+)
 
 # ── Lancement ─────────────────────────────────────────────────
 if __name__ == '__main__':
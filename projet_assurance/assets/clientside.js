@@ -0,0 +1,404 @@
+// =============================================================
+//  clientside.js  —  Filtrage & KPIs côté navigateur
+//  Projet : Analyse des Sinistres & Profil des Assurés
+//  Auteur : Sona KOULIBALY
+// =============================================================
+//  Recalcule, à partir du jeu colonnaire de 'store-columnar'
+//  (voir clientside.py), les KPIs, le compteur et les graphiques
+//  simples (pies type / région / B/M, histogramme nb sinistres).
+//  Les graphiques lourds et les exports restent calculés côté serveur.
+//  La sélection brossée (crossfilter-selection) suit la même sémantique
+//  que crossfilter.py : une ligne exclue par la seule brosse d'un
+//  graphique reste comptée dans ce graphique.
+
+(function () {
+
+    // ── Décodage des tableaux typés ─────────────────────────────
+    var TYPED = {
+        'i1': Int8Array,  'u1': Uint8Array,
+        'i2': Int16Array, 'u2': Uint16Array,
+        'i4': Int32Array, 'u4': Uint32Array,
+        'f4': Float32Array, 'f8': Float64Array
+    };
+
+    function decode(spec) {
+        var bin = atob(spec.bdata);
+        var bytes = new Uint8Array(bin.length);
+        for (var i = 0; i < bin.length; i++) { bytes[i] = bin.charCodeAt(i); }
+        return new TYPED[spec.dtype](bytes.buffer);
+    }
+
+    // Le jeu n'est décodé qu'une fois par version de données
+    var cache = {version: null, cols: null, ref: null};
+
+    function load(data) {
+        if (cache.version === data.version) { return cache; }
+        var cols = {};
+        Object.keys(data.columns).forEach(function (name) {
+            var c = data.columns[name];
+            cols[name] = c.levels ? {levels: c.levels, codes: decode(c.codes)} : decode(c);
+        });
+        cache = {version: data.version, cols: cols, ref: reference(cols, data.n)};
+        return cache;
+    }
+
+    // Références portefeuille complet (tendances « vs total »)
+    function reference(cols, n) {
+        var nb = cols.nb_sinistres, mt = cols.montant_sinistres, pr = cols.montant_prime;
+        var sumNb = 0, nSin = 0, sumSin = 0, sumPrime = 0;
+        for (var i = 0; i < n; i++) {
+            sumNb += nb[i];
+            sumPrime += pr[i];
+            if (nb[i] > 0) { nSin++; sumSin += mt[i]; }
+        }
+        return {n: n, sinistres: sumNb,
+                cout: nSin ? sumSin / nSin : 0,
+                prime: n ? sumPrime / n : 0};
+    }
+
+    // ── Formatage (aligné sur les f-strings de callbacks.py) ────
+    function thousands(v, decimals, sep) {
+        var s = Math.abs(v).toFixed(decimals).split('.');
+        s[0] = s[0].replace(/\B(?=(\d{3})+(?!\d))/g, sep);
+        return (v < 0 ? '-' : '') + s.join('.');
+    }
+
+    // toFixed arrondit les demis exacts vers le haut, Python vers le pair :
+    // on repère l'égalité exacte sur le développement décimal complet
+    function fixed(v, decimals) {
+        var exact = Math.abs(v).toFixed(Math.min(100, decimals + 60));
+        var cut = exact.indexOf('.') + 1 + decimals;
+        var tail = exact.slice(cut);
+        if (/^50*$/.test(tail)) {
+            var head = exact.slice(0, decimals ? cut : cut - 1);
+            var last = Number(head.replace('.', '').slice(-1));
+            if (last % 2 === 0) { return (v < 0 ? '-' : '') + head; }
+        }
+        return v.toFixed(decimals);
+    }
+
+    function pctVs(val, ref) {
+        if (ref === 0) { return ''; }
+        var d = (val - ref) / ref * 100;
+        return (d > 0 ? '↗️ +' : '↘️ ') + fixed(d, 1) + '% vs total';
+    }
+
+    function median(arr) {
+        if (!arr.length) { return NaN; }
+        arr.sort();
+        var m = arr.length >> 1;
+        return arr.length % 2 ? arr[m] : (arr[m - 1] + arr[m]) / 2;
+    }
+
+    // Masque des modalités retenues pour un filtre catégoriel
+    function codeMask(col, values) {
+        if (!values || !values.length) { return null; }
+        var wanted = values.map(String);
+        var mask = new Uint8Array(col.levels.length);
+        col.levels.forEach(function (lvl, k) {
+            if (wanted.indexOf(lvl) !== -1) { mask[k] = 1; }
+        });
+        return mask;
+    }
+
+    // Brosses actives → tests par ligne (true = ligne retenue)
+    var RANGE_FIELDS = ['age', 'montant_prime', 'montant_sinistres', 'bonus_malus', 'score_risque'];
+
+    function brushTests(cols, selection) {
+        var tests = [];
+        Object.keys(selection || {}).forEach(function (field) {
+            var vals = selection[field], col = cols[field];
+            if (!vals || !vals.length || !col) { return; }
+            if (RANGE_FIELDS.indexOf(field) !== -1) {
+                tests.push({field: field, ok: function (i) {
+                    return col[i] >= vals[0] && col[i] <= vals[1];
+                }});
+            } else if (col.levels) {
+                var mask = codeMask(col, vals);
+                tests.push({field: field, ok: function (i) { return mask[col.codes[i]] === 1; }});
+            } else {
+                var set = {};
+                vals.forEach(function (v) { set[Number(v)] = true; });
+                tests.push({field: field, ok: function (i) { return set[col[i]] === true; }});
+            }
+        });
+        return tests;
+    }
+
+    // Mise en avant des modalités brossées (comme pulls / opacities de callbacks.py)
+    function brushed(selection, field, labels) {
+        var sel = ((selection || {})[field] || []).map(String);
+        return labels.map(function (l) { return !sel.length || sel.indexOf(String(l)) !== -1; });
+    }
+
+    function opacities(selection, field, labels) {
+        return brushed(selection, field, labels).map(function (b) { return b ? 1.0 : 0.35; });
+    }
+
+    function pulls(selection, field, labels) {
+        var active = ((selection || {})[field] || []).length > 0;
+        return brushed(selection, field, labels).map(function (b) { return active && b ? 0.08 : 0; });
+    }
+
+    // ── Figures ─────────────────────────────────────────────────
+    function baseLayout(data, extra) {
+        return Object.assign({}, data.layout, extra || {});
+    }
+
+    function emptyFig(data) {
+        return {data: [], layout: baseLayout(data, {
+            annotations: [{text: 'Aucune donnée', xref: 'paper', yref: 'paper',
+                           x: 0.5, y: 0.5, showarrow: false,
+                           font: {size: 13, color: '#a0aec0'}}]
+        })};
+    }
+
+    // Comptages triés par effectif décroissant (comme value_counts)
+    function sortedCounts(levels, counts, keepZero) {
+        var rows = [];
+        levels.forEach(function (lvl, k) {
+            if (keepZero || counts[k] > 0) { rows.push([lvl, counts[k]]); }
+        });
+        rows.sort(function (a, b) { return b[1] - a[1]; });
+        return rows;
+    }
+
+    function pieFig(data, rows, palette, opts) {
+        var labels = rows.map(function (r) { return r[0]; });
+        return {
+            data: [{
+                type: 'pie',
+                labels: labels,
+                values: rows.map(function (r) { return r[1]; }),
+                hole: opts.hole,
+                pull: pulls(opts.selection, opts.field, labels),
+                marker: {colors: rows.map(function (r) { return palette[r[0]] || '#888'; }),
+                         line: {color: 'white', width: 2}},
+                customdata: opts.customdata ? labels.map(function () { return opts.field; }) : undefined,
+                textinfo: opts.textinfo,
+                textfont: {size: opts.textsize},
+                hovertemplate: '<b>%{label}</b><br>%{value} assurés (%{percent})<extra></extra>'
+            }],
+            layout: baseLayout(data, Object.assign({showlegend: false}, opts.layout || {}))
+        };
+    }
+
+    // ── Hiérarchie géographique (mêmes règles que geography.py) ──
+    function geoFind(geo, depth, label, parent) {
+        var labels = geo.labels[depth], par = geo.parent[depth];
+        for (var k = 0; k < labels.length; k++) {
+            if (labels[k] === label && (parent === null || par[k] === parent)) { return k; }
+        }
+        return null;
+    }
+
+    // Drill-down : on descend tant qu'un seul nœud est retenu
+    function geoDrill(geo, regionV, selection) {
+        var depth = 0, parent = null;
+        selection = selection || {};
+        while (depth + 1 < geo.levels.length) {
+            var vals = selection[geo.levels[depth]];
+            if (!vals || !vals.length) { vals = depth === 0 ? (regionV || []) : []; }
+            var node = vals.length === 1 ? geoFind(geo, depth, String(vals[0]), parent) : null;
+            if (node === null) { break; }
+            depth++;
+            parent = node;
+        }
+        return {depth: depth, parent: parent};
+    }
+
+    // Effectifs par feuille → enfants du nœud parent (table feuille → nœud)
+    function geoPie(data, leafCounts, drill, selection) {
+        var geo = data.geo, d = drill.depth, up = geo.up[d], par = geo.parent[d];
+        var counts = new Array(geo.labels[d].length).fill(0);
+        for (var l = 0; l < leafCounts.length; l++) { counts[up[l]] += leafCounts[l]; }
+        var rows = [], palette = {};
+        counts.forEach(function (v, k) {
+            if (v > 0 && (drill.parent === null || par[k] === drill.parent)) {
+                rows.push([geo.labels[d][k], v]);
+                palette[geo.labels[d][k]] = geo.colors[d][k];
+            }
+        });
+        rows.sort(function (a, b) { return b[1] - a[1]; });
+        var layout = {};
+        if (d > 0) {
+            var path = [], parent = drill.parent;
+            for (var k = d - 1; k >= 0 && parent !== null; k--) {
+                path.unshift(geo.labels[k][parent]);
+                parent = geo.parent[k] ? geo.parent[k][parent] : null;
+            }
+            layout = {title: {text: path.join(' › ') + ' — ' + geo.names[d].toLowerCase() + 's',
+                              font: {size: 11}, x: 0.02, y: 0.98},
+                      margin: Object.assign({}, data.layout.margin, {t: 40})};
+        }
+        return pieFig(data, rows, palette,
+                      {hole: 0.45, textinfo: 'label+percent', textsize: 11,
+                       selection: selection, field: geo.levels[d], customdata: true,
+                       layout: layout});
+    }
+
+    var BAR_COLS = {0: '#00E676', 1: '#00C6FF', 2: '#FFB300', 3: '#FF7043', 4: '#FF5252'};
+
+    function histFig(data, nbCounts, selection) {
+        var x = [], y = [], colors = [], text = [];
+        var keys = Object.keys(nbCounts).map(Number).sort(function (a, b) { return a - b; });
+        var total = keys.reduce(function (acc, k) { return acc + nbCounts[k]; }, 0);
+        keys.forEach(function (k) {
+            var v = nbCounts[k];
+            x.push(k <= 1 ? k + ' sinistre' : (k <= 4 ? k + ' sinistres' : k + ' sin.'));
+            y.push(v);
+            colors.push(BAR_COLS[k] || '#FF5252');
+            text.push(v + '<br>(' + (v / total * 100).toFixed(1) + '%)');
+        });
+        return {
+            data: [{type: 'bar', x: x, y: y, customdata: keys,
+                    marker: {color: colors, line: {color: 'white', width: 1.5},
+                             opacity: opacities(selection, 'nb_sinistres', keys)},
+                    text: text, textposition: 'outside', textfont: {size: 10},
+                    hovertemplate: '<b>%{x}</b><br>%{y} assurés<extra></extra>'}],
+            layout: baseLayout(data, {
+                showlegend: false,
+                xaxis: {showgrid: false},
+                yaxis: {showgrid: true, gridcolor: '#e2e8f0', title: {text: "Nb d'assurés"}}
+            })
+        };
+    }
+
+    // ════════════════════════════════════════════════════════════
+    // CALLBACK — update_light
+    // ════════════════════════════════════════════════════════════
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        assurance: {
+            update_light: function (type_v, sexe_v, region_v, sin_v, age_v, bm_v,
+                                    age_drag, bm_drag, selection, data) {
+                if (!data) { return window.dash_clientside.no_update; }
+                var st = load(data), c = st.cols, ref = st.ref, N = data.n;
+
+                // Pendant le glissement, drag_value précède value
+                var ctx = window.dash_clientside.callback_context || {};
+                var dragging = (ctx.triggered || []).some(function (t) {
+                    return /drag_value$/.test(t.prop_id);
+                });
+                var ages = (dragging && age_drag) || age_v,
+                    bms  = (dragging && bm_drag) || bm_v;
+
+                var mType = codeMask(c.type_assurance, type_v);
+                var mSexe = codeMask(c.sexe, sexe_v);
+                var mReg  = codeMask(c.region, region_v);
+                var nbSet = null;
+                if (sin_v && sin_v.length) {
+                    nbSet = {};
+                    sin_v.forEach(function (v) { nbSet[v] = true; });
+                }
+
+                var tCodes = c.type_assurance.codes, sCodes = c.sexe.codes,
+                    rCodes = c.region.codes, leaf = c.geo_leaf, bmCodes = c.bm_cat ? c.bm_cat.codes : null;
+                var age = c.age, nb = c.nb_sinistres, mt = c.montant_sinistres,
+                    pr = c.montant_prime, ratio = c.ratio_SP, bm = c.bonus_malus;
+
+                var n = 0, sumNb = 0, nSin = 0, sumSin = 0, sumPrime = 0,
+                    sumBm = 0, nDef = 0;
+                var ratios = new Float64Array(N), nRatio = 0;
+                var typeCounts = new Array(c.type_assurance.levels.length).fill(0);
+                var leafCounts = new Float64Array(data.geo.n_leaves);
+                var geoFields  = data.geo.levels;
+                var bmCounts   = bmCodes ? new Array(c.bm_cat.levels.length).fill(0) : null;
+                var nbCounts   = {};
+                var tests = brushTests(c, selection), nTests = tests.length;
+
+                // Une seule passe : filtre + accumulation
+                for (var i = 0; i < N; i++) {
+                    if (mType && !mType[tCodes[i]]) { continue; }
+                    if (mSexe && !mSexe[sCodes[i]]) { continue; }
+                    if (mReg && !mReg[rCodes[i]]) { continue; }
+                    if (nbSet && !nbSet[nb[i] >= 4 ? '4' : String(nb[i])]) { continue; }
+                    if (ages && (age[i] < ages[0] || age[i] > ages[1])) { continue; }
+                    if (bms && (bm[i] < bms[0] || bm[i] > bms[1])) { continue; }
+
+                    // Brosses : exclue par un seul champ → comptée dans son graphique
+                    var failed = null, nFail = 0;
+                    for (var t = 0; t < nTests && nFail < 2; t++) {
+                        if (!tests[t].ok(i)) { failed = tests[t].field; nFail++; }
+                    }
+                    if (nFail === 1) {
+                        if (failed === 'type_assurance') { typeCounts[tCodes[i]]++; }
+                        else if (geoFields.indexOf(failed) !== -1) { leafCounts[leaf[i]]++; }
+                        else if (failed === 'nb_sinistres') { nbCounts[nb[i]] = (nbCounts[nb[i]] || 0) + 1; }
+                        else if (failed === 'bm_cat' && bmCodes && bmCodes[i] >= 0) { bmCounts[bmCodes[i]]++; }
+                    }
+                    if (nFail) { continue; }
+
+                    n++;
+                    sumNb += nb[i];
+                    sumPrime += pr[i];
+                    sumBm += bm[i];
+                    if (nb[i] > 0) { nSin++; sumSin += mt[i]; }
+                    if (!isNaN(ratio[i])) {
+                        ratios[nRatio++] = ratio[i];
+                        if (ratio[i] > 1) { nDef++; }
+                    }
+                    typeCounts[tCodes[i]]++;
+                    leafCounts[leaf[i]]++;
+                    if (bmCodes && bmCodes[i] >= 0) { bmCounts[bmCodes[i]]++; }
+                    nbCounts[nb[i]] = (nbCounts[nb[i]] || 0) + 1;
+                }
+
+                // ── KPIs ──
+                var cout = nSin ? sumSin / nSin : 0;
+                var prime = n ? sumPrime / n : 0;
+                var kpiAssures   = thousands(n, 0, ' ');
+                var kpiSinistres = thousands(sumNb, 0, ' ');
+                var kpiCout      = nSin ? thousands(cout, 0, ',') + ' €' : '— €';
+                var kpiPrime     = n ? thousands(prime, 0, ',') + ' €' : '— €';
+
+                var tAssures = n < N ? '📊 ' + fixed(n / N * 100, 0) + '% du portefeuille'
+                                     : '📊 Portefeuille complet';
+                var tSinistres = pctVs(sumNb, ref.sinistres);
+                var tCout      = pctVs(cout, ref.cout);
+                var tPrime     = pctVs(prime, ref.prime);
+
+                var tauxSin = n ? fixed(nSin / n * 100, 1) + '%' : '—';
+                var ratioSp = n ? fixed(median(ratios.subarray(0, nRatio)), 2) + 'x' : '—';
+                var bmMoyen = n ? fixed(sumBm / n, 3) : '—';
+                var pctDef  = n ? fixed(nDef / n * 100, 1) + '%' : '—';
+
+                var counter = {
+                    namespace: 'dash_html_components', type: 'Span',
+                    props: n === N
+                        ? {children: '✅ ' + thousands(n, 0, ',') + ' assurés — Aucun filtre actif',
+                           style: {color: '#38a169', fontSize: '0.78rem', fontWeight: '600'}}
+                        : {children: '🔍 ' + thousands(n, 0, ',') + ' assurés filtrés / ' + thousands(N, 0, ','),
+                           style: {color: '#1565C0', fontSize: '0.78rem', fontWeight: '600'}}
+                };
+
+                // ── Graphiques simples ──
+                var figType, figReg, figHist, figBm;
+                if (n === 0) {
+                    figType = figReg = figHist = figBm = emptyFig(data);
+                } else {
+                    figType = pieFig(data, sortedCounts(c.type_assurance.levels, typeCounts),
+                                     data.colors.type,
+                                     {hole: 0.52, textinfo: 'label+percent', textsize: 11,
+                                      selection: selection, field: 'type_assurance',
+                                      layout: {annotations: [{text: '<b>' + n + '</b><br>assurés',
+                                                              x: 0.5, y: 0.5, showarrow: false,
+                                                              font: {size: 13, color: '#2d3748'}}]}});
+                    figReg = geoPie(data, leafCounts, geoDrill(data.geo, region_v, selection),
+                                    selection);
+                    figHist = histFig(data, nbCounts, selection);
+                    figBm = bmCounts
+                        ? pieFig(data, sortedCounts(c.bm_cat.levels, bmCounts, true), data.colors.bm,
+                                 {hole: 0.45, textinfo: 'label+percent+value', textsize: 10,
+                                  selection: selection, field: 'bm_cat'})
+                        : emptyFig(data);
+                }
+
+                return [kpiAssures, kpiSinistres, kpiCout, kpiPrime,
+                        tAssures, tSinistres, tCout, tPrime,
+                        tauxSin, ratioSp, bmMoyen, pctDef,
+                        counter,
+                        figType, figReg, figHist, figBm];
+            }
+        }
+    });
+})();
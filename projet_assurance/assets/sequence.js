@@ -0,0 +1,36 @@
+// =============================================================
+//  sequence.js  —  Numérotation des requêtes de callbacks par onglet
+//  Projet : Analyse des Sinistres & Profil des Assurés
+//  Auteur : Sona KOULIBALY
+// =============================================================
+//  Chaque requête /_dash-update-component part avec l'identifiant de
+//  l'onglet (X-Assur-Tab, tiré au chargement de la page : un onglet
+//  dupliqué ou rechargé en reçoit un nouveau) et un compteur croissant
+//  propre à l'onglet (X-Assur-Seq). Le serveur
+//  (coalescing.py) n'abandonne une requête que si un numéro plus grand du
+//  même onglet est arrivé pour le même callback.
+
+(function () {
+
+    var bytes = new Uint8Array(12);
+    window.crypto.getRandomValues(bytes);
+    var tab = Array.prototype.map.call(bytes, function (b) {
+        return ('0' + b.toString(16)).slice(-2);
+    }).join('');
+    var seq = 0;
+
+    var fetch0 = window.fetch;
+    if (!fetch0) { return; }
+    window.fetch = function (input, init) {
+        var url = typeof input === 'string' ? input : (input && input.url) || '';
+        if (url.indexOf('_dash-update-component') !== -1) {
+            init = Object.assign({}, init || {});
+            var headers = new Headers(init.headers || (typeof input === 'string' ? {} : input.headers));
+            headers.set('X-Assur-Tab', tab);
+            headers.set('X-Assur-Seq', String(++seq));
+            init.headers = headers;
+        }
+        return fetch0.call(window, input, init);
+    };
+
+})();
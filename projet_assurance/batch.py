@@ -0,0 +1,238 @@
+# =============================================================
+#  batch.py  —  Rapports en lot (ligne de commande)
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+#  Pack de gestion sans clics : une matrice de combinaisons de filtres (ex.
+#  chaque région × type d'assurance) → un rapport par combinaison et par
+#  format. Mêmes constructeurs que les boutons d'export (exports.py), même
+#  moteur de filtrage que les callbacks (crossfilter.apply_filters).
+#  Portefeuille chargé une fois (portfolio.load_portfolio) ; combinaisons
+#  réparties sur un pool de processus — en fork, les processus héritent des
+#  données et du moteur sans rien recharger ; sinon chacun les charge une
+#  fois au démarrage. Une combinaison = un filtrage, puis tous ses formats.
+#  manifest.json recense chaque rapport : filtres, effectif, fichier,
+#  taille, durée, ou le motif d'absence (sélection vide, erreur).
+#
+#  Usage :
+#    python batch.py --par region type_assurance --formats pdf excel
+#    python batch.py --par region --filtre type_assurance=Auto --sortie rapports/auto
+#    python batch.py --par region tranche_age --formats parquet --compression lz4 --workers 8
+
+import argparse
+import base64
+import itertools
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+import numpy as np
+
+from catalogue import load_catalogue, distinct_values
+from crossfilter import portfolio_crossfilter, apply_filters
+from exports import (EXPORTS, COLUMNAR_EXPORTS, ExportColumns,
+                     EXPORT_COMPRESSIONS, EXPORT_COMPRESSION_DEFAULT)
+from portfolio import load_portfolio, DATA_FILE
+
+
+# Dimensions de la matrice : filtres du panneau, sinon brosses (sélection)
+BATCH_DIMENSIONS = ['region', 'type_assurance', 'sexe', 'tranche_age', 'bm_cat', 'nb_sinistres']
+PANEL_FILTERS = ['type_assurance', 'sexe', 'region', 'nb_sinistres']
+DEFAULT_FORMATS = ['pdf', 'excel']
+
+# État d'un processus de rendu : portefeuille, moteur, colonnes d'export
+_state = {}
+
+
+# ════════════════════════════════════════════════════════════════
+# MATRICE DES COMBINAISONS
+# ════════════════════════════════════════════════════════════════
+def _filter_value(text):
+    col, _, vals = text.partition('=')
+    if col not in BATCH_DIMENSIONS or not vals:
+        raise argparse.ArgumentTypeError(
+            f"filtre « {text} » : attendu <dimension>=<valeur>[,<valeur>…], "
+            f"dimension parmi {', '.join(BATCH_DIMENSIONS)}")
+    return col, [v.strip() for v in vals.split(',') if v.strip()]
+
+
+# Produit cartésien des modalités (catalogue), restreint par les filtres fixes
+def combinations(catalogue, dimensions, fixed):
+    axes = []
+    for col in dimensions:
+        values = distinct_values(catalogue, col)
+        if col in fixed:
+            values = [v for v in values if v in fixed[col]]
+        axes.append(values)
+    out = []
+    for values in itertools.product(*axes):
+        combo = {col: list(vals) for col, vals in fixed.items()}
+        combo.update({col: [v] for col, v in zip(dimensions, values)})
+        name = '_'.join(f"{col}-{v}" for col, v in zip(dimensions, values)) or 'portefeuille'
+        out.append((re.sub(r'[^\w.-]+', '-', name), combo))
+    return out
+
+
+# Combinaison → arguments de apply_filters (panneau + sélection brossée)
+def filter_args(combo):
+    panel = [combo.get(col) for col in PANEL_FILTERS]
+    selection = {col: vals for col, vals in combo.items() if col not in PANEL_FILTERS}
+    return (*panel, None, None, selection)
+
+
+# ════════════════════════════════════════════════════════════════
+# RENDU (un processus du pool)
+# ════════════════════════════════════════════════════════════════
+def _init(path):
+    # Fork : portefeuille et moteur hérités du processus principal
+    if 'df' not in _state:
+        df, claims = load_portfolio(path)
+        _state.update(df=df, claims=claims, engine=portfolio_crossfilter(df))
+
+
+def _columns():
+    if 'columns' not in _state:
+        _state['columns'] = ExportColumns(_state['df'])
+    return _state['columns']
+
+
+# Résultat d'un constructeur (dcc.send_bytes ou message d'erreur) → fichier
+def _write(result, outdir, name):
+    if result.get('filename') == 'erreur.txt':
+        raise RuntimeError(result['content'])
+    content = (base64.b64decode(result['content']) if result.get('base64')
+               else result['content'].encode('utf-8'))
+    fname = name + os.path.splitext(result['filename'])[1]
+    with open(os.path.join(outdir, fname), 'wb') as f:
+        f.write(content)
+    return fname, len(content)
+
+
+def render(name, combo, formats, outdir, compression):
+    df, engine = _state['df'], _state['engine']
+    apply_filters(engine, *filter_args(combo))
+    mask = engine.mask()
+    rows = np.flatnonzero(mask)
+    fdf = None
+    entries = []
+    for fmt in formats:
+        entry = {'combinaison': name, 'filtres': combo, 'format': fmt, 'assures': int(len(rows))}
+        entries.append(entry)
+        if not len(rows):
+            entry['statut'] = 'vide'
+            continue
+        t0 = time.perf_counter()
+        builder = EXPORTS[fmt][1]
+        try:
+            if fmt in COLUMNAR_EXPORTS:
+                result = builder(_columns(), rows, compression)
+            else:
+                if fdf is None:
+                    fdf = df[mask]
+                result = builder(fdf, claims=_state['claims']) if fmt == 'pdf' else builder(fdf)
+            entry['fichier'], entry['octets'] = _write(result, outdir, name)
+            entry['statut'] = 'ok'
+        except Exception as e:
+            entry.update(statut='erreur', message=str(e))
+        entry['duree_s'] = round(time.perf_counter() - t0, 3)
+    return entries
+
+
+# ════════════════════════════════════════════════════════════════
+# ORCHESTRATION
+# ════════════════════════════════════════════════════════════════
+def _progress(i, n, entries):
+    name, rows = entries[0]['combinaison'], entries[0]['assures']
+    done = ', '.join(f"{e['format']} {'✓' if e['statut'] == 'ok' else e['statut']}" for e in entries)
+    print(f"  [{i:>{len(str(n))}}/{n}] {name} — {rows:,} assurés".replace(',', ' ') + f" — {done}")
+
+
+def run_batch(tasks, formats, outdir, compression, workers, path):
+    results = {}
+    if workers > 1 and len(tasks) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks)),
+                                     initializer=_init, initargs=(path,)) as pool:
+                futures = {pool.submit(render, name, combo, formats, outdir, compression): name
+                           for name, combo in tasks}
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+                    _progress(len(results), len(tasks), results[futures[future]])
+        except (OSError, BrokenProcessPool) as e:
+            print(f"⚠️ Pool de rendu indisponible ({e}) — rendu séquentiel")
+    # Séquentiel : un seul processus, ou combinaisons restantes après un échec du pool
+    for name, combo in tasks:
+        if name not in results:
+            results[name] = render(name, combo, formats, outdir, compression)
+            _progress(len(results), len(tasks), results[name])
+    return [entry for name, _ in tasks for entry in results[name]]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Rapports AssurAnalytics en lot (une combinaison "
+                                             "de filtres = un rapport par format)")
+    ap.add_argument('--par', nargs='*', default=[], choices=BATCH_DIMENSIONS, metavar='DIMENSION',
+                    help=f"dimensions croisées, parmi {', '.join(BATCH_DIMENSIONS)}")
+    ap.add_argument('--filtre', action='append', default=[], type=_filter_value,
+                    metavar='DIM=VAL[,VAL]', help="filtre fixe appliqué à toutes les combinaisons")
+    ap.add_argument('--formats', nargs='+', default=DEFAULT_FORMATS, choices=list(EXPORTS))
+    ap.add_argument('--compression', default=EXPORT_COMPRESSION_DEFAULT,
+                    choices=list(EXPORT_COMPRESSIONS), help="Parquet / Arrow")
+    ap.add_argument('--sortie', default='rapports', help="répertoire des rapports")
+    ap.add_argument('--donnees', default=DATA_FILE, help="fichier assurés (CSV ;)")
+    ap.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                    help="processus de rendu (défaut : nb de cœurs)")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    df, claims = load_portfolio(args.donnees)
+    if not len(df):
+        sys.exit("❌ Portefeuille vide — aucun rapport généré")
+    _state.update(df=df, claims=claims, engine=portfolio_crossfilter(df))
+
+    fixed = {}
+    for col, vals in args.filtre:
+        fixed[col] = fixed.get(col, []) + vals
+    catalogue = load_catalogue(df)
+    for col, vals in fixed.items():
+        unknown = [v for v in vals if v not in distinct_values(catalogue, col)]
+        if unknown:
+            ap.error(f"{col} : modalité(s) inconnue(s) {unknown} — "
+                     f"disponibles : {distinct_values(catalogue, col)}")
+    tasks = combinations(catalogue, list(dict.fromkeys(args.par)), fixed)
+
+    os.makedirs(args.sortie, exist_ok=True)
+    print(f"📦  {len(tasks)} combinaison(s) × {len(args.formats)} format(s) → {args.sortie} "
+          f"({args.workers} processus)")
+    entries = run_batch(tasks, args.formats, args.sortie, args.compression,
+                        args.workers, args.donnees)
+
+    manifest = {
+        'genere_le':   datetime.now().isoformat(timespec='seconds'),
+        'donnees':     os.path.abspath(args.donnees),
+        'assures':     int(len(df)),
+        'dimensions':  args.par,
+        'filtres':     fixed,
+        'formats':     args.formats,
+        'compression': args.compression,
+        'duree_s':     round(time.perf_counter() - t0, 1),
+        'rapports':    entries,
+    }
+    with open(os.path.join(args.sortie, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    counts = {s: sum(e['statut'] == s for e in entries) for s in ('ok', 'vide', 'erreur')}
+    print(f"\n✅  {counts['ok']} rapport(s) · {counts['vide']} sélection(s) vide(s) · "
+          f"{counts['erreur']} erreur(s) — {manifest['duree_s']:.1f}s")
+    print(f"💾 Manifeste : {os.path.join(args.sortie, 'manifest.json')}")
+    if counts['erreur']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
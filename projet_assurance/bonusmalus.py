@@ -0,0 +1,114 @@
+# =============================================================
+#  bonusmalus.py  —  Projection Bonus/Malus (chaîne de Markov)
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+#  États : coefficient B/M discrétisé au centième (GRID_MIN → GRID_MAX).
+#  Règle annuelle (paramétrable) : année sans sinistre → × (1 − bonus) ;
+#  k sinistres → × (1 + malus)^k ; arrondi au centième, borné [plancher, plafond].
+#  Nombre de sinistres ~ Poisson(λ_s), λ_s = fréquence observée du segment
+#  région × tranche d'âge des contrats Auto.
+#  Matrice de transition par segment, stockée compacte : chaque état n'a que
+#  MAX_CLAIMS + 1 destinations (une par nombre de sinistres) — indices de
+#  destination communs + probabilités par segment. Une année de projection
+#  = une réduction bincount sur tous les segments à la fois, sans boucle par
+#  contrat. Les effectifs et les primes de base (prime ÷ coefficient actuel)
+#  sont projetés ensemble ; prime de l'année t = Σ prime de base × coefficient.
+
+import numpy as np
+import pandas as pd
+
+
+PROJECTION_TYPE = 'Auto'
+SEGMENT_COLUMNS = ['region', 'tranche_age']
+GRID_MIN, GRID_MAX, GRID_STEP = 0.30, 4.00, 0.01
+MAX_CLAIMS = 6                          # au-delà : regroupé dans la dernière destination
+BM_RULE_DEFAULT = {'bonus': 5, 'malus': 25, 'plancher': 0.50, 'plafond': 3.50}
+BM_YEARS_DEFAULT = 10
+BM_YEARS_MAX = 20
+# Catégories B/M (mêmes bornes que bm_cat, dernière ouverte)
+BM_CATEGORIES = ['Bonus fort', 'Bonus', 'Neutre', 'Malus']
+BM_CATEGORY_EDGES = [0.8, 1.0, 1.2]
+
+
+def _poisson_probs(lam):
+    k = np.arange(MAX_CLAIMS)
+    probs = np.empty((len(lam), MAX_CLAIMS + 1))
+    probs[:, 0] = np.exp(-lam)
+    for j in k[1:]:
+        probs[:, j] = probs[:, j - 1] * lam / j
+    # Queue P(N ≥ MAX_CLAIMS)
+    probs[:, MAX_CLAIMS] = np.clip(1 - probs[:, :MAX_CLAIMS].sum(axis=1), 0, 1)
+    return probs
+
+
+class BonusMalusProjector:
+
+    def __init__(self, df, insurance_type=PROJECTION_TYPE):
+        sub = df[df['type_assurance'] == insurance_type]
+        self.grid = np.round(np.arange(GRID_MIN, GRID_MAX + GRID_STEP / 2, GRID_STEP), 2)
+        self.K = len(self.grid)
+        self.n = len(sub)
+
+        keys = pd.MultiIndex.from_frame(sub[SEGMENT_COLUMNS].astype(str))
+        seg, self.segments = pd.factorize(keys)
+        self.S = max(len(self.segments), 1)
+        nb = sub['nb_sinistres'].to_numpy(dtype=np.float64)
+        self.lam = (np.bincount(seg, weights=nb, minlength=self.S)
+                    / np.maximum(np.bincount(seg, minlength=self.S), 1))
+
+        bm = sub['bonus_malus'].to_numpy(dtype=np.float64)
+        state = np.clip(np.round((bm - GRID_MIN) / GRID_STEP).astype(np.int64), 0, self.K - 1)
+        flat = seg * self.K + state
+        base = sub['montant_prime'].to_numpy(dtype=np.float64) / bm
+        # Vecteurs d'état (2, S, K) : effectifs, primes de base
+        self.initial = np.stack([
+            np.bincount(flat, minlength=self.S * self.K),
+            np.bincount(flat, weights=base, minlength=self.S * self.K),
+        ]).astype(np.float64).reshape(2, self.S, self.K)
+        self.category = np.searchsorted(BM_CATEGORY_EDGES, self.grid - 1e-9)
+
+    # ════════════════════════════════════════════════════════
+    # MATRICES DE TRANSITION (forme compacte)
+    # ════════════════════════════════════════════════════════
+    # Destinations (K, MAX_CLAIMS + 1) communes ; probabilités (S, MAX_CLAIMS + 1)
+    def transition(self, rule):
+        factor = np.concatenate([[1 - rule['bonus'] / 100],
+                                 (1 + rule['malus'] / 100) ** np.arange(1, MAX_CLAIMS + 1)])
+        coef = np.clip(np.round(self.grid[:, None] * factor[None, :], 2),
+                       rule['plancher'], rule['plafond'])
+        dest = np.clip(np.round((coef - GRID_MIN) / GRID_STEP).astype(np.int64), 0, self.K - 1)
+        return dest, _poisson_probs(self.lam)
+
+    def step(self, vectors, dest, probs):
+        S, K = self.S, self.K
+        weights = vectors[:, :, :, None] * probs[None, :, None, :]          # (2, S, K, M+1)
+        index = (np.arange(S)[:, None, None] * K + dest[None, :, :])       # (S, K, M+1)
+        out = [np.bincount(index.ravel(), weights=w.ravel(), minlength=S * K) for w in weights]
+        return np.stack(out).reshape(2, S, K)
+
+    # ════════════════════════════════════════════════════════
+    # PROJECTION SUR N ANNÉES
+    # ════════════════════════════════════════════════════════
+    def project(self, rule=None, years=BM_YEARS_DEFAULT):
+        rule = {**BM_RULE_DEFAULT, **(rule or {})}
+        dest, probs = self.transition(rule)
+        v = self.initial
+        counts, primes = [v[0].sum(axis=0)], [v[1].sum(axis=0)]
+        for _ in range(years):
+            v = self.step(v, dest, probs)
+            counts.append(v[0].sum(axis=0))
+            primes.append(v[1].sum(axis=0))
+        counts, primes = np.array(counts), np.array(primes)          # (années + 1, K)
+
+        total = np.maximum(counts.sum(axis=1), 1e-12)
+        mix = np.stack([counts[:, self.category == c].sum(axis=1)
+                        for c in range(len(BM_CATEGORIES))], axis=1)
+        return {
+            'annees':     np.arange(years + 1),
+            'mix':        pd.DataFrame(mix / total[:, None] * 100, columns=BM_CATEGORIES),
+            'coef_moyen': counts @ self.grid / total,
+            'primes':     primes @ self.grid,
+            'polices':    self.n,
+            'segments':   len(self.segments),
+        }
@@ -0,0 +1,202 @@
+# =============================================================
+#  bootstrap.py  —  Intervalles de confiance bootstrap des KPIs
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+#  Bootstrap de Poisson vectorisé : la ligne i de la sélection reçoit, dans
+#  la réplique b, le poids W[b, i] ~ Poisson(1). La matrice W (BOOT_REPLICATES
+#  × BOOT_ROWS) est tirée une fois par processus avec une graine fixe : mêmes
+#  filtres → mêmes intervalles, sans tirage aléatoire à chaque requête.
+#  Toutes les sommes de toutes les répliques en un produit matriciel W @ X ;
+#  les KPIs (ratios de sommes) et leurs quantiles 2,5 % / 97,5 % s'en déduisent.
+#  Médiane du S/P : lignes rangées par ratio croissant, la médiane pondérée de
+#  chaque réplique est le point où le cumul des poids atteint la moitié — cumul
+#  calculé dans une fenêtre centrale seulement (le point de bascule s'écarte
+#  du milieu de ~√n / 2 lignes).
+#  Au-delà de BOOT_ROWS lignes, bootstrap sur un sous-échantillon fixe de
+#  BOOT_ROWS lignes ; les écarts sont ramenés à la taille de la sélection
+#  (facteur √(m / n), largeur d'un IC ∝ 1/√n).
+#  Tranche d'âge à risque : écart entre la fréquence (sinistres / assuré) de
+#  la tranche la plus sinistrée et celle de la sélection, mêmes répliques.
+
+import threading
+
+import numpy as np
+
+from kpis import portfolio_kpis
+
+
+BOOT_REPLICATES = 200
+BOOT_ROWS = 20_000
+BOOT_SEED = 2024
+CI_LEVEL = 0.95
+CI_LABEL = "IC 95 % bootstrap"       # distinct de l'IC d'échantillonnage (sampling.py)
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def _weights():
+    with _lock:
+        if 'W' not in _cache:
+            rng = np.random.default_rng(BOOT_SEED)
+            _cache['W'] = rng.poisson(1.0, (BOOT_REPLICATES, BOOT_ROWS)).astype(np.float32)
+        return _cache['W']
+
+
+# Colonnes sommées (une par statistique de base)
+_COLUMNS = ['un', 'nb', 'sin', 'cout', 'prime', 'bm', 'deficit', 'malus', 'sinistres',
+            'score', 'ratio_ok', 'gauche', 'un_top', 'nb_top']
+# KPI → (numérateur, dénominateur)
+_RATIOS = {
+    'taux':      ('sin', 'un'),
+    'cout':      ('cout', 'sin'),
+    'prime':     ('prime', 'un'),
+    'bm':        ('bm', 'un'),
+    'deficit':   ('deficit', 'un'),
+    'malus':     ('malus', 'un'),
+    'sin_prime': ('sinistres', 'prime'),
+    'score':     ('score', 'un'),
+    'sinistres': ('nb', 'un'),          # moyenne par assuré, ramenée au total de la sélection
+}
+
+
+# Tranche d'âge la plus sinistrée (sinistres / assuré) et écart à la sélection
+def top_age_band(fdf):
+    if 'tranche_age' not in fdf.columns or len(fdf) == 0:
+        return None, np.nan
+    age_r = fdf.groupby('tranche_age', observed=True)['nb_sinistres'].mean()
+    if len(age_r) == 0:
+        return None, np.nan
+    top = age_r.idxmax()
+    return top, float(age_r[top] - fdf['nb_sinistres'].mean())
+
+
+# ════════════════════════════════════════════════════════════════
+# NOYAU BOOTSTRAP
+# ════════════════════════════════════════════════════════════════
+# Renvoie {kpi: (estimation, borne basse, borne haute)} ; vide si < 2 lignes.
+# kpis : résultat de portfolio_kpis(fdf) s'il est déjà calculé
+def bootstrap_kpis(fdf, kpis=None):
+    n = len(fdf)
+    if n < 2:
+        return {}
+    ratio_all = fdf['ratio_SP'].to_numpy(dtype=np.float64)
+    rows = np.arange(n)
+    if n > BOOT_ROWS:
+        rows = np.sort(np.random.default_rng(BOOT_SEED).choice(n, BOOT_ROWS, replace=False))
+    m = len(rows)
+    order = rows[np.argsort(ratio_all[rows], kind='stable')]       # NaN en dernier
+
+    nb = fdf['nb_sinistres'].to_numpy(dtype=np.float64)[order]
+    sin = (nb > 0).astype(np.float64)
+    s = fdf['montant_sinistres'].to_numpy(dtype=np.float64)[order]
+    bm = fdf['bonus_malus'].to_numpy(dtype=np.float64)[order]
+    ratio = ratio_all[order]
+    score = (fdf['score_risque'].to_numpy(dtype=np.float64)[order]
+             if 'score_risque' in fdf.columns else np.zeros(m))
+    top, gap_full = top_age_band(fdf)
+    in_top = ((fdf['tranche_age'].to_numpy()[order] == top).astype(np.float64)
+              if top is not None else np.zeros(m))
+    # Fenêtre centrale pour la médiane pondérée ; 'gauche' = lignes avant la fenêtre
+    m_ok = int((~np.isnan(ratio)).sum())
+    width = int(8 * np.sqrt(max(m_ok, 1))) + 1
+    lo, hi = max(0, m_ok // 2 - width), min(m_ok, m_ok // 2 + width)
+    X = np.column_stack([
+        np.ones(m), nb, sin, s * sin, fdf['montant_prime'].to_numpy(dtype=np.float64)[order],
+        bm, (ratio > 1).astype(np.float64), (bm > 1).astype(np.float64), s, score,
+        (~np.isnan(ratio)).astype(np.float64), (np.arange(m) < lo).astype(np.float64),
+        in_top, nb * in_top,
+    ])
+
+    W = _weights()[:, :m]
+    reps = dict(zip(_COLUMNS, (W @ X.astype(np.float32)).astype(np.float64).T))
+    point = dict(zip(_COLUMNS, X.sum(axis=0)))
+    full = _full_estimates(kpis or portfolio_kpis(fdf), 'score_risque' in fdf.columns) if m < n else None
+    scale = np.sqrt(m / n)
+    q = [(1 - CI_LEVEL) / 2 * 100, (1 + CI_LEVEL) / 2 * 100]
+
+    def interval(est_sub, values, est_full):
+        values = values[np.isfinite(values)]
+        if len(values) < BOOT_REPLICATES // 2 or not np.isfinite(est_sub):
+            return (est_full, np.nan, np.nan)
+        qlo, qhi = np.percentile(values, q)
+        return (est_full, est_full + (qlo - est_sub) * scale, est_full + (qhi - est_sub) * scale)
+
+    out = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for kpi, (num, den) in _RATIOS.items():
+            est_sub = point[num] / point[den] if point[den] else np.nan
+            est = full[kpi] if full else est_sub
+            out[kpi] = interval(est_sub, reps[num] / reps[den], est)
+        # Total de sinistres = n × moyenne par assuré
+        out['sinistres'] = tuple(v * n for v in out['sinistres'])
+        # Tranche à risque : fréquence de la tranche − fréquence de la sélection
+        if top is not None:
+            est_sub = (point['nb_top'] / point['un_top'] - point['nb'] / point['un']
+                       if point['un_top'] else np.nan)
+            out['tranche'] = interval(est_sub, reps['nb_top'] / reps['un_top'] - reps['nb'] / reps['un'],
+                                      gap_full if full else est_sub)
+
+    # ── Médiane pondérée du ratio S/P ──
+    if m_ok >= 2:
+        half = reps['ratio_ok'] / 2
+        cum = reps['gauche'][:, None] + np.cumsum(W[:, lo:hi], axis=1, dtype=np.float64)
+        inside = (reps['gauche'] < half) & (cum[:, -1] >= half) if hi > lo else np.zeros(0, bool)
+        meds = np.full(BOOT_REPLICATES, np.nan)
+        meds[inside] = ratio[lo + (cum[inside] >= half[inside, None]).argmax(axis=1)]
+        # Répliques hors fenêtre (très improbable) : cumul complet
+        for b in np.nonzero(~inside)[0]:
+            c = np.cumsum(W[b, :m_ok], dtype=np.float64)
+            meds[b] = ratio[min(np.searchsorted(c, c[-1] / 2), m_ok - 1)]
+        est_sub = float(np.median(ratio[:m_ok]))
+        est = full['ratio_median'] if full else est_sub
+        out['ratio_median'] = interval(est_sub, meds, est)
+    return out
+
+
+# Estimations exactes sur toute la sélection (quand le bootstrap est sous-échantillonné)
+def _full_estimates(k, scored):
+    return {
+        'taux':      k.taux_sinistralite,
+        'cout':      k.cout_moyen,
+        'prime':     k.prime_moyenne,
+        'bm':        k.bm_moyen,
+        'deficit':   k.pct_deficitaires,
+        'malus':     k.pct_malus,
+        'sin_prime': k.charge_sur_prime,
+        'score':     k.score_moyen if scored else 0.0,
+        'sinistres': k.sinistres / k.assures,
+        'ratio_median': k.ratio_sp_median,
+    }
+
+
+# ════════════════════════════════════════════════════════════════
+# AFFICHAGE (bandes ± sous les KPIs) & SIGNIFICATIVITÉ
+# ════════════════════════════════════════════════════════════════
+def _band(ci, fmt, factor=1.0):
+    if not ci or not np.isfinite(ci[1]):
+        return ""
+    return f"± {fmt.format((ci[2] - ci[1]) / 2 * factor)} ({CI_LABEL})"
+
+
+def kpi_intervals(ci):
+    med = ci.get('ratio_median')
+    return {
+        'ci-assures':            "",
+        'ci-sinistres':          _band(ci.get('sinistres'), '{:,.0f}').replace(',', ' '),
+        'ci-cout':               _band(ci.get('cout'), '{:,.0f} €'),
+        'ci-prime':              _band(ci.get('prime'), '{:,.0f} €'),
+        'ci-taux-sinistralite':  _band(ci.get('taux'), '{:.1f} pts', 100),
+        'ci-ratio-sp':           (f"{CI_LABEL} : {med[1]:.2f} – {med[2]:.2f}"
+                                  if med and np.isfinite(med[1]) else ""),
+        'ci-bm-moyen':           _band(ci.get('bm'), '{:.3f}'),
+        'ci-pct-deficit':        _band(ci.get('deficit'), '{:.1f} pts', 100),
+    }
+
+
+# Écart à un seuil confirmé par l'IC : +1 (au-dessus), −1 (en dessous), 0 (non significatif)
+def significance(ci, threshold):
+    if not ci or not np.isfinite(ci[1]):
+        return 0
+    return 1 if ci[1] > threshold else (-1 if ci[2] < threshold else 0)
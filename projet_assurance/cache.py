@@ -0,0 +1,86 @@
+# =============================================================
+#  cache.py  —  Version des données & cache disque des calculs
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+
+import functools
+import glob
+import hashlib
+import os
+import pickle
+import re
+
+import pandas as pd
+
+
+CACHE_DIR = os.environ.get(
+    'ASSUR_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+)
+
+
+# ════════════════════════════════════════════════════════════════
+# VERSION DU JEU DE DONNÉES
+# ════════════════════════════════════════════════════════════════
+# Empreinte du contenu (valeurs + colonnes) : change dès qu'une ligne change
+def dataset_version(df):
+    h = hashlib.sha1()
+    h.update(','.join(map(str, df.columns)).encode('utf-8'))
+    if len(df):
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+# Empreinte d'un ou plusieurs fichiers source : invalide le cache quand le code change
+def code_version(*paths):
+    h = hashlib.sha1()
+    for p in paths:
+        with open(p, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()[:8]
+
+
+# Empreinte de tous les modules du projet (*.py du paquet), calculée une fois par
+# processus : pour les résultats qui mêlent les calculs de plusieurs modules
+@functools.lru_cache(maxsize=None)
+def package_version():
+    here = os.path.dirname(os.path.abspath(__file__))
+    return code_version(*sorted(glob.glob(os.path.join(here, '*.py'))))
+
+
+def _prune(name, keep):
+    pattern = re.compile(rf"{re.escape(name)}_[0-9A-Za-z]+\.pkl")
+    try:
+        for entry in os.scandir(CACHE_DIR):
+            if pattern.fullmatch(entry.name) and entry.path != keep:
+                os.remove(entry.path)
+    except OSError:
+        pass
+
+
+# ════════════════════════════════════════════════════════════════
+# CACHE DISQUE
+# ════════════════════════════════════════════════════════════════
+# Résultat de builder() mémorisé dans .cache/<nom>_<version>.pkl.
+# Partagé entre les workers gunicorn ; toute erreur d'E/S retombe sur le calcul.
+# Écrire une version supprime les versions précédentes du même nom.
+def cached(name, version, builder):
+    path = os.path.join(CACHE_DIR, f"{name}_{version}.pkl")
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        pass
+
+    value = builder()
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        _prune(name, path)
+    except Exception as e:
+        print(f"⚠️ Cache non écrit ({name}) : {e}")
+    return value
@@ -4,14 +4,34 @@
 #  Auteur : Sona KOULIBALY
 # =============================================================
 
-from dash import Input, Output, State, dcc, html, dash_table
-import plotly.express as px
+import functools
+
+from dash import Input, Output, State, ClientsideFunction, callback_context, no_update, html, dash_table
+from flask import has_request_context
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
-from datetime import datetime
-import io
+
+from cache import cached, package_version, dataset_version
+from crossfilter import portfolio_crossfilter, apply_filters, EnginePool
+from sampling import SampleEstimator, kpi_estimates
+from cohorts import (COHORT_MAX, COHORT_COLORS, COHORT_KPIS, CohortComparator,
+                     cohort_filters, cohort_deltas, describe)
+from coalescing import coalesce, checkpoint, client_tab
+from fingerprints import FINGERPRINT_STORE, fingerprint, unchanged, changed_outputs
+from scheduler import scheduler, job_status, job_result, ServerBusy
+from exports import EXPORTS, COLUMNAR_EXPORTS, FIGURE_EXPORTS, ExportColumns
+from pricing import PricingModel, describe_rule
+from outliers import OutlierCube, METRICS, describe_segment, format_metric
+from bootstrap import bootstrap_kpis, kpi_intervals, significance, top_age_band
+from kpis import portfolio_kpis
+from claims import NO_CAUSE
+from geography import GEO_LEVELS
+from catalogue import build_catalogue, distinct_values, bounds
+from policies import PolicyIndex, TOP_METRICS, TOP_METRIC_DEFAULT
+from montecarlo import portfolio_loss_report, VAR_LEVELS, TVAR_LEVELS
+from bonusmalus import (BonusMalusProjector, BM_CATEGORIES, BM_RULE_DEFAULT,
+                        BM_YEARS_DEFAULT, BM_YEARS_MAX, PROJECTION_TYPE)
 
 
 # ════════════════════════════════════════════════════════════════
@@ -23,12 +43,6 @@ TYPE_COLORS = {
     'Habitation': '#00E676',
     'Vie':        '#FF5252',
 }
-REGION_COLORS = {
-    'Dakar':       '#1565C0',
-    'Thiès':       '#FFB300',
-    'Kaolack':     '#00E676',
-    'Saint-Louis': '#FF5252',
-}
 BM_COLORS = {
     'Bonus fort': '#00E676',
     'Bonus':      '#00C6FF',
@@ -52,79 +66,335 @@ def base_layout(height=320):
     )
 
 
-def register_callbacks(app, df):
+# ════════════════════════════════════════════════════════════════
+# SORTIES DU CALLBACK PRINCIPAL
+# ════════════════════════════════════════════════════════════════
+DASHBOARD_OUTPUTS = [
+    # KPIs principaux
+    ('kpi-total-assures',    'children'),
+    ('kpi-total-sinistres',  'children'),
+    ('kpi-cout-moyen',       'children'),
+    ('kpi-prime-moy',        'children'),
+    ('trend-assures',        'children'),
+    ('trend-sinistres',      'children'),
+    ('trend-cout',           'children'),
+    ('trend-prime',          'children'),
+    # KPIs secondaires
+    ('kpi-taux-sinistralite','children'),
+    ('kpi-ratio-sp',         'children'),
+    ('kpi-bm-moyen',         'children'),
+    ('kpi-pct-deficit',      'children'),
+    # Intervalles de confiance (mode échantillon)
+    ('ci-assures',           'children'),
+    ('ci-sinistres',         'children'),
+    ('ci-cout',              'children'),
+    ('ci-prime',             'children'),
+    ('ci-taux-sinistralite', 'children'),
+    ('ci-ratio-sp',          'children'),
+    ('ci-bm-moyen',          'children'),
+    ('ci-pct-deficit',       'children'),
+    # Compteur filtre
+    ('filter-counter',       'children'),
+    # Insights
+    ('insights-content',     'children'),
+    # Graphiques section 1
+    ('chart-type-pie',       'figure'),
+    ('chart-age-dist',       'figure'),
+    ('chart-age-sexe',       'figure'),
+    ('chart-region-pie',     'figure'),
+    # Graphiques section 2
+    ('chart-region-bar',     'figure'),
+    ('chart-sinistres-hist', 'figure'),
+    ('chart-time-series',    'figure'),
+    ('chart-sinistres-age',  'figure'),
+    # Graphiques section 3
+    ('chart-scatter-prime',  'figure'),
+    ('chart-cout-type',      'figure'),
+    # Graphiques section 4
+    ('chart-heatmap-risque', 'figure'),
+    ('chart-bm-dist',        'figure'),
+    ('chart-bm-scatter',     'figure'),
+    ('chart-score-risque',   'figure'),
+    # Tableau
+    ('data-table-container', 'children'),
+    ('table-count',          'children'),
+]
+
+# Sorties légères recalculées dans le navigateur (assets/clientside.js)
+CLIENTSIDE_OUTPUTS = [
+    'kpi-total-assures', 'kpi-total-sinistres', 'kpi-cout-moyen', 'kpi-prime-moy',
+    'trend-assures', 'trend-sinistres', 'trend-cout', 'trend-prime',
+    'kpi-taux-sinistralite', 'kpi-ratio-sp', 'kpi-bm-moyen', 'kpi-pct-deficit',
+    'filter-counter',
+    'chart-type-pie', 'chart-region-pie', 'chart-sinistres-hist', 'chart-bm-dist',
+]
+FIGURE_OUTPUTS = [cid for cid, prop in DASHBOARD_OUTPUTS if prop == 'figure']
+
+# Section comparaison de cohortes
+COMPARISON_OUTPUTS = [
+    ('cohort-list',           'children'),
+    ('cohort-table',          'children'),
+    ('cohort-insights',       'children'),
+    ('chart-cohort-types',    'figure'),
+    ('chart-cohort-tranches', 'figure'),
+]
+
+# Section simulateur de tarification
+PRICING_OUTPUTS = [
+    ('pricing-kpis',        'children'),
+    ('pricing-rules-list',  'children'),
+    ('chart-pricing-types', 'figure'),
+    ('chart-pricing-dist',  'figure'),
+]
+PRICING_BM_CATEGORIES = ['Bonus fort', 'Bonus', 'Neutre', 'Malus']
+
+# Section projection bonus/malus (contrats Auto)
+BM_PROJECTION_OUTPUTS = [
+    ('bm-projection-kpis',        'children'),
+    ('chart-bm-projection-mix',   'figure'),
+    ('chart-bm-projection-prime', 'figure'),
+]
+
+# Section risque agrégé (Monte Carlo, portefeuille complet) : précalculée, sans callback
+RISK_OUTPUTS = [
+    ('mc-table',      'children'),
+    ('mc-meta',       'children'),
+    ('chart-mc-dist', 'figure'),
+]
+
+# Section contrats : top N de la sélection (la fiche assuré a son propre callback)
+TOP_OUTPUTS = [
+    ('top-policies',      'children'),
+    ('top-policies-meta', 'children'),
+]
+
+
+# ════════════════════════════════════════════════════════════════
+# FILTRAGE CROISÉ (BROSSAGE DES GRAPHIQUES)
+# ════════════════════════════════════════════════════════════════
+# Champs brossés par chaque graphique (clic ou sélection de plage)
+CHART_FIELDS = {
+    'chart-type-pie':       ['type_assurance'],
+    'chart-age-dist':       ['age'],
+    'chart-age-sexe':       ['tranche_age', 'sexe'],
+    'chart-region-pie':     ['region'],
+    'chart-region-bar':     ['region'],
+    'chart-sinistres-hist': ['nb_sinistres'],
+    'chart-time-series':    ['mois_sinistre'],
+    'chart-sinistres-age':  ['tranche_age', 'type_assurance'],
+    'chart-scatter-prime':  ['montant_prime', 'montant_sinistres'],
+    'chart-cout-type':      ['type_assurance'],
+    'chart-heatmap-risque': ['tranche_age', 'type_assurance'],
+    'chart-bm-dist':        ['bm_cat'],
+    'chart-bm-scatter':     ['bonus_malus'],
+    'chart-score-risque':   ['score_risque'],
+}
+# Graphiques brossés au rectangle (selectedData) ; les autres au clic
+SELECT_CHARTS = ['chart-age-dist', 'chart-time-series', 'chart-scatter-prime', 'chart-bm-scatter',
+                 'chart-score-risque']
+CLICK_CHARTS = [cid for cid in CHART_FIELDS if cid not in SELECT_CHARTS]
+# Graphiques calculés ligne à ligne : vue dédiée qui ignore leur propre brosse
+VIEW_CHARTS = ['chart-age-dist', 'chart-age-sexe', 'chart-time-series',
+               'chart-scatter-prime', 'chart-bm-scatter', 'chart-score-risque']
+RANGE_FIELDS = ['age', 'montant_prime', 'montant_sinistres', 'bonus_malus', 'score_risque']
+# Sources de chaque graphique (clé de sortie, fingerprints.py) : réductions
+# crossfilter ('group:<nom>'), niveau géographique affiché ('drill'), lignes de
+# sa vue ('view'). KPIs, insights et tableau se lisent sur les lignes retenues.
+CHART_SOURCES = {
+    'chart-type-pie':       ['group:type_assurance'],
+    'chart-age-dist':       ['view'],
+    'chart-age-sexe':       ['view'],
+    'chart-region-pie':     ['group:geo', 'drill'],
+    'chart-region-bar':     ['group:geo', 'drill'],
+    'chart-sinistres-hist': ['group:nb_sinistres'],
+    'chart-time-series':    ['view'],
+    'chart-sinistres-age':  ['group:tranche_type'],
+    'chart-scatter-prime':  ['view'],
+    'chart-cout-type':      ['group:type_assurance'],
+    'chart-heatmap-risque': ['group:tranche_type'],
+    'chart-bm-dist':        ['group:bm_cat'],
+    'chart-bm-scatter':     ['view'],
+    'chart-score-risque':   ['view'],
+}
+
+FIELD_LABELS = {
+    'type_assurance': 'Type', 'sexe': 'Sexe', 'region': 'Région', 'tranche_age': 'Tranche',
+    'nb_sinistres': 'Sinistres', 'mois_sinistre': 'Mois', 'bm_cat': 'B/M',
+    'age': 'Âge', 'montant_prime': 'Prime', 'montant_sinistres': 'Montant sinistres',
+    'bonus_malus': 'Coef. B/M', 'score_risque': 'Score de risque',
+    **dict(GEO_LEVELS[1:]),
+}
+# Graphiques géographiques : le champ brossé suit le niveau affiché (drill-down),
+# porté par la customdata de chaque part / barre
+GEO_CHARTS = ['chart-region-pie', 'chart-region-bar']
+
+
+# Point cliqué → {champ: [modalité]}
+def _click_values(cid, point):
+    x, y = point.get('x'), point.get('y')
+    label, custom = point.get('label'), point.get('customdata')
+    if cid in GEO_CHARTS:
+        field = (custom[-1] if isinstance(custom, list) and custom else custom) or 'region'
+        value = label if cid == 'chart-region-pie' else y
+        return {field: [value]} if value is not None else {}
+    if isinstance(custom, list):
+        custom = custom[0] if custom else None
+    if cid in ('chart-type-pie', 'chart-region-pie', 'chart-bm-dist'):
+        return {CHART_FIELDS[cid][0]: [label]} if label is not None else {}
+    if cid == 'chart-cout-type':
+        return {CHART_FIELDS[cid][0]: [x]}
+    if cid == 'chart-sinistres-hist' and custom is not None:
+        return {'nb_sinistres': [int(custom)]}
+    if cid == 'chart-age-sexe' and custom is not None:
+        return {'tranche_age': [x], 'sexe': [custom]}
+    if cid == 'chart-sinistres-age' and custom is not None:
+        return {'tranche_age': [x], 'type_assurance': [custom]}
+    if cid == 'chart-heatmap-risque':
+        return {'tranche_age': [y], 'type_assurance': [x]}
+    return {}
+
+
+# Sélection rectangle → {champ: [min, max]} (mois : liste des mois couverts)
+def _range_values(cid, selected, months):
+    rng = (selected or {}).get('range') or {}
+    xr, yr = rng.get('x'), rng.get('y')
+    if not xr and selected and selected.get('points'):
+        pts = selected['points']
+        xr = [min(p['x'] for p in pts), max(p['x'] for p in pts)]
+        if all('y' in p for p in pts):
+            yr = [min(p['y'] for p in pts), max(p['y'] for p in pts)]
+    if not xr:
+        return {}
+    if cid == 'chart-time-series':
+        lo, hi = sorted(str(v)[:7] for v in xr)
+        return {'mois_sinistre': [m for m in months if lo <= m <= hi]}
+    out = {CHART_FIELDS[cid][0]: sorted(float(v) for v in xr)}
+    if cid == 'chart-scatter-prime' and yr:
+        out['montant_sinistres'] = sorted(float(v) for v in yr)
+    return out
+
+
+def register_callbacks(app, df, clientside=False, sampling=False, claims=None, catalogue=None):
 
     # ════════════════════════════════════════════════════════
     # FONCTION FILTRE CENTRAL
     # ════════════════════════════════════════════════════════
-    def filter_data(type_vals, sexe_vals, region_vals, sinistres_vals, age_range, bm_range):
-        f = df.copy()
-        if type_vals:
-            f = f[f['type_assurance'].isin(type_vals)]
-        if sexe_vals:
-            f = f[f['sexe'].isin(sexe_vals)]
-        if region_vals:
-            f = f[f['region'].isin(region_vals)]
-        if sinistres_vals:
-            nb_list = []
-            for v in sinistres_vals:
-                if v == '4':
-                    nb_list += list(range(4, 100))
-                else:
-                    nb_list.append(int(v))
-            f = f[f['nb_sinistres'].isin(nb_list)]
-        if age_range:
-            f = f[(f['age'] >= age_range[0]) & (f['age'] <= age_range[1])]
-        if bm_range:
-            f = f[(f['bonus_malus'] >= bm_range[0]) & (f['bonus_malus'] <= bm_range[1])]
-        return f
+    # Moteur crossfilter : index triés par dimension, réductions incrémentales ;
+    # un état de filtres par onglet (EnginePool), les exports (fond) ont le leur
+    engine = portfolio_crossfilter(df)
+    engines = EnginePool(engine)
+
+    # Échantillon stratifié pondéré, utilisé pendant le glissement des sliders
+    estimator = SampleEstimator(df) if sampling else None
+    sample_engines = (EnginePool(portfolio_crossfilter(estimator.sample,
+                                                       weights=estimator.weights))
+                      if sampling else None)
+
+    # Moteur de l'appelant : onglet du navigateur, exports hors requête
+    def session_engine(pool):
+        if not has_request_context():
+            return pool.get('exports')
+        return pool.get(client_tab() or 'session')
+
+    # Cube des segments (5 dimensions) pour la détection des segments atypiques
+    outlier_cube = OutlierCube(df)
+
+    # Catalogue des dimensions : types présents, plages complètes des sliders
+    catalogue = catalogue or build_catalogue(df)
+    portfolio_types = distinct_values(catalogue, 'type_assurance')
+    age_bounds, bm_bounds = bounds(catalogue, 'age'), bounds(catalogue, 'bonus_malus')
+
+    # Références portefeuille complet (tendances « vs total », insights), calculées une fois
+    totals = portfolio_kpis(df)
+
+    # sampled=True : même sélection, évaluée sur l'échantillon
+    def select_data(type_vals, sexe_vals, region_vals, sinistres_vals, age_range, bm_range,
+                    selection=None, sampled=False):
+        eng, frame = ((session_engine(sample_engines), estimator.sample) if sampled
+                      else (session_engine(engines), df))
+        with eng.lock:
+            apply_filters(eng, type_vals, sexe_vals, region_vals, sinistres_vals,
+                          age_range, bm_range, selection)
+            fdf = frame[eng.mask()]
+            groups = {name: g.result() for name, g in eng.groups.items()}
+            groups['levels'] = eng.levels
+            # Niveau géographique affiché et nœud parent (drill-down)
+            groups['hierarchy'] = eng.geo
+            groups['drill'] = eng.geo.drill(region_vals, selection)
+            # Graphiques brossés en sélection de plage : vue qui ignore leur propre brosse
+            views = {}
+            for cid in VIEW_CHARTS:
+                fields = [f for f in CHART_FIELDS[cid] if (selection or {}).get(f)]
+                if fields:
+                    views[cid] = frame[eng.mask(ignore=[f'brush:{f}' for f in fields])]
+        return fdf, groups, views
+
+    def filter_data(type_vals, sexe_vals, region_vals, sinistres_vals, age_range, bm_range,
+                    selection=None):
+        return select_data(type_vals, sexe_vals, region_vals, sinistres_vals,
+                           age_range, bm_range, selection)[0]
 
     # ════════════════════════════════════════════════════════
     # INSIGHTS AUTOMATIQUES (STORYTELLING)
     # ════════════════════════════════════════════════════════
-    def generate_insights(fdf, full_df):
+    # k : KPIs de la sélection (portfolio_kpis) ; totals : portefeuille complet
+    def generate_insights(fdf, k, ci=None):
         insights = []
+        ci = ci or {}
+
+        # Alerte retenue seulement si l'IC 95 % (bootstrap) exclut la référence ;
+        # sinon rétrogradée en information, avec l'intervalle
+        def confirmed(level, kpi, ref, fmt):
+            if level not in ('warning', 'danger') or significance(ci.get(kpi), ref) > 0:
+                return level, ''
+            lo, hi = ci.get(kpi, (np.nan, np.nan, np.nan))[1:]
+            if not np.isfinite(lo):
+                return 'info', ' (écart non significatif)'
+            return 'info', f' (écart non significatif, IC 95 % : {fmt(lo)} – {fmt(hi)})'
 
         if len(fdf) == 0:
             return [html.P("⚠️ Aucun assuré ne correspond à ces filtres.", className='text-muted text-center')]
 
         # Sélection active
-        if len(fdf) < len(full_df):
-            pct = len(fdf) / len(full_df) * 100
+        if k.assures < totals.assures:
+            pct = k.assures / totals.assures * 100
             insights.append(('info', 'fas fa-filter',
                 f'Sélection active',
-                f'{len(fdf):,} assurés analysés ({pct:.1f}% du portefeuille total de {len(full_df):,})'))
+                f'{k.assures:,} assurés analysés ({pct:.1f}% du portefeuille total de {totals.assures:,})'))
 
         # Taux de sinistralité
-        taux = (fdf['nb_sinistres'] > 0).mean() * 100
-        taux_full = (full_df['nb_sinistres'] > 0).mean() * 100
+        taux = k.taux_sinistralite * 100
+        taux_full = totals.taux_sinistralite * 100
         diff = taux - taux_full
         level = 'warning' if diff > 3 else ('success' if diff < -3 else 'info')
+        level, note = confirmed(level, 'taux', taux_full / 100, lambda v: f'{v * 100:.1f}%')
         arrow = '↗️ +' if diff > 0 else '↘️ '
         insights.append((level, 'fas fa-triangle-exclamation',
             f'Taux de sinistralité : {taux:.1f}%',
-            f'{arrow}{diff:.1f}% vs moyenne globale ({taux_full:.1f}%) — '
-            f'{(fdf["nb_sinistres"] == 0).mean()*100:.1f}% des assurés n\'ont aucun sinistre'))
+            f'{arrow}{diff:.1f}% vs moyenne globale ({taux_full:.1f}%){note} — '
+            f'{k.sans_sinistre*100:.1f}% des assurés n\'ont aucun sinistre'))
 
         # Coût moyen
-        df_sin = fdf[fdf['nb_sinistres'] > 0]
-        if len(df_sin) > 0:
-            cout = df_sin['montant_sinistres'].mean()
-            cout_full = full_df[full_df['nb_sinistres'] > 0]['montant_sinistres'].mean()
+        if k.assures_sinistres > 0:
+            cout = k.cout_moyen
+            cout_full = totals.cout_moyen
             diff_c = (cout - cout_full) / cout_full * 100
             level_c = 'warning' if diff_c > 10 else ('success' if diff_c < -10 else 'info')
+            level_c, note = confirmed(level_c, 'cout', cout_full, lambda v: f'{v:,.0f} €')
             insights.append((level_c, 'fas fa-euro-sign',
                 f'Coût moyen sinistre : {cout:,.0f} €',
-                f'{"↗️ +" if diff_c > 0 else "↘️ "}{diff_c:.1f}% vs moyenne globale ({cout_full:,.0f} €)'))
+                f'{"↗️ +" if diff_c > 0 else "↘️ "}{diff_c:.1f}% vs moyenne globale ({cout_full:,.0f} €){note}'))
 
         # Ratio S/P
-        ratio = fdf['ratio_SP'].median()
-        pct_def = (fdf['ratio_SP'] > 1).mean() * 100
+        ratio = k.ratio_sp_median
+        pct_def = k.pct_deficitaires * 100
         level_r = 'warning' if pct_def > 85 else ('success' if pct_def < 70 else 'info')
+        level_r, note = confirmed(level_r, 'deficit', 0.85, lambda v: f'{v * 100:.1f}%')
+        verdict = ('🚨 Alerte rentabilité' if level_r == 'warning'
+                   else f'⚠️ Alerte non confirmée{note}' if note else '✅ Rentabilité acceptable')
         insights.append((level_r, 'fas fa-chart-line',
             f'Ratio Sinistre/Prime médian : {ratio:.1f}x',
-            f'{pct_def:.1f}% des assurés génèrent plus de sinistres que leur prime ne couvre — '
-            f'{"🚨 Alerte rentabilité" if pct_def > 85 else "✅ Rentabilité acceptable"}'))
+            f'{pct_def:.1f}% des assurés génèrent plus de sinistres que leur prime ne couvre — {verdict}'))
 
         # Région la plus sinistrée
         reg_sin = fdf.groupby('region')['montant_sinistres'].sum()
@@ -135,31 +405,74 @@ def register_callbacks(app, df):
                 f'{reg_sin[top_r]:,.0f} € de sinistres — '
                 f'{reg_sin[top_r]/reg_sin.sum()*100:.1f}% du montant total de la sélection'))
 
-        # Tranche d'âge à risque
-        if 'tranche_age' in fdf.columns:
-            age_r = fdf.groupby('tranche_age', observed=True)['nb_sinistres'].mean()
-            if len(age_r) > 0:
-                top_a = age_r.idxmax()
-                insights.append(('warning', 'fas fa-user-shield',
-                    f'Tranche à risque : {top_a} ans',
-                    f'Moyenne de {age_r[top_a]:.3f} sinistre/assuré — profil prioritaire pour la tarification'))
+        # Cause principale (table de faits des sinistres)
+        if claims is not None:
+            causes = claims.by_cause(fdf.index.to_numpy())
+            if len(causes) and list(causes.index) != [NO_CAUSE]:
+                top_c = causes.iloc[0]
+                insights.append(('info', 'fas fa-file-invoice',
+                    f'Cause la plus coûteuse : {causes.index[0]}',
+                    f'{int(top_c["nb"]):,} sinistres, {top_c["montant"]:,.0f} € '
+                    f'({top_c["montant"] / causes["montant"].sum() * 100:.1f}% du montant) — '
+                    f'coût moyen {top_c["cout_moyen"]:,.0f} € par sinistre'))
+
+        # Tranche d'âge à risque : alerte si sa fréquence dépasse significativement
+        # celle de la sélection (IC bootstrap de l'écart)
+        top_a, gap_a = top_age_band(fdf)
+        if top_a is not None:
+            freq = fdf['nb_sinistres'].mean()
+            level_a, note = confirmed('warning', 'tranche', 0, lambda v: f'{v:+.3f}')
+            insights.append((level_a, 'fas fa-user-shield',
+                f'Tranche à risque : {top_a} ans',
+                f'Moyenne de {freq + gap_a:.3f} sinistre/assuré ({gap_a:+.3f} vs sélection){note}'
+                + (' — profil prioritaire pour la tarification' if level_a == 'warning' else '')))
+
+        # Prime pure modélisée (GLM fréquence × coût)
+        if 'prime_pure' in fdf.columns:
+            score = k.score_moyen
+            couverture = k.couverture_prime_pure * 100
+            level_s = 'warning' if score > 105 else ('success' if score < 95 else 'info')
+            level_s, note = confirmed(level_s, 'score', 100, lambda v: f'{v:.0f}')
+            insights.append((level_s, 'fas fa-calculator',
+                f'Score de risque modélisé : {score:.0f}',
+                f'Prime pure prédite {k.prime_pure_moyenne:,.0f} € / assuré (indice 100 = portefeuille){note} — '
+                f'les primes payées en couvrent {couverture:.0f}%'))
 
         # Bonus/Malus
-        pct_malus = (fdf['bonus_malus'] > 1.0).mean() * 100
+        pct_malus = k.pct_malus * 100
         level_bm = 'warning' if pct_malus > 45 else 'success'
+        level_bm, note = confirmed(level_bm, 'malus', 0.45, lambda v: f'{v * 100:.1f}%')
         insights.append((level_bm, 'fas fa-gauge-high',
-            f'Coefficient B/M : {fdf["bonus_malus"].mean():.3f} moyen',
-            f'{pct_malus:.1f}% des assurés en malus (B/M > 1.0) — '
-            f'B/M moyen : {fdf["bonus_malus"].mean():.3f}'))
+            f'Coefficient B/M : {k.bm_moyen:.3f} moyen',
+            f'{pct_malus:.1f}% des assurés en malus (B/M > 1.0){note} — '
+            f'B/M moyen : {k.bm_moyen:.3f}'))
+
+        # Segments atypiques : toutes les combinaisons à 1, 2, 3 dimensions,
+        # écarts significatifs (fréquence, coût moyen, S/P) vs la sélection
+        segments, n_tests = outlier_cube.top(fdf.index.to_numpy())
+        for seg in segments:
+            label = METRICS[seg['metric']]
+            insights.append(('warning' if seg['z'] > 0 else 'success', 'fas fa-magnifying-glass-chart',
+                f'Segment atypique : {describe_segment(seg["segment"])}',
+                f'{label[0].upper() + label[1:]} {format_metric(seg["metric"], seg["value"])} — '
+                f'×{seg["value"] / seg["ref"]:.2f} vs la sélection '
+                f'({format_metric(seg["metric"], seg["ref"])}) sur {seg["n"]:,} assurés, z = {seg["z"]:+.1f}'))
+        if n_tests and not segments:
+            insights.append(('info', 'fas fa-magnifying-glass-chart',
+                'Aucun segment atypique',
+                f'{n_tests:,} tests sur les combinaisons type × région × sexe × âge × B/M '
+                f'(1 à 3 dimensions) — aucun écart significatif de fréquence, coût ou S/P'))
 
         # Recommandation tarifaire
-        prime_m = fdf['montant_prime'].mean()
-        cout_m  = fdf['montant_sinistres'].mean()
+        prime_m = k.prime_moyenne
+        cout_m  = k.sinistre_moyen
         if cout_m > prime_m * 3:
-            insights.append(('danger', 'fas fa-lightbulb',
+            level_t, note = confirmed('danger', 'sin_prime', 3, lambda v: f'{v:.1f}x')
+            insights.append((level_t, 'fas fa-lightbulb',
                 '💡 RECOMMANDATION TARIFAIRE',
-                f'Le coût moyen ({cout_m:,.0f} €) dépasse la prime de {cout_m/prime_m:.1f}x. '
-                f'Révision des grilles tarifaires fortement recommandée.'))
+                f'Le coût moyen ({cout_m:,.0f} €) dépasse la prime de {cout_m/prime_m:.1f}x{note}. '
+                + ('Révision des grilles tarifaires fortement recommandée.' if level_t == 'danger'
+                   else 'À confirmer sur un périmètre plus large avant révision des grilles.')))
 
         # Rendu HTML - CORRECTION : iterer sur insights (pas result)
         color_map = {'success': 'success', 'warning': 'warning',
@@ -197,65 +510,45 @@ def register_callbacks(app, df):
         prevent_initial_call=True
     )
     def reset_filters(n):
-        return None, None, None, None, [18, 79], [0.5, 1.5]
+        return None, None, None, None, age_bounds, bm_bounds
 
     # ════════════════════════════════════════════════════════
     # CALLBACK PRINCIPAL — DASHBOARD COMPLET
     # ════════════════════════════════════════════════════════
-    @app.callback(
-        [
-            # KPIs principaux
-            Output('kpi-total-assures',    'children'),
-            Output('kpi-total-sinistres',  'children'),
-            Output('kpi-cout-moyen',       'children'),
-            Output('kpi-prime-moy',        'children'),
-            Output('trend-assures',        'children'),
-            Output('trend-sinistres',      'children'),
-            Output('trend-cout',           'children'),
-            Output('trend-prime',          'children'),
-            # KPIs secondaires
-            Output('kpi-taux-sinistralite','children'),
-            Output('kpi-ratio-sp',         'children'),
-            Output('kpi-bm-moyen',         'children'),
-            Output('kpi-pct-deficit',      'children'),
-            # Compteur filtre
-            Output('filter-counter',       'children'),
-            # Insights
-            Output('insights-content',     'children'),
-            # Graphiques section 1
-            Output('chart-type-pie',       'figure'),
-            Output('chart-age-dist',       'figure'),
-            Output('chart-age-sexe',       'figure'),
-            Output('chart-region-pie',     'figure'),
-            # Graphiques section 2
-            Output('chart-region-bar',     'figure'),
-            Output('chart-sinistres-hist', 'figure'),
-            Output('chart-time-series',    'figure'),
-            Output('chart-sinistres-age',  'figure'),
-            # Graphiques section 3
-            Output('chart-scatter-prime',  'figure'),
-            Output('chart-cout-type',      'figure'),
-            # Graphiques section 4
-            Output('chart-heatmap-risque', 'figure'),
-            Output('chart-bm-dist',        'figure'),
-            Output('chart-bm-scatter',     'figure'),
-            # Tableau
-            Output('data-table-container', 'children'),
-            Output('table-count',          'children'),
-        ],
-        [
-            Input('type-filter',      'value'),
-            Input('sexe-filter',      'value'),
-            Input('region-filter',    'value'),
-            Input('sinistres-filter', 'value'),
-            Input('age-filter',       'value'),
-            Input('bm-filter',        'value'),
-        ]
-    )
-    def update_all(type_v, sexe_v, region_v, sin_v, age_v, bm_v):
+    server_outputs = [o for o in DASHBOARD_OUTPUTS
+                      if not (clientside and o[0] in CLIENTSIDE_OUTPUTS)]
+
+    # Construit toutes les sorties pour une sélection donnée ;
+    # light=False saute les graphiques simples calculés par le navigateur.
+    # groups : réductions crossfilter (chaque graphique ignore sa propre brosse)
+    # views  : sélections ignorant la brosse des graphiques en plage
+    # details=False : insights et tableau inchangés (no_update)
+    # keep : sorties dont la clé est celle affichée — non construites
+    def build_dashboard(fdf, groups, views=None, selection=None, light=True, details=True,
+                        keep=()):
 
-        fdf = filter_data(type_v, sexe_v, region_v, sin_v, age_v, bm_v)
         n   = len(fdf)
+        views = views or {}
+        selection = selection or {}
+
+        def need(cid):
+            return cid not in keep
+
+        # Réduction d'un groupe crossfilter → Series indexée par modalité
+        def group_series(name, col='count'):
+            return pd.Series(groups[name][col], index=groups['levels'][name])
+
+        # Mise en avant des modalités brossées (opacité des barres, décalage des parts)
+        def brushed(field, labels):
+            sel = [str(v) for v in selection.get(field) or []]
+            return [not sel or str(l) in sel for l in labels]
+
+        def opacities(field, labels):
+            return [1.0 if b else 0.35 for b in brushed(field, labels)]
+
+        def pulls(field, labels):
+            sel = selection.get(field)
+            return [0.08 if (sel and b) else 0 for b in brushed(field, labels)]
 
         # ── Figure vide utilitaire ──
         def empty_fig(msg="Aucune donnée"):
@@ -267,11 +560,11 @@ def register_callbacks(app, df):
             return fig
 
         # ── KPIs principaux ────────────────────────────────
-        df_sin = fdf[fdf['nb_sinistres'] > 0]
+        k = portfolio_kpis(fdf)
         kpi_assures   = f"{n:,}".replace(',', ' ')
-        kpi_sinistres = f"{fdf['nb_sinistres'].sum():,}".replace(',', ' ')
-        kpi_cout      = f"{df_sin['montant_sinistres'].mean():,.0f} €" if len(df_sin) else "— €"
-        kpi_prime     = f"{fdf['montant_prime'].mean():,.0f} €" if n else "— €"
+        kpi_sinistres = f"{k.sinistres:,}".replace(',', ' ')
+        kpi_cout      = f"{k.cout_moyen:,.0f} €" if k.assures_sinistres else "— €"
+        kpi_prime     = f"{k.prime_moyenne:,.0f} €" if n else "— €"
 
         # ── Tendances ──────────────────────────────────────
         def pct_vs(val, ref):
@@ -280,16 +573,15 @@ def register_callbacks(app, df):
             return f"{'↗️ +' if d > 0 else '↘️ '}{d:.1f}% vs total"
 
         t_assures   = f"📊 {n/len(df)*100:.0f}% du portefeuille" if n < len(df) else "📊 Portefeuille complet"
-        t_sinistres = pct_vs(fdf['nb_sinistres'].sum(), df['nb_sinistres'].sum())
-        t_cout      = pct_vs(df_sin['montant_sinistres'].mean() if len(df_sin) else 0,
-                             df[df['nb_sinistres'] > 0]['montant_sinistres'].mean())
-        t_prime     = pct_vs(fdf['montant_prime'].mean() if n else 0, df['montant_prime'].mean())
+        t_sinistres = pct_vs(k.sinistres, totals.sinistres)
+        t_cout      = pct_vs(k.cout_moyen if k.assures_sinistres else 0, np.nan_to_num(totals.cout_moyen))
+        t_prime     = pct_vs(k.prime_moyenne if n else 0, np.nan_to_num(totals.prime_moyenne))
 
         # ── KPIs secondaires ───────────────────────────────
-        taux_sin  = f"{(fdf['nb_sinistres']>0).mean()*100:.1f}%" if n else "—"
-        ratio_sp  = f"{fdf['ratio_SP'].median():.2f}x" if n else "—"
-        bm_moyen  = f"{fdf['bonus_malus'].mean():.3f}" if n else "—"
-        pct_def   = f"{(fdf['ratio_SP']>1).mean()*100:.1f}%" if n else "—"
+        taux_sin  = f"{k.taux_sinistralite*100:.1f}%" if n else "—"
+        ratio_sp  = f"{k.ratio_sp_median:.2f}x" if n else "—"
+        bm_moyen  = f"{k.bm_moyen:.3f}" if n else "—"
+        pct_def   = f"{k.pct_deficitaires*100:.1f}%" if n else "—"
 
         # ── Compteur filtre ────────────────────────────────
         if n == len(df):
@@ -300,737 +592,1452 @@ def register_callbacks(app, df):
                                 style={"color":"#1565C0","fontSize":"0.78rem","fontWeight":"600"})
 
         # ── Insights ───────────────────────────────────────
-        insights_html = generate_insights(fdf, df)
+        checkpoint()
+        # IC bootstrap : insights et bandes sous les KPIs (sautés si leurs clés sont affichées)
+        boot = any(need(cid) for cid, _ in DASHBOARD_OUTPUTS
+                   if cid == 'insights-content' or cid.startswith('ci-'))
+        ci = bootstrap_kpis(fdf, k) if details and boot else {}
+        insights_html = generate_insights(fdf, k, ci) if details and need('insights-content') else no_update
+
+        out = {
+            'kpi-total-assures': kpi_assures, 'kpi-total-sinistres': kpi_sinistres,
+            'kpi-cout-moyen': kpi_cout, 'kpi-prime-moy': kpi_prime,
+            'trend-assures': t_assures, 'trend-sinistres': t_sinistres,
+            'trend-cout': t_cout, 'trend-prime': t_prime,
+            'kpi-taux-sinistralite': taux_sin, 'kpi-ratio-sp': ratio_sp,
+            'kpi-bm-moyen': bm_moyen, 'kpi-pct-deficit': pct_def,
+            'filter-counter': counter, 'insights-content': insights_html,
+        }
+        # Bandes ± IC 95 % (bootstrap) sous les KPIs
+        out.update(kpi_intervals(ci))
 
         if n == 0:
             empty = empty_fig()
-            return (kpi_assures, kpi_sinistres, kpi_cout, kpi_prime,
-                    t_assures, t_sinistres, t_cout, t_prime,
-                    taux_sin, ratio_sp, bm_moyen, pct_def,
-                    counter, insights_html,
-                    *[empty]*14,
-                    html.P("Aucune donnée", className='text-muted'), "")
+            out.update({cid: empty for cid in FIGURE_OUTPUTS})
+            out['data-table-container'] = html.P("Aucune donnée", className='text-muted')
+            out['table-count'] = ""
+            return out
 
         # ══════════════════════════════════════════════════
         # GRAPHIQUE 1 — PIE TYPE D'ASSURANCE
         # ══════════════════════════════════════════════════
-        counts_t = fdf['type_assurance'].value_counts()
-        fig_pie = go.Figure(go.Pie(
-            labels=counts_t.index,
-            values=counts_t.values,
-            hole=0.52,
-            marker=dict(
-                colors=[TYPE_COLORS.get(t, '#888') for t in counts_t.index],
-                line=dict(color='white', width=2)
-            ),
-            textinfo='label+percent',
-            textfont_size=11,
-            hovertemplate='<b>%{label}</b><br>%{value} assurés (%{percent})<extra></extra>'
-        ))
-        fig_pie.update_layout(
-            showlegend=False,
-            **{k: v for k, v in base_layout().items()},
-            annotations=[dict(text=f"<b>{n}</b><br>assurés",
-                              x=0.5, y=0.5, font_size=13, showarrow=False,
-                              font_color='#2d3748')]
-        )
+        fig_pie = None
+        if light and need('chart-type-pie'):
+            counts_t = group_series('type_assurance')
+            counts_t = counts_t[counts_t > 0].sort_values(ascending=False)
+            # Échantillon : parts pondérées → effectif estimé des types brossés
+            centre = (f"≈ {counts_t[brushed('type_assurance', counts_t.index)].sum():,.0f}"
+                      .replace(',', ' ') if 'poids' in fdf.columns else f"{n}")
+            fig_pie = go.Figure(go.Pie(
+                labels=counts_t.index,
+                values=counts_t.values,
+                hole=0.52,
+                pull=pulls('type_assurance', counts_t.index),
+                marker=dict(
+                    colors=[TYPE_COLORS.get(t, '#888') for t in counts_t.index],
+                    line=dict(color='white', width=2)
+                ),
+                textinfo='label+percent',
+                textfont_size=11,
+                hovertemplate='<b>%{label}</b><br>%{value} assurés (%{percent})<extra></extra>'
+            ))
+            fig_pie.update_layout(
+                showlegend=False,
+                **{k: v for k, v in base_layout().items()},
+                annotations=[dict(text=f"<b>{centre}</b><br>assurés",
+                                  x=0.5, y=0.5, font_size=13, showarrow=False,
+                                  font_color='#2d3748')]
+            )
 
         # ══════════════════════════════════════════════════
         # GRAPHIQUE 2 — HISTOGRAMME ÂGES PAR TYPE
         # ══════════════════════════════════════════════════
-        fig_age = go.Figure()
-        for t in ['Auto', 'Santé', 'Habitation', 'Vie']:
-            sub = fdf[fdf['type_assurance'] == t]
-            if sub.empty: continue
-            fig_age.add_trace(go.Histogram(
-                x=sub['age'], name=t, opacity=0.75, nbinsx=15,
-                marker_color=TYPE_COLORS[t],
-                hovertemplate=f'<b>{t}</b><br>Âge: %{{x}}<br>Nb: %{{y}}<extra></extra>'
-            ))
-        fig_age.update_layout(
-            barmode='overlay', showlegend=True,
-            **base_layout(),
-            xaxis=dict(title='Âge', showgrid=False),
-            yaxis=dict(title="Nb d'assurés", showgrid=True, gridcolor='#e2e8f0'),
-            legend=dict(orientation='h', yanchor='bottom', y=1.02, font_size=10)
-        )
+        fig_age = no_update
+        if need('chart-age-dist'):
+            vdf = views.get('chart-age-dist', fdf)
+            fig_age = go.Figure()
+            for t in portfolio_types:
+                sub = vdf[vdf['type_assurance'] == t]
+                if sub.empty: continue
+                # Échantillon : barres = somme des poids (effectifs estimés)
+                weighted = dict(y=sub['poids'], histfunc='sum') if 'poids' in sub.columns else {}
+                fig_age.add_trace(go.Histogram(
+                    x=sub['age'], name=t, opacity=0.75, nbinsx=15, **weighted,
+                    marker_color=TYPE_COLORS.get(t, '#888'),
+                    hovertemplate=f'<b>{t}</b><br>Âge: %{{x}}<br>Nb: %{{y}}<extra></extra>'
+                ))
+            fig_age.update_layout(
+                barmode='overlay', showlegend=True, dragmode='select', selectdirection='h',
+                **base_layout(),
+                xaxis=dict(title='Âge', showgrid=False),
+                yaxis=dict(title="Nb d'assurés", showgrid=True, gridcolor='#e2e8f0'),
+                legend=dict(orientation='h', yanchor='bottom', y=1.02, font_size=10)
+            )
 
         # ══════════════════════════════════════════════════
         # GRAPHIQUE 3 — ÂGE & SEXE (prime moy par tranche/sexe)
         # ══════════════════════════════════════════════════
-        grp_as = fdf.groupby(['tranche_age', 'sexe'], observed=True).agg(
-            prime_moy=('montant_prime', 'mean'),
-            nb=('id_assure', 'count')
-        ).reset_index()
-
-        fig_as = go.Figure()
-        for sexe, color, label in [('masculin', '#1565C0', '👨 Masculin'),
-                                    ('feminin', '#FF5252', '👩 Féminin')]:
-            sub = grp_as[grp_as['sexe'] == sexe]
-            fig_as.add_trace(go.Bar(
-                x=sub['tranche_age'].astype(str),
-                y=sub['prime_moy'],
-                name=label,
-                marker_color=color,
-                text=[f"{v:,.0f}€" for v in sub['prime_moy']],
-                textposition='outside',
-                textfont_size=9,
-                hovertemplate=f'<b>{label}</b><br>Tranche: %{{x}}<br>Prime moy: %{{y:,.0f}} €<extra></extra>'
-            ))
-        fig_as.update_layout(
-            barmode='group', showlegend=True,
-            **base_layout(),
-            xaxis=dict(title="Tranche d'âge", showgrid=False),
-            yaxis=dict(title="Prime moyenne (€)", showgrid=True, gridcolor='#e2e8f0'),
-            legend=dict(orientation='h', yanchor='bottom', y=1.02, font_size=10)
-        )
+        fig_as = no_update
+        if need('chart-age-sexe'):
+            vdf = views.get('chart-age-sexe', fdf)
+            # Échantillon : moyenne pondérée Σ poids·prime / Σ poids, effectifs = Σ poids
+            w_as = vdf['poids'] if 'poids' in vdf.columns else 1
+            grp_as = vdf.assign(un=w_as, prime_pond=vdf['montant_prime'] * w_as).groupby(
+                ['tranche_age', 'sexe'], observed=True).agg(
+                prime_pond=('prime_pond', 'sum'),
+                nb=('un', 'sum')
+            ).reset_index()
+            grp_as['prime_moy'] = grp_as['prime_pond'] / grp_as['nb']
+
+            fig_as = go.Figure()
+            for sexe, color, label in [('masculin', '#1565C0', '👨 Masculin'),
+                                        ('feminin', '#FF5252', '👩 Féminin')]:
+                sub = grp_as[grp_as['sexe'] == sexe]
+                on_sexe = brushed('sexe', [sexe])[0]
+                fig_as.add_trace(go.Bar(
+                    x=sub['tranche_age'].astype(str),
+                    y=sub['prime_moy'],
+                    name=label,
+                    marker_color=color,
+                    marker_opacity=[o if on_sexe else 0.35
+                                    for o in opacities('tranche_age', sub['tranche_age'])],
+                    customdata=[sexe] * len(sub),
+                    text=[f"{v:,.0f}€" for v in sub['prime_moy']],
+                    textposition='outside',
+                    textfont_size=9,
+                    hovertemplate=f'<b>{label}</b><br>Tranche: %{{x}}<br>Prime moy: %{{y:,.0f}} €<extra></extra>'
+                ))
+            fig_as.update_layout(
+                barmode='group', showlegend=True,
+                **base_layout(),
+                xaxis=dict(title="Tranche d'âge", showgrid=False),
+                yaxis=dict(title="Prime moyenne (€)", showgrid=True, gridcolor='#e2e8f0'),
+                legend=dict(orientation='h', yanchor='bottom', y=1.02, font_size=10)
+            )
+
+        checkpoint()
+
+        # ══════════════════════════════════════════════════
+        # GÉOGRAPHIE — niveau affiché (drill-down) depuis les rollups
+        # ══════════════════════════════════════════════════
+        geo = groups['hierarchy']
+        depth, parent = groups['drill']
+        geo_field = geo.levels[depth]
+        geo_reg = geo.rollup(groups['geo'], depth, parent)
+        geo_title = (dict(text=f"{' › '.join(geo.path(depth, parent))} — {geo.label(depth).lower()}s",
+                          font_size=11, x=0.02, y=0.98)
+                     if depth else None)
 
         # ══════════════════════════════════════════════════
         # GRAPHIQUE 4 — PIE RÉGION
         # ══════════════════════════════════════════════════
-        counts_r = fdf['region'].value_counts()
-        fig_reg_pie = go.Figure(go.Pie(
-            labels=counts_r.index,
-            values=counts_r.values,
-            hole=0.45,
-            marker=dict(
-                colors=[REGION_COLORS.get(r, '#888') for r in counts_r.index],
-                line=dict(color='white', width=2)
-            ),
-            textinfo='label+percent',
-            textfont_size=11,
-            hovertemplate='<b>%{label}</b><br>%{value} assurés (%{percent})<extra></extra>'
-        ))
-        fig_reg_pie.update_layout(showlegend=False, **base_layout())
+        fig_reg_pie = None
+        if light and need('chart-region-pie'):
+            counts_r = geo_reg[geo_reg['count'] > 0].sort_values('count', ascending=False)
+            fig_reg_pie = go.Figure(go.Pie(
+                labels=counts_r.index,
+                values=counts_r['count'].values,
+                hole=0.45,
+                pull=pulls(geo_field, counts_r.index),
+                marker=dict(
+                    colors=counts_r['color'].tolist(),
+                    line=dict(color='white', width=2)
+                ),
+                customdata=[geo_field] * len(counts_r),
+                textinfo='label+percent',
+                textfont_size=11,
+                hovertemplate='<b>%{label}</b><br>%{value} assurés (%{percent})<extra></extra>'
+            ))
+            fig_reg_pie.update_layout(showlegend=False, **base_layout())
+            if geo_title:
+                fig_reg_pie.update_layout(title=geo_title, margin_t=40)
 
         # ══════════════════════════════════════════════════
         # GRAPHIQUE 5 — BAR SINISTRES PAR RÉGION
         # ══════════════════════════════════════════════════
-        agg_reg = fdf.groupby('region').agg(
-            nb_sin=('nb_sinistres', 'sum'),
-            montant=('montant_sinistres', 'sum'),
-            assures=('id_assure', 'count')
-        ).reset_index().sort_values('montant', ascending=True)
-
-        fig_reg = go.Figure()
-        fig_reg.add_trace(go.Bar(
-            x=agg_reg['montant'], y=agg_reg['region'],
-            orientation='h',
-            marker_color=[REGION_COLORS.get(r, '#888') for r in agg_reg['region']],
-            marker=dict(
-                color=[REGION_COLORS.get(r, '#888') for r in agg_reg['region']],
-                line=dict(color='white', width=1)
-            ),
-            text=[f"{v/1e6:.2f}M €" for v in agg_reg['montant']],
-            textposition='outside',
-            textfont_size=10,
-            customdata=agg_reg[['nb_sin', 'assures']].values,
-            hovertemplate='<b>%{y}</b><br>Montant: %{x:,.0f} €<br>Sinistres: %{customdata[0]}<br>Assurés: %{customdata[1]}<extra></extra>'
-        ))
-        if len(agg_reg) > 0:
-            mean_m = agg_reg['montant'].mean()
-            fig_reg.add_vline(x=mean_m, line_dash='dot', line_color='#FFB300',
-                              annotation_text=f"Moy. {mean_m/1e6:.2f}M€",
-                              annotation_font_color='#FFB300', annotation_font_size=9)
-        fig_reg.update_layout(
-            showlegend=False, **base_layout(),
-            xaxis=dict(title='Montant total sinistres (€)', showgrid=True, gridcolor='#e2e8f0'),
-            yaxis=dict(showgrid=False)
-        )
+        fig_reg = no_update
+        if need('chart-region-bar'):
+            agg_reg = pd.DataFrame({
+                'region':  geo_reg.index,
+                'nb_sin':  geo_reg['nb_sinistres'].values.astype(int),
+                'montant': geo_reg['montant_sinistres'].values,
+                'assures': geo_reg['count'].values.astype(int),
+                'color':   geo_reg['color'].values,
+                'niveau':  geo_field,
+            })
+            agg_reg = agg_reg[agg_reg['assures'] > 0].sort_values('montant', ascending=True)
+
+            fig_reg = go.Figure()
+            fig_reg.add_trace(go.Bar(
+                x=agg_reg['montant'], y=agg_reg['region'],
+                orientation='h',
+                marker_color=agg_reg['color'].tolist(),
+                marker=dict(
+                    color=agg_reg['color'].tolist(),
+                    opacity=opacities(geo_field, agg_reg['region']),
+                    line=dict(color='white', width=1)
+                ),
+                text=[f"{v/1e6:.2f}M €" for v in agg_reg['montant']],
+                textposition='outside',
+                textfont_size=10,
+                customdata=agg_reg[['nb_sin', 'assures', 'niveau']].values,
+                hovertemplate='<b>%{y}</b><br>Montant: %{x:,.0f} €<br>Sinistres: %{customdata[0]}<br>Assurés: %{customdata[1]}<extra></extra>'
+            ))
+            if len(agg_reg) > 0:
+                mean_m = agg_reg['montant'].mean()
+                fig_reg.add_vline(x=mean_m, line_dash='dot', line_color='#FFB300',
+                                  annotation_text=f"Moy. {mean_m/1e6:.2f}M€",
+                                  annotation_font_color='#FFB300', annotation_font_size=9)
+            fig_reg.update_layout(
+                showlegend=False, **base_layout(),
+                xaxis=dict(title='Montant total sinistres (€)', showgrid=True, gridcolor='#e2e8f0'),
+                yaxis=dict(showgrid=False)
+            )
+            if geo_title:
+                fig_reg.update_layout(title=geo_title, margin_t=40)
 
         # ══════════════════════════════════════════════════
         # GRAPHIQUE 6 — HISTOGRAMME NB SINISTRES
         # ══════════════════════════════════════════════════
-        counts_sin = fdf['nb_sinistres'].value_counts().sort_index()
-        pct_sin    = (counts_sin / n * 100).round(1)
-        bar_cols   = {0: '#00E676', 1: '#00C6FF', 2: '#FFB300', 3: '#FF7043', 4: '#FF5252'}
-        labels_sin = {0: '0 sinistre', 1: '1 sinistre', 2: '2 sinistres',
-                      3: '3 sinistres', 4: '4 sinistres'}
-
-        fig_hist = go.Figure(go.Bar(
-            x=[labels_sin.get(i, f'{i} sin.') for i in counts_sin.index],
-            y=counts_sin.values,
-            marker_color=[bar_cols.get(i, '#FF5252') for i in counts_sin.index],
-            marker=dict(line=dict(color='white', width=1.5)),
-            text=[f'{v}<br>({p}%)' for v, p in zip(counts_sin.values, pct_sin)],
-            textposition='outside', textfont_size=10,
-            hovertemplate='<b>%{x}</b><br>%{y} assurés<extra></extra>'
-        ))
-        fig_hist.update_layout(
-            showlegend=False, **base_layout(),
-            xaxis=dict(showgrid=False),
-            yaxis=dict(showgrid=True, gridcolor='#e2e8f0', title="Nb d'assurés")
-        )
+        fig_hist = None
+        if light and need('chart-sinistres-hist'):
+            counts_sin = group_series('nb_sinistres').astype(int)
+            counts_sin = counts_sin[counts_sin > 0]
+            pct_sin    = (counts_sin / counts_sin.sum() * 100).round(1)
+            bar_cols   = {0: '#00E676', 1: '#00C6FF', 2: '#FFB300', 3: '#FF7043', 4: '#FF5252'}
+            labels_sin = {0: '0 sinistre', 1: '1 sinistre', 2: '2 sinistres',
+                          3: '3 sinistres', 4: '4 sinistres'}
+
+            fig_hist = go.Figure(go.Bar(
+                x=[labels_sin.get(i, f'{i} sin.') for i in counts_sin.index],
+                y=counts_sin.values,
+                marker_color=[bar_cols.get(i, '#FF5252') for i in counts_sin.index],
+                marker=dict(line=dict(color='white', width=1.5),
+                            opacity=opacities('nb_sinistres', counts_sin.index)),
+                customdata=counts_sin.index.tolist(),
+                text=[f'{v}<br>({p}%)' for v, p in zip(counts_sin.values, pct_sin)],
+                textposition='outside', textfont_size=10,
+                hovertemplate='<b>%{x}</b><br>%{y} assurés<extra></extra>'
+            ))
+            fig_hist.update_layout(
+                showlegend=False, **base_layout(),
+                xaxis=dict(showgrid=False),
+                yaxis=dict(showgrid=True, gridcolor='#e2e8f0', title="Nb d'assurés")
+            )
 
         # ══════════════════════════════════════════════════
         # GRAPHIQUE 7 — SÉRIE TEMPORELLE
         # ══════════════════════════════════════════════════
-        df_t = fdf[fdf['nb_sinistres'] > 0].dropna(subset=['date_derniere_sinistre']).copy()
-        df_t['mois'] = df_t['date_derniere_sinistre'].dt.to_period('M').astype(str)
-        agg_t = (df_t.groupby('mois')
-                 .agg(nb=('id_assure', 'count'), montant=('montant_sinistres', 'sum'))
-                 .reset_index().sort_values('mois'))
-
-        fig_time = make_subplots(specs=[[{"secondary_y": True}]])
-        if len(agg_t) > 0:
-            fig_time.add_trace(go.Bar(
-                x=agg_t['mois'], y=agg_t['nb'], name='Nb sinistres',
-                marker_color='rgba(21,101,192,0.6)',
-                hovertemplate='%{x}<br><b>%{y} sinistres</b><extra></extra>'
-            ), secondary_y=False)
-            fig_time.add_trace(go.Scatter(
-                x=agg_t['mois'], y=agg_t['montant'],
-                name='Montant (€)', mode='lines+markers',
-                line=dict(color='#00C6FF', width=2.5),
-                marker=dict(size=5, color='#00C6FF'),
-                hovertemplate='%{x}<br><b>%{y:,.0f} €</b><extra></extra>'
-            ), secondary_y=True)
-        fig_time.update_layout(
-            showlegend=True,
-            plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(family='Inter, sans-serif', color='#2d3748', size=10),
-            xaxis=dict(showgrid=False, tickangle=45, nticks=18, tickfont_size=8),
-            yaxis=dict(title='Nb sinistres', showgrid=True, gridcolor='#e2e8f0'),
-            yaxis2=dict(title='Montant (€)', showgrid=False),
-            legend=dict(orientation='h', yanchor='bottom', y=1.02, font_size=10),
-            margin=dict(l=30, r=50, t=30, b=60), height=320
-        )
+        fig_time = no_update
+        if need('chart-time-series'):
+            vdf = views.get('chart-time-series', fdf)
+            if claims is not None and 'poids' not in vdf.columns:
+                # Table de faits : tous les sinistres de la sélection, par mois de survenance
+                agg_t = claims.monthly(vdf.index.to_numpy())
+            else:
+                # Agrégats par assuré : date du dernier sinistre seulement
+                df_t = vdf[vdf['nb_sinistres'] > 0].dropna(subset=['date_derniere_sinistre']).copy()
+                df_t['mois'] = df_t['date_derniere_sinistre'].dt.to_period('M').astype(str)
+                w_t = df_t['poids'] if 'poids' in df_t.columns else 1
+                df_t['un'], df_t['montant_pond'] = w_t, df_t['montant_sinistres'] * w_t
+                agg_t = (df_t.groupby('mois')
+                         .agg(nb=('un', 'sum'), montant=('montant_pond', 'sum'))
+                         .reset_index().sort_values('mois'))
+
+            from plotly.subplots import make_subplots
+            fig_time = make_subplots(specs=[[{"secondary_y": True}]])
+            if len(agg_t) > 0:
+                fig_time.add_trace(go.Bar(
+                    x=agg_t['mois'], y=agg_t['nb'], name='Nb sinistres',
+                    marker_color='rgba(21,101,192,0.6)',
+                    marker_opacity=opacities('mois_sinistre', agg_t['mois']),
+                    hovertemplate='%{x}<br><b>%{y} sinistres</b><extra></extra>'
+                ), secondary_y=False)
+                fig_time.add_trace(go.Scatter(
+                    x=agg_t['mois'], y=agg_t['montant'],
+                    name='Montant (€)', mode='lines+markers',
+                    line=dict(color='#00C6FF', width=2.5),
+                    marker=dict(size=5, color='#00C6FF'),
+                    hovertemplate='%{x}<br><b>%{y:,.0f} €</b><extra></extra>'
+                ), secondary_y=True)
+            fig_time.update_layout(
+                showlegend=True, dragmode='select', selectdirection='h',
+                plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)',
+                font=dict(family='Inter, sans-serif', color='#2d3748', size=10),
+                xaxis=dict(showgrid=False, tickangle=45, nticks=18, tickfont_size=8),
+                yaxis=dict(title='Nb sinistres', showgrid=True, gridcolor='#e2e8f0'),
+                yaxis2=dict(title='Montant (€)', showgrid=False),
+                legend=dict(orientation='h', yanchor='bottom', y=1.02, font_size=10),
+                margin=dict(l=30, r=50, t=30, b=60), height=320
+            )
 
         # ══════════════════════════════════════════════════
         # GRAPHIQUE 8 — SINISTRES PAR ÂGE & TYPE (heatmap)
         # ══════════════════════════════════════════════════
-        if 'tranche_age' in fdf.columns:
-            piv = fdf.groupby(['tranche_age', 'type_assurance'], observed=True)['nb_sinistres'].mean().unstack(fill_value=0)
-        else:
-            piv = pd.DataFrame()
+        # Moyenne de sinistres par tranche × type, lue dans le groupe crossfilter
+        tranches, types = groups['levels']['tranche_age'], groups['levels']['type_assurance']
+        tt_count = groups['tranche_type']['count'].reshape(len(tranches), len(types))
+        tt_nb    = groups['tranche_type']['nb_sinistres'].reshape(len(tranches), len(types))
+        piv = pd.DataFrame(np.divide(tt_nb, tt_count, out=np.zeros_like(tt_nb), where=tt_count > 0),
+                           index=pd.Index(tranches, name='tranche_age'),
+                           columns=pd.Index(types, name='type_assurance'))
+        piv = piv.loc[tt_count.sum(axis=1) > 0, tt_count.sum(axis=0) > 0]
+
+        fig_sin_age = no_update
+        if need('chart-sinistres-age'):
+            if piv.empty:
+                fig_sin_age = empty_fig()
+            else:
+                fig_sin_age = go.Figure()
+                for t in piv.columns:
+                    on_type = brushed('type_assurance', [t])[0]
+                    fig_sin_age.add_trace(go.Bar(
+                        x=piv.index.astype(str), y=piv[t],
+                        name=t, marker_color=TYPE_COLORS.get(t, '#888'),
+                        marker_opacity=[o if on_type else 0.35
+                                        for o in opacities('tranche_age', piv.index)],
+                        customdata=[t] * len(piv),
+                        text=[f"{v:.2f}" for v in piv[t]],
+                        textposition='outside', textfont_size=9,
+                        hovertemplate=f'<b>{t}</b><br>Tranche: %{{x}}<br>Moy: %{{y:.3f}}<extra></extra>'
+                    ))
+                fig_sin_age.update_layout(
+                    barmode='group', showlegend=True,
+                    **base_layout(),
+                    xaxis=dict(title="Tranche d'âge", showgrid=False),
+                    yaxis=dict(title="Sinistres moyens/assuré", showgrid=True, gridcolor='#e2e8f0'),
+                    legend=dict(orientation='h', yanchor='bottom', y=1.02, font_size=10)
+                )
 
-        if piv.empty:
-            fig_sin_age = empty_fig()
-        else:
-            fig_sin_age = go.Figure()
-            for t in piv.columns:
-                fig_sin_age.add_trace(go.Bar(
-                    x=piv.index.astype(str), y=piv[t],
-                    name=t, marker_color=TYPE_COLORS.get(t, '#888'),
-                    text=[f"{v:.2f}" for v in piv[t]],
-                    textposition='outside', textfont_size=9,
-                    hovertemplate=f'<b>{t}</b><br>Tranche: %{{x}}<br>Moy: %{{y:.3f}}<extra></extra>'
-                ))
-            fig_sin_age.update_layout(
-                barmode='group', showlegend=True,
-                **base_layout(),
-                xaxis=dict(title="Tranche d'âge", showgrid=False),
-                yaxis=dict(title="Sinistres moyens/assuré", showgrid=True, gridcolor='#e2e8f0'),
-                legend=dict(orientation='h', yanchor='bottom', y=1.02, font_size=10)
-            )
+        checkpoint()
 
         # ══════════════════════════════════════════════════
         # GRAPHIQUE 9 — SCATTER PRIME vs SINISTRE
         # ══════════════════════════════════════════════════
-        fig_sc = go.Figure()
-        for t in ['Auto', 'Santé', 'Habitation', 'Vie']:
-            sub = fdf[fdf['type_assurance'] == t]
-            if sub.empty: continue
+        fig_sc = no_update
+        if need('chart-scatter-prime'):
+            vdf = views.get('chart-scatter-prime', fdf)
+            fig_sc = go.Figure()
+            for t in portfolio_types:
+                sub = vdf[vdf['type_assurance'] == t]
+                if sub.empty: continue
+                fig_sc.add_trace(go.Scatter(
+                    x=sub['montant_prime'], y=sub['montant_sinistres'],
+                    mode='markers', name=t,
+                    marker=dict(color=TYPE_COLORS.get(t, '#888'), size=5, opacity=0.6,
+                                line=dict(color='white', width=0.5)),
+                    customdata=sub[['age', 'region', 'nb_sinistres']].values,
+                    hovertemplate=(f'<b>{t}</b><br>Prime: %{{x:,.0f}} €<br>'
+                                   'Sinistre: %{y:,.0f} €<br>Âge: %{customdata[0]}<br>'
+                                   'Région: %{customdata[1]}<extra></extra>')
+                ))
+            max_p = vdf['montant_prime'].max() if len(vdf) else 600
             fig_sc.add_trace(go.Scatter(
-                x=sub['montant_prime'], y=sub['montant_sinistres'],
-                mode='markers', name=t,
-                marker=dict(color=TYPE_COLORS[t], size=5, opacity=0.6,
-                            line=dict(color='white', width=0.5)),
-                customdata=sub[['age', 'region', 'nb_sinistres']].values,
-                hovertemplate=(f'<b>{t}</b><br>Prime: %{{x:,.0f}} €<br>'
-                               'Sinistre: %{y:,.0f} €<br>Âge: %{customdata[0]}<br>'
-                               'Région: %{customdata[1]}<extra></extra>')
+                x=[0, max_p], y=[0, max_p], mode='lines', name='Équilibre S=P',
+                line=dict(dash='dot', color='#FFB300', width=2),
+                hoverinfo='skip'
             ))
-        max_p = fdf['montant_prime'].max() if n else 600
-        fig_sc.add_trace(go.Scatter(
-            x=[0, max_p], y=[0, max_p], mode='lines', name='Équilibre S=P',
-            line=dict(dash='dot', color='#FFB300', width=2),
-            hoverinfo='skip'
-        ))
-        fig_sc.update_layout(
-            showlegend=True, **base_layout(),
-            xaxis=dict(title='Prime annuelle (€)', showgrid=True, gridcolor='#e2e8f0'),
-            yaxis=dict(title='Montant sinistre (€)', showgrid=True, gridcolor='#e2e8f0'),
-            legend=dict(orientation='h', yanchor='bottom', y=1.02, font_size=10)
-        )
+            fig_sc.update_layout(
+                showlegend=True, dragmode='select', **base_layout(),
+                xaxis=dict(title='Prime annuelle (€)', showgrid=True, gridcolor='#e2e8f0'),
+                yaxis=dict(title='Montant sinistre (€)', showgrid=True, gridcolor='#e2e8f0'),
+                legend=dict(orientation='h', yanchor='bottom', y=1.02, font_size=10)
+            )
 
         # ══════════════════════════════════════════════════
         # GRAPHIQUE 10 — COUT TYPE (barres groupées)
         # ══════════════════════════════════════════════════
-        agg_ct = fdf.groupby('type_assurance').agg(
-            cout_moy=('montant_sinistres', 'mean'),
-            prime_moy=('montant_prime', 'mean')
-        ).reset_index()
-
-        fig_ct = go.Figure()
-        fig_ct.add_trace(go.Bar(
-            x=agg_ct['type_assurance'], y=agg_ct['cout_moy'],
-            name='Coût moyen sinistre',
-            marker_color='#FF5252',
-            text=[f"{v:,.0f}€" for v in agg_ct['cout_moy']],
-            textposition='outside', textfont_size=9,
-            hovertemplate='<b>%{x}</b><br>Coût: %{y:,.0f} €<extra></extra>'
-        ))
-        fig_ct.add_trace(go.Bar(
-            x=agg_ct['type_assurance'], y=agg_ct['prime_moy'],
-            name='Prime moyenne',
-            marker_color='#00C6FF',
-            text=[f"{v:,.0f}€" for v in agg_ct['prime_moy']],
-            textposition='outside', textfont_size=9,
-            hovertemplate='<b>%{x}</b><br>Prime: %{y:,.0f} €<extra></extra>'
-        ))
-        fig_ct.update_layout(
-            barmode='group', showlegend=True,
-            **base_layout(),
-            xaxis=dict(showgrid=False),
-            yaxis=dict(title='Montant (€)', showgrid=True, gridcolor='#e2e8f0'),
-            legend=dict(orientation='h', yanchor='bottom', y=1.02, font_size=10)
-        )
+        fig_ct = no_update
+        if need('chart-cout-type'):
+            ct_count = group_series('type_assurance')
+            agg_ct = pd.DataFrame({
+                'type_assurance': ct_count.index,
+                'cout_moy':  group_series('type_assurance', 'montant_sinistres').values / ct_count.clip(lower=1).values,
+                'prime_moy': group_series('type_assurance', 'montant_prime').values / ct_count.clip(lower=1).values,
+            })[ct_count.values > 0]
+
+            fig_ct = go.Figure()
+            fig_ct.add_trace(go.Bar(
+                x=agg_ct['type_assurance'], y=agg_ct['cout_moy'],
+                name='Coût moyen sinistre',
+                marker_color='#FF5252',
+                marker_opacity=opacities('type_assurance', agg_ct['type_assurance']),
+                text=[f"{v:,.0f}€" for v in agg_ct['cout_moy']],
+                textposition='outside', textfont_size=9,
+                hovertemplate='<b>%{x}</b><br>Coût: %{y:,.0f} €<extra></extra>'
+            ))
+            fig_ct.add_trace(go.Bar(
+                x=agg_ct['type_assurance'], y=agg_ct['prime_moy'],
+                name='Prime moyenne',
+                marker_color='#00C6FF',
+                marker_opacity=opacities('type_assurance', agg_ct['type_assurance']),
+                text=[f"{v:,.0f}€" for v in agg_ct['prime_moy']],
+                textposition='outside', textfont_size=9,
+                hovertemplate='<b>%{x}</b><br>Prime: %{y:,.0f} €<extra></extra>'
+            ))
+            fig_ct.update_layout(
+                barmode='group', showlegend=True,
+                **base_layout(),
+                xaxis=dict(showgrid=False),
+                yaxis=dict(title='Montant (€)', showgrid=True, gridcolor='#e2e8f0'),
+                legend=dict(orientation='h', yanchor='bottom', y=1.02, font_size=10)
+            )
 
         # ══════════════════════════════════════════════════
         # GRAPHIQUE 11 — HEATMAP RISQUE ÂGE × TYPE
         # ══════════════════════════════════════════════════
-        if 'tranche_age' in fdf.columns:
-            hm = fdf.groupby(['tranche_age', 'type_assurance'], observed=True)['nb_sinistres'].mean().unstack(fill_value=0)
-        else:
-            hm = pd.DataFrame()
-
-        if hm.empty:
-            fig_hm = empty_fig()
-        else:
-            fig_hm = go.Figure(go.Heatmap(
-                z=hm.values,
-                x=hm.columns.tolist(),
-                y=hm.index.astype(str).tolist(),
-                colorscale='Blues',
-                text=[[f"{v:.2f}" for v in row] for row in hm.values],
-                texttemplate="%{text}",
-                textfont_size=10,
-                hovertemplate='<b>%{y} — %{x}</b><br>Moy sinistres: %{z:.3f}<extra></extra>',
-                colorbar=dict(title="Moy.", thickness=12, len=0.8, tickfont_size=9)
-            ))
-            fig_hm.update_layout(
-                **base_layout(),
-                xaxis=dict(side='bottom'),
-                yaxis=dict(autorange='reversed')
-            )
+        fig_hm = no_update
+        if need('chart-heatmap-risque'):
+            hm = piv
+
+            if hm.empty:
+                fig_hm = empty_fig()
+            else:
+                fig_hm = go.Figure(go.Heatmap(
+                    z=hm.values,
+                    x=hm.columns.tolist(),
+                    y=hm.index.astype(str).tolist(),
+                    colorscale='Blues',
+                    text=[[f"{v:.2f}" for v in row] for row in hm.values],
+                    texttemplate="%{text}",
+                    textfont_size=10,
+                    hovertemplate='<b>%{y} — %{x}</b><br>Moy sinistres: %{z:.3f}<extra></extra>',
+                    colorbar=dict(title="Moy.", thickness=12, len=0.8, tickfont_size=9)
+                ))
+                fig_hm.update_layout(
+                    **base_layout(),
+                    xaxis=dict(side='bottom'),
+                    yaxis=dict(autorange='reversed')
+                )
+                # Cellules brossées encadrées
+                for i, tr in enumerate(hm.index):
+                    for j, ty in enumerate(hm.columns):
+                        if (selection.get('tranche_age') or selection.get('type_assurance')) and \
+                                brushed('tranche_age', [tr])[0] and brushed('type_assurance', [ty])[0]:
+                            fig_hm.add_shape(type='rect', x0=j - 0.5, x1=j + 0.5, y0=i - 0.5, y1=i + 0.5,
+                                             line=dict(color='#FF5252', width=2.5))
 
         # ══════════════════════════════════════════════════
         # GRAPHIQUE 12 — DISTRIBUTION BONUS/MALUS
         # ══════════════════════════════════════════════════
-        if 'bm_cat' in fdf.columns:
-            bm_counts = fdf['bm_cat'].value_counts()
-            fig_bm = go.Figure(go.Pie(
-                labels=bm_counts.index.tolist(),
-                values=bm_counts.values,
-                hole=0.45,
-                marker=dict(
-                    colors=[BM_COLORS.get(str(k), '#888') for k in bm_counts.index],
-                    line=dict(color='white', width=2)
-                ),
-                textinfo='label+percent+value',
-                textfont_size=10,
-                hovertemplate='<b>%{label}</b><br>%{value} assurés (%{percent})<extra></extra>'
-            ))
-        else:
-            fig_bm = go.Figure(go.Histogram(
-                x=fdf['bonus_malus'], nbinsx=20,
-                marker_color='#1565C0',
-                hovertemplate='B/M: %{x:.2f}<br>Nb: %{y}<extra></extra>'
-            ))
-        fig_bm.update_layout(showlegend=False, **base_layout())
+        fig_bm = None
+        if light and need('chart-bm-dist'):
+            if 'bm_cat' in fdf.columns:
+                bm_counts = group_series('bm_cat').astype(int).sort_values(ascending=False)
+                fig_bm = go.Figure(go.Pie(
+                    labels=bm_counts.index.tolist(),
+                    values=bm_counts.values,
+                    hole=0.45,
+                    pull=pulls('bm_cat', bm_counts.index),
+                    marker=dict(
+                        colors=[BM_COLORS.get(str(k), '#888') for k in bm_counts.index],
+                        line=dict(color='white', width=2)
+                    ),
+                    textinfo='label+percent+value',
+                    textfont_size=10,
+                    hovertemplate='<b>%{label}</b><br>%{value} assurés (%{percent})<extra></extra>'
+                ))
+            else:
+                fig_bm = go.Figure(go.Histogram(
+                    x=fdf['bonus_malus'], nbinsx=20,
+                    marker_color='#1565C0',
+                    hovertemplate='B/M: %{x:.2f}<br>Nb: %{y}<extra></extra>'
+                ))
+            fig_bm.update_layout(showlegend=False, **base_layout())
 
         # ══════════════════════════════════════════════════
         # GRAPHIQUE 13 — SCATTER B/M × SINISTRES × MONTANT
         # ══════════════════════════════════════════════════
-        fig_bm_sc = go.Figure()
-        for t in ['Auto', 'Santé', 'Habitation', 'Vie']:
-            sub = fdf[fdf['type_assurance'] == t]
-            if sub.empty: continue
-            fig_bm_sc.add_trace(go.Scatter(
-                x=sub['bonus_malus'],
-                y=sub['nb_sinistres'],
-                mode='markers', name=t,
-                marker=dict(
-                    color=TYPE_COLORS[t],
-                    size=np.clip(sub['montant_sinistres'] / 500, 4, 18),
-                    opacity=0.55,
-                    line=dict(color='white', width=0.5)
-                ),
-                customdata=sub[['montant_sinistres', 'age', 'region']].values,
-                hovertemplate=(f'<b>{t}</b><br>B/M: %{{x:.2f}}<br>'
-                               'Nb sinistres: %{y}<br>Montant: %{customdata[0]:,.0f} €<br>'
-                               'Âge: %{customdata[1]} | %{customdata[2]}<extra></extra>')
-            ))
-        fig_bm_sc.add_vline(x=1.0, line_dash='dot', line_color='#FFB300',
-                             annotation_text="Seuil Malus (1.0)",
-                             annotation_font_color='#FFB300', annotation_font_size=9)
-        fig_bm_sc.update_layout(
-            showlegend=True, **base_layout(height=340),
-            xaxis=dict(title='Coefficient Bonus/Malus', showgrid=True, gridcolor='#e2e8f0'),
-            yaxis=dict(title='Nb sinistres déclarés', showgrid=True, gridcolor='#e2e8f0'),
-            legend=dict(orientation='h', yanchor='bottom', y=1.02, font_size=10)
-        )
+        fig_bm_sc = no_update
+        if need('chart-bm-scatter'):
+            vdf = views.get('chart-bm-scatter', fdf)
+            fig_bm_sc = go.Figure()
+            for t in portfolio_types:
+                sub = vdf[vdf['type_assurance'] == t]
+                if sub.empty: continue
+                fig_bm_sc.add_trace(go.Scatter(
+                    x=sub['bonus_malus'],
+                    y=sub['nb_sinistres'],
+                    mode='markers', name=t,
+                    marker=dict(
+                        color=TYPE_COLORS.get(t, '#888'),
+                        size=np.clip(sub['montant_sinistres'] / 500, 4, 18),
+                        opacity=0.55,
+                        line=dict(color='white', width=0.5)
+                    ),
+                    customdata=sub[['montant_sinistres', 'age', 'region']].values,
+                    hovertemplate=(f'<b>{t}</b><br>B/M: %{{x:.2f}}<br>'
+                                   'Nb sinistres: %{y}<br>Montant: %{customdata[0]:,.0f} €<br>'
+                                   'Âge: %{customdata[1]} | %{customdata[2]}<extra></extra>')
+                ))
+            fig_bm_sc.add_vline(x=1.0, line_dash='dot', line_color='#FFB300',
+                                 annotation_text="Seuil Malus (1.0)",
+                                 annotation_font_color='#FFB300', annotation_font_size=9)
+            fig_bm_sc.update_layout(
+                showlegend=True, dragmode='select', **base_layout(height=340),
+                xaxis=dict(title='Coefficient Bonus/Malus', showgrid=True, gridcolor='#e2e8f0'),
+                yaxis=dict(title='Nb sinistres déclarés', showgrid=True, gridcolor='#e2e8f0'),
+                legend=dict(orientation='h', yanchor='bottom', y=1.02, font_size=10)
+            )
 
         # ══════════════════════════════════════════════════
-        # TABLEAU DE DONNÉES
+        # GRAPHIQUE 14 — SCORE DE RISQUE MODÉLISÉ (GLM)
         # ══════════════════════════════════════════════════
-        cols_show = ['id_assure', 'age', 'sexe', 'type_assurance', 'region',
-                     'duree_contrat', 'montant_prime', 'nb_sinistres',
-                     'montant_sinistres', 'bonus_malus', 'bm_cat', 'ratio_SP']
-        cols_ok = [c for c in cols_show if c in fdf.columns]
-        df_table = fdf[cols_ok].head(100).copy()
-        df_table['montant_prime']     = df_table['montant_prime'].round(0)
-        df_table['montant_sinistres'] = df_table['montant_sinistres'].round(0)
-        df_table['bonus_malus']       = df_table['bonus_malus'].round(3)
-        df_table['ratio_SP']          = df_table['ratio_SP'].round(2)
-        df_table['bm_cat']            = df_table['bm_cat'].astype(str)
+        fig_score = no_update
+        if need('chart-score-risque'):
+            vdf = views.get('chart-score-risque', fdf)
+            fig_score = go.Figure()
+            if 'score_risque' in vdf.columns:
+                for t in portfolio_types:
+                    sub = vdf[vdf['type_assurance'] == t]
+                    if sub.empty: continue
+                    weighted = dict(y=sub['poids'], histfunc='sum') if 'poids' in sub.columns else {}
+                    fig_score.add_trace(go.Histogram(
+                        x=sub['score_risque'], name=t, opacity=0.7, nbinsx=30, **weighted,
+                        marker_color=TYPE_COLORS.get(t, '#888'),
+                        hovertemplate=f'<b>{t}</b><br>Score: %{{x}}<br>Nb: %{{y}}<extra></extra>'
+                    ))
+                fig_score.add_vline(x=100, line_dash='dot', line_color='#FFB300',
+                                    annotation_text="Risque moyen (100)",
+                                    annotation_font_color='#FFB300', annotation_font_size=9)
+            fig_score.update_layout(
+                barmode='overlay', showlegend=True, dragmode='select', selectdirection='h',
+                **base_layout(height=300),
+                xaxis=dict(title='Score de risque (prime pure prédite, 100 = moyenne)', showgrid=False),
+                yaxis=dict(title="Nb d'assurés", showgrid=True, gridcolor='#e2e8f0'),
+                legend=dict(orientation='h', yanchor='bottom', y=1.02, font_size=10)
+            )
 
-        table = dash_table.DataTable(
-            data=df_table.to_dict('records'),
-            columns=[{'name': c, 'id': c} for c in cols_ok],
-            page_size=15,
-            sort_action='native',
-            filter_action='native',
-            style_table={'overflowX': 'auto'},
-            style_cell={
-                'fontFamily': 'Inter, sans-serif',
-                'fontSize': '12px',
-                'padding': '6px 10px',
-                'textAlign': 'left',
-                'border': '1px solid #e2e8f0',
-                'maxWidth': '140px',
-                'overflow': 'hidden',
-                'textOverflow': 'ellipsis',
-            },
-            style_header={
-                'backgroundColor': '#1565C0',
-                'color': 'white',
-                'fontWeight': '700',
-                'fontSize': '11px',
-                'textTransform': 'uppercase',
-                'letterSpacing': '0.06em',
-                'border': '1px solid #1565C0',
-            },
-            style_data_conditional=[
-                {'if': {'row_index': 'odd'}, 'backgroundColor': '#f7fafc'},
-                {'if': {'filter_query': '{nb_sinistres} > 2'},
-                 'backgroundColor': '#fff5f5', 'color': '#c53030'},
-                {'if': {'filter_query': '{bonus_malus} > 1.2'},
-                 'backgroundColor': '#fffbeb'},
-                {'if': {'filter_query': '{ratio_SP} > 10'},
-                 'backgroundColor': '#fff5f5'},
-            ]
-        )
-        table_count = f"Affichage de {min(100, n)} lignes sur {n:,} au total"
+        checkpoint()
 
-        return (
-            kpi_assures, kpi_sinistres, kpi_cout, kpi_prime,
-            t_assures, t_sinistres, t_cout, t_prime,
-            taux_sin, ratio_sp, bm_moyen, pct_def,
-            counter, insights_html,
+        # ══════════════════════════════════════════════════
+        # TABLEAU DE DONNÉES
+        # ══════════════════════════════════════════════════
+        table = table_count = no_update
+        if details and need('data-table-container'):
+            cols_show = ['id_assure', 'age', 'sexe', 'type_assurance', 'region',
+                         'duree_contrat', 'montant_prime', 'nb_sinistres',
+                         'montant_sinistres', 'bonus_malus', 'bm_cat', 'ratio_SP',
+                         'prime_pure', 'score_risque']
+            cols_ok = [c for c in cols_show if c in fdf.columns]
+            df_table = fdf[cols_ok].head(100).copy()
+            df_table['montant_prime']     = df_table['montant_prime'].round(0)
+            df_table['montant_sinistres'] = df_table['montant_sinistres'].round(0)
+            df_table['bonus_malus']       = df_table['bonus_malus'].round(3)
+            df_table['ratio_SP']          = df_table['ratio_SP'].round(2)
+            df_table['bm_cat']            = df_table['bm_cat'].astype(str)
+
+            table = dash_table.DataTable(
+                data=df_table.to_dict('records'),
+                columns=[{'name': c, 'id': c} for c in cols_ok],
+                page_size=15,
+                sort_action='native',
+                filter_action='native',
+                style_table={'overflowX': 'auto'},
+                style_cell={
+                    'fontFamily': 'Inter, sans-serif',
+                    'fontSize': '12px',
+                    'padding': '6px 10px',
+                    'textAlign': 'left',
+                    'border': '1px solid #e2e8f0',
+                    'maxWidth': '140px',
+                    'overflow': 'hidden',
+                    'textOverflow': 'ellipsis',
+                },
+                style_header={
+                    'backgroundColor': '#1565C0',
+                    'color': 'white',
+                    'fontWeight': '700',
+                    'fontSize': '11px',
+                    'textTransform': 'uppercase',
+                    'letterSpacing': '0.06em',
+                    'border': '1px solid #1565C0',
+                },
+                style_data_conditional=[
+                    {'if': {'row_index': 'odd'}, 'backgroundColor': '#f7fafc'},
+                    {'if': {'filter_query': '{nb_sinistres} > 2'},
+                     'backgroundColor': '#fff5f5', 'color': '#c53030'},
+                    {'if': {'filter_query': '{bonus_malus} > 1.2'},
+                     'backgroundColor': '#fffbeb'},
+                    {'if': {'filter_query': '{ratio_SP} > 10'},
+                     'backgroundColor': '#fff5f5'},
+                ]
+            )
+            table_count = f"Affichage de {min(100, n)} lignes sur {n:,} au total"
+
+        out.update({
             # Section 1
-            fig_pie, fig_age, fig_as, fig_reg_pie,
+            'chart-type-pie': fig_pie, 'chart-age-dist': fig_age,
+            'chart-age-sexe': fig_as, 'chart-region-pie': fig_reg_pie,
             # Section 2
-            fig_reg, fig_hist, fig_time, fig_sin_age,
+            'chart-region-bar': fig_reg, 'chart-sinistres-hist': fig_hist,
+            'chart-time-series': fig_time, 'chart-sinistres-age': fig_sin_age,
             # Section 3
-            fig_sc, fig_ct,
+            'chart-scatter-prime': fig_sc, 'chart-cout-type': fig_ct,
             # Section 4
-            fig_hm, fig_bm, fig_bm_sc,
+            'chart-heatmap-risque': fig_hm, 'chart-bm-dist': fig_bm,
+            'chart-bm-scatter': fig_bm_sc, 'chart-score-risque': fig_score,
             # Tableau
-            table, table_count
-        )
+            'data-table-container': table if details else no_update,
+            'table-count': table_count if details else no_update,
+        })
+        return out
+
+    # Clé de chaque sortie : empreinte de ses sources (CHART_SOURCES), des brosses
+    # qu'elle met en avant et de la table lue (portefeuille ou échantillon)
+    def output_keys(fdf, groups, views, selection=None):
+        selection = selection or {}
+        frame = 'echantillon' if 'poids' in fdf.columns else 'portefeuille'
+        rows = fingerprint(fdf.index)
+        hashed = {}
+
+        def source(cid, name):
+            if name == 'view':
+                return fingerprint(views[cid].index) if cid in views else rows
+            if name == 'drill':
+                return groups['drill']
+            if name not in hashed:
+                hashed[name] = fingerprint(groups[name[len('group:'):]])
+            return hashed[name]
+
+        keys = {}
+        for cid, _ in DASHBOARD_OUTPUTS:
+            sources = CHART_SOURCES.get(cid)
+            if sources is None:
+                keys[cid] = fingerprint([frame, rows])
+                continue
+            fields = CHART_FIELDS[cid] + (groups['hierarchy'].levels if 'drill' in sources else [])
+            brushes = {f: selection[f] for f in fields if selection.get(f)}
+            keys[cid] = fingerprint([frame, [source(cid, s) for s in sources], brushes])
+        return keys
+
+    # Tableau de bord exact ; sorties dont la clé est affichée non construites
+    def exact_dashboard(type_v, sexe_v, region_v, sin_v, age_v, bm_v, selection, shown):
+        fdf, groups, views = select_data(type_v, sexe_v, region_v, sin_v, age_v, bm_v, selection)
+        checkpoint()
+        keys = output_keys(fdf, groups, views, selection)
+        out = build_dashboard(fdf, groups, views, selection, light=not clientside,
+                              keep=unchanged(keys, shown))
+        return out, keys
+
+    # Tableau de bord estimé : KPIs ± IC 95 %, graphiques pondérés ;
+    # insights et tableau gardent le dernier état exact
+    def approximate_dashboard(type_v, sexe_v, region_v, sin_v, age_v, bm_v, selection, shown):
+        fdf, groups, views = select_data(type_v, sexe_v, region_v, sin_v, age_v, bm_v,
+                                         selection, sampled=True)
+        mask = np.zeros(len(estimator.sample), dtype=bool)
+        mask[fdf.index] = True
+        keys = output_keys(fdf, groups, views, selection)
+        out = build_dashboard(fdf, groups, views, selection, details=False,
+                              keep=unchanged(keys, shown))
+        out.update(kpi_estimates(estimator, mask))
+        out['filter-counter'] = html.Span(
+            f"⏳ Estimation sur {len(fdf):,} lignes échantillonnées — résultat exact au relâchement",
+            style={"color": "#DD6B20", "fontSize": "0.78rem", "fontWeight": "600"})
+        return out, keys
+
+    # Requête interactive refusée (serveur saturé) : l'écran garde son état,
+    # seule la sortie texte notice affiche l'avis
+    def server_busy(outputs, notice):
+        span = html.Span("🚦 Serveur saturé — affichage non mis à jour, réessayez dans un instant",
+                         style={"color": "#C53030", "fontSize": "0.78rem", "fontWeight": "600"})
+        return [span if cid == notice else no_update for cid, _ in outputs]
+
+    # Avis du callback principal : compteur, ou insights si le navigateur tient le compteur
+    busy_notice = ('filter-counter' if ('filter-counter', 'children') in server_outputs
+                   else 'insights-content')
+
+    drag_inputs = ([Input('age-filter', 'drag_value'), Input('bm-filter', 'drag_value')]
+                   if sampling else [])
+
+    # Sorties + clés de l'état affiché (sorties inchangées ni construites ni renvoyées)
+    main_outputs = server_outputs + [FINGERPRINT_STORE]
+
+    @app.callback(
+        [Output(cid, prop) for cid, prop in main_outputs],
+        [
+            Input('type-filter',      'value'),
+            Input('sexe-filter',      'value'),
+            Input('region-filter',    'value'),
+            Input('sinistres-filter', 'value'),
+            Input('age-filter',       'value'),
+            Input('bm-filter',        'value'),
+            Input('crossfilter-selection', 'data'),
+        ] + drag_inputs + [State(*FINGERPRINT_STORE)],
+        prevent_initial_call=True
+    )
+    def update_all(type_v, sexe_v, region_v, sin_v, age_v, bm_v, selection, *args):
+        *drag, shown = args
+
+        # Requête déjà dépassée pendant son attente (rafale de glissement) : rien à calculer
+        checkpoint()
+
+        # Admission : travail interactif prioritaire sur les exports
+        try:
+            with scheduler.interactive():
+                checkpoint()
+
+                # Glissement d'un slider : estimation sur l'échantillon, affinée au relâchement
+                triggered = [t['prop_id'] for t in callback_context.triggered]
+                if drag and any(t.endswith('.drag_value') for t in triggered):
+                    out, keys = approximate_dashboard(type_v, sexe_v, region_v, sin_v,
+                                                      drag[0] or age_v, drag[1] or bm_v,
+                                                      selection, shown)
+                else:
+                    out, keys = exact_dashboard(type_v, sexe_v, region_v, sin_v, age_v, bm_v,
+                                                selection, shown)
+        except ServerBusy:
+            # Clé de la sortie d'avis oubliée : elle sera reconstruite à la réponse suivante
+            shown = {cid: key for cid, key in (shown or {}).items() if cid != busy_notice}
+            return server_busy(server_outputs, busy_notice) + [shown]
+        values, sent = changed_outputs(out, [cid for cid, _ in server_outputs], keys, shown)
+        return values + [sent]
+
+    # Rafales par session : seule la requête la plus récente va au bout
+    coalesce(main_outputs)
 
     # ════════════════════════════════════════════════════════
-    # CALLBACK — EXPORT EXCEL
+    # CALLBACK — BROSSAGE DES GRAPHIQUES
     # ════════════════════════════════════════════════════════
+    # Clic sur une barre / part : bascule la modalité ; sélection de plage :
+    # remplace l'intervalle (désélection = suppression). La sélection vit dans
+    # le store 'crossfilter-selection' et s'ajoute aux filtres du panneau.
+    months = sorted(df['mois_sinistre'].dropna().astype(str).unique())
+    brush_inputs = ([f"{cid}.clickData" for cid in CLICK_CHARTS] +
+                    [f"{cid}.selectedData" for cid in SELECT_CHARTS])
+
     @app.callback(
-        Output('download-excel', 'data'),
-        Input('btn-download-excel', 'n_clicks'),
+        [Output('crossfilter-selection', 'data'),
+         Output('selection-chips',       'children')],
+        [Input(cid, 'clickData') for cid in CLICK_CHARTS] +
+        [Input(cid, 'selectedData') for cid in SELECT_CHARTS] +
+        [Input('clear-selection', 'n_clicks'),
+         Input('reset-filters',   'n_clicks')],
+        State('crossfilter-selection', 'data'),
+        prevent_initial_call=True
+    )
+    def update_selection(*args):
+        current = dict(args[-1] or {})
+        values = dict(zip(brush_inputs, args))
+        trigger = callback_context.triggered[0]['prop_id'] if callback_context.triggered else ''
+        cid, _, prop = trigger.rpartition('.')
+
+        if cid in ('clear-selection', 'reset-filters'):
+            current = {}
+        elif prop == 'clickData':
+            point = ((values.get(trigger) or {}).get('points') or [{}])[0]
+            picked = _click_values(cid, point)
+            if picked and all(current.get(f) == v for f, v in picked.items()):
+                for f in picked:
+                    current.pop(f, None)
+            else:
+                current.update(picked)
+        elif prop == 'selectedData':
+            for f in CHART_FIELDS[cid]:
+                current.pop(f, None)
+            current.update(_range_values(cid, values.get(trigger), months))
+
+        current = {f: v for f, v in current.items() if v}
+        chips = []
+        for f, v in current.items():
+            if f in RANGE_FIELDS:
+                fmt = '{:,.2f}' if f == 'bonus_malus' else '{:,.0f}'
+                txt = f"{fmt.format(v[0])} – {fmt.format(v[1])}".replace(',', ' ')
+            elif f == 'mois_sinistre' and len(v) > 2:
+                txt = f"{v[0]} → {v[-1]}"
+            else:
+                txt = ', '.join(map(str, v))
+            chips.append(html.Span(f"{FIELD_LABELS.get(f, f)} : {txt}", className='selection-chip'))
+        return current, chips
+
+    # ════════════════════════════════════════════════════════
+    # CALLBACK — COMPARAISON DE COHORTES
+    # ════════════════════════════════════════════════════════
+    # La sélection courante du panneau est figée comme cohorte (A, B, …) ;
+    # au-delà de COHORT_MAX la plus ancienne sort. La comparaison ne dépend
+    # que du store : changer les filtres ne la recalcule pas.
+    comparator = CohortComparator(df)
+
+    @app.callback(
+        Output('cohorts-store', 'data'),
+        [Input('cohort-add',   'n_clicks'),
+         Input('cohort-clear', 'n_clicks')],
         [State('type-filter',      'value'),
          State('sexe-filter',      'value'),
          State('region-filter',    'value'),
          State('sinistres-filter', 'value'),
          State('age-filter',       'value'),
-         State('bm-filter',        'value')],
+         State('bm-filter',        'value'),
+         State('cohorts-store',    'data')],
         prevent_initial_call=True
     )
-    def download_excel(n, tv, sv, rv, sinv, av, bmv):
-        fdf = filter_data(tv, sv, rv, sinv, av, bmv)
+    def manage_cohorts(n_add, n_clear, tv, sv, rv, sinv, av, bmv, cohorts):
+        trigger = callback_context.triggered[0]['prop_id'] if callback_context.triggered else ''
+        if trigger.startswith('cohort-clear'):
+            return []
+        filters = cohort_filters(tv, sv, rv, sinv, av, bmv)
+        cohorts = [c for c in (cohorts or []) if c['filters'] != filters]
+        cohorts.append({'filters': filters, 'label': describe(filters, age_bounds, bm_bounds)})
+        return cohorts[-COHORT_MAX:]
+
+    def build_comparison(cohorts):
+
+        def placeholder_fig(msg):
+            fig = go.Figure()
+            fig.add_annotation(text=msg, xref="paper", yref="paper",
+                               x=0.5, y=0.5, showarrow=False,
+                               font=dict(size=12, color="#a0aec0"))
+            fig.update_layout(**base_layout(height=280),
+                              xaxis=dict(visible=False), yaxis=dict(visible=False))
+            return fig
 
-        buf = io.BytesIO()
-        with pd.ExcelWriter(buf, engine='openpyxl') as writer:
+        if not cohorts:
+            hint = "Ajoutez au moins deux sélections pour les comparer côte à côte."
+            return {'cohort-list': [], 'cohort-table': html.P(hint, className='text-muted text-center'),
+                    'cohort-insights': [],
+                    'chart-cohort-types': placeholder_fig("Aucune cohorte"),
+                    'chart-cohort-tranches': placeholder_fig("Aucune cohorte")}
+
+        res = comparator.compare(cohorts)
+        labels, kpis = res['labels'], res['kpis']
+        colors = dict(zip(labels, COHORT_COLORS))
+
+        chips = [html.Span([html.Strong(f"{l} "), c['label']], className='cohort-chip',
+                           style={"borderLeft": f"4px solid {colors[l]}"})
+                 for l, c in zip(labels, cohorts)]
+
+        # ── Tableau côte à côte (écart vs A mis en évidence) ──
+        def cell(key, fmt, worse_up, label):
+            val = kpis.at[label, key]
+            txt = fmt.format(val) if pd.notna(val) else "—"
+            if key in ('assures', 'sinistres'):
+                txt = txt.replace(',', ' ')
+            ref = kpis.iloc[0][key]
+            if label == labels[0] or pd.isna(val) or pd.isna(ref) or ref == 0:
+                return html.Td(txt)
+            rel = (val - ref) / abs(ref) * 100
+            tone = '' if worse_up is None or abs(rel) < 5 else \
+                   ('cohort-worse' if (rel > 0) == worse_up else 'cohort-better')
+            return html.Td([txt, html.Small(f" {'+' if rel > 0 else ''}{rel:.1f}%",
+                                            className=f'cohort-delta {tone}')])
+
+        table = html.Table([
+            html.Thead(html.Tr([html.Th("Indicateur")] +
+                               [html.Th(l, style={"color": colors[l]}) for l in labels])),
+            html.Tbody([html.Tr([html.Td(name)] + [cell(key, fmt, worse_up, l) for l in labels])
+                        for key, name, fmt, worse_up in COHORT_KPIS])
+        ], className='table table-sm cohort-table mb-0')
+
+        # ── Écarts notables ──
+        deltas = cohort_deltas(kpis)
+        insights = [html.Div([
+            html.I(className=f"fas {'fa-triangle-exclamation' if worse else 'fa-circle-check'} me-2"),
+            html.Strong(f"{l} vs A — {name} : "),
+            html.Span(f"{val} contre {ref} ({'+' if rel > 0 else ''}{rel:.1f}%)")
+        ], className=f"alert alert-{'warning' if worse else 'success'} mb-2 py-2 px-3",
+           style={"fontSize": "0.79rem", "borderRadius": "8px", "border": "none"})
+            for l, key, name, val, ref, rel, worse in deltas[:6]]
+        if len(labels) > 1 and not insights:
+            insights = [html.P("Aucun écart supérieur à 10 % entre les cohortes.",
+                               className='text-muted text-center')]
+
+        # ── Répartition par type & sinistralité par tranche ──
+        fig_types = go.Figure()
+        fig_tranches = go.Figure()
+        for l in labels:
+            fig_types.add_trace(go.Bar(
+                x=res['types'].columns, y=res['types'].loc[l], name=l,
+                marker_color=colors[l],
+                hovertemplate=f'<b>Cohorte {l}</b><br>%{{x}} : %{{y:.1f}}%<extra></extra>'
+            ))
+            fig_tranches.add_trace(go.Bar(
+                x=res['tranches'].columns, y=res['tranches'].loc[l], name=l,
+                marker_color=colors[l],
+                hovertemplate=f'<b>Cohorte {l}</b><br>%{{x}} ans : %{{y:.1f}}% sinistrés<extra></extra>'
+            ))
+        for fig, title in ((fig_types, "% des assurés"), (fig_tranches, "Taux de sinistralité (%)")):
+            fig.update_layout(
+                barmode='group', showlegend=True, **base_layout(height=280),
+                xaxis=dict(showgrid=False),
+                yaxis=dict(title=title, showgrid=True, gridcolor='#e2e8f0'),
+                legend=dict(orientation='h', yanchor='bottom', y=1.02, font_size=10)
+            )
 
-            # Feuille 1 — Données brutes
-            cols_keep = ['id_assure', 'age', 'sexe', 'type_assurance', 'region',
-                         'duree_contrat', 'montant_prime', 'nb_sinistres',
-                         'montant_sinistres', 'bonus_malus', 'bm_cat', 'ratio_SP', 'tranche_age']
-            fdf[[c for c in cols_keep if c in fdf.columns]].to_excel(
-                writer, sheet_name='Données', index=False)
-
-            # Feuille 2 — KPIs
-            df_sin = fdf[fdf['nb_sinistres'] > 0]
-            kpis = pd.DataFrame({
-                'Indicateur': [
-                    'Nb assurés analysés', 'Total sinistres', 'Taux sinistralité (%)',
-                    'Coût moyen sinistre (€)', 'Prime moyenne (€)',
-                    'Ratio S/P médian', '% déficitaires', 'B/M moyen'
-                ],
-                'Valeur': [
-                    len(fdf), fdf['nb_sinistres'].sum(),
-                    round((fdf['nb_sinistres'] > 0).mean() * 100, 2),
-                    round(df_sin['montant_sinistres'].mean(), 0) if len(df_sin) else 0,
-                    round(fdf['montant_prime'].mean(), 0),
-                    round(fdf['ratio_SP'].median(), 2),
-                    round((fdf['ratio_SP'] > 1).mean() * 100, 1),
-                    round(fdf['bonus_malus'].mean(), 3),
-                ]
-            })
-            kpis.to_excel(writer, sheet_name='KPIs', index=False)
-
-            # Feuille 3 — Agrégat région
-            reg = fdf.groupby('region').agg(
-                assures=('id_assure', 'count'),
-                sinistres=('nb_sinistres', 'sum'),
-                montant_sin=('montant_sinistres', 'sum'),
-                prime_moy=('montant_prime', 'mean'),
-                bm_moyen=('bonus_malus', 'mean')
-            ).round(2).reset_index()
-            reg.to_excel(writer, sheet_name='Par Région', index=False)
-
-            # Feuille 4 — Agrégat type
-            typ = fdf.groupby('type_assurance').agg(
-                assures=('id_assure', 'count'),
-                sinistres=('nb_sinistres', 'sum'),
-                cout_moy=('montant_sinistres', 'mean'),
-                prime_moy=('montant_prime', 'mean'),
-                ratio_sp_med=('ratio_SP', 'median')
-            ).round(2).reset_index()
-            typ.to_excel(writer, sheet_name='Par Type', index=False)
-
-        buf.seek(0)
-        fname = f"assuranalytics_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-        return dcc.send_bytes(buf.getvalue(), fname)
+        return {'cohort-list': chips, 'cohort-table': table, 'cohort-insights': insights,
+                'chart-cohort-types': fig_types, 'chart-cohort-tranches': fig_tranches}
+
+    @app.callback(
+        [Output(cid, prop) for cid, prop in COMPARISON_OUTPUTS],
+        Input('cohorts-store', 'data'),
+        prevent_initial_call=True
+    )
+    def update_comparison(cohorts):
+        try:
+            with scheduler.interactive():
+                out = build_comparison(cohorts or [])
+        except ServerBusy:
+            return server_busy(COMPARISON_OUTPUTS, 'cohort-insights')
+        return [out[cid] for cid, _ in COMPARISON_OUTPUTS]
 
     # ════════════════════════════════════════════════════════
-    # CALLBACK — EXPORT HTML
+    # CALLBACK — SIMULATEUR DE TARIFICATION
     # ════════════════════════════════════════════════════════
+    # Sommes par segment précalculées : chaque hypothèse se résume à un
+    # facteur de prime par segment, KPIs et S/P par type en O(segments)
+    pricing_model = PricingModel(df)
+
+    def pending_rule(types, regions, tranches, bms, pct):
+        return {'type': types or [], 'region': regions or [], 'tranche': tranches or [],
+                'bm': bms or [], 'pct': pct or 0}
+
     @app.callback(
-        Output('download-html', 'data'),
-        Input('btn-download-html', 'n_clicks'),
-        [State('type-filter',      'value'),
-         State('sexe-filter',      'value'),
-         State('region-filter',    'value'),
-         State('sinistres-filter', 'value'),
-         State('age-filter',       'value'),
-         State('bm-filter',        'value')],
+        [Output('pricing-rules', 'data'),
+         Output('pricing-pct',   'value')],
+        [Input('pricing-apply', 'n_clicks'),
+         Input('pricing-reset', 'n_clicks')],
+        [State('pricing-type',    'value'),
+         State('pricing-region',  'value'),
+         State('pricing-tranche', 'value'),
+         State('pricing-bm',      'value'),
+         State('pricing-pct',     'value'),
+         State('pricing-rules',   'data')],
         prevent_initial_call=True
     )
-    def download_html(n, tv, sv, rv, sinv, av, bmv):
-        import plotly.io as pio
-        fdf = filter_data(tv, sv, rv, sinv, av, bmv)
-        df_sin = fdf[fdf['nb_sinistres'] > 0]
-        cout_str = f"{df_sin['montant_sinistres'].mean():,.0f} €" if len(df_sin) else "—"
-
-        # 3 figures clés
-        ct = fdf['type_assurance'].value_counts()
-        f1 = go.Figure(go.Pie(labels=ct.index, values=ct.values, hole=0.4,
-                               marker_colors=[TYPE_COLORS.get(t, '#888') for t in ct.index]))
-        f1.update_layout(title="Répartition par type", height=350,
-                         plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
-
-        ar = fdf.groupby('region')['montant_sinistres'].sum().reset_index().sort_values('montant_sinistres')
-        f2 = go.Figure(go.Bar(x=ar['montant_sinistres'], y=ar['region'], orientation='h',
-                               marker_color=[REGION_COLORS.get(r, '#888') for r in ar['region']]))
-        f2.update_layout(title="Montants par région", height=350,
-                         plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
-
-        if 'tranche_age' in fdf.columns:
-            pv = fdf.groupby(['tranche_age'], observed=True)['nb_sinistres'].mean().reset_index()
-            f3 = go.Figure(go.Bar(x=pv['tranche_age'].astype(str), y=pv['nb_sinistres'],
-                                   marker_color='#1565C0'))
-            f3.update_layout(title="Sinistres moyens par tranche d'âge", height=350,
-                             plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
-        else:
-            f3 = go.Figure()
-
-        html_content = f"""<!DOCTYPE html>
-<html lang="fr">
-<head>
-<meta charset="UTF-8">
-<title>Rapport AssurAnalytics</title>
-<style>
-  body {{ font-family: Inter, Arial, sans-serif; background: #f0f4f8; color: #2d3748; margin: 0; }}
-  .header {{ background: linear-gradient(135deg,#0D47A1,#1976D2); color: white; padding: 28px 40px; }}
-  h1 {{ margin: 0; font-size: 1.8rem; }} p.sub {{ margin: 4px 0 0; opacity: .8; font-size: .85rem; }}
-  .kpis {{ display: flex; gap: 16px; padding: 20px 40px; flex-wrap: wrap; }}
-  .kpi {{ background: white; border-radius: 12px; padding: 16px 24px; flex: 1; min-width: 160px;
-          box-shadow: 0 2px 10px rgba(0,0,0,.08); text-align: center; }}
-  .kpi-v {{ font-size: 1.6rem; font-weight: 800; color: #1565C0; }}
-  .kpi-l {{ font-size: .72rem; color: #718096; text-transform: uppercase; letter-spacing: .06em; }}
-  .insight {{ background: white; margin: 0 40px 8px; padding: 12px 16px; border-radius: 8px;
-              border-left: 4px solid #1565C0; font-size: .83rem; box-shadow: 0 1px 4px rgba(0,0,0,.06); }}
-  .graphs {{ padding: 20px 40px; }}
-  footer {{ background: #0D47A1; color: rgba(255,255,255,.8); text-align: center; padding: 14px; font-size:.75rem; margin-top:20px; }}
-</style>
-</head>
-<body>
-<div class="header">
-  <h1>📊 AssurAnalytics — Rapport d'Analyse</h1>
-  <p class="sub">Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')} | {len(fdf)} assurés analysés</p>
-</div>
-<div class="kpis">
-  <div class="kpi"><div class="kpi-v">{len(fdf):,}</div><div class="kpi-l">Total assurés</div></div>
-  <div class="kpi"><div class="kpi-v">{fdf['nb_sinistres'].sum():,}</div><div class="kpi-l">Total sinistres</div></div>
-  <div class="kpi"><div class="kpi-v">{cout_str}</div><div class="kpi-l">Coût moyen sinistre</div></div>
-  <div class="kpi"><div class="kpi-v">{fdf['montant_prime'].mean():,.0f} €</div><div class="kpi-l">Prime moyenne</div></div>
-  <div class="kpi"><div class="kpi-v">{(fdf['nb_sinistres']>0).mean()*100:.1f}%</div><div class="kpi-l">Taux sinistralité</div></div>
-  <div class="kpi"><div class="kpi-v">{fdf['ratio_SP'].median():.2f}x</div><div class="kpi-l">Ratio S/P médian</div></div>
-</div>
-<div class="insight">📌 <strong>{(fdf['nb_sinistres']==0).mean()*100:.1f}%</strong> des assurés n'ont déclaré aucun sinistre.</div>
-<div class="insight">⚠️ Ratio S/P médian : <strong>{fdf['ratio_SP'].median():.1f}x</strong>. {(fdf['ratio_SP']>1).mean()*100:.1f}% des assurés sont déficitaires.</div>
-<div class="insight">💡 B/M moyen : <strong>{fdf['bonus_malus'].mean():.3f}</strong> — {(fdf['bonus_malus']>1).mean()*100:.1f}% des assurés en malus.</div>
-<div class="graphs">
-  <h2>Répartition par type d'assurance</h2>
-  {pio.to_html(f1, full_html=False, include_plotlyjs='cdn')}
-  <h2>Montants des sinistres par région</h2>
-  {pio.to_html(f2, full_html=False, include_plotlyjs=False)}
-  <h2>Sinistres moyens par tranche d'âge</h2>
-  {pio.to_html(f3, full_html=False, include_plotlyjs=False)}
-</div>
-<footer>AssurAnalytics · Mastère 2 Big Data & Data Stratégie · Sona KOULIBALY · {len(fdf)} assurés analysés</footer>
-</body>
-</html>"""
-
-        fname = f"rapport_assuranalytics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
-        return dcc.send_bytes(html_content.encode('utf-8'), fname)
+    def manage_pricing_rules(n_apply, n_reset, types, regions, tranches, bms, pct, rules):
+        trigger = callback_context.triggered[0]['prop_id'] if callback_context.triggered else ''
+        if trigger.startswith('pricing-reset'):
+            return [], 0
+        if not pct:
+            return no_update, no_update
+        # La règle en aperçu devient définitive ; le curseur revient à 0
+        return (rules or []) + [pending_rule(types, regions, tranches, bms, pct)], 0
+
+    def build_pricing(rules, pending, bm_scale):
+        f = pricing_model.factors(rules + [pending], bm_scale)
+        sim = pricing_model.simulate(f)
+
+        # ── Règles appliquées + aperçu de la règle en cours ──
+        chips = [html.Span(describe_rule(r), className='cohort-chip') for r in rules]
+        if pending['pct']:
+            chips.append(html.Span(["Aperçu — ", describe_rule(pending)], className='cohort-chip',
+                                   style={"borderStyle": "dashed", "opacity": "0.75"}))
+        scale = [f"{cat} {pct:+g} %" for cat, pct in bm_scale.items() if pct]
+        if scale:
+            chips.append(html.Span("Barème B/M : " + ', '.join(scale), className='cohort-chip'))
+        if not chips:
+            chips = [html.Small("Aucune hypothèse — tarif actuel", className='text-muted')]
+
+        # ── KPIs actuel / simulé ──
+        def row(name, before, after, fmt, worse_up):
+            rel = (after - before) / abs(before) * 100 if before else 0.0
+            tone = '' if abs(rel) < 0.05 else \
+                   ('cohort-worse' if (rel > 0) == worse_up else 'cohort-better')
+            return html.Tr([
+                html.Td(name), html.Td(fmt.format(before)),
+                html.Td([fmt.format(after),
+                         html.Small(f" {'+' if rel > 0 else ''}{rel:.1f}%", className=f'cohort-delta {tone}')])
+            ])
+
+        checkpoint()
+        dist = pricing_model.distribution(f)
+        kpis = html.Table([
+            html.Thead(html.Tr([html.Th("Indicateur"), html.Th("Actuel"), html.Th("Simulé")])),
+            html.Tbody([
+                row("Primes totales", sim['prime_avant'], sim['prime_apres'], "{:,.0f} €", False),
+                row("S/P projeté (sinistres ÷ primes)", sim['sp_avant'], sim['sp_apres'], "{:.2f}x", True),
+                row("% assurés déficitaires", sim['def_avant'], sim['def_apres'], "{:.1f}%", True),
+                row("Ratio S/P médian", dist['med_avant'], dist['med_apres'], "{:.2f}x", True),
+            ])
+        ], className='table table-sm cohort-table mb-1')
+        scope = html.Small(
+            f"{sim['assures_modifies']:,} assurés concernés · {sim['segments_modifies']} segments".replace(',', ' '),
+            className='text-muted')
+
+        # ── S/P projeté par type ──
+        fig_types = go.Figure()
+        for name, key, opacity in (("Actuel", 'sp_type_avant', 0.4), ("Simulé", 'sp_type_apres', 1.0)):
+            fig_types.add_trace(go.Bar(
+                x=sim['types'], y=sim[key], name=name, opacity=opacity,
+                marker_color=[TYPE_COLORS.get(t, '#888') for t in sim['types']],
+                hovertemplate=f'<b>%{{x}}</b><br>S/P {name.lower()} : %{{y:.2f}}x<extra></extra>'
+            ))
+        fig_types.update_layout(
+            barmode='group', showlegend=False, **base_layout(height=240),
+            xaxis=dict(showgrid=False),
+            yaxis=dict(title="S/P (sinistres ÷ primes)", showgrid=True, gridcolor='#e2e8f0')
+        )
+
+        # ── Distribution du ratio S/P (classes logarithmiques) ──
+        edges = dist['bins']
+        centers = np.sqrt(edges[:-1] * edges[1:])
+        fig_dist = go.Figure()
+        for name, key, color in (("Actuel", 'avant', '#a0aec0'), ("Simulé", 'apres', '#1565C0')):
+            fig_dist.add_trace(go.Scatter(
+                x=centers, y=dist[key], name=name, mode='lines', line_shape='hvh',
+                line=dict(color=color, width=2), fill='tozeroy' if key == 'apres' else None,
+                hovertemplate=f'<b>{name}</b><br>S/P ≈ %{{x:.2f}}x : %{{y:,}} assurés<extra></extra>'
+            ))
+        fig_dist.add_vline(x=1, line_dash='dash', line_color='#E53E3E',
+                           annotation_text="Seuil déficit (S/P = 1)", annotation_font_size=10)
+        fig_dist.update_layout(
+            **base_layout(height=280),
+            xaxis=dict(title="Ratio S/P (échelle log)", type='log', showgrid=False),
+            yaxis=dict(title="Nb assurés", showgrid=True, gridcolor='#e2e8f0'),
+            legend=dict(orientation='h', yanchor='bottom', y=1.02, font_size=10)
+        )
+
+        return {'pricing-kpis': [kpis, scope], 'pricing-rules-list': chips,
+                'chart-pricing-types': fig_types, 'chart-pricing-dist': fig_dist}
+
+    @app.callback(
+        [Output(cid, prop) for cid, prop in PRICING_OUTPUTS],
+        [Input('pricing-rules',   'data'),
+         Input('pricing-pct',     'value'),
+         Input('pricing-type',    'value'),
+         Input('pricing-region',  'value'),
+         Input('pricing-tranche', 'value'),
+         Input('pricing-bm',      'value')]
+        + [Input(f'pricing-bm-scale-{i}', 'value') for i in range(len(PRICING_BM_CATEGORIES))],
+        prevent_initial_call=True
+    )
+    def update_pricing(rules, pct, types, regions, tranches, bms, *scale):
+        checkpoint()
+        try:
+            with scheduler.interactive():
+                out = build_pricing(rules or [], pending_rule(types, regions, tranches, bms, pct),
+                                    dict(zip(PRICING_BM_CATEGORIES, scale)))
+        except ServerBusy:
+            return server_busy(PRICING_OUTPUTS, 'pricing-kpis')
+        return [out[cid] for cid, _ in PRICING_OUTPUTS]
+
+    # Curseurs en mode glissement : seule la dernière hypothèse va au bout
+    coalesce(PRICING_OUTPUTS)
 
     # ════════════════════════════════════════════════════════
-    # CALLBACK — EXPORT PDF
+    # CALLBACK — PROJECTION BONUS/MALUS
     # ════════════════════════════════════════════════════════
+    # États initiaux par segment calculés une fois ; chaque règle = une matrice
+    # de transition compacte par segment, projetée sur N années en bloc
+    projector = BonusMalusProjector(df)
+
+    def build_bm_projection(rule, years):
+        proj = projector.project(rule, years)
+        years_axis = proj['annees']
+        mix, primes, coef = proj['mix'], proj['primes'], proj['coef_moyen']
+
+        fig_mix = go.Figure()
+        for cat in BM_CATEGORIES:
+            fig_mix.add_trace(go.Scatter(
+                x=years_axis, y=mix[cat], name=cat, mode='lines', stackgroup='bm',
+                line=dict(width=0.5, color=BM_COLORS[cat]),
+                hovertemplate=f'<b>{cat}</b><br>Année %{{x}} : %{{y:.1f}}%<extra></extra>'
+            ))
+        fig_mix.update_layout(
+            **base_layout(height=250),
+            xaxis=dict(title="Années", showgrid=False, dtick=1 if years <= 10 else 2),
+            yaxis=dict(title="% des contrats", range=[0, 100], showgrid=True, gridcolor='#e2e8f0'),
+            legend=dict(orientation='h', yanchor='bottom', y=1.02, font_size=10)
+        )
+
+        fig_prime = go.Figure()
+        fig_prime.add_trace(go.Bar(
+            x=years_axis, y=primes, name="Primes", marker_color='#1565C0', opacity=0.75,
+            hovertemplate='Année %{x} : %{y:,.0f} €<extra></extra>'
+        ))
+        fig_prime.add_trace(go.Scatter(
+            x=years_axis, y=coef, name="Coef. moyen", yaxis='y2', mode='lines+markers',
+            line=dict(color='#FFB300', width=2.5),
+            hovertemplate='Année %{x} : coef. %{y:.3f}<extra></extra>'
+        ))
+        fig_prime.update_layout(
+            **base_layout(height=250),
+            xaxis=dict(title="Années", showgrid=False, dtick=1 if years <= 10 else 2),
+            yaxis=dict(title="Primes (€)", showgrid=True, gridcolor='#e2e8f0'),
+            yaxis2=dict(title="Coef. moyen", overlaying='y', side='right', showgrid=False),
+            legend=dict(orientation='h', yanchor='bottom', y=1.02, font_size=10)
+        )
+
+        delta = (primes[-1] - primes[0]) / primes[0] * 100 if primes[0] else 0.0
+        kpis = html.Table([
+            html.Thead(html.Tr([html.Th(""), html.Th("Actuel"), html.Th(f"Année {years}")])),
+            html.Tbody([
+                html.Tr([html.Td("Coef. moyen"), html.Td(f"{coef[0]:.3f}"), html.Td(f"{coef[-1]:.3f}")]),
+                html.Tr([html.Td("% en malus"), html.Td(f"{mix['Malus'].iloc[0]:.1f}%"),
+                         html.Td(f"{mix['Malus'].iloc[-1]:.1f}%")]),
+                html.Tr([html.Td("Primes"), html.Td(f"{primes[0]:,.0f} €".replace(',', ' ')),
+                         html.Td([f"{primes[-1]:,.0f} €".replace(',', ' '),
+                                  html.Small(f" {'+' if delta > 0 else ''}{delta:.1f}%",
+                                             className='cohort-delta')])]),
+            ])
+        ], className='table table-sm cohort-table mb-1')
+        scope = html.Small(f"{proj['polices']:,} contrats {PROJECTION_TYPE} · "
+                           f"{proj['segments']} segments région × âge".replace(',', ' '),
+                           className='text-muted')
+        return {'bm-projection-kpis': [kpis, scope], 'chart-bm-projection-mix': fig_mix,
+                'chart-bm-projection-prime': fig_prime}
+
     @app.callback(
-        Output('download-pdf', 'data'),
-        Input('btn-download-pdf', 'n_clicks'),
+        [Output(cid, prop) for cid, prop in BM_PROJECTION_OUTPUTS],
+        [Input('bm-rule-bonus',  'value'),
+         Input('bm-rule-malus',  'value'),
+         Input('bm-rule-bornes', 'value'),
+         Input('bm-years',       'value')],
+        prevent_initial_call=True
+    )
+    def update_bm_projection(bonus, malus, bornes, years):
+        checkpoint()
+        floor, cap = bornes or (BM_RULE_DEFAULT['plancher'], BM_RULE_DEFAULT['plafond'])
+        rule = {'bonus': bonus or 0, 'malus': malus or 0, 'plancher': floor, 'plafond': cap}
+        years = int(min(max(years or BM_YEARS_DEFAULT, 1), BM_YEARS_MAX))
+        try:
+            with scheduler.interactive():
+                out = build_bm_projection(rule, years)
+        except ServerBusy:
+            return server_busy(BM_PROJECTION_OUTPUTS, 'bm-projection-kpis')
+        return [out[cid] for cid, _ in BM_PROJECTION_OUTPUTS]
+
+    coalesce(BM_PROJECTION_OUTPUTS)
+
+    # ════════════════════════════════════════════════════════
+    # CALLBACKS — FICHE ASSURÉ & TOP N DES CONTRATS
+    # ════════════════════════════════════════════════════════
+    # Index id_assure → ligne et ordres décroissants précalculés une fois ;
+    # le top N ne lit que le masque du moteur crossfilter (filtres + brosses)
+    policy_index = PolicyIndex(df)
+
+    def select_mask(type_vals, sexe_vals, region_vals, sinistres_vals, age_range, bm_range,
+                    selection=None):
+        eng = session_engine(engines)
+        with eng.lock:
+            apply_filters(eng, type_vals, sexe_vals, region_vals, sinistres_vals,
+                          age_range, bm_range, selection)
+            return eng.mask()
+
+    def build_top(mask, metric):
+        metric = metric if metric in policy_index.order else TOP_METRIC_DEFAULT
+        rows = policy_index.top(mask, metric)
+        sub = df.iloc[rows]
+        records = pd.DataFrame({
+            'id':                sub['id_assure'].to_numpy(),
+            'rang':              np.arange(1, len(rows) + 1),
+            'id_assure':         sub['id_assure'].to_numpy(),
+            'type_assurance':    sub['type_assurance'].to_numpy(),
+            'region':            sub['region'].to_numpy(),
+            'age':               sub['age'].to_numpy(),
+            'montant_prime':     sub['montant_prime'].round(0).to_numpy(),
+            'nb_sinistres':      sub['nb_sinistres'].to_numpy(),
+            'montant_sinistres': sub['montant_sinistres'].round(0).to_numpy(),
+            'ratio_SP':          sub['ratio_SP'].round(2).to_numpy(),
+            'rang_portefeuille': policy_index.rank[metric][rows] + 1,
+        })
+        columns = [c for c in records.columns if c != 'id']
+        table = dash_table.DataTable(
+            id='top-policies-table',
+            data=records.to_dict('records'),
+            columns=[{'name': c, 'id': c} for c in columns],
+            page_size=10,
+            sort_action='native',
+            style_table={'overflowX': 'auto'},
+            style_cell={'fontFamily': 'Inter, sans-serif', 'fontSize': '12px',
+                        'padding': '5px 8px', 'textAlign': 'left',
+                        'border': '1px solid #e2e8f0', 'cursor': 'pointer'},
+            style_header={'backgroundColor': '#1565C0', 'color': 'white', 'fontWeight': '700',
+                          'fontSize': '11px', 'textTransform': 'uppercase',
+                          'border': '1px solid #1565C0'},
+            style_data_conditional=[
+                {'if': {'row_index': 'odd'}, 'backgroundColor': '#f7fafc'},
+                {'if': {'column_id': metric}, 'fontWeight': '700', 'color': '#c53030'},
+            ]
+        )
+        selected = int(np.count_nonzero(mask))
+        meta = (f"{len(rows)} contrats sur {selected:,} sélectionnés".replace(',', ' ')
+                + f", classés par « {TOP_METRICS[metric]} » — rang_portefeuille : rang sur les "
+                + f"{len(df):,} contrats. Cliquer une ligne ouvre la fiche.".replace(',', ' '))
+        return {'top-policies': table, 'top-policies-meta': meta}
+
+    @app.callback(
+        [Output(cid, prop) for cid, prop in TOP_OUTPUTS],
+        [Input('type-filter',      'value'),
+         Input('sexe-filter',      'value'),
+         Input('region-filter',    'value'),
+         Input('sinistres-filter', 'value'),
+         Input('age-filter',       'value'),
+         Input('bm-filter',        'value'),
+         Input('crossfilter-selection', 'data'),
+         Input('top-metric',       'value')],
+        prevent_initial_call=True
+    )
+    def update_top(type_v, sexe_v, region_v, sin_v, age_v, bm_v, selection, metric):
+        checkpoint()
+        try:
+            with scheduler.interactive():
+                out = build_top(select_mask(type_v, sexe_v, region_v, sin_v, age_v, bm_v,
+                                            selection), metric)
+        except ServerBusy:
+            return server_busy(TOP_OUTPUTS, 'top-policies-meta')
+        return [out[cid] for cid, _ in TOP_OUTPUTS]
+
+    coalesce(TOP_OUTPUTS)
+
+    # Fiche : caractéristiques du contrat, rangs portefeuille, derniers sinistres
+    def policy_card(row):
+        r = df.iloc[row]
+        geo = ' › '.join(str(r[c]) for c in engine.geo.levels)
+        rows = [
+            ("Âge", f"{r['age']} ans · {str(r['sexe']).capitalize()}"),
+            ("Contrat", f"{r['type_assurance']} · {r['duree_contrat']} ans"),
+            ("Zone", geo),
+            ("Prime annuelle", f"{r['montant_prime']:,.0f} €"),
+            ("Sinistres", f"{r['nb_sinistres']} · {r['montant_sinistres']:,.0f} €"),
+            ("Ratio S/P", f"{r['ratio_SP']:.2f}x"),
+            ("Bonus/Malus", f"{r['bonus_malus']:.3f} ({r['bm_cat']})"),
+        ]
+        if 'prime_pure' in df.columns:
+            rows.append(("Prime pure modélisée", f"{r['prime_pure']:,.0f} €"))
+        if 'score_risque' in df.columns:
+            rows.append(("Score de risque", f"{r['score_risque']:.0f}"))
+        rows += [(f"Rang — {label.lower()}", f"{policy_index.rank[m][row] + 1:,} / {len(df):,}")
+                 for m, label in TOP_METRICS.items() if m in policy_index.rank]
+        body = [html.H6(f"Assuré n° {r['id_assure']}", className='mb-2'),
+                html.Table(html.Tbody([html.Tr([html.Td(k), html.Td(v.replace(',', ' '))])
+                                       for k, v in rows]),
+                           className='table table-sm cohort-table mb-1')]
+
+        # Table de faits : derniers sinistres du contrat (plage de l'index CSR)
+        if claims is not None:
+            c = claims.claim_rows([row])[::-1][:5]
+            if len(c):
+                body.append(html.Small("Derniers sinistres", className='filter-label'))
+                body.append(html.Ul([
+                    html.Li(f"{str(claims.date[i])[:10]} — {claims.amount[i]:,.0f} € — "
+                            f"{claims.causes[claims.cause[i]]}".replace(',', ' '))
+                    for i in c
+                ], className='small mb-0'))
+        return body
+
+    @app.callback(
+        Output('policy-card', 'children'),
+        Input('policy-search', 'value'),
+        prevent_initial_call=True
+    )
+    def update_policy_card(policy_id):
+        if policy_id is None:
+            return html.Small("Saisir un identifiant, ou cliquer une ligne du top",
+                              className='text-muted')
+        row = policy_index.row(int(policy_id)) if float(policy_id).is_integer() else None
+        if row is None:
+            return html.Small(f"Aucun assuré n° {policy_id}", className='text-muted')
+        return policy_card(row)
+
+    # Clic sur une ligne du top → fiche du contrat
+    @app.callback(
+        Output('policy-search', 'value'),
+        Input('top-policies-table', 'active_cell'),
+        prevent_initial_call=True
+    )
+    def open_policy(cell):
+        if not cell or cell.get('row_id') is None:
+            return no_update
+        return cell['row_id']
+
+    # ════════════════════════════════════════════════════════
+    # CALLBACK CLIENTSIDE — KPIs & GRAPHIQUES LÉGERS
+    # ════════════════════════════════════════════════════════
+    # Recalcul instantané dans le navigateur à partir du jeu colonnaire
+    # (store-columnar). Les sliders suivent drag_value : aucun aller-retour
+    # serveur pendant le glissement, update_all ne part qu'au relâchement.
+    if clientside:
+        app.clientside_callback(
+            ClientsideFunction(namespace='assurance', function_name='update_light'),
+            [Output(cid, prop) for cid, prop in DASHBOARD_OUTPUTS
+             if cid in CLIENTSIDE_OUTPUTS],
+            [Input('type-filter',      'value'),
+             Input('sexe-filter',      'value'),
+             Input('region-filter',    'value'),
+             Input('sinistres-filter', 'value'),
+             Input('age-filter',       'value'),
+             Input('bm-filter',        'value'),
+             Input('age-filter',       'drag_value'),
+             Input('bm-filter',        'drag_value'),
+             Input('crossfilter-selection', 'data')],
+            State('store-columnar', 'data'),
+            prevent_initial_call=True
+        )
+
+    # ════════════════════════════════════════════════════════
+    # CALLBACK — EXPORTS (file de l'ordonnanceur)
+    # ════════════════════════════════════════════════════════
+    # Un clic met le rapport en file : il est construit par un thread de fond,
+    # jamais sur un thread de requête. export-poll interroge l'état des jobs
+    # et remet les fichiers prêts ; file pleine → message au lieu d'un timeout.
+    # Parquet / Arrow : colonnes encodées une fois, lues par lots à l'export
+    export_columns = ExportColumns(df)
+
+    # Rapport HTML : sélection + graphiques du tableau de bord (mêmes figures qu'à l'écran)
+    def dashboard_figures(*filters):
+        fdf, groups, views = select_data(*filters)
+        out = build_dashboard(fdf, groups, views, filters[-1], details=False)
+        return fdf, {cid: out[cid] for cid, prop in DASHBOARD_OUTPUTS if prop == 'figure'}
+
+    # Construction d'un export (thread de fond) ; arguments liés à la soumission
+    def build_export(kind, builder, filters, compression):
+        if kind in COLUMNAR_EXPORTS:
+            # Positions retenues seulement : les colonnes sont lues par lots
+            return builder(export_columns, np.flatnonzero(select_mask(*filters)), compression)
+        if kind in FIGURE_EXPORTS:
+            return builder(*dashboard_figures(*filters))
+        fdf = filter_data(*filters)
+        # Rapport PDF : sévérité du Monte Carlo ajustée sur les sinistres individuels
+        return builder(fdf, claims=claims) if kind == 'pdf' else builder(fdf)
+
+    @app.callback(
+        [Output('download-excel',   'data'),
+         Output('download-html',    'data'),
+         Output('download-pdf',     'data'),
+         Output('download-parquet', 'data'),
+         Output('download-arrow',   'data'),
+         Output('export-jobs',    'data'),
+         Output('export-poll',    'disabled'),
+         Output('export-status',  'children')],
+        [Input('btn-download-excel', 'n_clicks'),
+         Input('btn-download-html',  'n_clicks'),
+         Input('btn-download-pdf',   'n_clicks'),
+         Input('btn-download-parquet', 'n_clicks'),
+         Input('btn-download-arrow',   'n_clicks'),
+         Input('export-poll',        'n_intervals')],
         [State('type-filter',      'value'),
          State('sexe-filter',      'value'),
          State('region-filter',    'value'),
          State('sinistres-filter', 'value'),
          State('age-filter',       'value'),
-         State('bm-filter',        'value')],
+         State('bm-filter',        'value'),
+         State('crossfilter-selection', 'data'),
+         State('export-compression', 'value'),
+         State('export-jobs',      'data')],
         prevent_initial_call=True
     )
-    def download_pdf(n, tv, sv, rv, sinv, av, bmv):
-        try:
-            from reportlab.lib.pagesizes import A4
-            from reportlab.lib import colors
-            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-            from reportlab.lib.units import inch
-            from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-            from reportlab.lib.enums import TA_CENTER, TA_LEFT
-
-            fdf = filter_data(tv, sv, rv, sinv, av, bmv)
-            df_sin = fdf[fdf['nb_sinistres'] > 0]
-
-            buf = io.BytesIO()
-            doc = SimpleDocTemplate(buf, pagesize=A4,
-                                    leftMargin=0.7*inch, rightMargin=0.7*inch,
-                                    topMargin=0.7*inch, bottomMargin=0.7*inch)
-            elements = []
-            styles = getSampleStyleSheet()
-
-            title_s  = ParagraphStyle('T', parent=styles['Heading1'], fontSize=20,
-                                       textColor=colors.HexColor('#1565C0'), alignment=TA_CENTER, spaceAfter=6)
-            sub_s    = ParagraphStyle('S', parent=styles['Normal'], fontSize=10,
-                                       textColor=colors.HexColor('#718096'), alignment=TA_CENTER, spaceAfter=20)
-            section_s = ParagraphStyle('Sec', parent=styles['Heading2'], fontSize=13,
-                                        textColor=colors.HexColor('#1565C0'), spaceBefore=16, spaceAfter=8)
-            body_s   = ParagraphStyle('B', parent=styles['Normal'], fontSize=9, spaceAfter=4)
-
-            elements.append(Paragraph("RAPPORT ASSURANALYTICS", title_s))
-            elements.append(Paragraph(
-                f"Analyse des Sinistres & Profil des Assurés<br/>Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}",
-                sub_s))
-
-            # KPIs
-            elements.append(Paragraph("Indicateurs Clés", section_s))
-            cout_str = f"{df_sin['montant_sinistres'].mean():,.0f} €" if len(df_sin) else "—"
-            kpi_data = [
-                ['Indicateur', 'Valeur'],
-                ["Nb assurés analysés",        f"{len(fdf):,}"],
-                ["Total sinistres",             f"{fdf['nb_sinistres'].sum():,}"],
-                ["Taux de sinistralité",        f"{(fdf['nb_sinistres']>0).mean()*100:.1f}%"],
-                ["Coût moyen sinistre",         cout_str],
-                ["Prime moyenne",               f"{fdf['montant_prime'].mean():,.0f} €"],
-                ["Ratio S/P médian",            f"{fdf['ratio_SP'].median():.2f}x"],
-                ["% assurés déficitaires",      f"{(fdf['ratio_SP']>1).mean()*100:.1f}%"],
-                ["Bonus/Malus moyen",           f"{fdf['bonus_malus'].mean():.3f}"],
-            ]
-            kpi_t = Table(kpi_data, colWidths=[3.5*inch, 2.5*inch])
-            kpi_t.setStyle(TableStyle([
-                ('BACKGROUND',    (0,0),(-1,0), colors.HexColor('#1565C0')),
-                ('TEXTCOLOR',     (0,0),(-1,0), colors.white),
-                ('FONTNAME',      (0,0),(-1,0), 'Helvetica-Bold'),
-                ('FONTSIZE',      (0,0),(-1,-1), 10),
-                ('ALIGN',         (0,0),(-1,-1), 'LEFT'),
-                ('ROWBACKGROUNDS',(0,1),(-1,-1), [colors.white, colors.HexColor('#EBF8FF')]),
-                ('GRID',          (0,0),(-1,-1), 0.5, colors.HexColor('#E2E8F0')),
-                ('BOTTOMPADDING', (0,0),(-1,-1), 6),
-                ('TOPPADDING',    (0,0),(-1,-1), 6),
-            ]))
-            elements.append(kpi_t)
-            elements.append(Spacer(1, 0.2*inch))
-
-            # Agrégat région
-            elements.append(Paragraph("Analyse par Région", section_s))
-            reg = fdf.groupby('region').agg(
-                assures=('id_assure', 'count'),
-                sinistres=('nb_sinistres', 'sum'),
-                montant=('montant_sinistres', 'sum'),
-                prime_moy=('montant_prime', 'mean')
-            ).round(0).reset_index()
-            reg_data = [['Région', 'Assurés', 'Sinistres', 'Montant (€)', 'Prime moy. (€)']]
-            for _, row in reg.iterrows():
-                reg_data.append([row['region'], f"{int(row['assures']):,}",
-                                  f"{int(row['sinistres']):,}", f"{int(row['montant']):,}",
-                                  f"{int(row['prime_moy']):,}"])
-            reg_t = Table(reg_data)
-            reg_t.setStyle(TableStyle([
-                ('BACKGROUND',    (0,0),(-1,0), colors.HexColor('#1565C0')),
-                ('TEXTCOLOR',     (0,0),(-1,0), colors.white),
-                ('FONTNAME',      (0,0),(-1,0), 'Helvetica-Bold'),
-                ('FONTSIZE',      (0,0),(-1,-1), 9),
-                ('ALIGN',         (0,0),(-1,-1), 'CENTER'),
-                ('ROWBACKGROUNDS',(0,1),(-1,-1), [colors.white, colors.HexColor('#EBF8FF')]),
-                ('GRID',          (0,0),(-1,-1), 0.5, colors.HexColor('#E2E8F0')),
-            ]))
-            elements.append(reg_t)
-            elements.append(Spacer(1, 0.2*inch))
-
-            # Insights
-            elements.append(Paragraph("Insights & Recommandations", section_s))
-            insights_txt = [
-                f"• {(fdf['nb_sinistres']==0).mean()*100:.1f}% des assurés n'ont déclaré aucun sinistre.",
-                f"• Ratio S/P médian : {fdf['ratio_SP'].median():.1f}x — {(fdf['ratio_SP']>1).mean()*100:.1f}% des assurés sont déficitaires.",
-                f"• B/M moyen : {fdf['bonus_malus'].mean():.3f} — {(fdf['bonus_malus']>1).mean()*100:.1f}% des assurés en malus.",
-                f"• Le coût moyen ({fdf['montant_sinistres'].mean():,.0f} €) dépasse la prime moyenne de {fdf['montant_sinistres'].mean()/fdf['montant_prime'].mean():.1f}x.",
-            ]
-            for txt in insights_txt:
-                elements.append(Paragraph(txt, body_s))
-
-            elements.append(Spacer(1, 0.2*inch))
-            elements.append(Paragraph(
-                f"© 2025 AssurAnalytics — Mastère 2 Big Data & Data Stratégie — Sona KOULIBALY",
-                ParagraphStyle('foot', parent=styles['Normal'], fontSize=8,
-                                textColor=colors.HexColor('#718096'), alignment=TA_CENTER)
-            ))
+    def exports(n_excel, n_html, n_pdf, n_parquet, n_arrow, n_poll,
+                tv, sv, rv, sinv, av, bmv, selection, compression, jobs):
+        jobs = list(jobs or [])
+        triggered = [t['prop_id'].split('.')[0] for t in callback_context.triggered]
+        downloads = {kind: no_update for kind in EXPORTS}
+        notices = []
+
+        for cid in triggered:
+            if not cid.startswith('btn-download-'):
+                continue
+            kind = cid[len('btn-download-'):]
+            label, builder = EXPORTS[kind]
+            filters = (tv, sv, rv, sinv, av, bmv, selection)
+            job = scheduler.submit(kind, functools.partial(build_export, kind, builder,
+                                                           filters, compression))
+            if job is None:
+                notices.append(f"🚦 File d'exports pleine — rapport {label} non ajouté, "
+                               f"réessayez dans un instant")
+            else:
+                jobs.append({'id': job, 'format': kind})
+
+        # Remise des rapports prêts (un par format et par passage)
+        pending = []
+        for job in jobs:
+            label = EXPORTS[job['format']][0]
+            status = job_status(job['id'])
+            if status is None:
+                notices.append(f"❌ Export {label} perdu — relancez-le")
+            elif status['etat'] == 'erreur':
+                notices.append(f"❌ Export {label} : {status.get('message', 'erreur')}")
+            elif status['etat'] == 'pret' and downloads[job['format']] is no_update:
+                result = job_result(job['id'])
+                if result is None:
+                    notices.append(f"❌ Export {label} perdu — relancez-le")
+                else:
+                    downloads[job['format']] = result
+            else:
+                pending.append(job)
+                if status['etat'] == 'file':
+                    notices.append(f"⏳ {label} en file (position {status.get('position', '?')})")
+                elif status['etat'] == 'en_cours':
+                    notices.append(f"⚙️ {label} en préparation…")
+                else:
+                    notices.append(f"✅ {label} prêt")
+
+        return (downloads['excel'], downloads['html'], downloads['pdf'],
+                downloads['parquet'], downloads['arrow'],
+                pending, not pending, ' · '.join(notices))
 
-            doc.build(elements)
-            buf.seek(0)
-            fname = f"rapport_assuranalytics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-            return dcc.send_bytes(buf.getvalue(), fname)
+    # ════════════════════════════════════════════════════════
+    # RISQUE AGRÉGÉ — MONTE CARLO (portefeuille complet)
+    # ════════════════════════════════════════════════════════
+    def build_risk():
+        report = portfolio_loss_report(df, claims)
+        table = report['table']
+        var_hi, tvar_hi = f'VaR {VAR_LEVELS[-1] * 100:g} %', f'TVaR {TVAR_LEVELS[-1] * 100:g} %'
+        cols = [('primes', "Primes"), ('perte_moyenne', "Charge moy."),
+                (f'VaR {VAR_LEVELS[0] * 100:g} %', f'VaR {VAR_LEVELS[0] * 100:g} %'),
+                (var_hi, var_hi), (tvar_hi, tvar_hi), ('capital', "Capital")]
+
+        def money(v):
+            return f"{v:,.0f} €".replace(',', ' ')
+
+        rows = [html.Tr([html.Td(label, style={"fontWeight": "700"} if label == 'Portefeuille' else {})]
+                        + [html.Td(money(table.loc[label, key])) for key, _ in cols])
+                for label in table.index]
+        mc_table = html.Table([
+            html.Thead(html.Tr([html.Th("Périmètre")] + [html.Th(name) for _, name in cols])),
+            html.Tbody(rows)
+        ], className='table table-sm cohort-table mb-1')
+
+        total = table.loc['Portefeuille']
+        meta = (f"{report['scenarios']:,} scénarios · calcul {report['secondes']:.1f}s · "
+                f"charge moyenne = {total['perte_moyenne'] / total['primes']:.2f}x les primes · "
+                f"Capital = {var_hi} − charge moyenne").replace(',', ' ')
+
+        counts, edges = report['hist']
+        fig = go.Figure(go.Bar(
+            x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges),
+            marker_color='#1565C0', opacity=0.8,
+            hovertemplate='Charge ≈ %{x:,.0f} €<br>%{y:,} scénarios<extra></extra>'
+        ))
+        for value, label, color in ((total['perte_moyenne'], "Moyenne", '#38A169'),
+                                    (total[var_hi], var_hi, '#FFB300'),
+                                    (total[tvar_hi], tvar_hi, '#E53E3E')):
+            fig.add_vline(x=value, line_dash='dash', line_color=color,
+                          annotation_text=label, annotation_font_color=color,
+                          annotation_font_size=9)
+        fig.update_layout(
+            showlegend=False, bargap=0, **base_layout(height=300),
+            xaxis=dict(title="Charge sinistres annuelle simulée (€)", showgrid=False),
+            yaxis=dict(title="Nb scénarios", showgrid=True, gridcolor='#e2e8f0')
+        )
+        return {'mc-table': mc_table, 'mc-meta': meta, 'chart-mc-dist': fig}
 
-        except ImportError:
-            return dict(content="⚠️ reportlab non installé. Installez-le avec : pip install reportlab",
-                        filename="erreur.txt")
-        except Exception as e:
-            return dict(content=f"Erreur PDF : {str(e)}", filename="erreur.txt")
\ No newline at end of file
+    # ════════════════════════════════════════════════════════
+    # ÉTAT INITIAL PRÉCALCULÉ
+    # ════════════════════════════════════════════════════════
+    # Portefeuille sans filtre, calculé une fois par version de données
+    # (cache disque partagé entre workers) puis embarqué dans create_layout() :
+    # le premier affichage ne déclenche aucun callback.
+    def prerender():
+        fdf, groups, views = select_data(None, None, None, None, age_bounds, bm_bounds)
+        out = build_dashboard(fdf, groups, views)
+        out.update(build_comparison([]))
+        out.update(build_pricing([], pending_rule(None, None, None, None, 0), {}))
+        out.update(build_risk())
+        out.update(build_bm_projection(BM_RULE_DEFAULT, BM_YEARS_DEFAULT))
+        out.update(build_top(select_mask(None, None, None, None, age_bounds, bm_bounds),
+                             TOP_METRIC_DEFAULT))
+        initial = {cid: {prop: out[cid].to_dict() if prop == 'figure' else out[cid]}
+                   for cid, prop in DASHBOARD_OUTPUTS + COMPARISON_OUTPUTS + PRICING_OUTPUTS
+                   + RISK_OUTPUTS + BM_PROJECTION_OUTPUTS + TOP_OUTPUTS}
+        # Clés de l'état embarqué : premier filtrage sans reconstruire les sorties inchangées
+        store_id, store_prop = FINGERPRINT_STORE
+        initial[store_id] = {store_prop: output_keys(fdf, groups, views)}
+        return initial
+
+    if df.empty:
+        return None
+    # Tout le code du projet : aucun module oublié ne peut servir un état périmé
+    version = dataset_version(df) + package_version()
+    if claims is not None:
+        version += claims.version
+    return cached('etat_initial', version, prerender)
@@ -0,0 +1,154 @@
+# =============================================================
+#  catalogue.py  —  Catalogue des dimensions (options & bornes des filtres)
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+#  Un passage sur le jeu de données, une fois par version (cache disque) :
+#   - catégorielles : modalités distinctes et effectifs (ordre des catégories
+#     pour les variables découpées, ordre d'usage pour les types connus,
+#     alphabétique sinon) ;
+#   - nb de sinistres : effectifs 0, 1, 2, 3, 4+ ;
+#   - numériques des sliders : min / max arrondis au pas du slider, moyenne,
+#     histogramme.
+#  create_layout() et les callbacks lisent le catalogue : options avec
+#  effectifs, bornes des sliders, valeurs de réinitialisation — un nouveau
+#  produit ou une nouvelle région apparaît sans modifier le code, et sans
+#  relire les données au rendu. Résultat en types Python (sérialisable JSON).
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from cache import cached, code_version, dataset_version
+from geography import REGION_ICONS
+
+
+CATALOGUE_COLUMNS = ['type_assurance', 'sexe', 'region', 'tranche_age', 'bm_cat']
+NB_SINISTRES_CAP = 4                    # dernière modalité du filtre : « 4+ »
+# Slider → (pas, nombre de repères)
+SLIDER_COLUMNS = {
+    'age':         (1,    5),
+    'bonus_malus': (0.05, 3),
+}
+HIST_BINS = 20
+
+TYPE_ICONS = {
+    'Auto':       '🚗',
+    'Santé':      '🏥',
+    'Habitation': '🏠',
+    'Vie':        '❤️',
+}
+SEXE_LABELS = {
+    'masculin': '👨 Masculin',
+    'feminin':  '👩 Féminin',
+}
+
+
+def _distinct(s, preferred=()):
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        vc = s.value_counts(sort=False)
+        values = [str(v) for v in vc.index]
+        return values, [int(n) for n in vc.to_numpy()]
+    vc = s.dropna().astype(str).value_counts()
+    values = ([v for v in preferred if v in vc.index]
+              + sorted(v for v in vc.index if v not in preferred))
+    return values, [int(vc[v]) for v in values]
+
+
+def _round(value, step):
+    return int(value) if step >= 1 else round(value, 2)
+
+
+def _numeric(values, step, n_marks):
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return None
+    lo = _round(math.floor(values.min() / step + 1e-9) * step, step)
+    hi = _round(math.ceil(values.max() / step - 1e-9) * step, step)
+    counts, edges = np.histogram(values, bins=HIST_BINS, range=(lo, max(hi, lo + step)))
+    return {
+        'min': lo, 'max': hi, 'step': step, 'mean': float(values.mean()),
+        'marks': [_round(round(v / step) * step, step) for v in np.linspace(lo, hi, n_marks)],
+        'hist': {'counts': counts.tolist(), 'edges': [float(e) for e in edges]},
+    }
+
+
+# ════════════════════════════════════════════════════════════════
+# CONSTRUCTION
+# ════════════════════════════════════════════════════════════════
+def build_catalogue(df):
+    catalogue = {'n': int(len(df))}
+    for col in CATALOGUE_COLUMNS:
+        if col in df.columns:
+            values, counts = _distinct(df[col], TYPE_ICONS if col == 'type_assurance' else ())
+            catalogue[col] = {'values': values, 'counts': counts}
+
+    if 'nb_sinistres' in df.columns:
+        nb = np.minimum(df['nb_sinistres'].to_numpy(dtype=np.int64), NB_SINISTRES_CAP)
+        counts = np.bincount(nb, minlength=1)
+        catalogue['nb_sinistres'] = {
+            'values': [str(k) for k in np.flatnonzero(counts)],
+            'counts': [int(c) for c in counts[counts > 0]],
+        }
+
+    for col, (step, n_marks) in SLIDER_COLUMNS.items():
+        if col in df.columns:
+            catalogue[col] = _numeric(df[col].to_numpy(dtype=np.float64), step, n_marks)
+    return catalogue
+
+
+# Une fois par version des données (partagé entre workers par le cache disque)
+def load_catalogue(df):
+    version = dataset_version(df) + code_version(__file__)
+    return cached('catalogue', version, lambda: build_catalogue(df))
+
+
+# ════════════════════════════════════════════════════════════════
+# LECTURE (layout & callbacks)
+# ════════════════════════════════════════════════════════════════
+def distinct_values(catalogue, col):
+    return list((catalogue.get(col) or {}).get('values', []))
+
+
+def type_label(v):
+    return f"{TYPE_ICONS.get(v, '🛡️')} {v}"
+
+
+def sexe_label(v):
+    return SEXE_LABELS.get(v, v.capitalize())
+
+
+def region_label(v):
+    return f"{REGION_ICONS.get(v, '📍')} {v}"
+
+
+def sinistres_label(v):
+    k = int(v)
+    return f"{k}+ sinistres" if k == NB_SINISTRES_CAP else f"{k} sinistre{'s' if k > 1 else ''}"
+
+
+# Options de dropdown avec l'effectif de chaque modalité
+def options(catalogue, col, label=str, counts=True):
+    entry = catalogue.get(col) or {'values': [], 'counts': []}
+    return [{'label': f"{label(v)} ({n:,})".replace(',', ' ') if counts else label(v), 'value': v}
+            for v, n in zip(entry['values'], entry['counts'])]
+
+
+# Propriétés d'un RangeSlider : bornes, pas, repères ; value = plage complète
+def slider(catalogue, col):
+    entry = catalogue.get(col)
+    if not entry:
+        return {}
+    decimals = 0 if entry['step'] >= 1 else 1
+    return {
+        'min': entry['min'], 'max': entry['max'], 'step': entry['step'],
+        'value': [entry['min'], entry['max']],
+        'marks': {m: f"{m:.{decimals}f}" for m in entry['marks']},
+    }
+
+
+# Plage complète (aucun filtre) d'un slider
+def bounds(catalogue, col):
+    entry = catalogue.get(col)
+    return [entry['min'], entry['max']] if entry else None
@@ -0,0 +1,201 @@
+# =============================================================
+#  claims.py  —  Table de faits des sinistres (une ligne par sinistre)
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+#  Schéma en étoile : data/sinistres.csv (id_assure ; date_sinistre ; montant ;
+#  cause) reliée à la dimension assurés par la clé entière id_assure.
+#  Index de jointure précalculé au chargement (format CSR) : sinistres triés
+#  par ligne d'assuré puis par date, indptr[i] : indptr[i + 1] = sinistres de
+#  l'assuré i. Les sinistres d'une sélection s'obtiennent par plages, sans
+#  jointure par requête — coût proportionnel aux sinistres sélectionnés.
+#  Agrégats par assuré (nb_sinistres, montant_sinistres, date_derniere_sinistre)
+#  recalculés exactement depuis les faits et substitués aux colonnes du fichier
+#  assurés : KPIs, graphiques et exports restent cohérents avec les sinistres.
+#  Séries par mois et par cause : bincount sur les sinistres sélectionnés ;
+#  au-delà de la moitié des assurés, totaux du portefeuille − complément.
+#  Index mis en cache disque (version du fichier + clés des assurés).
+#  Fichier absent → None : l'application garde les agrégats du fichier assurés.
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from cache import cached, code_version, dataset_version
+
+
+CLAIMS_FILE = os.environ.get(
+    'ASSUR_CLAIMS_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'sinistres.csv')
+)
+CLAIMS_COLUMNS = ['id_assure', 'date_sinistre', 'montant']
+NO_CAUSE = "Non renseignée"
+DENSE_KEY_FACTOR = 4                    # table d'accès direct si max(id) ≤ 4 × nb d'assurés
+
+
+# Clé entière id_assure → ligne de l'assuré : table d'accès direct si les
+# identifiants sont denses, sinon identifiants triés + recherche dichotomique
+def _policy_rows(policy_ids, key):
+    n = len(policy_ids)
+    if not n:
+        return np.zeros(len(key), dtype=np.int64), np.zeros(len(key), dtype=bool)
+    lo, hi = int(policy_ids.min()), int(policy_ids.max())
+    if lo >= 0 and hi <= DENSE_KEY_FACTOR * n + 1024:
+        lookup = np.full(hi + 1, -1, dtype=np.int64)
+        lookup[policy_ids] = np.arange(n)
+        inside = (key >= 0) & (key <= hi)
+        row = np.full(len(key), -1, dtype=np.int64)
+        row[inside] = lookup[key[inside]]
+        return row, row >= 0
+    by_id = np.argsort(policy_ids, kind='stable')
+    pos = np.minimum(np.searchsorted(policy_ids[by_id], key), n - 1)
+    return by_id[pos], policy_ids[by_id][pos] == key
+
+
+class ClaimsIndex:
+
+    def __init__(self, claims, policy_ids):
+        policy_ids = np.asarray(policy_ids, dtype=np.int64)
+        key = claims['id_assure'].to_numpy(dtype=np.int64)
+        row, found = _policy_rows(policy_ids, key)
+        self.orphans = int((~found).sum())             # sinistres sans assuré connu
+        row = row[found]
+
+        dates = pd.to_datetime(claims['date_sinistre'], errors='coerce').to_numpy()[found]
+        stamp = dates.astype('datetime64[ns]').astype(np.int64)     # NaT → plus petit entier
+        # Tri par assuré puis par date : deux tris, le second stable
+        by_date = np.argsort(stamp)
+        perm = by_date[np.argsort(row[by_date], kind='stable')]
+        self.n_policies = len(policy_ids)
+        self.row = row[perm]
+        self.date = dates[perm]
+        self.amount = claims['montant'].to_numpy(dtype=np.float64)[found][perm]
+        counts = np.bincount(self.row, minlength=self.n_policies)
+        self.indptr = np.concatenate([[0], np.cumsum(counts)])
+
+        # Mois du sinistre : rang depuis le premier mois observé (−1 si date absente)
+        months = self.date.astype('datetime64[M]')
+        valid = ~np.isnat(months)
+        month = months.astype(np.int64)
+        self.month_min = int(month[valid].min()) if valid.any() else 0
+        self.n_months = int(month[valid].max()) - self.month_min + 1 if valid.any() else 0
+        self.month_code = np.where(valid, month - self.month_min, -1).astype(np.int32)
+
+        # Cause : codes entiers (modalités triées), manquante → « Non renseignée »
+        if 'cause' in claims.columns:
+            codes, levels = pd.factorize(claims['cause'], sort=True)
+            self.causes = [str(l) for l in levels]
+        else:
+            codes, self.causes = np.full(len(claims), -1), []
+        if (codes < 0).any():
+            codes = np.where(codes < 0, len(self.causes), codes)
+            self.causes.append(NO_CAUSE)
+        self.cause = np.asarray(codes, dtype=np.int32)[found][perm]
+
+        # Totaux du portefeuille (une sélection large se calcule par complément)
+        everything = np.arange(len(self.row))
+        self.totals = {field: self._bincount(everything, field) for field in ('mois', 'cause')}
+
+    # ════════════════════════════════════════════════════════
+    # AGRÉGATS PAR ASSURÉ
+    # ════════════════════════════════════════════════════════
+    def rollup(self):
+        counts = np.diff(self.indptr)
+        last = np.full(self.n_policies, np.datetime64('NaT'), dtype='datetime64[ns]')
+        has = counts > 0
+        # Dernier sinistre = dernière ligne de la plage (triée par date)
+        last[has] = self.date[self.indptr[1:][has] - 1]
+        return pd.DataFrame({
+            'nb_sinistres':           counts.astype(np.int64),
+            'montant_sinistres':      np.bincount(self.row, weights=self.amount,
+                                                  minlength=self.n_policies).round(2),
+            'date_derniere_sinistre': last,
+        })
+
+    # Remplace les agrégats du fichier assurés (lignes positionnelles)
+    def apply(self, df):
+        df = df.copy()
+        for col, values in self.rollup().items():
+            df[col] = values.to_numpy()
+        return df
+
+    # ════════════════════════════════════════════════════════
+    # SINISTRES D'UNE SÉLECTION (plages de l'index CSR)
+    # ════════════════════════════════════════════════════════
+    # rows : positions des assurés sélectionnés → positions des sinistres
+    def claim_rows(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        start, stop = self.indptr[rows], self.indptr[rows + 1]
+        counts = stop - start
+        offsets = np.repeat(start - (np.cumsum(counts) - counts), counts)
+        return offsets + np.arange(int(counts.sum()))
+
+    # Nombre et montant des sinistres c par modalité (mois ou cause)
+    def _bincount(self, c, field):
+        codes, K = ((self.month_code, self.n_months) if field == 'mois'
+                    else (self.cause, len(self.causes)))
+        k = codes[c]
+        ok = k >= 0
+        return (np.bincount(k[ok], minlength=K),
+                np.bincount(k[ok], weights=self.amount[c][ok], minlength=K))
+
+    # Sélection couvrant plus de la moitié des assurés : totaux − complément
+    def _tally(self, rows, field):
+        rows = np.asarray(rows, dtype=np.int64)
+        if 2 * len(rows) <= self.n_policies:
+            return self._bincount(self.claim_rows(rows), field)
+        keep = np.ones(self.n_policies, dtype=bool)
+        keep[rows] = False
+        nb, amount = self._bincount(self.claim_rows(np.nonzero(keep)[0]), field)
+        total_nb, total_amount = self.totals[field]
+        return total_nb - nb, total_amount - amount
+
+    # Série mensuelle exacte : nombre et montant des sinistres par mois
+    def monthly(self, rows):
+        nb, amount = self._tally(rows, 'mois')
+        keep = np.nonzero(nb)[0]
+        # Rang depuis 1970-01 → libellé AAAA-MM
+        month = keep + self.month_min
+        return pd.DataFrame({
+            'mois':    [f"{1970 + m // 12:04d}-{m % 12 + 1:02d}" for m in month],
+            'nb':      nb[keep],
+            'montant': amount[keep],
+        })
+
+    # Montants individuels (distribution de sévérité)
+    def severity(self, rows):
+        return self.amount[self.claim_rows(rows)]
+
+    # Répartition par cause : nombre, montant, coût moyen par sinistre
+    def by_cause(self, rows):
+        nb, amount = self._tally(rows, 'cause')
+        out = pd.DataFrame({'nb': nb, 'montant': amount}, index=self.causes)
+        out['cout_moyen'] = out['montant'] / out['nb'].where(out['nb'] > 0)
+        return out[out['nb'] > 0].sort_values('montant', ascending=False)
+
+
+# ════════════════════════════════════════════════════════════════
+# CHARGEMENT
+# ════════════════════════════════════════════════════════════════
+def _build(path, policy_ids):
+    claims = pd.read_csv(path, sep=';', usecols=lambda c: c in CLAIMS_COLUMNS + ['cause'],
+                         dtype={'id_assure': 'Int64'})
+    claims = claims.dropna(subset=['id_assure', 'montant'])
+    return ClaimsIndex(claims, policy_ids)
+
+
+def load_claims(df, path=CLAIMS_FILE):
+    if not os.path.exists(path) or not len(df):
+        return None
+    t0 = time.perf_counter()
+    version = code_version(__file__, path) + dataset_version(df[['id_assure']])
+    index = cached('sinistres', version,
+                   lambda: _build(path, df['id_assure'].to_numpy(dtype=np.int64)))
+    index.version = version
+    print(f"🧾  Sinistres (faits)   : {len(index.amount):,} sinistres, {len(index.causes)} causes "
+          f"— {time.perf_counter() - t0:.1f}s")
+    if index.orphans:
+        print(f"⚠️  {index.orphans:,} sinistres sans assuré correspondant ignorés")
+    return index
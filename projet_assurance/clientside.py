@@ -0,0 +1,89 @@
+# =============================================================
+#  clientside.py  —  Encodage colonnaire pour le filtrage navigateur
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+
+import base64
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from callbacks import TYPE_COLORS, BM_COLORS, base_layout
+from geography import GeoHierarchy
+
+
+# Au-delà de ce volume, le jeu encodé devient trop lourd pour le navigateur
+CLIENTSIDE_MAX_ROWS = 100_000
+
+# Colonnes expédiées au navigateur
+CATEGORICAL_COLUMNS = ['type_assurance', 'sexe', 'region', 'departement', 'commune',
+                       'bm_cat', 'tranche_age', 'mois_sinistre']
+NUMERIC_COLUMNS = {
+    'age':               None,      # entier → type minimal choisi à l'encodage
+    'nb_sinistres':      None,
+    'montant_prime':     '<f8',     # montants en double précision (sommes exactes)
+    'montant_sinistres': '<f8',
+    'ratio_SP':          '<f8',     # f8 : médiane et bornes des sliders identiques au serveur
+    'bonus_malus':       '<f8',
+    'score_risque':      '<f8',     # brossable depuis l'histogramme du score (GLM)
+}
+
+
+# Tableau typé au format plotly.js : {'dtype': 'f8', 'bdata': base64}
+def _typed_array(values, dtype):
+    arr = np.ascontiguousarray(values, dtype=dtype)
+    return {
+        'dtype': arr.dtype.str.lstrip('<|>'),
+        'bdata': base64.b64encode(arr.tobytes()).decode('ascii'),
+    }
+
+
+def _int_dtype(values):
+    lo, hi = (int(values.min()), int(values.max())) if len(values) else (0, 0)
+    for dt in ('|u1', '<u2', '<u4') if lo >= 0 else ('|i1', '<i2', '<i4'):
+        info = np.iinfo(np.dtype(dt))
+        if info.min <= lo and hi <= info.max:
+            return dt
+    return '<f8'
+
+
+# ════════════════════════════════════════════════════════════════
+# ENCODAGE COLONNAIRE
+# ════════════════════════════════════════════════════════════════
+# Encodage compact du DataFrame enrichi, chargé une seule fois dans le
+# dcc.Store 'store-columnar' :
+#   - catégorielles → dictionnaire de modalités + codes entiers (−1 = manquant)
+#   - numériques    → tableaux typés little-endian encodés en base64
+def encode_columnar(df):
+    columns = {}
+    for col in CATEGORICAL_COLUMNS:
+        if col not in df.columns:
+            continue
+        cat = pd.Categorical(df[col])
+        levels = [str(v) for v in cat.categories]
+        dtype = '|i1' if len(levels) < 127 else ('<i2' if len(levels) < 32767 else '<i4')
+        columns[col] = {'levels': levels, 'codes': _typed_array(cat.codes, dtype)}
+
+    for col, dtype in NUMERIC_COLUMNS.items():
+        if col not in df.columns:
+            continue
+        values = df[col].to_numpy()
+        if dtype is None:
+            dtype = _int_dtype(values)
+        columns[col] = _typed_array(values, dtype)
+
+    # Hiérarchie géographique : feuille par ligne + tables des niveaux (drill-down du pie région)
+    geo = GeoHierarchy(df)
+    columns['geo_leaf'] = _typed_array(geo.leaf, _int_dtype(geo.leaf))
+
+    raw = ''.join(c['bdata'] if 'bdata' in c else c['codes']['bdata'] for c in columns.values())
+    return {
+        'version': hashlib.sha1(raw.encode('ascii')).hexdigest()[:12],
+        'n': int(len(df)),
+        'columns': columns,
+        'colors': {'type': TYPE_COLORS, 'bm': BM_COLORS},
+        'geo': geo.describe(),
+        'layout': base_layout(),
+    }
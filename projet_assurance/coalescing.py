@@ -0,0 +1,165 @@
+# =============================================================
+#  coalescing.py  —  Abandon des requêtes dépassées (par session)
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+#  Glisser un slider émet une rafale de requêtes update_all ; seule la
+#  dernière sera affichée (le navigateur ignore les réponses des précédentes).
+#  Chaque requête porte son numéro, attribué par l'onglet à l'envoi
+#  (assets/sequence.js) : identifiant d'onglet (X-Assur-Tab) et compteur
+#  croissant propre à l'onglet (X-Assur-Seq). Le serveur publie ce numéro
+#  pour (onglet, callback) ; entre deux étapes du calcul, checkpoint()
+#  n'arrête une requête (PreventUpdate → 204) que si un numéro strictement
+#  plus grand du même onglet est arrivé : l'ordre d'arrivée ne compte pas,
+#  deux onglets ne s'interrompent jamais. Sans en-têtes, aucun abandon.
+#  Publication : un fichier vide par numéro dans .cache/sequences/<clé>/
+#  (création atomique, vue par tous les workers gunicorn).
+
+import hashlib
+import os
+import re
+import shutil
+import threading
+import time
+
+from dash.exceptions import PreventUpdate
+from flask import g, has_request_context, request
+
+from cache import CACHE_DIR
+
+
+SEQUENCE_DIR = os.path.join(CACHE_DIR, 'sequences')
+TAB_HEADER = 'X-Assur-Tab'
+SEQUENCE_HEADER = 'X-Assur-Seq'
+_TAB_RE = re.compile(r'[0-9A-Za-z_-]{8,64}')
+SEQUENCE_TTL = 3600                     # fichiers de séquence purgés après 1 h d'inactivité
+PRUNE_EVERY = 1000                      # purge tous les N numéros publiés (par worker)
+
+_tracked = set()                        # empreintes des sorties des callbacks suivis
+_published = {'n': 0}
+_lock = threading.Lock()
+
+
+# ════════════════════════════════════════════════════════════════
+# CALLBACKS SUIVIS
+# ════════════════════════════════════════════════════════════════
+def _key(output):
+    return hashlib.sha1(output.encode('utf-8')).hexdigest()[:12]
+
+
+# outputs : liste (id, prop) telle que passée à app.callback ; Dash l'identifie
+# par la chaîne « ..id.prop...id.prop.. » reçue dans le corps des requêtes
+def coalesce(outputs):
+    outputs = list(outputs)
+    if len(outputs) == 1:
+        spec = f"{outputs[0][0]}.{outputs[0][1]}"
+    else:
+        spec = '..' + '...'.join(f"{cid}.{prop}" for cid, prop in outputs) + '..'
+    _tracked.add(_key(spec))
+
+
+# ════════════════════════════════════════════════════════════════
+# ONGLET & NUMÉROS DE SÉQUENCE
+# ════════════════════════════════════════════════════════════════
+# Onglet à l'origine de la requête (None hors requête ou sans en-tête)
+def client_tab():
+    if not has_request_context():
+        return None
+    tab = request.headers.get(TAB_HEADER, '')
+    return tab if _TAB_RE.fullmatch(tab) else None
+
+
+def _dir(name):
+    return os.path.join(SEQUENCE_DIR, name)
+
+
+# Numéro le plus récent publié pour (onglet, callback) : le plus grand nom de fichier
+def _latest(name):
+    try:
+        names = [int(n) for n in os.listdir(_dir(name)) if n.isdigit()]
+    except (OSError, ValueError):
+        return 0
+    return max(names, default=0)
+
+
+# Publication atomique entre workers : un fichier vide par numéro (création exclusive),
+# jamais de lecture-comparaison-remplacement ; les numéros plus anciens sont effacés
+def _publish(name, seq):
+    try:
+        os.makedirs(_dir(name), exist_ok=True)
+        fd = os.open(os.path.join(_dir(name), f"{seq:020d}"), os.O_CREAT | os.O_WRONLY, 0o644)
+        os.close(fd)
+        for n in os.listdir(_dir(name)):
+            if n.isdigit() and int(n) < seq:
+                try:
+                    os.remove(os.path.join(_dir(name), n))
+                except OSError:
+                    pass
+    except OSError:
+        pass
+
+
+def _prune():
+    limit = time.time() - SEQUENCE_TTL
+    try:
+        for entry in os.scandir(SEQUENCE_DIR):
+            if entry.stat().st_mtime < limit:
+                if entry.is_dir():
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                else:
+                    os.remove(entry.path)
+    except OSError:
+        pass
+
+
+# La requête courante a-t-elle été dépassée par une plus récente du même onglet ?
+def superseded():
+    if not has_request_context():
+        return False
+    current = g.get('assur_sequence')
+    return current is not None and _latest(current[0]) > current[1]
+
+
+# Point d'arrêt entre deux étapes d'un callback suivi (sans effet ailleurs)
+def checkpoint():
+    if superseded():
+        g.assur_sequence = None
+        g.assur_superseded = True
+        raise PreventUpdate
+
+
+# ════════════════════════════════════════════════════════════════
+# INSTALLATION SUR LE SERVEUR FLASK
+# ════════════════════════════════════════════════════════════════
+def install_coalescing(server):
+
+    @server.before_request
+    def _stamp_sequence():
+        if not request.path.endswith('/_dash-update-component') or not _tracked:
+            return
+        tab = client_tab()
+        try:
+            seq = int(request.headers.get(SEQUENCE_HEADER, ''))
+        except ValueError:
+            return
+        if tab is None or seq <= 0:
+            return
+        output = (request.get_json(silent=True) or {}).get('output', '')
+        key = _key(output)
+        if key not in _tracked:
+            return
+        name = f"{_key(tab)}_{key}"
+        _publish(name, seq)
+        g.assur_sequence = (name, seq)
+        with _lock:
+            _published['n'] += 1
+            prune = _published['n'] % PRUNE_EVERY == 0
+        if prune:
+            _prune()
+
+    @server.after_request
+    def _superseded_header(response):
+        # Réponse vide d'une requête abandonnée : signalée pour les tests de charge
+        if g.pop('assur_superseded', False):
+            response.headers['X-Assur-Superseded'] = '1'
+        return response
@@ -0,0 +1,194 @@
+# =============================================================
+#  cohorts.py  —  Comparaison de cohortes (calcul groupé en une passe)
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+#  Une cohorte = un jeu de filtres du panneau gauche, figé par l'analyste.
+#  Les lignes reçoivent une matrice d'appartenance (n × k, une colonne par
+#  cohorte — une ligne peut appartenir à plusieurs cohortes), résumée en un
+#  code de combinaison par ligne ; toutes les sommes nécessaires aux KPIs et
+#  aux répartitions sont faites une fois par combinaison puis repliées sur
+#  les cohortes, au lieu de k filtrages + agrégations.
+
+import numpy as np
+import pandas as pd
+
+
+COHORT_MAX = 4
+COHORT_LETTERS = 'ABCD'
+COHORT_COLORS = ['#1565C0', '#FF5252', '#00E676', '#FFB300']
+
+# (clé, libellé, format, une hausse est défavorable ?)
+COHORT_KPIS = [
+    ('assures',   'Assurés',                 '{:,.0f}',   None),
+    ('sinistres', 'Sinistres déclarés',      '{:,.0f}',   None),
+    ('taux_sin',  'Taux de sinistralité',    '{:.1f}%',   True),
+    ('cout_moy',  'Coût moyen sinistre',     '{:,.0f} €', True),
+    ('prime_moy', 'Prime moyenne',           '{:,.0f} €', False),
+    ('ratio_sp',  'Ratio S/P médian',        '{:.2f}x',   True),
+    ('bm_moy',    'B/M moyen',               '{:.3f}',    True),
+    ('pct_def',   '% assurés déficitaires',  '{:.1f}%',   True),
+]
+
+
+# ════════════════════════════════════════════════════════════════
+# DÉFINITION DES COHORTES
+# ════════════════════════════════════════════════════════════════
+# Filtres au format du panneau : type / sexe / region / sinistres / age / bm
+def cohort_filters(type_vals, sexe_vals, region_vals, sinistres_vals, age_range, bm_range):
+    return {'type': type_vals or [], 'sexe': sexe_vals or [], 'region': region_vals or [],
+            'sinistres': sinistres_vals or [], 'age': age_range, 'bm': bm_range}
+
+
+# Libellé lisible d'un jeu de filtres
+def describe(filters, age_bounds=(18, 79), bm_bounds=(0.5, 1.5)):
+    parts = []
+    for key in ('type', 'region', 'sexe'):
+        if filters.get(key):
+            parts.append(', '.join(filters[key]))
+    if filters.get('sinistres'):
+        parts.append('sin. ' + ', '.join('4+' if v == '4' else v for v in filters['sinistres']))
+    age = filters.get('age')
+    if age and tuple(age) != tuple(age_bounds):
+        parts.append(f"{age[0]}–{age[1]} ans")
+    bm = filters.get('bm')
+    if bm and tuple(bm) != tuple(bm_bounds):
+        parts.append(f"B/M {bm[0]:.2f}–{bm[1]:.2f}")
+    return ' · '.join(parts) if parts else 'Portefeuille complet'
+
+
+# ════════════════════════════════════════════════════════════════
+# CALCUL GROUPÉ
+# ════════════════════════════════════════════════════════════════
+def _codes(series):
+    cat = pd.Categorical(series)
+    return np.asarray(cat.codes, dtype=np.int64), [str(c) for c in cat.categories]
+
+
+# Préparé une fois par jeu de données : codes des modalités, colonnes
+# numériques et ordre de tri du ratio S/P (médianes)
+class CohortComparator:
+
+    def __init__(self, df):
+        self.n = len(df)
+        self.codes, self.levels = {}, {}
+        for col in ('type_assurance', 'sexe', 'region', 'tranche_age'):
+            self.codes[col], self.levels[col] = _codes(df[col])
+        self.values = {col: df[col].to_numpy(dtype=np.float64)
+                       for col in ('age', 'nb_sinistres', 'montant_sinistres',
+                                   'montant_prime', 'bonus_malus', 'ratio_SP')}
+        ratio = self.values['ratio_SP']
+        order = np.argsort(ratio, kind='stable')
+        self.ratio_order = order[~np.isnan(ratio[order])]
+        self.ratio_sorted = ratio[self.ratio_order]
+
+    def mask(self, filters):
+        mask = np.ones(self.n, dtype=bool)
+        for col, key in (('type_assurance', 'type'), ('sexe', 'sexe'), ('region', 'region')):
+            if filters.get(key):
+                wanted = np.isin(self.levels[col], [str(v) for v in filters[key]])
+                codes = self.codes[col]
+                mask &= (codes >= 0) & wanted[codes]
+        if filters.get('sinistres'):
+            nb = self.values['nb_sinistres']
+            keep = np.zeros(self.n, dtype=bool)
+            for v in filters['sinistres']:
+                keep |= (nb >= 4) if v == '4' else (nb == int(v))
+            mask &= keep
+        for col, key in (('age', 'age'), ('bonus_malus', 'bm')):
+            if filters.get(key):
+                lo, hi = filters[key]
+                mask &= (self.values[col] >= lo) & (self.values[col] <= hi)
+        return mask
+
+    def membership(self, cohorts):
+        if not cohorts:
+            return np.zeros((self.n, 0), dtype=bool)
+        return np.column_stack([self.mask(c['filters']) for c in cohorts])
+
+    # Médiane par cohorte : rang médian lu sur les effectifs cumulés dans l'ordre trié
+    def _median(self, member):
+        out = np.full(member.shape[1], np.nan)
+        for j in range(member.shape[1]):
+            cum = np.cumsum(member[self.ratio_order, j], dtype=np.int64)
+            c = int(cum[-1]) if len(cum) else 0
+            if c == 0:
+                continue
+            lo = np.searchsorted(cum, (c - 1) // 2 + 1)
+            hi = np.searchsorted(cum, c // 2 + 1)
+            out[j] = (self.ratio_sorted[lo] + self.ratio_sorted[hi]) / 2
+        return out
+
+    # KPIs, répartition par type et sinistralité par tranche, pour toutes les cohortes.
+    # Chaque ligne est étiquetée par sa combinaison d'appartenance (bit j = cohorte j) ;
+    # les sommes sont faites par combinaison (bincount), puis repliées sur les cohortes.
+    def compare(self, cohorts):
+        member = self.membership(cohorts)
+        k = member.shape[1]
+        combo = member.astype(np.int64) @ (1 << np.arange(k, dtype=np.int64))
+        n_combo = 1 << k
+        fold = ((np.arange(n_combo)[:, None] >> np.arange(k)) & 1).astype(np.float64)
+
+        v = self.values
+        has_sin = (v['nb_sinistres'] > 0).astype(np.float64)
+
+        def sums(weights=None):
+            return fold.T @ np.bincount(combo, weights=weights, minlength=n_combo)
+
+        n         = sums()
+        sum_nb    = sums(v['nb_sinistres'])
+        n_sin     = sums(has_sin)
+        sum_cout  = sums(v['montant_sinistres'] * has_sin)
+        sum_prime = sums(v['montant_prime'])
+        sum_bm    = sums(v['bonus_malus'])
+        n_def     = sums((v['ratio_SP'] > 1).astype(np.float64))
+
+        # Répartitions : clé composite (combinaison, modalité)
+        def cross(col, weights=None):
+            codes, size = self.codes[col], len(self.levels[col])
+            ok = codes >= 0
+            w = None if weights is None else weights[ok]
+            counts = np.bincount(combo[ok] * size + codes[ok], weights=w, minlength=n_combo * size)
+            return fold.T @ counts.reshape(n_combo, size)
+
+        by_type = cross('type_assurance')
+        by_tranche = cross('tranche_age')
+        sin_tranche = cross('tranche_age', has_sin)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            kpis = pd.DataFrame({
+                'assures':   n,
+                'sinistres': sum_nb,
+                'taux_sin':  np.where(n > 0, n_sin / n * 100, np.nan),
+                'cout_moy':  np.where(n_sin > 0, sum_cout / n_sin, np.nan),
+                'prime_moy': np.where(n > 0, sum_prime / n, np.nan),
+                'ratio_sp':  self._median(member),
+                'bm_moy':    np.where(n > 0, sum_bm / n, np.nan),
+                'pct_def':   np.where(n > 0, n_def / n * 100, np.nan),
+            })
+            type_share = pd.DataFrame(np.where(n[:, None] > 0, by_type / n[:, None] * 100, 0.0),
+                                      columns=self.levels['type_assurance'])
+            tranche_rate = pd.DataFrame(np.where(by_tranche > 0, sin_tranche / by_tranche * 100, np.nan),
+                                        columns=self.levels['tranche_age'])
+
+        labels = [COHORT_LETTERS[i] for i in range(k)]
+        kpis.index = type_share.index = tranche_rate.index = labels
+        return {'labels': labels, 'kpis': kpis, 'types': type_share, 'tranches': tranche_rate}
+
+
+# Écarts notables de chaque cohorte vs la cohorte de référence (A)
+def cohort_deltas(kpis, threshold=10.0):
+    deltas = []
+    if len(kpis) < 2:
+        return deltas
+    ref = kpis.iloc[0]
+    for label, row in kpis.iloc[1:].iterrows():
+        for key, name, fmt, worse_up in COHORT_KPIS:
+            if worse_up is None or pd.isna(row[key]) or pd.isna(ref[key]) or ref[key] == 0:
+                continue
+            rel = (row[key] - ref[key]) / abs(ref[key]) * 100
+            if abs(rel) >= threshold:
+                deltas.append((label, key, name, fmt.format(row[key]), fmt.format(ref[key]),
+                               rel, (rel > 0) == worse_up))
+    deltas.sort(key=lambda d: -abs(d[5]))
+    return deltas
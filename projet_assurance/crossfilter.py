@@ -0,0 +1,344 @@
+# =============================================================
+#  crossfilter.py  —  Moteur de filtrage croisé (dimensions / groupes)
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+#  Inspiré de crossfilter.js :
+#   - chaque dimension garde un index trié (argsort) de ses valeurs ;
+#     un filtre est une liste d'intervalles de positions dans cet index ;
+#   - un masque de bits par ligne indique les dimensions qui l'excluent ;
+#   - quand un filtre bouge, seules les lignes entrant / sortant de
+#     l'intervalle sont touchées, et les réductions de groupe (effectifs,
+#     sommes) sont mises à jour par différence — O(Δ log n), pas O(n).
+#  Un groupe peut ignorer certaines dimensions : c'est ce qui permet à un
+#  graphique de continuer à afficher toutes ses barres pendant qu'on le brosse.
+#  Un moteur par session (EnginePool) : index triés, clés et colonnes partagés,
+#  état des filtres (bits par ligne, intervalles, réductions) propre à chacune.
+#  Chaque analyste garde son état incrémental ; les exports ont le leur.
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from geography import GeoHierarchy
+
+
+# ════════════════════════════════════════════════════════════════
+# OUTILS INTERVALLES
+# ════════════════════════════════════════════════════════════════
+# Intervalles [début, fin) triés et disjoints
+def _normalize(intervals):
+    out = []
+    for s, e in sorted((int(s), int(e)) for s, e in intervals if e > s):
+        if out and s <= out[-1][1]:
+            out[-1][1] = max(out[-1][1], e)
+        else:
+            out.append([s, e])
+    return [tuple(iv) for iv in out]
+
+
+# Positions de a absentes de b
+def _subtract(a, b):
+    out = []
+    for s, e in a:
+        cur = s
+        for bs, be in b:
+            if be <= cur or bs >= e:
+                continue
+            if bs > cur:
+                out.append((cur, bs))
+            cur = max(cur, be)
+            if cur >= e:
+                break
+        if cur < e:
+            out.append((cur, e))
+    return out
+
+
+def _positions(intervals):
+    if not intervals:
+        return np.empty(0, dtype=np.int64)
+    return np.concatenate([np.arange(s, e) for s, e in intervals])
+
+
+# ════════════════════════════════════════════════════════════════
+# DIMENSION
+# ════════════════════════════════════════════════════════════════
+class Dimension:
+
+    def __init__(self, engine, name, values, bit, levels=None):
+        self.engine = engine
+        self.name = name
+        self.bit = np.uint32(1) << np.uint32(bit)
+        self.levels = levels                       # modalités si catégorielle (valeurs = codes)
+        self.order = np.argsort(values, kind='stable')
+        self.sorted = np.asarray(values)[self.order]
+        self.selected = [(0, len(values))]         # aucun filtre
+
+    def _fork(self, engine):
+        dim = object.__new__(Dimension)
+        dim.__dict__.update(self.__dict__, engine=engine, selected=list(self.selected))
+        return dim
+
+    # Intervalles [lo, hi] (inclus) en valeurs → positions dans l'index trié
+    def _bounds(self, ranges):
+        out = []
+        for lo, hi in ranges:
+            s = np.searchsorted(self.sorted, lo, side='left')
+            e = np.searchsorted(self.sorted, hi, side='right')
+            out.append((s, e))
+        return _normalize(out)
+
+    # Codes des modalités demandées (dimension catégorielle)
+    def codes(self, values):
+        lookup = {str(v): i for i, v in enumerate(self.levels)}
+        return sorted(lookup[str(v)] for v in values if str(v) in lookup)
+
+    def filter_ranges(self, ranges):
+        self.engine._move(self, self._bounds(ranges))
+
+    def filter_range(self, lo, hi):
+        self.filter_ranges([(lo, hi)])
+
+    def filter_in(self, values):
+        self.filter_ranges([(c, c) for c in self.codes(values)])
+
+    def filter_all(self):
+        self.engine._move(self, [(0, len(self.order))])
+
+
+# ════════════════════════════════════════════════════════════════
+# GROUPE (réductions incrémentales)
+# ════════════════════════════════════════════════════════════════
+class Group:
+
+    def __init__(self, engine, keys, size, columns, ignore, weights=None):
+        self.keys = np.asarray(keys, dtype=np.int64)      # −1 = ligne hors groupe
+        self.size = size
+        self.columns = {c: np.asarray(v, dtype=np.float64) for c, v in columns.items()}
+        # Poids par ligne (échantillon) : effectifs et sommes deviennent des estimations
+        self.weights = None if weights is None else np.asarray(weights, dtype=np.float64)
+        self.ignore = np.uint32(0)
+        for d in ignore:
+            self.ignore |= engine.dimensions[d].bit
+        self._reset(engine.filters)
+
+    def _fork(self):
+        group = object.__new__(Group)
+        group.__dict__.update(self.__dict__, count=self.count.copy(),
+                              sums={c: s.copy() for c, s in self.sums.items()})
+        return group
+
+    def _reduce(self, rows, weights):
+        keys = self.keys[rows]
+        ok = keys >= 0
+        keys, rows, weights = keys[ok], rows[ok], weights[ok]
+        if self.weights is not None:
+            weights = weights * self.weights[rows]
+        self.count += np.bincount(keys, weights=weights, minlength=self.size)
+        for c, v in self.columns.items():
+            self.sums[c] += np.bincount(keys, weights=weights * v[rows], minlength=self.size)
+
+    def _reset(self, filters):
+        self.count = np.zeros(self.size)
+        self.sums = {c: np.zeros(self.size) for c in self.columns}
+        rows = np.flatnonzero((filters & ~self.ignore) == 0)
+        self._reduce(rows, np.ones(len(rows)))
+
+    # Lignes dont le masque passe de old à new
+    def _update(self, rows, old, new):
+        keep = ~self.ignore
+        delta = ((new & keep) == 0).astype(np.int8) - ((old & keep) == 0).astype(np.int8)
+        moved = delta != 0
+        if moved.any():
+            self._reduce(rows[moved], delta[moved].astype(np.float64))
+
+    def result(self):
+        out = {'count': self.count.copy()}
+        out.update({c: s.copy() for c, s in self.sums.items()})
+        return out
+
+
+# ════════════════════════════════════════════════════════════════
+# MOTEUR
+# ════════════════════════════════════════════════════════════════
+class Crossfilter:
+
+    def __init__(self, n):
+        self.n = n
+        self.filters = np.zeros(n, dtype=np.uint32)   # bit d = exclu par la dimension d
+        self.dimensions = {}
+        self.groups = {}
+        self.lock = threading.RLock()
+
+    # Copie de travail : index partagés (ordres, valeurs triées, clés, colonnes),
+    # état des filtres copié — O(n) octets pour les bits, rien n'est retrié
+    def fork(self):
+        cf = object.__new__(Crossfilter)
+        cf.__dict__.update(self.__dict__, filters=self.filters.copy(), lock=threading.RLock())
+        cf.dimensions = {name: d._fork(cf) for name, d in self.dimensions.items()}
+        cf.groups = {name: g._fork() for name, g in self.groups.items()}
+        return cf
+
+    def dimension(self, name, values):
+        if len(self.dimensions) >= 32:
+            raise ValueError("Crossfilter : 32 dimensions maximum")
+        if isinstance(values, pd.Categorical) or str(getattr(values, 'dtype', '')) == 'category':
+            cat = pd.Categorical(values)
+            dim = Dimension(self, name, cat.codes, len(self.dimensions),
+                            levels=[str(c) for c in cat.categories])
+        else:
+            dim = Dimension(self, name, np.asarray(values), len(self.dimensions))
+        self.dimensions[name] = dim
+        return dim
+
+    # keys : clé entière par ligne dans [0, size) (−1 = ignorée)
+    # ignore : dimensions dont le filtre ne s'applique pas au groupe
+    # weights : poids par ligne (None = effectifs bruts)
+    def group(self, name, keys, size, columns=None, ignore=(), weights=None):
+        g = Group(self, keys, size, columns or {}, ignore, weights)
+        self.groups[name] = g
+        return g
+
+    def _move(self, dim, selected):
+        selected = _normalize(selected)
+        added = _positions(_subtract(selected, dim.selected))
+        removed = _positions(_subtract(dim.selected, selected))
+        dim.selected = selected
+        if len(added) == 0 and len(removed) == 0:
+            return
+
+        rows = np.concatenate([dim.order[added], dim.order[removed]])
+        old = self.filters[rows]
+        new = old.copy()
+        new[:len(added)] &= ~dim.bit
+        new[len(added):] |= dim.bit
+        self.filters[rows] = new
+        for g in self.groups.values():
+            g._update(rows, old, new)
+
+    # Lignes retenues par toutes les dimensions
+    def mask(self, ignore=()):
+        bits = np.uint32(0)
+        for d in ignore:
+            bits |= self.dimensions[d].bit
+        return (self.filters & ~bits) == 0
+
+
+# ════════════════════════════════════════════════════════════════
+# MOTEURS PAR SESSION
+# ════════════════════════════════════════════════════════════════
+ENGINE_SESSIONS = int(os.environ.get('ASSUR_ENGINE_SESSIONS', 16))
+
+
+# Moteurs des sessions actives (LRU) dérivés d'un moteur de base jamais filtré ;
+# une session évincée repart de la base à sa requête suivante
+class EnginePool:
+
+    def __init__(self, base, size=ENGINE_SESSIONS):
+        self.base = base
+        self.size = max(1, size)
+        self.engines = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            engine = self.engines.pop(key, None)
+            if engine is None:
+                engine = self.base.fork()
+            self.engines[key] = engine
+            while len(self.engines) > self.size:
+                self.engines.popitem(last=False)
+        return engine
+
+
+# ════════════════════════════════════════════════════════════════
+# PORTEFEUILLE D'ASSURÉS
+# ════════════════════════════════════════════════════════════════
+# Filtres du panneau gauche (dropdowns & sliders)
+FILTER_DIMENSIONS = ['type_assurance', 'sexe', 'region', 'nb_sinistres', 'age', 'bonus_malus']
+
+# Champs brossables depuis les graphiques (dimensions 'brush:<champ>')
+BRUSH_CATEGORIES = ['type_assurance', 'sexe', 'region', 'tranche_age',
+                    'nb_sinistres', 'mois_sinistre', 'bm_cat']
+BRUSH_RANGES = ['age', 'montant_prime', 'montant_sinistres', 'bonus_malus', 'score_risque']
+# + niveaux géographiques inférieurs présents (département, commune) : voir geography.py
+
+
+def _categorical(s):
+    return pd.Categorical(s.astype(str).where(s.notna())) if s.dtype != 'category' else s.values
+
+
+# weights : poids de sondage par ligne (moteur construit sur un échantillon)
+def portfolio_crossfilter(df, weights=None):
+    cf = Crossfilter(len(df))
+    cats = {}
+    for col in FILTER_DIMENSIONS:
+        if col in ('type_assurance', 'sexe', 'region'):
+            cats[col] = _categorical(df[col])
+            cf.dimension(col, cats[col])
+        else:
+            cf.dimension(col, df[col].to_numpy())
+    cf.geo = GeoHierarchy(df)
+    for col in BRUSH_CATEGORIES + cf.geo.sublevels:
+        if col not in cats:
+            cats[col] = _categorical(df[col])
+        cf.dimension(f'brush:{col}', cats[col])
+    for col in BRUSH_RANGES:
+        cf.dimension(f'brush:{col}', df[col].to_numpy())
+
+    # Niveaux des clés de groupe (libellés des axes)
+    cf.levels = {col: [str(c) for c in cats[col].categories] for col in cats}
+    nb = df['nb_sinistres'].to_numpy().astype(np.int64)
+    cf.levels['nb_sinistres'] = list(range(int(nb.max()) + 1 if len(nb) else 1))
+
+    sums = {'nb_sinistres': df['nb_sinistres'], 'montant_sinistres': df['montant_sinistres'],
+            'montant_prime': df['montant_prime']}
+    type_codes = np.asarray(cats['type_assurance'].codes, dtype=np.int64)
+    age_codes = np.asarray(cats['tranche_age'].codes, dtype=np.int64)
+    n_types = len(cf.levels['type_assurance'])
+
+    cf.group('type_assurance', type_codes, n_types, sums, ignore=['brush:type_assurance'],
+             weights=weights)
+    # Géographie : réduction par feuille de la hiérarchie, chaque niveau en est
+    # déduit (geography.GeoHierarchy.rollup) ; ignore les brosses de tous les niveaux
+    cf.group('geo', cf.geo.leaf, cf.geo.n_leaves, sums,
+             ignore=[f'brush:{col}' for col in cf.geo.levels], weights=weights)
+    cf.group('nb_sinistres', nb, len(cf.levels['nb_sinistres']), ignore=['brush:nb_sinistres'],
+             weights=weights)
+    cf.group('bm_cat', cats['bm_cat'].codes, len(cf.levels['bm_cat']), ignore=['brush:bm_cat'],
+             weights=weights)
+    cf.group('tranche_type',
+             np.where((age_codes >= 0) & (type_codes >= 0), age_codes * n_types + type_codes, -1),
+             len(cf.levels['tranche_age']) * n_types, sums,
+             ignore=['brush:tranche_age', 'brush:type_assurance'], weights=weights)
+    return cf
+
+
+# Applique filtres du panneau + sélection brossée ; seules les dimensions
+# dont le filtre a changé font un travail (incrémental)
+def apply_filters(cf, type_vals, sexe_vals, region_vals, sinistres_vals,
+                  age_range, bm_range, selection=None):
+    dims = cf.dimensions
+    for name, vals in (('type_assurance', type_vals), ('sexe', sexe_vals),
+                       ('region', region_vals)):
+        dims[name].filter_in(vals) if vals else dims[name].filter_all()
+
+    if sinistres_vals:
+        dims['nb_sinistres'].filter_ranges(
+            [(4, 99) if v == '4' else (int(v), int(v)) for v in sinistres_vals])
+    else:
+        dims['nb_sinistres'].filter_all()
+    dims['age'].filter_range(*age_range) if age_range else dims['age'].filter_all()
+    dims['bonus_malus'].filter_range(*bm_range) if bm_range else dims['bonus_malus'].filter_all()
+
+    selection = selection or {}
+    for col in BRUSH_CATEGORIES + cf.geo.sublevels:
+        vals = selection.get(col)
+        dims[f'brush:{col}'].filter_in(vals) if vals else dims[f'brush:{col}'].filter_all()
+    for col in BRUSH_RANGES:
+        rng = selection.get(col)
+        dims[f'brush:{col}'].filter_range(*rng) if rng else dims[f'brush:{col}'].filter_all()
@@ -0,0 +1,617 @@
+# =============================================================
+#  exports.py  —  Rapports exportés (Excel, HTML, PDF, Parquet, Arrow)
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+#  Construction des fichiers à partir de la sélection filtrée. Les exports
+#  passent par la file de l'ordonnanceur (scheduler.py) : ils tournent hors
+#  des threads de requête et ne retardent pas le tableau de bord interactif.
+#  Parquet / Arrow IPC (Feather v2) : écrits directement depuis les tableaux
+#  NumPy des colonnes (ExportColumns, encodées une fois au démarrage), sans
+#  passer par des objets Python ; types conservés (catégories ordonnées,
+#  dates, entiers). Écriture par lots de ROW_GROUP_SIZE lignes (un row group
+#  Parquet / un record batch Arrow par lot) : la mémoire de travail reste
+#  bornée quelle que soit la taille de la sélection. pyarrow est optionnel.
+
+import base64
+import functools
+import io
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from dash import dcc
+
+from annex import (CHAPTERS, ANNEX_MAX_ROWS, segment_table, annex_pages, annex_flowables,
+                   parallel_available, render_with_annex)
+from kpis import portfolio_kpis
+from montecarlo import aggregate_loss_report, EXPORT_SCENARIOS, VAR_LEVELS, TVAR_LEVELS
+
+
+# ════════════════════════════════════════════════════════════════
+# EXPORT EXCEL
+# ════════════════════════════════════════════════════════════════
+def excel_report(fdf):
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine='openpyxl') as writer:
+
+        # Feuille 1 — Données brutes
+        cols_keep = ['id_assure', 'age', 'sexe', 'type_assurance', 'region',
+                     'duree_contrat', 'montant_prime', 'nb_sinistres',
+                     'montant_sinistres', 'bonus_malus', 'bm_cat', 'ratio_SP', 'tranche_age']
+        fdf[[c for c in cols_keep if c in fdf.columns]].to_excel(
+            writer, sheet_name='Données', index=False)
+
+        # Feuille 2 — KPIs (mêmes valeurs que l'écran)
+        k = portfolio_kpis(fdf)
+        kpis = pd.DataFrame({
+            'Indicateur': [
+                'Nb assurés analysés', 'Total sinistres', 'Taux sinistralité (%)',
+                'Coût moyen sinistre (€)', 'Prime moyenne (€)',
+                'Ratio S/P médian', '% déficitaires', 'B/M moyen'
+            ],
+            'Valeur': [
+                k.assures, k.sinistres,
+                round(k.taux_sinistralite * 100, 2),
+                round(k.cout_moyen, 0) if k.assures_sinistres else 0,
+                round(k.prime_moyenne, 0),
+                round(k.ratio_sp_median, 2),
+                round(k.pct_deficitaires * 100, 1),
+                round(k.bm_moyen, 3),
+            ]
+        })
+        kpis.to_excel(writer, sheet_name='KPIs', index=False)
+
+        # Feuille 3 — Agrégat région
+        reg = fdf.groupby('region').agg(
+            assures=('id_assure', 'count'),
+            sinistres=('nb_sinistres', 'sum'),
+            montant_sin=('montant_sinistres', 'sum'),
+            prime_moy=('montant_prime', 'mean'),
+            bm_moyen=('bonus_malus', 'mean')
+        ).round(2).reset_index()
+        reg.to_excel(writer, sheet_name='Par Région', index=False)
+
+        # Feuille 4 — Agrégat type
+        typ = fdf.groupby('type_assurance').agg(
+            assures=('id_assure', 'count'),
+            sinistres=('nb_sinistres', 'sum'),
+            cout_moy=('montant_sinistres', 'mean'),
+            prime_moy=('montant_prime', 'mean'),
+            ratio_sp_med=('ratio_SP', 'median')
+        ).round(2).reset_index()
+        typ.to_excel(writer, sheet_name='Par Type', index=False)
+
+    buf.seek(0)
+    fname = f"assuranalytics_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
+    return dcc.send_bytes(buf.getvalue(), fname)
+
+# ════════════════════════════════════════════════════════════════
+# EXPORT HTML
+# ════════════════════════════════════════════════════════════════
+# Rapport autonome : en-tête statique (styles, plotly.js, rendu) préparé une
+# fois par processus. Figures du tableau de bord (3 figures clés à défaut)
+# sérialisées avec leurs tableaux numériques en base64 typé (dtype + bdata,
+# décodé par plotly.js ≥ 2.28) ; thème plotly commun envoyé une seule fois ;
+# chaque figure n'ajoute qu'un appel R(), dessiné à son arrivée à l'écran.
+# Fichier écrit par morceaux, sans gabarit complet en mémoire.
+HTML_PLOTLYJS = os.environ.get('ASSUR_HTML_PLOTLYJS', 'inline')     # 'inline' (autonome) ou 'cdn'
+TYPED_ARRAY_MIN = 16                    # tableaux plus courts : JSON ordinaire
+TYPED_KEYS = {'x', 'y', 'z', 'values', 'customdata', 'size', 'color'}
+
+# Section → [(graphique du tableau de bord, titre)]
+REPORT_SECTIONS = [
+    ("Profil des assurés", [
+        ('chart-type-pie',       "Répartition par type d'assurance"),
+        ('chart-age-dist',       "Distribution des âges par type"),
+        ('chart-age-sexe',       "Profil démographique — âge & sexe"),
+        ('chart-region-pie',     "Répartition par région"),
+    ]),
+    ("Analyse des sinistres", [
+        ('chart-region-bar',     "Sinistres & montants par région"),
+        ('chart-sinistres-hist', "Fréquence des sinistres déclarés"),
+        ('chart-time-series',    "Évolution temporelle des sinistres"),
+        ('chart-sinistres-age',  "Sinistres moyens par tranche d'âge"),
+    ]),
+    ("Rentabilité & tarification", [
+        ('chart-scatter-prime',  "Prime vs montant sinistre"),
+        ('chart-cout-type',      "Coût moyen sinistre vs prime par type"),
+    ]),
+    ("Profils à risque & bonus/malus", [
+        ('chart-heatmap-risque', "Heatmap risque — âge × type d'assurance"),
+        ('chart-bm-dist',        "Distribution du bonus/malus"),
+        ('chart-bm-scatter',     "Bonus/malus × nb sinistres × montant"),
+        ('chart-score-risque',   "Score de risque modélisé (GLM)"),
+    ]),
+]
+
+REPORT_HEAD = """<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="UTF-8">
+<title>Rapport AssurAnalytics</title>
+<style>
+  body { font-family: Inter, Arial, sans-serif; background: #f0f4f8; color: #2d3748; margin: 0; }
+  .header { background: linear-gradient(135deg,#0D47A1,#1976D2); color: white; padding: 28px 40px; }
+  h1 { margin: 0; font-size: 1.8rem; } p.sub { margin: 4px 0 0; opacity: .8; font-size: .85rem; }
+  .kpis { display: flex; gap: 16px; padding: 20px 40px; flex-wrap: wrap; }
+  .kpi { background: white; border-radius: 12px; padding: 16px 24px; flex: 1; min-width: 160px;
+      box-shadow: 0 2px 10px rgba(0,0,0,.08); text-align: center; }
+  .kpi-v { font-size: 1.6rem; font-weight: 800; color: #1565C0; }
+  .kpi-l { font-size: .72rem; color: #718096; text-transform: uppercase; letter-spacing: .06em; }
+  .insight { background: white; margin: 0 40px 8px; padding: 12px 16px; border-radius: 8px;
+          border-left: 4px solid #1565C0; font-size: .83rem; box-shadow: 0 1px 4px rgba(0,0,0,.06); }
+  .graphs { padding: 20px 40px; }
+  .grid { display: grid; grid-template-columns: repeat(auto-fit, minmax(460px, 1fr)); gap: 16px; }
+  .card { background: white; border-radius: 12px; padding: 12px 16px; box-shadow: 0 2px 10px rgba(0,0,0,.08); }
+  .card h3 { margin: 0 0 6px; font-size: .9rem; color: #1565C0; }
+  .plot { min-height: 300px; }
+  footer { background: #0D47A1; color: rgba(255,255,255,.8); text-align: center; padding: 14px; font-size:.75rem; margin-top:20px; }
+</style>
+<!--plotlyjs-->
+<script>
+  // T : thèmes plotly partagés ; R : dessine une figure à son arrivée à l'écran
+  var T = [], CFG = {displayModeBar: false, responsive: true}, pending = [];
+  function R(id, f) {
+    var el = document.getElementById(id), done = false;
+    function draw() {
+      if (done) { return; }
+      done = true;
+      var layout = Object.assign({height: 380}, f.layout);
+      if (f.t >= 0) { layout.template = T[f.t]; }
+      Plotly.newPlot(el, f.data, layout, CFG);
+    }
+    pending.push(draw);
+    if (!('IntersectionObserver' in window)) { return draw(); }
+    var seen = new IntersectionObserver(function (entries) {
+      if (entries.some(function (e) { return e.isIntersecting; })) { seen.disconnect(); draw(); }
+    }, {rootMargin: '300px'});
+    seen.observe(el);
+  }
+  // Impression : toutes les figures, y compris celles jamais affichées
+  window.addEventListener('beforeprint', function () { pending.forEach(function (d) { d(); }); });
+</script>
+</head>
+<body>
+"""
+
+
+# En-tête statique, plotly.js compris (≈ 3,6 Mo) : construit une fois par processus
+@functools.lru_cache(maxsize=None)
+def _report_head(mode):
+    import plotly.offline
+    if mode == 'cdn':
+        script = (f'<script src="https://cdn.plot.ly/plotly-{plotly.offline.get_plotlyjs_version()}'
+                  f'.min.js" charset="utf-8"></script>')
+    else:
+        script = f'<script type="text/javascript">{plotly.offline.get_plotlyjs()}</script>'
+    return REPORT_HEAD.replace('<!--plotlyjs-->', script).encode('utf-8')
+
+
+# Tableau numérique → {dtype, bdata[, shape]} : entiers sur le plus petit type
+# qui les contient ; décimaux en float64, sauf si la liste JSON est plus courte
+_INT_CODES = [('u1', '<u1'), ('i1', '<i1'), ('u2', '<u2'), ('i2', '<i2'), ('i4', '<i4')]
+
+
+def _typed(value):
+    if not isinstance(value, (np.ndarray, list, tuple)):
+        return value
+    try:
+        a = np.asarray(value)
+    except ValueError:
+        return value
+    if a.ndim not in (1, 2) or a.size < TYPED_ARRAY_MIN or a.dtype.kind not in 'iuf':
+        return value
+    code = None
+    if a.dtype.kind in 'iu' or (np.isfinite(a).all() and (a == np.round(a)).all()):
+        lo, hi = a.min(), a.max()
+        for c, dtype in _INT_CODES:
+            info = np.iinfo(dtype)
+            if info.min <= lo and hi <= info.max:
+                a, code = a.astype(dtype), c
+                break
+    if code is None:
+        a, code = a.astype('<f8'), 'f8'
+    spec = {'dtype': code, 'bdata': base64.b64encode(np.ascontiguousarray(a).tobytes()).decode('ascii')}
+    if code == 'f8' and len(spec['bdata']) >= len(json.dumps(a.tolist())):
+        return value
+    if a.ndim == 2:
+        spec['shape'] = f"{a.shape[0]},{a.shape[1]}"
+    return spec
+
+
+def _compact(node, key=None):
+    if isinstance(node, dict):
+        return {k: _compact(v, k) for k, v in node.items()}
+    if key in TYPED_KEYS:
+        return _typed(node)
+    if isinstance(node, (list, tuple)):
+        return [_compact(v) for v in node]
+    return node
+
+
+# Figure → JSON compact ; son thème rejoint la liste partagée (index 't')
+def _figure_json(fig, templates):
+    from plotly.utils import PlotlyJSONEncoder
+    fig = fig.to_plotly_json() if hasattr(fig, 'to_plotly_json') else dict(fig)
+    layout = dict(fig.get('layout') or {})
+    template = layout.pop('template', None)
+    t = -1
+    if template is not None:
+        key = json.dumps(template, cls=PlotlyJSONEncoder, separators=(',', ':'))
+        t = templates.setdefault(key.replace('</', '<\\/'), len(templates))
+    data = [_compact(trace) for trace in fig.get('data') or []]
+    text = json.dumps({'data': data, 'layout': layout, 't': t},
+                      cls=PlotlyJSONEncoder, separators=(',', ':'))
+    return text.replace('</', '<\\/')
+
+
+# Sans les graphiques du tableau de bord (rapports en lot) : 3 figures clés
+def _key_figures(fdf):
+    from callbacks import TYPE_COLORS
+    from geography import region_color
+    ct = fdf['type_assurance'].value_counts()
+    f1 = go.Figure(go.Pie(labels=ct.index, values=ct.values, hole=0.4,
+                           marker_colors=[TYPE_COLORS.get(t, '#888') for t in ct.index]))
+    f1.update_layout(height=350, plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
+
+    ar = fdf.groupby('region')['montant_sinistres'].sum().reset_index().sort_values('montant_sinistres')
+    f2 = go.Figure(go.Bar(x=ar['montant_sinistres'], y=ar['region'], orientation='h',
+                           marker_color=[region_color(r) for r in ar['region']]))
+    f2.update_layout(height=350, plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
+
+    figures = {'chart-type-pie': f1, 'chart-region-bar': f2}
+    if 'tranche_age' in fdf.columns:
+        pv = fdf.groupby(['tranche_age'], observed=True)['nb_sinistres'].mean().reset_index()
+        f3 = go.Figure(go.Bar(x=pv['tranche_age'].astype(str), y=pv['nb_sinistres'],
+                               marker_color='#1565C0'))
+        f3.update_layout(height=350, plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
+        figures['chart-sinistres-age'] = f3
+    return figures
+
+
+# figures : {id du graphique : figure} (tableau de bord) ; None → figures clés
+def html_report(fdf, figures=None):
+    k = portfolio_kpis(fdf)
+    cout_str = f"{k.cout_moyen:,.0f} €" if k.assures_sinistres else "—"
+    figures = _key_figures(fdf) if figures is None else figures
+
+    templates, sections = {}, []
+    for section, charts in REPORT_SECTIONS:
+        items = [(cid, title, _figure_json(figures[cid], templates))
+                 for cid, title in charts if figures.get(cid) is not None]
+        if items:
+            sections.append((section, items))
+
+    body = f"""<div class="header">
+  <h1>📊 AssurAnalytics — Rapport d'Analyse</h1>
+  <p class="sub">Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')} | {k.assures} assurés analysés</p>
+</div>
+<div class="kpis">
+  <div class="kpi"><div class="kpi-v">{k.assures:,}</div><div class="kpi-l">Total assurés</div></div>
+  <div class="kpi"><div class="kpi-v">{k.sinistres:,}</div><div class="kpi-l">Total sinistres</div></div>
+  <div class="kpi"><div class="kpi-v">{cout_str}</div><div class="kpi-l">Coût moyen sinistre</div></div>
+  <div class="kpi"><div class="kpi-v">{k.prime_moyenne:,.0f} €</div><div class="kpi-l">Prime moyenne</div></div>
+  <div class="kpi"><div class="kpi-v">{k.taux_sinistralite*100:.1f}%</div><div class="kpi-l">Taux sinistralité</div></div>
+  <div class="kpi"><div class="kpi-v">{k.ratio_sp_median:.2f}x</div><div class="kpi-l">Ratio S/P médian</div></div>
+</div>
+<div class="insight">📌 <strong>{k.sans_sinistre*100:.1f}%</strong> des assurés n'ont déclaré aucun sinistre.</div>
+<div class="insight">⚠️ Ratio S/P médian : <strong>{k.ratio_sp_median:.1f}x</strong>. {k.pct_deficitaires*100:.1f}% des assurés sont déficitaires.</div>
+<div class="insight">💡 B/M moyen : <strong>{k.bm_moyen:.3f}</strong> — {k.pct_malus*100:.1f}% des assurés en malus.</div>
+<div class="graphs">
+"""
+
+    def write(buf):
+        buf.write(_report_head(HTML_PLOTLYJS))
+        buf.write(body.encode('utf-8'))
+        for section, items in sections:
+            buf.write(f'  <h2>{section}</h2>\n  <div class="grid">\n'.encode('utf-8'))
+            for cid, title, _ in items:
+                buf.write(f'    <div class="card"><h3>{title}</h3><div id="{cid}" class="plot">'
+                          f'</div></div>\n'.encode('utf-8'))
+            buf.write(b'  </div>\n')
+        buf.write(b'</div>\n<script>\n')
+        for template in templates:
+            buf.write(f"T.push({template});\n".encode('utf-8'))
+        for _, items in sections:
+            for cid, _, text in items:
+                buf.write(f'R("{cid}",{text});\n'.encode('utf-8'))
+        buf.write(f"""</script>
+<footer>AssurAnalytics · Mastère 2 Big Data & Data Stratégie · Sona KOULIBALY · {len(fdf)} assurés analysés</footer>
+</body>
+</html>""".encode('utf-8'))
+
+    fname = f"rapport_assuranalytics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
+    return dcc.send_bytes(write, fname)
+
+# ════════════════════════════════════════════════════════════════
+# EXPORT PDF
+# ════════════════════════════════════════════════════════════════
+def pdf_report(fdf, claims=None):
+    try:
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib import colors
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.units import inch
+        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+        from reportlab.lib.enums import TA_CENTER, TA_LEFT
+
+        k = portfolio_kpis(fdf)
+        margins = (0.7*inch,) * 4                      # gauche, droite, haut, bas
+        annex = fdf.iloc[:ANNEX_MAX_ROWS]
+
+        elements = []
+        styles = getSampleStyleSheet()
+
+        title_s  = ParagraphStyle('T', parent=styles['Heading1'], fontSize=20,
+                                   textColor=colors.HexColor('#1565C0'), alignment=TA_CENTER, spaceAfter=6)
+        sub_s    = ParagraphStyle('S', parent=styles['Normal'], fontSize=10,
+                                   textColor=colors.HexColor('#718096'), alignment=TA_CENTER, spaceAfter=20)
+        section_s = ParagraphStyle('Sec', parent=styles['Heading2'], fontSize=13,
+                                    textColor=colors.HexColor('#1565C0'), spaceBefore=16, spaceAfter=8)
+        body_s   = ParagraphStyle('B', parent=styles['Normal'], fontSize=9, spaceAfter=4)
+
+        elements.append(Paragraph("RAPPORT ASSURANALYTICS", title_s))
+        elements.append(Paragraph(
+            f"Analyse des Sinistres & Profil des Assurés<br/>Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}",
+            sub_s))
+
+        # KPIs
+        elements.append(Paragraph("Indicateurs Clés", section_s))
+        cout_str = f"{k.cout_moyen:,.0f} €" if k.assures_sinistres else "—"
+        kpi_data = [
+            ['Indicateur', 'Valeur'],
+            ["Nb assurés analysés",        f"{k.assures:,}"],
+            ["Total sinistres",             f"{k.sinistres:,}"],
+            ["Taux de sinistralité",        f"{k.taux_sinistralite*100:.1f}%"],
+            ["Coût moyen sinistre",         cout_str],
+            ["Prime moyenne",               f"{k.prime_moyenne:,.0f} €"],
+            ["Ratio S/P médian",            f"{k.ratio_sp_median:.2f}x"],
+            ["% assurés déficitaires",      f"{k.pct_deficitaires*100:.1f}%"],
+            ["Bonus/Malus moyen",           f"{k.bm_moyen:.3f}"],
+        ]
+        kpi_t = Table(kpi_data, colWidths=[3.5*inch, 2.5*inch])
+        kpi_t.setStyle(TableStyle([
+            ('BACKGROUND',    (0,0),(-1,0), colors.HexColor('#1565C0')),
+            ('TEXTCOLOR',     (0,0),(-1,0), colors.white),
+            ('FONTNAME',      (0,0),(-1,0), 'Helvetica-Bold'),
+            ('FONTSIZE',      (0,0),(-1,-1), 10),
+            ('ALIGN',         (0,0),(-1,-1), 'LEFT'),
+            ('ROWBACKGROUNDS',(0,1),(-1,-1), [colors.white, colors.HexColor('#EBF8FF')]),
+            ('GRID',          (0,0),(-1,-1), 0.5, colors.HexColor('#E2E8F0')),
+            ('BOTTOMPADDING', (0,0),(-1,-1), 6),
+            ('TOPPADDING',    (0,0),(-1,-1), 6),
+        ]))
+        elements.append(kpi_t)
+        elements.append(Spacer(1, 0.2*inch))
+
+        # Agrégat région
+        elements.append(Paragraph("Analyse par Région", section_s))
+        reg = fdf.groupby('region').agg(
+            assures=('id_assure', 'count'),
+            sinistres=('nb_sinistres', 'sum'),
+            montant=('montant_sinistres', 'sum'),
+            prime_moy=('montant_prime', 'mean')
+        ).round(0)
+        reg_data = [['Région', 'Assurés', 'Sinistres', 'Montant (€)', 'Prime moy. (€)']] + [
+            [region, *(f"{int(v):,}" for v in values)]
+            for region, values in zip(reg.index.astype(str), reg.to_numpy())
+        ]
+        reg_t = Table(reg_data)
+        reg_t.setStyle(TableStyle([
+            ('BACKGROUND',    (0,0),(-1,0), colors.HexColor('#1565C0')),
+            ('TEXTCOLOR',     (0,0),(-1,0), colors.white),
+            ('FONTNAME',      (0,0),(-1,0), 'Helvetica-Bold'),
+            ('FONTSIZE',      (0,0),(-1,-1), 9),
+            ('ALIGN',         (0,0),(-1,-1), 'CENTER'),
+            ('ROWBACKGROUNDS',(0,1),(-1,-1), [colors.white, colors.HexColor('#EBF8FF')]),
+            ('GRID',          (0,0),(-1,-1), 0.5, colors.HexColor('#E2E8F0')),
+        ]))
+        elements.append(reg_t)
+        elements.append(Spacer(1, 0.2*inch))
+
+        # Chapitres par segment : type, tranche d'âge, catégorie B/M
+        for col, title in CHAPTERS:
+            if col not in fdf.columns:
+                continue
+            elements.append(Paragraph(title, section_s))
+            seg_t = Table(segment_table(fdf, col), repeatRows=1)
+            seg_t.setStyle(TableStyle([
+                ('BACKGROUND',    (0,0),(-1,0), colors.HexColor('#1565C0')),
+                ('TEXTCOLOR',     (0,0),(-1,0), colors.white),
+                ('FONTNAME',      (0,0),(-1,0), 'Helvetica-Bold'),
+                ('FONTSIZE',      (0,0),(-1,-1), 7.5),
+                ('ALIGN',         (1,0),(-1,-1), 'RIGHT'),
+                ('ROWBACKGROUNDS',(0,1),(-1,-1), [colors.white, colors.HexColor('#EBF8FF')]),
+                ('GRID',          (0,0),(-1,-1), 0.5, colors.HexColor('#E2E8F0')),
+            ]))
+            elements.append(seg_t)
+            elements.append(Spacer(1, 0.2*inch))
+
+        # Risque agrégé : simulation Monte Carlo de la sélection exportée
+        if k.sinistres > 0:
+            mc = aggregate_loss_report(fdf, scenarios=EXPORT_SCENARIOS, workers=1, claims=claims)
+            var_hi = f'VaR {VAR_LEVELS[-1] * 100:g} %'
+            tvar_hi = f'TVaR {TVAR_LEVELS[-1] * 100:g} %'
+            elements.append(Paragraph("Risque Agrégé — Simulation Monte Carlo", section_s))
+            elements.append(Paragraph(
+                f"Charge sinistres de l'an prochain sur {EXPORT_SCENARIOS:,} scénarios "
+                f"(Poisson × Gamma par segment région × type).", body_s))
+            mc_data = [['Périmètre', 'Primes (€)', 'Charge moy. (€)', f'{var_hi} (€)',
+                        f'{tvar_hi} (€)', 'Capital (€)']]
+            for label, row in mc['table'].iterrows():
+                mc_data.append([label] + [f"{int(row[k]):,}" for k in
+                                          ('primes', 'perte_moyenne', var_hi, tvar_hi, 'capital')])
+            mc_t = Table(mc_data)
+            mc_t.setStyle(TableStyle([
+                ('BACKGROUND',    (0,0),(-1,0), colors.HexColor('#1565C0')),
+                ('TEXTCOLOR',     (0,0),(-1,0), colors.white),
+                ('FONTNAME',      (0,0),(-1,0), 'Helvetica-Bold'),
+                ('FONTNAME',      (0,1),(-1,1), 'Helvetica-Bold'),
+                ('FONTSIZE',      (0,0),(-1,-1), 8),
+                ('ALIGN',         (1,0),(-1,-1), 'RIGHT'),
+                ('ROWBACKGROUNDS',(0,1),(-1,-1), [colors.white, colors.HexColor('#EBF8FF')]),
+                ('GRID',          (0,0),(-1,-1), 0.5, colors.HexColor('#E2E8F0')),
+            ]))
+            elements.append(mc_t)
+            elements.append(Spacer(1, 0.2*inch))
+
+        # Insights
+        elements.append(Paragraph("Insights & Recommandations", section_s))
+        insights_txt = [
+            f"• {k.sans_sinistre*100:.1f}% des assurés n'ont déclaré aucun sinistre.",
+            f"• Ratio S/P médian : {k.ratio_sp_median:.1f}x — {k.pct_deficitaires*100:.1f}% des assurés sont déficitaires.",
+            f"• B/M moyen : {k.bm_moyen:.3f} — {k.pct_malus*100:.1f}% des assurés en malus.",
+            f"• Le coût moyen ({k.sinistre_moyen:,.0f} €) dépasse la prime moyenne de {k.charge_sur_prime:.1f}x.",
+        ]
+        for txt in insights_txt:
+            elements.append(Paragraph(txt, body_s))
+
+        if len(annex):
+            truncated = (f" (limitée aux {ANNEX_MAX_ROWS:,} premiers contrats sur {len(fdf):,} — "
+                         f"liste complète : export Parquet / Arrow)" if len(fdf) > len(annex) else "")
+            elements.append(Paragraph(
+                f"• Annexe : liste des {len(annex):,} contrats de la sélection, "
+                f"{annex_pages(len(annex)):,} page(s){truncated}.", body_s))
+
+        elements.append(Spacer(1, 0.2*inch))
+        elements.append(Paragraph(
+            f"© 2025 AssurAnalytics — Mastère 2 Big Data & Data Stratégie — Sona KOULIBALY",
+            ParagraphStyle('foot', parent=styles['Normal'], fontSize=8,
+                            textColor=colors.HexColor('#718096'), alignment=TA_CENTER)
+        ))
+
+        def compose(extra=()):
+            buf = io.BytesIO()
+            doc = SimpleDocTemplate(buf, pagesize=A4,
+                                    leftMargin=margins[0], rightMargin=margins[1],
+                                    topMargin=margins[2], bottomMargin=margins[3])
+            doc.build(elements + list(extra))
+            return buf.getvalue()
+
+        # Grosse annexe : pages rendues en parallèle puis fusionnées ;
+        # sinon ajoutées au document principal
+        if parallel_available(len(annex)):
+            content = render_with_annex(annex, margins, compose)
+        else:
+            content = compose(annex_flowables(annex))
+        fname = f"rapport_assuranalytics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+        return dcc.send_bytes(content, fname)
+
+    except ImportError:
+        return dict(content="⚠️ reportlab non installé. Installez-le avec : pip install reportlab",
+                    filename="erreur.txt")
+    except Exception as e:
+        return dict(content=f"Erreur PDF : {str(e)}", filename="erreur.txt")
+
+
+# ════════════════════════════════════════════════════════════════
+# EXPORTS COLONNAIRES (PARQUET / ARROW IPC)
+# ════════════════════════════════════════════════════════════════
+ROW_GROUP_SIZE = int(os.environ.get('ASSUR_ROW_GROUP_SIZE', 262_144))
+EXPORT_COMPRESSIONS = {
+    'zstd': "Zstd",
+    'lz4':  "LZ4",
+    'none': "Sans compression",
+}
+EXPORT_COMPRESSION_DEFAULT = 'zstd'
+
+
+class ExportColumns:
+
+    # Une passe au démarrage : numériques et dates gardés tels quels (vues),
+    # catégorielles → codes + modalités, textes → dictionnaire (pd.factorize)
+    def __init__(self, df):
+        self.n = len(df)
+        self.columns = {}
+        for col in df.columns:
+            s = df[col]
+            if isinstance(s.dtype, pd.CategoricalDtype):
+                self.columns[col] = (s.cat.codes.to_numpy(),
+                                     [str(c) for c in s.cat.categories], s.cat.ordered)
+            elif s.dtype == object:
+                codes, uniques = pd.factorize(s)
+                self.columns[col] = (codes.astype(np.int32), [str(u) for u in uniques], False)
+            else:
+                self.columns[col] = (s.to_numpy(), None, False)
+
+    # rows : positions retenues → record batches de ROW_GROUP_SIZE lignes.
+    # Portefeuille complet : tranches contiguës (vues, aucune copie) ;
+    # sinon seules les lignes du lot sont rassemblées.
+    def batches(self, rows, size=ROW_GROUP_SIZE):
+        import pyarrow as pa
+        everything = len(rows) == self.n
+        dictionaries = {col: pa.array(labels, type=pa.string())
+                        for col, (_, labels, _) in self.columns.items() if labels is not None}
+        for start in range(0, max(len(rows), 1), size):
+            part = slice(start, start + size) if everything else rows[start:start + size]
+            arrays = []
+            for col, (values, labels, ordered) in self.columns.items():
+                chunk = values[part]
+                if labels is None:
+                    arrays.append(pa.array(chunk, from_pandas=True))
+                else:
+                    arrays.append(pa.DictionaryArray.from_arrays(
+                        pa.array(chunk, mask=chunk < 0), dictionaries[col], ordered=ordered))
+            yield pa.RecordBatch.from_arrays(arrays, names=list(self.columns))
+
+
+def _missing_pyarrow():
+    return dict(content="⚠️ pyarrow non installé. Installez-le avec : pip install pyarrow",
+                filename="erreur.txt")
+
+
+def _compression(compression):
+    return compression if compression in EXPORT_COMPRESSIONS else EXPORT_COMPRESSION_DEFAULT
+
+
+def parquet_export(columns, rows, compression=EXPORT_COMPRESSION_DEFAULT):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return _missing_pyarrow()
+    sink = pa.BufferOutputStream()
+    writer = None
+    for batch in columns.batches(rows):
+        if writer is None:
+            writer = pq.ParquetWriter(sink, batch.schema, compression=_compression(compression))
+        writer.write_batch(batch, row_group_size=ROW_GROUP_SIZE)
+    writer.close()
+    fname = f"assuranalytics_{datetime.now().strftime('%Y%m%d_%H%M')}.parquet"
+    return dcc.send_bytes(sink.getvalue().to_pybytes(), fname)
+
+
+def arrow_export(columns, rows, compression=EXPORT_COMPRESSION_DEFAULT):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return _missing_pyarrow()
+    compression = _compression(compression)
+    options = pa.ipc.IpcWriteOptions(compression=None if compression == 'none' else compression)
+    sink = pa.BufferOutputStream()
+    writer = None
+    for batch in columns.batches(rows):
+        if writer is None:
+            writer = pa.ipc.new_file(sink, batch.schema, options=options)
+        writer.write_batch(batch)
+    writer.close()
+    fname = f"assuranalytics_{datetime.now().strftime('%Y%m%d_%H%M')}.arrow"
+    return dcc.send_bytes(sink.getvalue().to_pybytes(), fname)
+
+
+# Format → (libellé affiché, constructeur)
+EXPORTS = {
+    'excel':   ('Excel',   excel_report),
+    'html':    ('HTML',    html_report),
+    'pdf':     ('PDF',     pdf_report),
+    'parquet': ('Parquet', parquet_export),
+    'arrow':   ('Arrow',   arrow_export),
+}
+# Formats construits depuis les colonnes (ExportColumns + positions retenues)
+COLUMNAR_EXPORTS = {'parquet', 'arrow'}
+# Formats illustrés par les graphiques du tableau de bord (sélection, figures)
+FIGURE_EXPORTS = {'html'}
@@ -0,0 +1,79 @@
+# =============================================================
+#  fingerprints.py  —  Sorties inchangées ni construites ni renvoyées (clés)
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+#  Un changement de filtre laisse souvent une partie des sorties du callback
+#  principal identiques (camembert des types quand les 4 types sont cochés,
+#  KPIs qui reviennent, même page du tableau). Chaque sortie reçoit une clé :
+#  l'empreinte de ce dont elle est construite — réductions crossfilter lues,
+#  lignes de sa vue, brosses qu'elle met en avant (callbacks.py). Tableaux
+#  NumPy hachés sur leurs octets, le reste par l'encodeur JSON natif.
+#  Une sortie dont la clé est celle déjà affichée n'est pas construite et part
+#  en no_update : ni calculée, ni sérialisée, ni transmise, ni redessinée.
+#  Les clés affichées vivent dans un dcc.Store du navigateur, renvoyé avec les
+#  sorties : il reflète toujours l'écran de la session, quel que soit le
+#  worker gunicorn qui répond, même si une réponse est abandonnée.
+
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+from dash import no_update
+from plotly.basedatatypes import BaseFigure
+
+
+FINGERPRINT_STORE = ('dashboard-fingerprints', 'data')
+
+
+# Parcours par l'encodeur JSON natif (C, clés triées) sans construire le JSON
+# des tableaux : leurs octets vont directement au hachage, à leur place dans
+# l'ordre de parcours, le texte n'en garde qu'un repère (type, forme).
+def fingerprint(value):
+    h = hashlib.blake2b(digest_size=10)
+
+    def default(obj):
+        # Figure lue sur place : to_plotly_json() en ferait une copie profonde
+        if isinstance(obj, BaseFigure):
+            return {'data': obj._data, 'layout': obj._layout}
+        if hasattr(obj, 'to_plotly_json'):
+            return obj.to_plotly_json()
+        if isinstance(obj, (pd.Series, pd.Index)):
+            obj = obj.to_numpy()
+        if isinstance(obj, np.ndarray):
+            if obj.dtype == object:
+                return obj.tolist()
+            h.update(np.ascontiguousarray(obj).tobytes())
+            return f"<{obj.dtype.str}{obj.shape}>"
+        if isinstance(obj, np.generic):
+            return obj.item()
+        return f"{type(obj).__name__}:{obj!r}"
+
+    text = json.dumps(value, default=default, sort_keys=True, ensure_ascii=False)
+    h.update(text.encode('utf-8', 'surrogatepass'))
+    return h.hexdigest()
+
+
+# keys : clés des sorties ; shown : clés affichées (store du navigateur)
+# → sorties à ne pas construire
+def unchanged(keys, shown):
+    shown = shown or {}
+    return {cid for cid, key in keys.items() if shown.get(cid) == key}
+
+
+# out : sorties construites (no_update si sautées) → valeurs à renvoyer et
+# nouvelles clés affichées (no_update si aucune ne change)
+def changed_outputs(out, ids, keys, shown):
+    shown = shown or {}
+    sent = {cid: shown[cid] for cid in ids if cid in shown}
+    values = []
+    for cid in ids:
+        value = out.get(cid, no_update)
+        if value is not no_update:
+            if shown.get(cid) == keys[cid]:
+                value = no_update
+            else:
+                sent[cid] = keys[cid]
+        values.append(value)
+    return values, (sent if sent != shown else no_update)
@@ -0,0 +1,174 @@
+# =============================================================
+#  geography.py  —  Hiérarchie géographique (région → département → commune)
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+#  Niveaux présents dans le fichier, dans l'ordre de GEO_LEVELS (la colonne
+#  'region' seule suffit ; 'departement' puis 'commune' ajoutent des niveaux).
+#  Chaque nœud est identifié par son chemin complet (un même nom de
+#  département dans deux régions donne deux nœuds). La feuille d'une ligne
+#  est son nœud au niveau le plus fin : le moteur crossfilter agrège par
+#  feuille (groupe 'geo'), et chaque niveau s'en déduit par un bincount sur
+#  la table précalculée feuille → nœud — aucun regroupement des lignes.
+#  Drill-down : tant qu'un seul nœud est retenu à un niveau (filtre région du
+#  panneau ou brosse du graphique), on affiche ses enfants.
+#  Couleurs générées depuis les données : palette fixe
+#  pour les régions connues, couleur stable (hash du nom) pour les autres,
+#  nuances de la couleur de la région pour les niveaux inférieurs.
+
+import zlib
+
+import numpy as np
+import pandas as pd
+
+
+GEO_LEVELS = [
+    ('region',      "Région"),
+    ('departement', "Département"),
+    ('commune',     "Commune"),
+]
+MISSING = "Non renseigné"
+
+REGION_COLORS = {
+    'Dakar':       '#1565C0',
+    'Thiès':       '#FFB300',
+    'Kaolack':     '#00E676',
+    'Saint-Louis': '#FF5252',
+}
+REGION_ICONS = {
+    'Dakar':       '🏙️',
+    'Kaolack':     '🌿',
+    'Saint-Louis': '🌊',
+    'Thiès':       '🌳',
+}
+GEO_PALETTE = ['#8E24AA', '#00897B', '#F4511E', '#3949AB',
+               '#C0CA33', '#6D4C41', '#D81B60', '#039BE5']
+
+
+def _hash(label):
+    return zlib.crc32(str(label).encode('utf-8'))
+
+
+def region_color(region):
+    return REGION_COLORS.get(region) or GEO_PALETTE[_hash(region) % len(GEO_PALETTE)]
+
+
+# Nuance (éclaircissement 15 à 65 %) stable pour un libellé donné
+def _shade(color, label):
+    t = 0.15 + 0.5 * (_hash(label) % 101) / 100
+    rgb = [int(color[i:i + 2], 16) for i in (1, 3, 5)]
+    return '#' + ''.join(f"{round(c + (255 - c) * t):02X}" for c in rgb)
+
+
+# Niveaux contigus présents dans le DataFrame
+def geo_levels(df):
+    levels = []
+    for col, _ in GEO_LEVELS:
+        if col not in df.columns:
+            break
+        levels.append(col)
+    return levels
+
+
+class GeoHierarchy:
+
+    def __init__(self, df):
+        self.levels = geo_levels(df)
+        self.labels, self.parent, self.root = {}, {}, {}
+        node, prev = np.zeros(len(df), dtype=np.int64), None
+        for col in self.levels:
+            values = df[col].astype(str).where(df[col].notna(), MISSING)
+            codes, labels = pd.factorize(values, sort=True)
+            if prev is None:
+                node = codes.astype(np.int64)
+                self.labels[col] = [str(l) for l in labels]
+                self.parent[col] = None
+                self.root[col] = np.arange(len(labels))
+            else:
+                # Nœud = (nœud parent, libellé) ; np.unique trie par parent puis libellé
+                uniq, node = np.unique(node * len(labels) + codes, return_inverse=True)
+                node = node.astype(np.int64)
+                self.parent[col] = uniq // len(labels)
+                self.labels[col] = [str(labels[c]) for c in uniq % len(labels)]
+                self.root[col] = self.root[prev][self.parent[col]]
+            prev = col
+        self.leaf = node                                  # ligne → feuille
+        self.n_leaves = len(self.labels[prev]) if prev else 1
+
+        # Rollups précalculés : feuille → nœud de chaque niveau
+        self.up = {}
+        if prev:
+            self.up[prev] = np.arange(self.n_leaves)
+            for upper, lower in zip(self.levels[-2::-1], self.levels[:0:-1]):
+                self.up[upper] = self.parent[lower][self.up[lower]]
+
+    @property
+    def sublevels(self):
+        return self.levels[1:]
+
+    def label(self, depth):
+        return dict(GEO_LEVELS)[self.levels[depth]]
+
+    def find(self, depth, label, parent=None):
+        col = self.levels[depth]
+        for k, l in enumerate(self.labels[col]):
+            if l == label and (parent is None or self.parent[col][k] == parent):
+                return k
+        return None
+
+    def color(self, depth, node):
+        col = self.levels[depth]
+        base = region_color(self.labels['region'][self.root[col][node]])
+        return base if depth == 0 else _shade(base, self.labels[col][node])
+
+    # ════════════════════════════════════════════════════════
+    # DRILL-DOWN
+    # ════════════════════════════════════════════════════════
+    # Niveau affiché : on descend tant qu'un seul nœud est retenu
+    # (brosse du niveau, sinon filtre région du panneau pour le premier)
+    def drill(self, region_vals=None, selection=None):
+        selection = selection or {}
+        depth, parent = 0, None
+        while depth + 1 < len(self.levels):
+            vals = selection.get(self.levels[depth]) or (region_vals if depth == 0 else None) or []
+            node = self.find(depth, str(vals[0]), parent) if len(vals) == 1 else None
+            if node is None:
+                break
+            depth, parent = depth + 1, node
+        return depth, parent
+
+    # Chemin des nœuds parents (fil d'Ariane)
+    def path(self, depth, parent):
+        out = []
+        while depth > 0 and parent is not None:
+            col = self.levels[depth - 1]
+            out.insert(0, self.labels[col][parent])
+            parent = self.parent[col][parent] if self.parent[col] is not None else None
+            depth -= 1
+        return out
+
+    # Réduction par feuille (groupe crossfilter) → enfants du nœud parent
+    def rollup(self, result, depth, parent=None):
+        col = self.levels[depth]
+        K = len(self.labels[col])
+        keep = (np.arange(K) if parent is None
+                else np.flatnonzero(self.parent[col] == parent))
+        frame = pd.DataFrame({c: np.bincount(self.up[col], weights=v, minlength=K)[keep]
+                              for c, v in result.items()},
+                             index=[self.labels[col][k] for k in keep])
+        frame['color'] = [self.color(depth, k) for k in keep]
+        return frame
+
+    # Description envoyée au navigateur (mêmes tables, pour le pie région)
+    def describe(self):
+        return {
+            'levels': self.levels,
+            'names':  [dict(GEO_LEVELS)[c] for c in self.levels],
+            'labels': [self.labels[c] for c in self.levels],
+            'parent': [None if self.parent[c] is None else self.parent[c].tolist()
+                       for c in self.levels],
+            'up':     [self.up[c].tolist() for c in self.levels],
+            'colors': [[self.color(d, k) for k in range(len(self.labels[c]))]
+                       for d, c in enumerate(self.levels)],
+            'n_leaves': self.n_leaves,
+        }
@@ -0,0 +1,115 @@
+# =============================================================
+#  kpis.py  —  Noyau de calcul des indicateurs du portefeuille
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+#  Un seul calcul des KPIs pour une sélection, partagé par le tableau de bord,
+#  les insights et les exports (Excel, HTML, PDF) : les fichiers exportés
+#  affichent exactement les valeurs de l'écran.
+#  Les colonnes sont lues une fois en tableaux NumPy contigus ; le résultat ne
+#  garde que des sommes et des comptes, les taux et moyennes en sont dérivés
+#  (propriétés) — aucune moyenne recalculée ailleurs sur le DataFrame.
+
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class PortfolioKPIs:
+    assures: int
+    sinistres: int                      # nombre total de sinistres déclarés
+    assures_sinistres: int              # assurés avec au moins un sinistre
+    montant_sinistres: float
+    montant_sinistres_sinistres: float  # montant des seuls assurés sinistrés (coût moyen)
+    primes: float
+    bm_total: float
+    deficitaires: int                   # ratio S/P > 1
+    en_malus: int                       # B/M > 1
+    ratio_sp_median: float
+    score_total: float = np.nan
+    prime_pure_total: float = np.nan
+
+    @staticmethod
+    def _div(a, b):
+        return a / b if b else np.nan
+
+    @property
+    def taux_sinistralite(self):
+        return self._div(self.assures_sinistres, self.assures)
+
+    @property
+    def sans_sinistre(self):
+        return self._div(self.assures - self.assures_sinistres, self.assures)
+
+    @property
+    def cout_moyen(self):
+        return self._div(self.montant_sinistres_sinistres, self.assures_sinistres)
+
+    @property
+    def prime_moyenne(self):
+        return self._div(self.primes, self.assures)
+
+    @property
+    def sinistre_moyen(self):
+        return self._div(self.montant_sinistres, self.assures)
+
+    @property
+    def charge_sur_prime(self):
+        return self._div(self.montant_sinistres, self.primes)
+
+    @property
+    def bm_moyen(self):
+        return self._div(self.bm_total, self.assures)
+
+    @property
+    def pct_deficitaires(self):
+        return self._div(self.deficitaires, self.assures)
+
+    @property
+    def pct_malus(self):
+        return self._div(self.en_malus, self.assures)
+
+    @property
+    def score_moyen(self):
+        return self._div(self.score_total, self.assures)
+
+    @property
+    def prime_pure_moyenne(self):
+        return self._div(self.prime_pure_total, self.assures)
+
+    # Primes payées / prime pure modélisée
+    @property
+    def couverture_prime_pure(self):
+        return self._div(self.primes, self.prime_pure_total)
+
+
+# ════════════════════════════════════════════════════════════════
+# NOYAU
+# ════════════════════════════════════════════════════════════════
+def portfolio_kpis(fdf):
+    nb = fdf['nb_sinistres'].to_numpy()
+    s = fdf['montant_sinistres'].to_numpy(dtype=np.float64)
+    bm = fdf['bonus_malus'].to_numpy(dtype=np.float64)
+    ratio = fdf['ratio_SP'].to_numpy(dtype=np.float64)
+    claimed = nb > 0
+    valid = ratio[~np.isnan(ratio)]
+    extra = {}
+    if 'score_risque' in fdf.columns:
+        extra['score_total'] = float(fdf['score_risque'].to_numpy(dtype=np.float64).sum())
+    if 'prime_pure' in fdf.columns:
+        extra['prime_pure_total'] = float(fdf['prime_pure'].to_numpy(dtype=np.float64).sum())
+    return PortfolioKPIs(
+        assures=len(fdf),
+        sinistres=int(nb.sum()),
+        assures_sinistres=int(np.count_nonzero(claimed)),
+        montant_sinistres=float(s.sum()),
+        montant_sinistres_sinistres=float(s[claimed].sum()),
+        primes=float(fdf['montant_prime'].to_numpy(dtype=np.float64).sum()),
+        bm_total=float(bm.sum()),
+        deficitaires=int(np.count_nonzero(ratio > 1)),
+        en_malus=int(np.count_nonzero(bm > 1)),
+        # Médiane par sélection partielle (O(n)), valeurs manquantes ignorées
+        ratio_sp_median=float(np.median(valid)) if len(valid) else np.nan,
+        **extra,
+    )
@@ -7,9 +7,23 @@
 import dash_bootstrap_components as dbc
 from dash import html, dcc
 
+from callbacks import TYPE_COLORS
+from catalogue import (options, slider, distinct_values, type_label, sexe_label, region_label,
+                       sinistres_label)
+from exports import EXPORT_COMPRESSIONS, EXPORT_COMPRESSION_DEFAULT
+from policies import TOP_N, TOP_METRICS, TOP_METRIC_DEFAULT
 
-def create_layout():
-    return dbc.Container([
+
+# columnar : jeu encodé par clientside.encode_columnar (mode navigateur), sinon None
+# initial  : état précalculé {id: {propriété: valeur}} du portefeuille non filtré
+# catalogue : catalogue des dimensions (catalogue.load_catalogue) — options avec effectifs,
+#             bornes des sliders ; aucune lecture des données au rendu
+def create_layout(columnar=None, initial=None, catalogue=None):
+    catalogue = catalogue or {}
+    types = distinct_values(catalogue, 'type_assurance')
+    age = catalogue.get('age') or {'min': 0, 'max': 0, 'mean': float('nan')}
+
+    layout = dbc.Container([
 
         # ══════════════════════════════════════════════════════
         # HEADER
@@ -46,6 +60,25 @@ def create_layout():
                         ], id='btn-download-pdf', color="danger",
                            size="sm", className='export-btn ms-2'),
 
+                        dbc.Button([
+                            html.I(className="fas fa-database me-1"), "Parquet"
+                        ], id='btn-download-parquet', color="primary",
+                           size="sm", className='export-btn ms-2'),
+
+                        dbc.Button([
+                            html.I(className="fas fa-table me-1"), "Arrow"
+                        ], id='btn-download-arrow', color="secondary",
+                           size="sm", className='export-btn ms-2'),
+
+                        # Compression des exports Parquet / Arrow
+                        dbc.Select(
+                            id='export-compression',
+                            options=[{'label': label, 'value': value}
+                                     for value, label in EXPORT_COMPRESSIONS.items()],
+                            value=EXPORT_COMPRESSION_DEFAULT,
+                            size="sm", className='export-compression ms-2'
+                        ),
+
                         html.A([
                             html.I(className="fas fa-sync-alt me-1"), "Actualiser"
                         ], href='/', className='btn btn-light btn-sm export-btn ms-3',
@@ -53,10 +86,34 @@ def create_layout():
 
                     ], className='export-buttons'),
 
+                    # État de la file d'exports (en file, en préparation, file pleine)
+                    html.Div(id='export-status', className='export-status'),
+
                     # Composants de téléchargement
                     dcc.Download(id="download-excel"),
                     dcc.Download(id="download-html"),
                     dcc.Download(id="download-pdf"),
+                    dcc.Download(id="download-parquet"),
+                    dcc.Download(id="download-arrow"),
+
+                    # Jobs d'export en cours et interrogation périodique de leur état
+                    dcc.Store(id="export-jobs", data=[], storage_type='memory'),
+                    dcc.Interval(id="export-poll", interval=1000, disabled=True),
+
+                    # Données colonnaires (mode filtrage navigateur)
+                    dcc.Store(id="store-columnar", data=columnar, storage_type='memory'),
+
+                    # Sélection brossée sur les graphiques (filtrage croisé)
+                    dcc.Store(id="crossfilter-selection", data={}, storage_type='memory'),
+
+                    # Cohortes figées pour la comparaison côte à côte
+                    dcc.Store(id="cohorts-store", data=[], storage_type='memory'),
+
+                    # Règles d'ajustement tarifaire appliquées (simulateur)
+                    dcc.Store(id="pricing-rules", data=[], storage_type='memory'),
+
+                    # Empreintes des sorties affichées du tableau de bord (no_update si inchangées)
+                    dcc.Store(id="dashboard-fingerprints", data={}, storage_type='memory'),
 
                 ], className='header-container')
             ], width=12)
@@ -110,12 +167,7 @@ def create_layout():
                             ], className='filter-label'),
                             dcc.Dropdown(
                                 id='type-filter',
-                                options=[
-                                    {'label': '🚗 Auto',        'value': 'Auto'},
-                                    {'label': '🏥 Santé',       'value': 'Santé'},
-                                    {'label': '🏠 Habitation',  'value': 'Habitation'},
-                                    {'label': '❤️ Vie',         'value': 'Vie'},
-                                ],
+                                options=options(catalogue, 'type_assurance', type_label),
                                 multi=True,
                                 placeholder="Tous les types",
                                 className='custom-dropdown'
@@ -130,10 +182,7 @@ def create_layout():
                             ], className='filter-label'),
                             dcc.Dropdown(
                                 id='sexe-filter',
-                                options=[
-                                    {'label': '👨 Masculin', 'value': 'masculin'},
-                                    {'label': '👩 Féminin',  'value': 'feminin'},
-                                ],
+                                options=options(catalogue, 'sexe', sexe_label),
                                 multi=True,
                                 placeholder="Tous",
                                 className='custom-dropdown'
@@ -148,12 +197,7 @@ def create_layout():
                             ], className='filter-label'),
                             dcc.Dropdown(
                                 id='region-filter',
-                                options=[
-                                    {'label': '🏙️ Dakar',        'value': 'Dakar'},
-                                    {'label': '🌿 Kaolack',      'value': 'Kaolack'},
-                                    {'label': '🌊 Saint-Louis',  'value': 'Saint-Louis'},
-                                    {'label': '🌳 Thiès',        'value': 'Thiès'},
-                                ],
+                                options=options(catalogue, 'region', region_label),
                                 multi=True,
                                 placeholder="Toutes les régions",
                                 className='custom-dropdown'
@@ -168,13 +212,7 @@ def create_layout():
                             ], className='filter-label'),
                             dcc.Dropdown(
                                 id='sinistres-filter',
-                                options=[
-                                    {'label': '0 sinistre',   'value': '0'},
-                                    {'label': '1 sinistre',   'value': '1'},
-                                    {'label': '2 sinistres',  'value': '2'},
-                                    {'label': '3 sinistres',  'value': '3'},
-                                    {'label': '4+ sinistres', 'value': '4'},
-                                ],
+                                options=options(catalogue, 'nb_sinistres', sinistres_label),
                                 multi=True,
                                 placeholder="Tous",
                                 className='custom-dropdown'
@@ -189,9 +227,7 @@ def create_layout():
                             ], className='filter-label'),
                             dcc.RangeSlider(
                                 id='age-filter',
-                                min=18, max=79, step=1,
-                                value=[18, 79],
-                                marks={18: '18', 35: '35', 50: '50', 65: '65', 79: '79'},
+                                **slider(catalogue, 'age'),
                                 tooltip={"placement": "bottom", "always_visible": True}
                             )
                         ], className='filter-group'),
@@ -204,9 +240,7 @@ def create_layout():
                             ], className='filter-label'),
                             dcc.RangeSlider(
                                 id='bm-filter',
-                                min=0.5, max=1.5, step=0.05,
-                                value=[0.5, 1.5],
-                                marks={0.5: '0.5', 1.0: '1.0', 1.5: '1.5'},
+                                **slider(catalogue, 'bonus_malus'),
                                 tooltip={"placement": "bottom", "always_visible": True}
                             )
                         ], className='filter-group'),
@@ -222,6 +256,22 @@ def create_layout():
                             n_clicks=0
                         ),
 
+                        # — Sélection graphique (filtrage croisé) —
+                        html.Div([
+                            html.P("Sélection graphique", className='filter-label mt-3'),
+                            html.Div(id='selection-chips', className='selection-chips'),
+                            dbc.Button([
+                                html.I(className="fas fa-eraser me-2"),
+                                "Effacer la sélection"
+                            ],
+                                id='clear-selection',
+                                color="light",
+                                size="sm",
+                                className='reset-btn w-100 mt-2',
+                                n_clicks=0
+                            ),
+                        ], className='filter-group'),
+
                         # Séparateur
                         html.Hr(style={"margin": "18px 0", "borderColor": "#e2e8f0"}),
 
@@ -229,10 +279,8 @@ def create_layout():
                         html.Div([
                             html.P("Légende types", className='filter-label'),
                             html.Div([
-                                html.Span("🚗 Auto",       style={"color":"#00C6FF","fontWeight":"600","fontSize":"0.78rem","display":"block"}),
-                                html.Span("🏥 Santé",      style={"color":"#FFB300","fontWeight":"600","fontSize":"0.78rem","display":"block"}),
-                                html.Span("🏠 Habitation", style={"color":"#00E676","fontWeight":"600","fontSize":"0.78rem","display":"block"}),
-                                html.Span("❤️ Vie",        style={"color":"#FF5252","fontWeight":"600","fontSize":"0.78rem","display":"block"}),
+                                html.Span(type_label(t), style={"color":TYPE_COLORS.get(t, '#888'),"fontWeight":"600","fontSize":"0.78rem","display":"block"})
+                                for t in types
                             ])
                         ])
 
@@ -254,7 +302,8 @@ def create_layout():
                                     html.Div([
                                         html.H3("—", id='kpi-total-assures', className='kpi-value'),
                                         html.P("Total Assurés", className='kpi-label'),
-                                        html.Small("", id='trend-assures', className='kpi-trend')
+                                        html.Small("", id='trend-assures', className='kpi-trend'),
+                                        html.Small("", id='ci-assures', className='kpi-ci')
                                     ])
                                 ], className='kpi-content')
                             ])
@@ -272,7 +321,8 @@ def create_layout():
                                     html.Div([
                                         html.H3("—", id='kpi-total-sinistres', className='kpi-value'),
                                         html.P("Total Sinistres", className='kpi-label'),
-                                        html.Small("", id='trend-sinistres', className='kpi-trend')
+                                        html.Small("", id='trend-sinistres', className='kpi-trend'),
+                                        html.Small("", id='ci-sinistres', className='kpi-ci')
                                     ])
                                 ], className='kpi-content')
                             ])
@@ -290,7 +340,8 @@ def create_layout():
                                     html.Div([
                                         html.H3("—", id='kpi-cout-moyen', className='kpi-value'),
                                         html.P("Coût Moyen Sinistre", className='kpi-label'),
-                                        html.Small("", id='trend-cout', className='kpi-trend')
+                                        html.Small("", id='trend-cout', className='kpi-trend'),
+                                        html.Small("", id='ci-cout', className='kpi-ci')
                                     ])
                                 ], className='kpi-content')
                             ])
@@ -308,7 +359,8 @@ def create_layout():
                                     html.Div([
                                         html.H3("—", id='kpi-prime-moy', className='kpi-value'),
                                         html.P("Prime Moyenne", className='kpi-label'),
-                                        html.Small("", id='trend-prime', className='kpi-trend')
+                                        html.Small("", id='trend-prime', className='kpi-trend'),
+                                        html.Small("", id='ci-prime', className='kpi-ci')
                                     ])
                                 ], className='kpi-content')
                             ])
@@ -327,6 +379,7 @@ def create_layout():
                                 html.Div([
                                     html.Span("", id='kpi-taux-sinistralite', className='kpi-mini-value'),
                                     html.Span("Taux sinistralité", className='kpi-mini-label'),
+                                    html.Small("", id='ci-taux-sinistralite', className='kpi-ci'),
                                 ])
                             ])
                         ], className='kpi-mini kpi-mini-orange')
@@ -337,6 +390,7 @@ def create_layout():
                                 html.Div([
                                     html.Span("", id='kpi-ratio-sp', className='kpi-mini-value'),
                                     html.Span("Ratio S/P médian", className='kpi-mini-label'),
+                                    html.Small("", id='ci-ratio-sp', className='kpi-ci'),
                                 ])
                             ])
                         ], className='kpi-mini kpi-mini-red')
@@ -347,6 +401,7 @@ def create_layout():
                                 html.Div([
                                     html.Span("", id='kpi-bm-moyen', className='kpi-mini-value'),
                                     html.Span("B/M moyen", className='kpi-mini-label'),
+                                    html.Small("", id='ci-bm-moyen', className='kpi-ci'),
                                 ])
                             ])
                         ], className='kpi-mini kpi-mini-blue')
@@ -357,6 +412,7 @@ def create_layout():
                                 html.Div([
                                     html.Span("", id='kpi-pct-deficit', className='kpi-mini-value'),
                                     html.Span("% assurés déficitaires", className='kpi-mini-label'),
+                                    html.Small("", id='ci-pct-deficit', className='kpi-ci'),
                                 ])
                             ])
                         ], className='kpi-mini kpi-mini-purple')
@@ -383,7 +439,7 @@ def create_layout():
                             dbc.CardBody([
                                 dcc.Graph(id='chart-type-pie', config={'displayModeBar': False}),
                                 html.P(
-                                    "📊 Comparaison — Équilibre entre les 4 types (Auto, Santé, Habitation, Vie)",
+                                    f"📊 Comparaison — Équilibre entre les {len(types)} types ({', '.join(types)})",
                                     className='chart-description'
                                 )
                             ])
@@ -399,7 +455,8 @@ def create_layout():
                             dbc.CardBody([
                                 dcc.Graph(id='chart-age-dist', config={'displayModeBar': False}),
                                 html.P(
-                                    "📈 Tendance — Distribution étalée de 18 à 79 ans. Âge moyen : 49,8 ans",
+                                    f"📈 Tendance — Distribution étalée de {age['min']} à {age['max']} ans. "
+                                    f"Âge moyen : {format(age['mean'], '.1f').replace('.', ',')} ans",
                                     className='chart-description'
                                 )
                             ])
@@ -627,13 +684,393 @@ def create_layout():
                     ], md=12),
                 ], className='mb-3 g-3'),
 
+                dbc.Row([
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardHeader([
+                                html.I(className="fas fa-calculator me-2"),
+                                "Score de Risque Modélisé — GLM Fréquence × Coût"
+                            ], className='card-header-custom'),
+                            dbc.CardBody([
+                                dcc.Graph(id='chart-score-risque', config={'displayModeBar': False}),
+                                html.P(
+                                    "🧮 Anomalie — Prime pure prédite (Poisson × Gamma sur âge, sexe, type, région, "
+                                    "durée, B/M). Sélectionner une plage filtre le tableau de bord",
+                                    className='chart-description'
+                                )
+                            ])
+                        ], className='chart-card')
+                    ], md=12),
+                ], className='mb-3 g-3'),
+
                 # ══════════════════════════════════════════════
-                # SECTION 5 — TABLEAU DE DONNÉES
+                # SECTION 5 — COMPARAISON DE COHORTES
+                # ══════════════════════════════════════════════
+                html.Div([
+                    html.H6([
+                        html.I(className="fas fa-code-compare me-2"),
+                        "SECTION 5 — COMPARAISON DE COHORTES"
+                    ], className='section-title')
+                ], className='section-header mb-2'),
+
+                dbc.Row([
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardHeader([
+                                html.Div([
+                                    html.Span([
+                                        html.I(className="fas fa-layer-group me-2"),
+                                        "Cohortes comparées (jusqu'à 4)"
+                                    ]),
+                                    html.Div([
+                                        dbc.Button([
+                                            html.I(className="fas fa-plus me-1"),
+                                            "Ajouter la sélection actuelle"
+                                        ], id='cohort-add', color="primary", size="sm",
+                                            className='me-2', n_clicks=0),
+                                        dbc.Button([
+                                            html.I(className="fas fa-trash me-1"),
+                                            "Vider"
+                                        ], id='cohort-clear', color="light", size="sm", n_clicks=0),
+                                    ])
+                                ], className='d-flex align-items-center justify-content-between')
+                            ], className='card-header-custom'),
+                            dbc.CardBody([
+                                html.Div(id='cohort-list', className='cohort-list mb-2'),
+                                dbc.Row([
+                                    dbc.Col(html.Div(id='cohort-table', style={"overflowX": "auto"}), md=6),
+                                    dbc.Col(html.Div(id='cohort-insights'), md=6),
+                                ], className='g-3'),
+                                html.P(
+                                    "⚖️ Comparaison — KPIs calculés en une passe pour toutes les cohortes ; "
+                                    "écarts vs la cohorte A en rouge (défavorable) ou vert (favorable)",
+                                    className='chart-description'
+                                )
+                            ])
+                        ], className='chart-card')
+                    ], md=12),
+                ], className='mb-3 g-3'),
+
+                dbc.Row([
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardHeader([
+                                html.I(className="fas fa-chart-column me-2"),
+                                "Répartition par Type d'Assurance — par cohorte"
+                            ], className='card-header-custom'),
+                            dbc.CardBody([
+                                dcc.Graph(id='chart-cohort-types', config={'displayModeBar': False}),
+                            ])
+                        ], className='chart-card')
+                    ], md=6),
+
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardHeader([
+                                html.I(className="fas fa-user-clock me-2"),
+                                "Taux de Sinistralité par Tranche d'Âge — par cohorte"
+                            ], className='card-header-custom'),
+                            dbc.CardBody([
+                                dcc.Graph(id='chart-cohort-tranches', config={'displayModeBar': False}),
+                            ])
+                        ], className='chart-card')
+                    ], md=6),
+                ], className='mb-3 g-3'),
+
+                # ══════════════════════════════════════════════
+                # SECTION 6 — SIMULATEUR DE TARIFICATION
+                # ══════════════════════════════════════════════
+                html.Div([
+                    html.H6([
+                        html.I(className="fas fa-calculator me-2"),
+                        "SECTION 6 — SIMULATEUR DE TARIFICATION"
+                    ], className='section-title')
+                ], className='section-header mb-2'),
+
+                dbc.Row([
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardHeader([
+                                html.I(className="fas fa-sliders me-2"),
+                                "Hypothèses tarifaires"
+                            ], className='card-header-custom'),
+                            dbc.CardBody([
+                                html.P("Segment ciblé (vide = tous)", className='filter-label'),
+                                dcc.Dropdown(
+                                    id='pricing-type',
+                                    options=options(catalogue, 'type_assurance', counts=False),
+                                    multi=True, placeholder="Tous les types",
+                                    className='custom-dropdown mb-2'
+                                ),
+                                dcc.Dropdown(
+                                    id='pricing-region',
+                                    options=options(catalogue, 'region', counts=False),
+                                    multi=True, placeholder="Toutes les régions",
+                                    className='custom-dropdown mb-2'
+                                ),
+                                dcc.Dropdown(
+                                    id='pricing-tranche',
+                                    options=options(catalogue, 'tranche_age', lambda a: f"{a} ans",
+                                                    counts=False),
+                                    multi=True, placeholder="Toutes les tranches d'âge",
+                                    className='custom-dropdown mb-2'
+                                ),
+                                dcc.Dropdown(
+                                    id='pricing-bm',
+                                    options=[{'label': c, 'value': c}
+                                             for c in ['Bonus fort', 'Bonus', 'Neutre', 'Malus']],
+                                    multi=True, placeholder="Toutes les catégories B/M",
+                                    className='custom-dropdown mb-2'
+                                ),
+                                html.P("Ajustement de prime du segment (%)", className='filter-label mt-2'),
+                                dcc.Slider(
+                                    id='pricing-pct',
+                                    min=-30, max=30, step=1, value=0, updatemode='drag',
+                                    marks={-30: '-30', -15: '-15', 0: '0', 15: '+15', 30: '+30'},
+                                    tooltip={"placement": "bottom", "always_visible": True}
+                                ),
+                                html.Div([
+                                    dbc.Button([
+                                        html.I(className="fas fa-check me-1"),
+                                        "Appliquer au segment"
+                                    ], id='pricing-apply', color="primary", size="sm",
+                                        className='me-2', n_clicks=0),
+                                    dbc.Button([
+                                        html.I(className="fas fa-rotate-left me-1"),
+                                        "Réinitialiser"
+                                    ], id='pricing-reset', color="light", size="sm", n_clicks=0),
+                                ], className='mt-3 mb-2'),
+                                html.Div(id='pricing-rules-list', className='cohort-list mb-2'),
+
+                                html.P("Barème bonus/malus révisé (%)", className='filter-label mt-3'),
+                                html.Div([
+                                    html.Div([
+                                        html.Small(cat, className='pricing-bm-label'),
+                                        dcc.Slider(
+                                            id=f'pricing-bm-scale-{i}',
+                                            min=-20, max=20, step=1, value=0, updatemode='drag',
+                                            marks={-20: '-20', 0: '0', 20: '+20'},
+                                            tooltip={"placement": "bottom", "always_visible": False}
+                                        ),
+                                    ]) for i, cat in enumerate(['Bonus fort', 'Bonus', 'Neutre', 'Malus'])
+                                ]),
+                            ])
+                        ], className='chart-card')
+                    ], md=4),
+
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardHeader([
+                                html.I(className="fas fa-scale-balanced me-2"),
+                                "Impact projeté sur le portefeuille"
+                            ], className='card-header-custom'),
+                            dbc.CardBody([
+                                html.Div(id='pricing-kpis', className='mb-2'),
+                                dcc.Graph(id='chart-pricing-types', config={'displayModeBar': False}),
+                                html.P(
+                                    "🧮 Simulation — S/P projeté = sinistres ÷ primes ajustées, recalculé "
+                                    "instantanément à partir des sommes par segment (type × région × âge × B/M)",
+                                    className='chart-description'
+                                )
+                            ])
+                        ], className='chart-card mb-3'),
+                        dbc.Card([
+                            dbc.CardHeader([
+                                html.I(className="fas fa-chart-area me-2"),
+                                "Distribution du Ratio S/P — avant / après"
+                            ], className='card-header-custom'),
+                            dbc.CardBody([
+                                dcc.Graph(id='chart-pricing-dist', config={'displayModeBar': False}),
+                            ])
+                        ], className='chart-card')
+                    ], md=8),
+                ], className='mb-3 g-3'),
+
+                # ══════════════════════════════════════════════
+                # SECTION 7 — RISQUE AGRÉGÉ (MONTE CARLO)
+                # ══════════════════════════════════════════════
+                html.Div([
+                    html.H6([
+                        html.I(className="fas fa-dice me-2"),
+                        "SECTION 7 — RISQUE AGRÉGÉ : SINISTRES DE L'AN PROCHAIN (MONTE CARLO)"
+                    ], className='section-title')
+                ], className='section-header mb-2'),
+
+                dbc.Row([
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardHeader([
+                                html.I(className="fas fa-chart-column me-2"),
+                                "Distribution de la Charge Totale Simulée"
+                            ], className='card-header-custom'),
+                            dbc.CardBody([
+                                dcc.Graph(id='chart-mc-dist', config={'displayModeBar': False}),
+                                html.P(
+                                    "🎲 Simulation — Poisson × Gamma par segment région × type, "
+                                    "portefeuille complet (indépendant des filtres)",
+                                    className='chart-description'
+                                )
+                            ])
+                        ], className='chart-card')
+                    ], md=5),
+
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardHeader([
+                                html.I(className="fas fa-shield-halved me-2"),
+                                "VaR / TVaR par Région et par Type"
+                            ], className='card-header-custom'),
+                            dbc.CardBody([
+                                html.Div(id='mc-table', style={"overflowX": "auto"}),
+                                html.Small(id='mc-meta', className='text-muted'),
+                            ])
+                        ], className='chart-card')
+                    ], md=7),
+                ], className='mb-3 g-3'),
+
+                # ══════════════════════════════════════════════
+                # SECTION 8 — PROJECTION BONUS/MALUS (AUTO)
+                # ══════════════════════════════════════════════
+                html.Div([
+                    html.H6([
+                        html.I(className="fas fa-car me-2"),
+                        "SECTION 8 — PROJECTION BONUS/MALUS DES CONTRATS AUTO"
+                    ], className='section-title')
+                ], className='section-header mb-2'),
+
+                dbc.Row([
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardHeader([
+                                html.I(className="fas fa-sliders me-2"),
+                                "Règle de transition annuelle"
+                            ], className='card-header-custom'),
+                            dbc.CardBody([
+                                html.P("Bonus par année sans sinistre (%)", className='filter-label'),
+                                dcc.Slider(
+                                    id='bm-rule-bonus',
+                                    min=0, max=15, step=1, value=5, updatemode='drag',
+                                    marks={0: '0', 5: '5', 10: '10', 15: '15'},
+                                    tooltip={"placement": "bottom", "always_visible": True}
+                                ),
+                                html.P("Malus par sinistre (%)", className='filter-label mt-2'),
+                                dcc.Slider(
+                                    id='bm-rule-malus',
+                                    min=0, max=50, step=5, value=25, updatemode='drag',
+                                    marks={0: '0', 25: '25', 50: '50'},
+                                    tooltip={"placement": "bottom", "always_visible": True}
+                                ),
+                                html.P("Plancher / plafond du coefficient", className='filter-label mt-2'),
+                                dcc.RangeSlider(
+                                    id='bm-rule-bornes',
+                                    min=0.3, max=4.0, step=0.05, value=[0.5, 3.5], updatemode='drag',
+                                    marks={0.3: '0.30', 1: '1.00', 2: '2.00', 3: '3.00', 4: '4.00'},
+                                    tooltip={"placement": "bottom", "always_visible": True}
+                                ),
+                                html.P("Horizon de projection (années)", className='filter-label mt-2'),
+                                dcc.Slider(
+                                    id='bm-years',
+                                    min=1, max=20, step=1, value=10, updatemode='drag',
+                                    marks={1: '1', 5: '5', 10: '10', 15: '15', 20: '20'},
+                                    tooltip={"placement": "bottom", "always_visible": True}
+                                ),
+                                html.Div(id='bm-projection-kpis', className='mt-3'),
+                            ])
+                        ], className='chart-card')
+                    ], md=4),
+
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardHeader([
+                                html.I(className="fas fa-layer-group me-2"),
+                                "Répartition B/M projetée"
+                            ], className='card-header-custom'),
+                            dbc.CardBody([
+                                dcc.Graph(id='chart-bm-projection-mix', config={'displayModeBar': False}),
+                            ])
+                        ], className='chart-card mb-3'),
+                        dbc.Card([
+                            dbc.CardHeader([
+                                html.I(className="fas fa-coins me-2"),
+                                "Primes encaissées & coefficient moyen projetés"
+                            ], className='card-header-custom'),
+                            dbc.CardBody([
+                                dcc.Graph(id='chart-bm-projection-prime', config={'displayModeBar': False}),
+                                html.P(
+                                    "🚗 Projection — Chaîne de Markov par segment région × âge, sinistres "
+                                    "Poisson à la fréquence observée ; prime = prime de base × coefficient",
+                                    className='chart-description'
+                                )
+                            ])
+                        ], className='chart-card')
+                    ], md=8),
+                ], className='mb-3 g-3'),
+
+                # ══════════════════════════════════════════════
+                # SECTION 9 — CONTRATS : FICHE ASSURÉ & TOP N
+                # ══════════════════════════════════════════════
+                html.Div([
+                    html.H6([
+                        html.I(className="fas fa-id-card me-2"),
+                        "SECTION 9 — CONTRATS : FICHE ASSURÉ & CONTRATS LES PLUS COÛTEUX"
+                    ], className='section-title')
+                ], className='section-header mb-2'),
+
+                dbc.Row([
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardHeader([
+                                html.I(className="fas fa-magnifying-glass me-2"),
+                                "Fiche assuré"
+                            ], className='card-header-custom'),
+                            dbc.CardBody([
+                                dcc.Input(
+                                    id='policy-search', type='number', debounce=True,
+                                    placeholder="N° d'assuré (id_assure)",
+                                    className='form-control form-control-sm'
+                                ),
+                                html.Div(
+                                    html.Small("Saisir un identifiant, ou cliquer une ligne du top",
+                                               className='text-muted'),
+                                    id='policy-card', className='mt-3'
+                                ),
+                            ])
+                        ], className='chart-card')
+                    ], md=4),
+
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardHeader([
+                                html.Div([
+                                    html.Span([
+                                        html.I(className="fas fa-ranking-star me-2"),
+                                        f"Top {TOP_N} contrats de la sélection"
+                                    ]),
+                                    dcc.RadioItems(
+                                        id='top-metric',
+                                        options=[{'label': f" {label}", 'value': m}
+                                                 for m, label in TOP_METRICS.items()],
+                                        value=TOP_METRIC_DEFAULT, inline=True,
+                                        inputStyle={"marginLeft": "10px"},
+                                        style={"fontSize": "0.75rem"}
+                                    ),
+                                ], className='d-flex align-items-center justify-content-between')
+                            ], className='card-header-custom'),
+                            dbc.CardBody([
+                                html.Div(id='top-policies', style={"overflowX": "auto"}),
+                                html.Small(id='top-policies-meta', className='text-muted'),
+                            ])
+                        ], className='chart-card')
+                    ], md=8),
+                ], className='mb-3 g-3'),
+
+                # ══════════════════════════════════════════════
+                # SECTION 10 — TABLEAU DE DONNÉES
                 # ══════════════════════════════════════════════
                 html.Div([
                     html.H6([
                         html.I(className="fas fa-table me-2"),
-                        "SECTION 5 — TABLEAU DES DONNÉES FILTRÉES"
+                        "SECTION 10 — TABLEAU DES DONNÉES FILTRÉES"
                     ], className='section-title')
                 ], className='section-header mb-2'),
 
@@ -675,4 +1112,12 @@ def create_layout():
             ], width=12)
         ])
 
-    ], fluid=True, className='main-container')
\ No newline at end of file
+    ], fluid=True, className='main-container')
+
+    # ── Injection de l'état initial (aucun callback au premier affichage) ──
+    if initial:
+        for comp in layout._traverse():
+            for prop, value in initial.get(getattr(comp, 'id', None), {}).items():
+                setattr(comp, prop, value)
+
+    return layout
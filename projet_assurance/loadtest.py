@@ -0,0 +1,440 @@
+# =============================================================
+#  loadtest.py  —  Test de charge du serveur Dash (gunicorn)
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+#  Rejoue des sessions d'analystes (dropdowns, glissement de sliders,
+#  brossage, cohortes, exports) sous forme de POST /_dash-update-component
+#  contre un gunicorn lancé localement, en faisant varier workers × threads
+#  × utilisateurs simultanés. Rapporte p50/p95/p99, débit, taux d'erreur et
+#  RSS par worker, puis un modèle de capacité (analystes supportés sous SLO) :
+#  demande d'un analyste mesurée à faible charge (1 / (réflexion + service)),
+#  débit max pris sur un palier en dépassement de SLO ou saturé (débit en
+#  deçà de la demande), projection jamais inférieure à l'observé.
+#
+#  Usage :
+#    python loadtest.py --workers 1,2,4 --threads 1,4 --users 1,5,10,20 --duration 30
+#    python loadtest.py --url http://127.0.0.1:8050 --users 10     (serveur déjà lancé)
+#    python loadtest.py --sessions sessions.json --json resultats.json
+#
+#  Format des sessions enregistrées (--sessions) : liste de sessions, chacune
+#  une liste d'étapes {"changes": {"<id>.<prop>": valeur, ...}, "think_ms": 400}.
+
+import argparse
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import numpy as np
+import requests
+
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+MAX_CHAIN = 4           # profondeur max des callbacks enchaînés (sortie → entrée)
+SATURATION = 0.8        # palier saturé : débit < 80 % de utilisateurs × demande
+
+
+# ════════════════════════════════════════════════════════════════
+# SERVEUR GUNICORN LOCAL
+# ════════════════════════════════════════════════════════════════
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers, threads, preload=False, timeout=180):
+    port = _free_port()
+    cmd = [sys.executable, '-m', 'gunicorn', 'app:server',
+           '-w', str(workers), '--threads', str(threads),
+           '-b', f'127.0.0.1:{port}', '--timeout', '300', '--log-level', 'warning']
+    if preload:
+        cmd.append('--preload')
+    log = open(os.path.join(tempfile.gettempdir(), f'assur_loadtest_w{workers}_t{threads}.log'), 'w')
+    proc = subprocess.Popen(cmd, cwd=APP_DIR, stdout=log, stderr=subprocess.STDOUT)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn arrêté (code {proc.returncode}), voir {log.name}")
+        try:
+            if requests.get(url + '/_dash-layout', timeout=5).status_code == 200:
+                return proc, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError("gunicorn ne répond pas")
+
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+# ── Mémoire des workers (/proc, Linux) ─────────────────────────
+def worker_pids(master):
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                if int(f.read().rsplit(')', 1)[1].split()[1]) == master:
+                    pids.append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    return pids
+
+
+def rss_mb(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+# ════════════════════════════════════════════════════════════════
+# CLIENT DASH (rejoue le protocole du renderer)
+# ════════════════════════════════════════════════════════════════
+def _outputs(spec):
+    if spec.startswith('..'):
+        return [dict(zip(('id', 'property'), o.rsplit('.', 1)))
+                for o in spec.strip('.').split('...')]
+    return dict(zip(('id', 'property'), spec.rsplit('.', 1)))
+
+
+# Valeurs initiales de toutes les props du layout : {"<id>.<prop>": valeur}
+def _layout_state(node, state):
+    if isinstance(node, list):
+        for child in node:
+            _layout_state(child, state)
+    elif isinstance(node, dict) and 'props' in node:
+        props = node['props']
+        cid = props.get('id')
+        for prop, value in props.items():
+            if cid is not None and isinstance(cid, str):
+                state[f'{cid}.{prop}'] = value
+            if isinstance(value, (dict, list)):
+                _layout_state(value, state)
+    return state
+
+
+class DashClient:
+
+    def __init__(self, url, layout, deps):
+        self.url = url
+        self.http = requests.Session()
+        # Comme un onglet (assets/sequence.js) : identifiant et compteur de requêtes
+        self.http.headers['X-Assur-Tab'] = uuid.uuid4().hex
+        self.seq = 0
+        self.state = _layout_state(layout, {})
+        # Callbacks serveur uniquement (les clientside ne font pas d'aller-retour)
+        self.deps = [d for d in deps if not d.get('clientside_function')]
+        self.by_input = {}
+        for i, d in enumerate(self.deps):
+            for inp in d['inputs']:
+                self.by_input.setdefault(f"{inp['id']}.{inp['property']}", []).append(i)
+
+    def _payload(self, d, changed):
+        def pack(items):
+            return [{'id': x['id'], 'property': x['property'],
+                     'value': self.state.get(f"{x['id']}.{x['property']}")} for x in items]
+        return {'output': d['output'], 'outputs': _outputs(d['output']),
+                'inputs': pack(d['inputs']), 'state': pack(d['state']),
+                'changedPropIds': changed}
+
+    @staticmethod
+    def label(d):
+        first = _outputs(d['output'])
+        first = first[0] if isinstance(first, list) else first
+        return first['id'] + ('…' if d['output'].startswith('..') else '')
+
+    # Applique des changements de props et déclenche les callbacks concernés ;
+    # les sorties qui sont aussi des entrées relancent la chaîne (comme le navigateur)
+    def fire(self, changes, records):
+        self.state.update(changes)
+        pending, depth = list(changes), 0
+        while pending and depth < MAX_CHAIN:
+            triggered = sorted({i for p in pending for i in self.by_input.get(p, [])})
+            pending = []
+            for i in triggered:
+                d = self.deps[i]
+                changed = [f"{x['id']}.{x['property']}" for x in d['inputs']
+                           if f"{x['id']}.{x['property']}" in changes or depth]
+                t0 = time.perf_counter()
+                try:
+                    self.seq += 1
+                    r = self.http.post(self.url + '/_dash-update-component',
+                                       headers={'X-Assur-Seq': str(self.seq)},
+                                       json=self._payload(d, changed), timeout=300)
+                    ok, size = r.status_code in (200, 204), len(r.content)
+                except requests.RequestException:
+                    r, ok, size = None, False, 0
+                dropped = r is not None and r.headers.get('X-Assur-Superseded') == '1'
+                records.append((time.time(), self.label(d), time.perf_counter() - t0, ok, size, dropped))
+                if ok and r.status_code == 200:
+                    for cid, props in r.json().get('response', {}).items():
+                        for prop, value in props.items():
+                            key = f'{cid}.{prop}'
+                            self.state[key] = value
+                            if key in self.by_input:
+                                pending.append(key)
+            depth += 1
+
+
+# ════════════════════════════════════════════════════════════════
+# SESSIONS SYNTHÉTIQUES
+# ════════════════════════════════════════════════════════════════
+# Mix d'actions d'un analyste : (poids, action)
+ACTIONS = [(30, 'dropdown'), (30, 'slider'), (10, 'brush'), (8, 'reset'),
+           (7, 'cohort'), (15, 'export')]
+
+
+def _options(state, cid, fallback):
+    opts = state.get(f'{cid}.options') or []
+    return [o['value'] if isinstance(o, dict) else o for o in opts] or fallback
+
+
+# Bornes et pas d'un slider, lus dans le layout (catalogue des dimensions)
+def _slider(state, cid, fallback):
+    props = tuple(state.get(f'{cid}.{p}') for p in ('min', 'max', 'step'))
+    return props if None not in props else fallback
+
+
+def synthetic_session(rng, state, n_actions=12, think_ms=400):
+    steps = []
+    clicks = {}
+
+    def click(cid):
+        clicks[cid] = clicks.get(cid, 0) + 1
+        return {f'{cid}.n_clicks': clicks[cid]}
+
+    def think():
+        return rng.expovariate(1000.0 / think_ms) if think_ms > 0 else 0
+
+    for _ in range(n_actions):
+        action = rng.choices([a for _, a in ACTIONS], weights=[w for w, _ in ACTIONS])[0]
+        if action == 'dropdown':
+            cid = rng.choice(['type-filter', 'sexe-filter', 'region-filter', 'sinistres-filter'])
+            opts = _options(state, cid, [])
+            value = rng.sample(opts, rng.randint(1, min(2, len(opts)))) if opts else None
+            steps.append({'changes': {f'{cid}.value': value}, 'think': think()})
+        elif action == 'slider':
+            # Glissement : une rafale de drag_value puis value au relâchement
+            cid, fallback = rng.choice([('age-filter', (18, 79, 1)), ('bm-filter', (0.5, 1.5, 0.05))])
+            lo, hi, step = _slider(state, cid, fallback)
+            a = lo + step * rng.randint(0, int((hi - lo) / step) // 2)
+            b = hi - step * rng.randint(0, int((hi - lo) / step) // 4)
+            for k in range(1, 6):
+                v = [round(a * k / 5 + lo * (1 - k / 5), 2), round(b, 2)]
+                steps.append({'changes': {f'{cid}.drag_value': v}, 'think': 0.05})
+            steps.append({'changes': {f'{cid}.value': [round(a, 2), round(b, 2)]}, 'think': think()})
+        elif action == 'brush':
+            region = rng.choice(_options(state, 'region-filter', ['Dakar']))
+            steps.append({'changes': {'chart-region-bar.clickData': {'points': [{'y': region}]}},
+                          'think': think()})
+        elif action == 'reset':
+            steps.append({'changes': click('reset-filters'), 'think': think()})
+        elif action == 'cohort':
+            steps.append({'changes': click('cohort-add'), 'think': think()})
+        else:
+            btn = rng.choice(['btn-download-excel', 'btn-download-html', 'btn-download-pdf'])
+            steps.append({'changes': click(btn), 'think': 0.5})
+            # Interrogation de la file d'exports (dcc.Interval du navigateur)
+            for _ in range(3):
+                polls = clicks['export-poll'] = clicks.get('export-poll', 0) + 1
+                steps.append({'changes': {'export-poll.n_intervals': polls}, 'think': 1.0})
+            steps[-1]['think'] = think()
+    return steps
+
+
+def load_sessions(path):
+    with open(path, encoding='utf-8') as f:
+        sessions = json.load(f)
+    return [[{'changes': s['changes'], 'think': s.get('think_ms', 0) / 1000} for s in sess]
+            for sess in sessions]
+
+
+# ════════════════════════════════════════════════════════════════
+# EXÉCUTION D'UN PALIER DE CHARGE
+# ════════════════════════════════════════════════════════════════
+def run_load(url, users, duration, think_ms, recorded=None, seed=0, master=None):
+    layout = requests.get(url + '/_dash-layout', timeout=60).json()
+    deps = requests.get(url + '/_dash-dependencies', timeout=60).json()
+    records, lock = [], threading.Lock()
+    deadline = time.time() + duration
+    rss, thinking = {}, [0.0]
+
+    def user(k):
+        rng = random.Random(seed * 1000 + k)
+        client = DashClient(url, layout, deps)
+        local, n, slept = [], 0, 0.0
+        while time.time() < deadline:
+            steps = (recorded[n % len(recorded)] if recorded
+                     else synthetic_session(rng, client.state, think_ms=think_ms))
+            n += 1
+            for step in steps:
+                if time.time() >= deadline:
+                    break
+                client.fire(step['changes'], local)
+                time.sleep(step['think'])
+                slept += step['think']
+        with lock:
+            records.extend(local)
+            thinking[0] += slept
+
+    # Échantillonne la RSS des workers pendant le palier (pic par pid)
+    def sample_rss():
+        while time.time() < deadline:
+            for pid in worker_pids(master):
+                rss[pid] = max(rss.get(pid, 0.0), rss_mb(pid))
+            time.sleep(0.5)
+
+    threads = [threading.Thread(target=user, args=(k,), daemon=True) for k in range(users)]
+    if master:
+        threads.append(threading.Thread(target=sample_rss, daemon=True))
+    t0 = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(duration + 600)
+    return summarize(records, time.time() - t0, users, rss, thinking[0])
+
+
+def summarize(records, elapsed, users, rss, think_s=0.0):
+    lat = np.array([r[2] for r in records]) * 1000
+    ok = np.array([r[3] for r in records], dtype=bool)
+    pct = (lambda a, q: float(np.percentile(a, q)) if len(a) else math.nan)
+    per_cb = {}
+    for label in sorted({r[1] for r in records}):
+        l = np.array([r[2] for r in records if r[1] == label]) * 1000
+        per_cb[label] = {'n': len(l), 'p50': pct(l, 50), 'p95': pct(l, 95), 'p99': pct(l, 99)}
+    return {
+        'users': users, 'requests': len(records), 'elapsed_s': elapsed,
+        'throughput': len(records) / elapsed if elapsed else 0.0,
+        'error_rate': float((~ok).mean()) if len(ok) else 0.0,
+        # Requêtes abandonnées car dépassées par une plus récente de la même session
+        'superseded': int(sum(r[5] for r in records)),
+        'p50': pct(lat, 50), 'p95': pct(lat, 95), 'p99': pct(lat, 99),
+        # Temps de service moyen et réflexion par requête (loi du temps de réponse)
+        'mean_ms': float(lat.mean()) if len(lat) else math.nan,
+        'think_ms': think_s * 1000 / len(records) if len(records) else math.nan,
+        'rss_mb': {str(pid): round(v, 1) for pid, v in sorted(rss.items())},
+        'callbacks': per_cb,
+    }
+
+
+# ════════════════════════════════════════════════════════════════
+# MODÈLE DE CAPACITÉ
+# ════════════════════════════════════════════════════════════════
+# Par configuration : demande par analyste λ = 1 / (réflexion + service) sur le
+# palier le moins chargé, débit max X_max d'un palier en dépassement de SLO ou
+# saturé, analystes tenant sous le SLO (p95) observés et extrapolés X_max / λ.
+# Sans palier saturé, X_max est inconnu : la projection reste l'observé.
+def capacity(config_runs, slo_ms, max_errors=0.01):
+    runs = [r for r in config_runs if r['users'] and r['requests']]
+    within = [r for r in runs if r['p95'] <= slo_ms and r['error_rate'] <= max_errors]
+    observed = max((r['users'] for r in within), default=0)
+    low = min(within or runs, key=lambda r: r['users'], default=None)
+    per_user = 1000 / (low['think_ms'] + low['mean_ms']) if low else math.nan
+
+    def saturated(r):
+        return r['throughput'] < SATURATION * r['users'] * per_user
+
+    limited = [r for r in runs if r not in within or saturated(r)]
+    x_max = max((r['throughput'] for r in limited), default=math.nan)
+    projected = int(x_max / per_user) if limited and per_user > 0 else 0
+    rss = [v for r in config_runs for v in r['rss_mb'].values()]
+    return {
+        'max_throughput': x_max,
+        'demand_per_user': per_user,
+        'saturated': bool(limited),
+        'users_ok_observed': observed,
+        'users_ok_projected': max(projected, observed),
+        'rss_per_worker_mb': float(np.max(rss)) if rss else math.nan,
+    }
+
+
+def print_run(tag, r):
+    print(f"{tag:<14} users={r['users']:<4} req={r['requests']:<6} "
+          f"débit={r['throughput']:7.1f} req/s  erreurs={r['error_rate']*100:5.1f}%  abandons={r['superseded']:<4} "
+          f"p50={r['p50']:7.0f}  p95={r['p95']:7.0f}  p99={r['p99']:7.0f} ms  "
+          f"RSS={'/'.join(f'{v:.0f}' for v in r['rss_mb'].values()) or '—'} Mo")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Test de charge AssurAnalytics (gunicorn + Dash)")
+    ap.add_argument('--workers', default='1,2', help="liste de nombres de workers")
+    ap.add_argument('--threads', default='1,4', help="liste de threads par worker")
+    ap.add_argument('--users', default='1,5,10', help="paliers d'utilisateurs simultanés")
+    ap.add_argument('--duration', type=float, default=20, help="durée d'un palier (s)")
+    ap.add_argument('--think-ms', type=float, default=400, help="temps de réflexion moyen")
+    ap.add_argument('--slo-ms', type=float, default=1000, help="objectif de latence p95")
+    ap.add_argument('--sessions', help="sessions enregistrées (JSON) au lieu des synthétiques")
+    ap.add_argument('--url', help="serveur déjà lancé (pas de balayage workers/threads)")
+    ap.add_argument('--preload', action='store_true', help="gunicorn --preload")
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--json', help="fichier de sortie des résultats")
+    args = ap.parse_args()
+
+    users = [int(u) for u in args.users.split(',')]
+    recorded = load_sessions(args.sessions) if args.sessions else None
+    if args.url:
+        configs = [(None, None)]
+    else:
+        configs = [(int(w), int(t)) for w in args.workers.split(',') for t in args.threads.split(',')]
+
+    results = []
+    for workers, threads in configs:
+        proc, url = (None, args.url) if args.url else start_server(workers, threads, args.preload)
+        tag = 'externe' if args.url else f'w{workers}×t{threads}'
+        try:
+            # Échauffement : premier passage de chaque callback (caches, imports paresseux)
+            run_load(url, 1, min(5, args.duration), 0, recorded, args.seed)
+            runs = []
+            for u in users:
+                r = run_load(url, u, args.duration, args.think_ms, recorded, args.seed,
+                             master=proc.pid if proc else None)
+                print_run(tag, r)
+                runs.append(r)
+        finally:
+            if proc:
+                stop_server(proc)
+        cap = capacity(runs, args.slo_ms)
+        results.append({'workers': workers, 'threads': threads, 'runs': runs, 'capacity': cap})
+
+    # ── Synthèse ──
+    print(f"\nModèle de capacité (SLO p95 ≤ {args.slo_ms:.0f} ms, erreurs ≤ 1 %)")
+    for res in results:
+        c = res['capacity']
+        tag = 'externe' if res['workers'] is None else f"w{res['workers']}×t{res['threads']}"
+        projected = (f"~{c['users_ok_projected']} extrapolés" if c['saturated']
+                     else f"≥ {c['users_ok_projected']} (saturation non atteinte)")
+        print(f"  {tag:<10} débit max {c['max_throughput']:6.1f} req/s · "
+              f"{c['demand_per_user']:.2f} req/s par analyste · "
+              f"{c['users_ok_observed']} analystes observés sous SLO · "
+              f"{projected} · RSS/worker {c['rss_per_worker_mb']:.0f} Mo")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Résultats : {args.json}")
+
+
+if __name__ == '__main__':
+    main()
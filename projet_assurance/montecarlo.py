@@ -0,0 +1,177 @@
+# =============================================================
+#  montecarlo.py  —  Simulation des pertes agrégées (Monte Carlo)
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+#  Modèle collectif par segment région × type d'assurance :
+#    N_s ~ Poisson(n_s × λ_s)      λ_s = nb_sinistres moyen observé
+#    coût ~ Gamma(k_s, θ_s)        coût d'UN sinistre, ajusté par les moments :
+#      - table de faits chargée : montants individuels des sinistres ;
+#      - sinon : coût moyen par sinistre de chaque assuré (montant_sinistres /
+#        nb_sinistres), pondéré par nb_sinistres — le total par assuré
+#        cumulerait plusieurs sinistres et gonflerait la sévérité.
+#  Somme de N coûts Gamma(k, θ) indépendants = Gamma(N·k, θ) : un scénario
+#  coûte deux tirages par segment, quel que soit le nombre de sinistres.
+#  Scénarios tirés par lots vectorisés (MC_BATCH), répartis sur un pool de
+#  processus. Graines : SeedSequence(MC_SEED).spawn(nb de lots) — le résultat
+#  ne dépend pas du nombre de processus. Mesures : VaR et TVaR (moyenne au-delà
+#  de la VaR) du total annuel, par région, par type et pour le portefeuille.
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+from cache import cached, code_version, dataset_version
+
+
+MC_SCENARIOS = int(os.environ.get('ASSUR_MC_SCENARIOS', 1_000_000))
+MC_WORKERS = int(os.environ.get('ASSUR_MC_WORKERS', os.cpu_count() or 1))
+MC_BATCH = 50_000
+MC_SEED = 2025
+EXPORT_SCENARIOS = 100_000              # rapport PDF : sélection exportée, sans pool
+VAR_LEVELS = [0.95, 0.99, 0.995]
+TVAR_LEVELS = [0.99, 0.995]
+MIN_CLAIMANTS = 5                       # en deçà, coût ajusté au niveau du type
+HIST_BINS = 60
+
+
+# ════════════════════════════════════════════════════════════════
+# PARAMÈTRES PAR SEGMENT
+# ════════════════════════════════════════════════════════════════
+# Moments d'un coût unitaire : x = coût moyen de w sinistres (w = 1 : sinistre
+# individuel). E[w (x − μ)²] = σ² : variance estimée sans biais de moyennage
+def _gamma_moments(g):
+    x, w = g['cout'].to_numpy(dtype=np.float64), g['poids'].to_numpy(dtype=np.float64)
+    mean = float((w * x).sum() / w.sum())
+    var = float((w * (x - mean) ** 2).sum() / (len(x) - 1)) if len(x) > 1 else 0.0
+    var = var if var > 0 else mean ** 2
+    return mean ** 2 / var, var / mean
+
+
+# Observations de coût : sinistres individuels (table de faits, lignes de df =
+# positions du portefeuille) ou coût moyen par sinistre de chaque assuré sinistré
+def _claim_costs(df, claims=None):
+    if claims is not None:
+        pos = pd.Index(df.index).get_indexer(claims.row)
+        keep = (pos >= 0) & (claims.amount > 0)
+        rows = df.iloc[pos[keep]]
+        return pd.DataFrame({'region': rows['region'].to_numpy(),
+                             'type_assurance': rows['type_assurance'].to_numpy(),
+                             'cout': claims.amount[keep], 'poids': 1.0})
+    claimed = df[(df['nb_sinistres'] > 0) & (df['montant_sinistres'] > 0)]
+    nb = claimed['nb_sinistres'].to_numpy(dtype=np.float64)
+    return pd.DataFrame({'region': claimed['region'].to_numpy(),
+                         'type_assurance': claimed['type_assurance'].to_numpy(),
+                         'cout': claimed['montant_sinistres'].to_numpy(dtype=np.float64) / nb,
+                         'poids': nb})
+
+
+def segment_parameters(df, claims=None):
+    regions = sorted(df['region'].dropna().astype(str).unique())
+    types = sorted(df['type_assurance'].dropna().astype(str).unique())
+    costs = _claim_costs(df, claims)
+    fallback = _gamma_moments(costs) if len(costs) > 1 else (1.0, 0.0)
+    by_type = {t: _gamma_moments(g)
+               for t, g in costs.groupby(costs['type_assurance'].astype(str))
+               if len(g) >= MIN_CLAIMANTS}
+    seg_sev = {k: _gamma_moments(g)
+               for k, g in costs.groupby([costs['region'].astype(str),
+                                          costs['type_assurance'].astype(str)])
+               if len(g) >= MIN_CLAIMANTS}
+    freq = df.groupby([df['region'].astype(str), df['type_assurance'].astype(str)]).agg(
+        polices=('nb_sinistres', 'size'), sinistres=('nb_sinistres', 'sum'),
+        prime=('montant_prime', 'sum'))
+
+    rows = []
+    for i, r in enumerate(regions):
+        for j, t in enumerate(types):
+            if (r, t) not in freq.index:
+                continue
+            f = freq.loc[(r, t)]
+            shape, scale = seg_sev.get((r, t), by_type.get(t, fallback))
+            rows.append((i, j, float(f['sinistres']), shape, scale, float(f['prime'])))
+    seg = np.array(rows, dtype=np.float64).reshape(-1, 6)
+    return {
+        'regions': regions, 'types': types,
+        'region': seg[:, 0].astype(int), 'type': seg[:, 1].astype(int),
+        # Espérance du nombre de sinistres du segment : n_s × λ_s = sinistres observés
+        'esperance': seg[:, 2], 'shape': seg[:, 3], 'scale': seg[:, 4], 'prime': seg[:, 5],
+    }
+
+
+# Colonnes de résultat : portefeuille, régions, types
+def _membership(params):
+    R, T = len(params['regions']), len(params['types'])
+    M = np.zeros((len(params['esperance']), 1 + R + T), dtype=np.float64)
+    M[:, 0] = 1
+    M[np.arange(len(M)), 1 + params['region']] = 1
+    M[np.arange(len(M)), 1 + R + params['type']] = 1
+    return M
+
+
+# ════════════════════════════════════════════════════════════════
+# SIMULATION PAR LOTS
+# ════════════════════════════════════════════════════════════════
+def _simulate_batch(task):
+    params, seed, size = task
+    rng = np.random.default_rng(seed)
+    counts = rng.poisson(params['esperance'], size=(size, len(params['esperance'])))
+    losses = rng.gamma(counts * params['shape'], params['scale'])
+    return (losses @ _membership(params)).astype(np.float32)
+
+
+def simulate(params, scenarios=MC_SCENARIOS, workers=MC_WORKERS):
+    sizes = [MC_BATCH] * (scenarios // MC_BATCH)
+    if scenarios % MC_BATCH:
+        sizes.append(scenarios % MC_BATCH)
+    seeds = np.random.SeedSequence(MC_SEED).spawn(len(sizes))
+    tasks = [(params, s, n) for s, n in zip(seeds, sizes)]
+    if workers > 1 and len(tasks) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+                return np.concatenate(list(pool.map(_simulate_batch, tasks)))
+        except (OSError, BrokenProcessPool) as e:
+            print(f"⚠️ Pool Monte Carlo indisponible ({e}) — simulation séquentielle")
+    return np.concatenate([_simulate_batch(t) for t in tasks])
+
+
+# ════════════════════════════════════════════════════════════════
+# MESURES DE RISQUE
+# ════════════════════════════════════════════════════════════════
+def risk_measures(losses):
+    x = np.sort(losses.astype(np.float64))
+    out = {'perte_moyenne': x.mean(), 'ecart_type': x.std()}
+    for q in VAR_LEVELS:
+        out[f'VaR {q * 100:g} %'] = x[min(int(np.ceil(q * len(x))) - 1, len(x) - 1)]
+    for q in TVAR_LEVELS:
+        out[f'TVaR {q * 100:g} %'] = x[min(int(np.ceil(q * len(x))) - 1, len(x) - 1):].mean()
+    return out
+
+
+def aggregate_loss_report(df, scenarios=MC_SCENARIOS, workers=MC_WORKERS, claims=None):
+    t0 = time.perf_counter()
+    params = segment_parameters(df, claims)
+    sims = simulate(params, scenarios, workers)
+    labels = (['Portefeuille'] + [f"Région — {r}" for r in params['regions']]
+              + [f"Type — {t}" for t in params['types']])
+    M = _membership(params)
+    table = pd.DataFrame([risk_measures(sims[:, k]) for k in range(sims.shape[1])], index=labels)
+    table.insert(0, 'primes', params['prime'] @ M)
+    last = f'VaR {VAR_LEVELS[-1] * 100:g} %'
+    # Capital au seuil le plus élevé : VaR au-delà de la perte attendue
+    table['capital'] = table[last] - table['perte_moyenne']
+    counts, edges = np.histogram(sims[:, 0], bins=HIST_BINS)
+    return {'table': table, 'hist': (counts, edges), 'scenarios': scenarios,
+            'secondes': time.perf_counter() - t0}
+
+
+# Portefeuille complet : simulé une fois par version des données (et des sinistres)
+def portfolio_loss_report(df, claims=None):
+    version = dataset_version(df) + code_version(__file__) + str(MC_SCENARIOS)
+    if claims is not None:
+        version += claims.version
+    return cached('montecarlo', version, lambda: aggregate_loss_report(df, claims=claims))
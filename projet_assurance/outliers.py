@@ -0,0 +1,176 @@
+# =============================================================
+#  outliers.py  —  Détection des segments atypiques (cube)
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+#  Toutes les combinaisons à 1, 2 et 3 dimensions parmi type, région, sexe,
+#  tranche d'âge et catégorie B/M. Un seul passage sur la sélection : le cube
+#  complet des 5 dimensions (sommes par cellule, un bincount par statistique),
+#  puis chaque sous-cube est une somme sur les axes restants — le coût ne
+#  dépend pas du nombre de combinaisons.
+#  Indicateurs : fréquence (sinistres / assuré), coût moyen (assurés sinistrés,
+#  comme le KPI), S/P agrégé (sinistres / primes). Écart testé contre la
+#  sélection entière : z = (Σy − n·m) / √Σ(y − m)² (variance empirique de la
+#  cellule), y = s − R·p pour le S/P. Support minimal, puis contrôle du taux
+#  de fausses découvertes (Benjamini–Hochberg) sur l'ensemble des tests.
+#  Une cellule n'est pas retenue si une cellule emboîtée (sous- ou sur-segment)
+#  l'est déjà pour le même indicateur dans le même sens (même écart, déjà montré).
+
+import math
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+
+OUTLIER_DIMENSIONS = [
+    ('type_assurance', "Type"),
+    ('region',         "Région"),
+    ('sexe',           "Sexe"),
+    ('tranche_age',    "Âge"),
+    ('bm_cat',         "B/M"),
+]
+MAX_ORDER = 3
+MIN_SUPPORT = 30                        # assurés par cellule
+MIN_CLAIMANTS = 10                      # assurés sinistrés (coût moyen)
+FDR = 0.05
+TOP_K = 5
+
+# Statistiques cumulées par cellule
+_STATS = ['n', 'nb', 'nb2', 'c', 'x', 'x2', 's', 's2', 'p', 'p2', 'sp']
+METRICS = {
+    'frequence': "fréquence",
+    'cout':      "coût moyen",
+    'sp':        "S/P",
+}
+
+_erfc = np.vectorize(math.erfc, otypes=[float])
+
+
+class OutlierCube:
+
+    def __init__(self, df):
+        self.levels, codes = [], []
+        for col, _ in OUTLIER_DIMENSIONS:
+            cat = pd.Categorical(df[col])
+            c = np.asarray(cat.codes, dtype=np.int64)
+            levels = [str(v) for v in cat.categories]
+            # Modalité manquante → dernière case, exclue des cellules publiées
+            codes.append(np.where(c >= 0, c, len(levels)))
+            self.levels.append(levels)
+        self.shape = tuple(len(l) + 1 for l in self.levels)
+        self.cell = np.ravel_multi_index(codes, self.shape)
+
+        nb = df['nb_sinistres'].to_numpy(dtype=np.float64)
+        s = df['montant_sinistres'].to_numpy(dtype=np.float64)
+        p = df['montant_prime'].to_numpy(dtype=np.float64)
+        claimed = (nb > 0).astype(np.float64)
+        x = s * claimed
+        # Une colonne par statistique, contiguë (lecture par index de sélection)
+        self.values = np.ascontiguousarray(np.column_stack(
+            [np.ones_like(nb), nb, nb * nb, claimed, x, x * x, s, s * s, p, p * p, s * p]).T)
+        self.subspaces = [dims for order in range(1, MAX_ORDER + 1)
+                          for dims in combinations(range(len(OUTLIER_DIMENSIONS)), order)]
+
+    # ════════════════════════════════════════════════════════
+    # CUBE DE LA SÉLECTION
+    # ════════════════════════════════════════════════════════
+    # rows : positions des lignes sélectionnées (index du DataFrame d'origine)
+    def cube(self, rows):
+        cell = self.cell[rows]
+        size = int(np.prod(self.shape))
+        return {name: np.bincount(cell, weights=self.values[k][rows], minlength=size)
+                .reshape(self.shape) for k, name in enumerate(_STATS)}
+
+    # Tests d'écart pour toutes les cellules de toutes les combinaisons
+    def scan(self, rows):
+        cube = self.cube(rows)
+        total = {k: v.sum() for k, v in cube.items()}
+        if total['n'] == 0 or total['p'] == 0:
+            return pd.DataFrame(), 0
+        freq = total['nb'] / total['n']
+        sev = total['x'] / total['c'] if total['c'] else 0.0
+        ratio = total['s'] / total['p']
+
+        frames = []
+        for dims in self.subspaces:
+            other = tuple(d for d in range(len(self.shape)) if d not in dims)
+            # Sous-cube sans la case « manquant » de chaque dimension retenue
+            keep = tuple(slice(0, self.shape[d] - 1) for d in dims)
+            sub = {k: v.sum(axis=other)[keep].ravel() for k, v in cube.items()}
+            n, c = sub['n'], sub['c']
+            with np.errstate(divide='ignore', invalid='ignore'):
+                tests = {
+                    'frequence': (sub['nb'] / n, freq, sub['nb'] - n * freq,
+                                  sub['nb2'] - 2 * freq * sub['nb'] + n * freq ** 2, n >= MIN_SUPPORT),
+                    'cout':      (sub['x'] / c, sev, sub['x'] - c * sev,
+                                  sub['x2'] - 2 * sev * sub['x'] + c * sev ** 2,
+                                  (n >= MIN_SUPPORT) & (c >= MIN_CLAIMANTS)),
+                    'sp':        (sub['s'] / sub['p'], ratio, sub['s'] - ratio * sub['p'],
+                                  sub['s2'] - 2 * ratio * sub['sp'] + ratio ** 2 * sub['p2'],
+                                  n >= MIN_SUPPORT),
+                }
+                cells = np.array(list(np.ndindex(*(self.shape[d] - 1 for d in dims))))
+                for metric, (value, ref, diff, ss, ok) in tests.items():
+                    z = diff / np.sqrt(ss)
+                    ok = ok & np.isfinite(z) & (ss > 0)
+                    if not ok.any():
+                        continue
+                    frames.append(pd.DataFrame({
+                        'dims': [dims] * int(ok.sum()),
+                        'cells': [tuple(r) for r in cells[ok]],
+                        'metric': metric, 'value': value[ok], 'ref': ref,
+                        'z': z[ok], 'n': n[ok],
+                    }))
+        if not frames:
+            return pd.DataFrame(), 0
+        tests = pd.concat(frames, ignore_index=True)
+        tests['p'] = _erfc(np.abs(tests['z'].to_numpy()) / math.sqrt(2))
+        return tests, len(tests)
+
+    # ════════════════════════════════════════════════════════
+    # SEGMENTS ATYPIQUES RETENUS
+    # ════════════════════════════════════════════════════════
+    def top(self, rows, k=TOP_K):
+        tests, n_tests = self.scan(rows)
+        if not n_tests:
+            return [], 0
+        # Benjamini–Hochberg : plus grand rang i tel que p_(i) ≤ i/m × FDR
+        order = np.argsort(tests['p'].to_numpy())
+        ranked = tests['p'].to_numpy()[order]
+        below = np.nonzero(ranked <= (np.arange(1, n_tests + 1) / n_tests) * FDR)[0]
+        if not len(below):
+            return [], n_tests
+        significant = tests.iloc[order[:below[-1] + 1]]
+        significant = significant.reindex(
+            significant['z'].abs().sort_values(ascending=False).index)
+
+        picked, seen = [], []
+        for row in significant.itertuples(index=False):
+            items = frozenset(zip(row.dims, row.cells))
+            sign = row.z > 0
+            # Écart déjà porté par un segment emboîté retenu (même indicateur, même sens)
+            if any(m == row.metric and s == sign and (items <= other or other <= items)
+                   for m, s, other in seen):
+                continue
+            seen.append((row.metric, sign, items))
+            picked.append({
+                'segment': [(OUTLIER_DIMENSIONS[d][1], self.levels[d][c]) for d, c in sorted(items)],
+                'metric': row.metric, 'value': row.value, 'ref': row.ref,
+                'z': row.z, 'n': int(row.n),
+            })
+            if len(picked) == k:
+                break
+        return picked, n_tests
+
+
+def describe_segment(segment):
+    return ' · '.join(level for _, level in segment)
+
+
+def format_metric(metric, value):
+    if metric == 'frequence':
+        return f"{value:.3f} sinistre/assuré"
+    if metric == 'cout':
+        return f"{value:,.0f} €"
+    return f"{value:.2f}x"
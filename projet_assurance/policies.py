@@ -0,0 +1,97 @@
+# =============================================================
+#  policies.py  —  Index des contrats : fiche assuré & top N
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+#  Fiche assuré : index de hachage id_assure → ligne (pd.Index, table khash),
+#  recherche en O(1) sans parcours du DataFrame.
+#  Top N d'une sélection (masque du moteur crossfilter) pour le montant des
+#  sinistres, le ratio S/P et le nombre de sinistres :
+#   - ordre décroissant de chaque indicateur précalculé au chargement
+#     (ex-aequo par ligne, S/P manquant en dernier) ;
+#   - sélection large : parcours de cet ordre par blocs de taille croissante,
+#     arrêt dès N lignes retenues — quelques blocs pour un segment courant ;
+#   - sélection étroite : sélection partielle (np.partition) sur ses seules
+#     lignes, O(k), puis tri des N retenues.
+#  Les deux chemins donnent le même résultat (mêmes règles d'ex-aequo).
+#  Rang de chaque contrat dans le portefeuille (permutation inverse de l'ordre).
+
+import numpy as np
+import pandas as pd
+
+
+TOP_N = 50
+TOP_METRICS = {
+    'montant_sinistres': "Montant des sinistres",
+    'ratio_SP':          "Ratio S/P",
+    'nb_sinistres':      "Nb de sinistres",
+}
+TOP_METRIC_DEFAULT = 'montant_sinistres'
+SCAN_FRACTION = 16                      # sélection ≥ 1/16 du portefeuille : parcours de l'ordre
+
+
+class PolicyIndex:
+
+    def __init__(self, df):
+        self.n = len(df)
+        self.by_id = pd.Index(df['id_assure'].to_numpy())
+        # Clé de tri : valeur, manquante → −∞ (dernière en ordre décroissant)
+        self.keys, self.order, self.rank = {}, {}, {}
+        for metric in TOP_METRICS:
+            if metric not in df.columns:
+                continue
+            v = df[metric].to_numpy(dtype=np.float64)
+            key = np.where(np.isnan(v), -np.inf, v)
+            order = np.argsort(-key, kind='stable')
+            rank = np.empty(self.n, dtype=np.int64)
+            rank[order] = np.arange(self.n)
+            self.keys[metric], self.order[metric], self.rank[metric] = key, order, rank
+
+    # ════════════════════════════════════════════════════════
+    # FICHE ASSURÉ
+    # ════════════════════════════════════════════════════════
+    # Ligne du contrat (première si l'identifiant est dupliqué), None si inconnu
+    def row(self, policy_id):
+        try:
+            loc = self.by_id.get_loc(policy_id)
+        except (KeyError, TypeError):
+            return None
+        if isinstance(loc, slice):
+            return loc.start
+        if isinstance(loc, np.ndarray):
+            return int(np.flatnonzero(loc)[0])
+        return int(loc)
+
+    # ════════════════════════════════════════════════════════
+    # TOP N D'UNE SÉLECTION
+    # ════════════════════════════════════════════════════════
+    # mask : lignes retenues (booléens) → positions des N premiers contrats
+    def top(self, mask, metric=TOP_METRIC_DEFAULT, n=TOP_N):
+        k = int(np.count_nonzero(mask))
+        n = min(n, k)
+        if n == 0:
+            return np.empty(0, dtype=np.int64)
+        if k * SCAN_FRACTION >= self.n:
+            return self._scan(mask, metric, n, k)
+        return self._partition(np.flatnonzero(mask), metric, n)
+
+    def _scan(self, mask, metric, n, k):
+        order = self.order[metric]
+        picked, found, start, block = [], 0, 0, 2 * n * self.n // k + 64
+        while found < n and start < self.n:
+            chunk = order[start:start + block]
+            chunk = chunk[mask[chunk]]
+            picked.append(chunk)
+            found += len(chunk)
+            start += block
+            block *= 2
+        return np.concatenate(picked)[:n]
+
+    def _partition(self, rows, metric, n):
+        key = self.keys[metric]
+        vals = key[rows]
+        # Seuil = N-ième plus grande valeur ; ex-aequo au seuil départagés par ligne
+        t = np.partition(vals, len(vals) - n)[len(vals) - n]
+        above = rows[vals > t]
+        top = np.concatenate([above, rows[vals == t][:n - len(above)]])
+        return top[np.lexsort((top, -key[top]))]
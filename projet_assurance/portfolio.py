@@ -0,0 +1,77 @@
+# =============================================================
+#  portfolio.py  —  Chargement & enrichissement du portefeuille
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+#  Lecture du fichier assurés, agrégats recalculés depuis la table des
+#  sinistres si elle est présente, variables dérivées (tranches d'âge, S/P,
+#  catégorie B/M, mois du sinistre) et scores du modèle fréquence × coût.
+#  Partagé par app.py (tableau de bord) et batch.py (rapports en lot) :
+#  mêmes données, mêmes calculs, dans le serveur comme en ligne de commande.
+
+import os
+import traceback
+
+import pandas as pd
+
+from claims import load_claims
+from glm import add_risk_scores
+
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         'data', 'assurance_data_1000.csv')
+
+
+def load_portfolio(path=DATA_FILE):
+    try:
+        df = pd.read_csv(path, sep=';')
+
+        # Conversion dates
+        df['date_derniere_sinistre'] = pd.to_datetime(
+            df['date_derniere_sinistre'], errors='coerce'
+        )
+
+        # Table de faits des sinistres (data/sinistres.csv, une ligne par sinistre) :
+        # si présente, agrégats par assuré recalculés exactement depuis les sinistres
+        claims = load_claims(df)
+        if claims is not None:
+            df = claims.apply(df)
+
+        # Tranches d'âge
+        df['tranche_age'] = pd.cut(
+            df['age'],
+            bins=[17, 25, 35, 45, 55, 65, 79],
+            labels=['18-25', '26-35', '36-45', '46-55', '56-65', '66-79'],
+            include_lowest=True
+        )
+
+        # Ratio sinistre / prime (rentabilité)
+        df['ratio_SP'] = (df['montant_sinistres'] / df['montant_prime']).round(2)
+
+        # Catégorie bonus/malus
+        df['bm_cat'] = pd.cut(
+            df['bonus_malus'],
+            bins=[0.4, 0.8, 1.0, 1.2, 1.6],
+            labels=['Bonus fort', 'Bonus', 'Neutre', 'Malus']
+        )
+
+        # Année et mois du sinistre
+        df['annee_sinistre'] = df['date_derniere_sinistre'].dt.year
+        df['mois_sinistre']  = df['date_derniere_sinistre'].dt.to_period('M').astype(str)
+
+        print(f"✅  Données chargées   : {len(df)} assurés")
+        print(f"📊  Colonnes           : {df.columns.tolist()}")
+        print(f"🗺️   Régions            : {df['region'].unique().tolist()}")
+        print(f"🛡️   Types              : {df['type_assurance'].unique().tolist()}")
+        print(f"📅  Âge                : {df['age'].min()} → {df['age'].max()} ans")
+
+    except Exception as e:
+        print(f"❌ Erreur chargement données : {e}")
+        traceback.print_exc()
+        df = pd.DataFrame()
+        claims = None
+
+    # ── Modèle fréquence × coût : prime pure & score de risque ───
+    if len(df):
+        df = add_risk_scores(df)
+    return df, claims
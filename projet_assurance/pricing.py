@@ -0,0 +1,154 @@
+# =============================================================
+#  pricing.py  —  Simulateur tarifaire « what-if »
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+#  Segments = type d'assurance × région × tranche d'âge × catégorie B/M.
+#  Une hypothèse tarifaire est un facteur multiplicatif de prime par segment :
+#  produit des règles d'ajustement (± x % sur un sous-ensemble de segments)
+#  et du barème bonus/malus révisé (± x % par catégorie B/M).
+#  Sommes par segment (effectifs, primes, sinistres) calculées une fois :
+#  prime totale, S/P projeté et S/P par type se recalculent en O(segments).
+#  % déficitaires : ratio_SP / f > 1 ⟺ ratio_SP > f, compté par recherche
+#  dichotomique dans un index trié (segment, ratio_SP) — une requête par segment.
+#  Seule la distribution complète (histogramme, médiane) repasse sur les contrats.
+
+import numpy as np
+import pandas as pd
+
+
+# (colonne, clé des règles, libellé)
+SEGMENT_DIMENSIONS = [
+    ('type_assurance', 'type',    "Type"),
+    ('region',         'region',  "Région"),
+    ('tranche_age',    'tranche', "Tranche d'âge"),
+    ('bm_cat',         'bm',      "Catégorie B/M"),
+]
+PRICING_PCT_RANGE = (-30, 30)           # bornes d'un ajustement de prime (%)
+BM_SCALE_RANGE = (-20, 20)              # bornes d'une révision de barème B/M (%)
+# Classes logarithmiques du ratio S/P (distribution très asymétrique) ; hors bornes regroupé
+HIST_BINS = np.logspace(-1, 2, 31)
+
+
+class PricingModel:
+
+    def __init__(self, df):
+        self.n = len(df)
+        self.levels, codes = [], []
+        for col, _, _ in SEGMENT_DIMENSIONS:
+            cat = pd.Categorical(df[col])
+            levels = [str(c) for c in cat.categories]
+            c = np.asarray(cat.codes, dtype=np.int64)
+            # Modalité manquante → dernière case : jamais visée par une règle restreinte
+            codes.append(np.where(c >= 0, c, len(levels)))
+            self.levels.append(levels)
+        self.shape = tuple(len(l) + 1 for l in self.levels)
+        self.size = int(np.prod(self.shape))
+        self.segment = np.ravel_multi_index(codes, self.shape)
+
+        prime = df['montant_prime'].to_numpy(dtype=np.float64)
+        sin = df['montant_sinistres'].to_numpy(dtype=np.float64)
+        self.ratio = df['ratio_SP'].to_numpy(dtype=np.float64)
+        self.count = np.bincount(self.segment, minlength=self.size)
+        self.prime = np.bincount(self.segment, weights=prime, minlength=self.size)
+        self.sinistres = np.bincount(self.segment, weights=sin, minlength=self.size)
+
+        # Index trié par (segment, ratio) ; clé composite segment × M + ratio
+        ok = ~np.isnan(self.ratio)
+        seg, ratio = self.segment[ok], self.ratio[ok]
+        self.span = float(max(np.nanmax(ratio, initial=0.0), 10.0)) + 1.0
+        self.keys = np.sort(seg * self.span + ratio)
+        self.valid = np.bincount(seg, minlength=self.size)
+        self.starts = np.concatenate([[0], np.cumsum(self.valid)[:-1]])
+
+    # ════════════════════════════════════════════════════════
+    # FACTEURS DE PRIME PAR SEGMENT
+    # ════════════════════════════════════════════════════════
+    # Masque (sur la grille des segments) des segments visés par une règle
+    def _selector(self, rule):
+        axes = []
+        for (_, key, _), levels in zip(SEGMENT_DIMENSIONS, self.levels):
+            wanted = rule.get(key) or []
+            if wanted:
+                axes.append(np.array([l in wanted for l in levels] + [False]))
+            else:
+                axes.append(np.ones(len(levels) + 1, dtype=bool))
+        return np.ix_(*axes)
+
+    # rules : [{'type': [...], 'region': [...], 'tranche': [...], 'bm': [...], 'pct': 5}, ...]
+    # bm_scale : {catégorie B/M: pct}
+    def factors(self, rules=(), bm_scale=None):
+        grid = np.ones(self.shape)
+        for rule in rules:
+            pct = float(rule.get('pct') or 0)
+            if pct:
+                grid[self._selector(rule)] *= 1 + pct / 100
+        for cat, pct in (bm_scale or {}).items():
+            if pct and cat in self.levels[3]:
+                grid[:, :, :, self.levels[3].index(cat)] *= 1 + float(pct) / 100
+        return grid.ravel()
+
+    # ════════════════════════════════════════════════════════
+    # INDICATEURS — O(segments)
+    # ════════════════════════════════════════════════════════
+    # Assurés déficitaires (ratio_SP > f_s) dans chaque segment ; un seuil au-delà
+    # du ratio max est ramené sous la clé du segment suivant
+    def _deficits(self, f):
+        f = np.minimum(f, self.span - 0.5)
+        ends = np.searchsorted(self.keys, np.arange(self.size) * self.span + f, side='right')
+        return self.valid - (ends - self.starts)
+
+    def simulate(self, f):
+        prime_after = self.prime * f
+
+        def by_type(a):
+            return a.reshape(self.shape).sum(axis=(1, 2, 3))[:-1]
+
+        deficit_before = self._deficits(np.ones(self.size)).sum()
+        deficit_after = self._deficits(f).sum()
+        valid = max(self.valid.sum(), 1)
+        total_sin = self.sinistres.sum()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return {
+                'prime_avant':    self.prime.sum(),
+                'prime_apres':    prime_after.sum(),
+                'sinistres':      total_sin,
+                'sp_avant':       total_sin / self.prime.sum() if self.prime.sum() else np.nan,
+                'sp_apres':       total_sin / prime_after.sum() if prime_after.sum() else np.nan,
+                'def_avant':      deficit_before / valid * 100,
+                'def_apres':      deficit_after / valid * 100,
+                'types':          self.levels[0],
+                'sp_type_avant':  by_type(self.sinistres) / by_type(self.prime),
+                'sp_type_apres':  by_type(self.sinistres) / by_type(prime_after),
+                'segments_modifies': int(((f != 1) & (self.count > 0)).sum()),
+                'assures_modifies':  int(self.count[f != 1].sum()),
+            }
+
+    # ════════════════════════════════════════════════════════
+    # DISTRIBUTION EXACTE — recalcul vectorisé par contrat
+    # ════════════════════════════════════════════════════════
+    def distribution(self, f):
+        after = self.ratio / f[self.segment]
+
+        def clip(a):
+            return np.clip(a[~np.isnan(a)], HIST_BINS[0], HIST_BINS[-1])
+
+        before_counts, _ = np.histogram(clip(self.ratio), bins=HIST_BINS)
+        after_counts, _ = np.histogram(clip(after), bins=HIST_BINS)
+        return {
+            'bins':       HIST_BINS,
+            'avant':      before_counts,
+            'apres':      after_counts,
+            'med_avant':  float(np.nanmedian(self.ratio)) if self.n else np.nan,
+            'med_apres':  float(np.nanmedian(after)) if self.n else np.nan,
+        }
+
+
+# Libellé lisible d'une règle d'ajustement
+def describe_rule(rule):
+    parts = []
+    for _, key, _ in SEGMENT_DIMENSIONS:
+        if rule.get(key):
+            parts.append(', '.join(rule[key]))
+    scope = ' · '.join(parts) if parts else 'Tout le portefeuille'
+    return f"{scope} : {float(rule.get('pct') or 0):+g} %"
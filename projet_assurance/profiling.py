@@ -0,0 +1,373 @@
+# =============================================================
+#  profiling.py  —  Profilage à la demande des callbacks lents
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+#  « Le dashboard rame avec ces filtres » : on rejoue les filtres avec le
+#  profilage activé, et la requête /_dash-update-component correspondante
+#  est enregistrée avec son état de filtres. Déclencheurs :
+#   - en-tête HTTP  X-Assur-Profile: sampling | cprofile
+#   - paramètre ?profil=sampling|cprofile dans l'URL du dashboard (via Referer)
+#   - armement depuis la page locale /admin/profils (N prochaines requêtes)
+#  Modes : 'sampling' (échantillonneur de piles → JSON speedscope, faible
+#  surcoût) ou 'cprofile' (déterministe → .pstats). tracemalloc relève les
+#  principales allocations dans les deux cas. Une seule requête profilée à
+#  la fois par worker ; les autres passent sans surcoût.
+#
+#  ASSUR_PROFILING : 'local' (défaut, déclencheurs acceptés depuis la machine
+#  locale seulement), 'all' (depuis tout client) ou '0' (désactivé).
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import shutil
+import sys
+import threading
+import time
+import tracemalloc
+from urllib.parse import parse_qs, urlparse
+
+from flask import abort, g, redirect, request, send_from_directory
+
+from cache import CACHE_DIR
+
+
+PROFILE_DIR = os.path.join(CACHE_DIR, 'profils')
+PROFILE_MODES = ('sampling', 'cprofile')
+PROFILE_KEEP = 50                       # profils conservés sur disque
+SAMPLE_INTERVAL = 0.002                 # période de l'échantillonneur (s)
+# Une seule trame par allocation : suffit au classement par ligne et limite
+# le surcoût de tracemalloc (≈ ×4 au lieu de ×35 avec 10 trames)
+TRACEMALLOC_FRAMES = 1
+# Callbacks profilables : tableau de bord (update_all) et exports
+PROFILE_TARGETS = re.compile(os.environ.get('ASSUR_PROFILE_TARGETS', r'chart-|kpi-|download-'))
+LOOPBACK = ('127.0.0.1', '::1', 'localhost')
+
+_busy = threading.Lock()
+_armed = {'mode': None, 'remaining': 0}
+_armed_lock = threading.Lock()
+
+
+# ════════════════════════════════════════════════════════════════
+# ÉCHANTILLONNEUR DE PILES
+# ════════════════════════════════════════════════════════════════
+# Thread qui relève la pile du thread de la requête toutes les SAMPLE_INTERVAL s
+class StackSampler:
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.frames, self.index = [], {}
+        self.samples, self.weights = [], []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _frame_id(self, code):
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        if key not in self.index:
+            self.index[key] = len(self.frames)
+            self.frames.append({'name': code.co_name, 'file': code.co_filename,
+                                'line': code.co_firstlineno})
+        return self.index[key]
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_id(frame.f_code))
+                frame = frame.f_back
+            self.samples.append(stack[::-1])
+            self.weights.append((now - last) * 1000)
+            last = now
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    # Format « sampled » de https://www.speedscope.app
+    def speedscope(self, name):
+        total = sum(self.weights)
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'shared': {'frames': self.frames},
+            'profiles': [{'type': 'sampled', 'name': name, 'unit': 'milliseconds',
+                          'startValue': 0, 'endValue': total,
+                          'samples': self.samples, 'weights': self.weights}],
+            'name': name, 'exporter': 'assuranalytics',
+        }
+
+    # Piles repliées (format flamegraph.pl : « a;b;c poids »)
+    def collapsed(self):
+        lines = {}
+        for stack, w in zip(self.samples, self.weights):
+            key = ';'.join(self.frames[i]['name'] for i in stack)
+            lines[key] = lines.get(key, 0.0) + w
+        return '\n'.join(f"{k} {v:.0f}" for k, v in sorted(lines.items(), key=lambda kv: -kv[1]))
+
+
+# ════════════════════════════════════════════════════════════════
+# SESSION DE PROFILAGE (une requête)
+# ════════════════════════════════════════════════════════════════
+def _label(body):
+    out = body.get('output', '')
+    first = out.strip('.').split('...')[0].rsplit('.', 1)[0]
+    return re.sub(r'[^A-Za-z0-9_-]', '_', first) or 'callback'
+
+
+# État des filtres de la requête (entrées + états), sans les gros stores
+def _filter_state(body):
+    state = {}
+    for item in body.get('inputs', []) + body.get('state', []):
+        if not isinstance(item, dict) or 'id' not in item:
+            continue
+        value = item.get('value')
+        if len(json.dumps(value, default=str)) > 2000:
+            value = '<volumineux>'
+        state[f"{item['id']}.{item['property']}"] = value
+    return state
+
+
+class ProfileSession:
+
+    def __init__(self, mode, body):
+        self.mode = mode
+        self.body = body
+        self.label = _label(body)
+        self.sampler = StackSampler(threading.get_ident()) if mode == 'sampling' else None
+        self.profiler = cProfile.Profile() if mode == 'cprofile' else None
+
+    def start(self):
+        self.tracing = not tracemalloc.is_tracing()
+        if self.tracing:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        self.t0 = time.perf_counter()
+        if self.sampler:
+            self.sampler.start()
+        if self.profiler:
+            self.profiler.enable()
+
+    def finish(self, status):
+        if self.profiler:
+            self.profiler.disable()
+        if self.sampler:
+            self.sampler.stop()
+        elapsed = (time.perf_counter() - self.t0) * 1000
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if self.tracing:
+            tracemalloc.stop()
+
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}_{self.label}_{elapsed:.0f}ms"
+        path = os.path.join(PROFILE_DIR, name)
+        os.makedirs(path, exist_ok=True)
+
+        files = []
+        if self.profiler:
+            self.profiler.dump_stats(os.path.join(path, 'profil.pstats'))
+            buf = io.StringIO()
+            pstats.Stats(self.profiler, stream=buf).sort_stats('cumulative').print_stats(40)
+            _write(path, 'profil.txt', buf.getvalue())
+            files += ['profil.pstats', 'profil.txt']
+        if self.sampler:
+            _write(path, 'speedscope.json', json.dumps(self.sampler.speedscope(name)))
+            _write(path, 'piles.txt', self.sampler.collapsed())
+            files += ['speedscope.json', 'piles.txt']
+
+        stats = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ]).statistics('lineno')
+        _write(path, 'allocations.txt', '\n'.join(
+            f"{s.size / 1024:10.1f} Kio  {s.count:8d} blocs  {s.traceback}" for s in stats[:30]))
+        files.append('allocations.txt')
+
+        meta = {'callback': self.label, 'mode': self.mode, 'duree_ms': round(elapsed, 1),
+                'statut': status, 'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'pid': os.getpid(), 'memoire_pic_kio': round(peak / 1024, 1),
+                'memoire_fin_kio': round(current / 1024, 1), 'fichiers': files,
+                'declencheurs': self.body.get('changedPropIds', []),
+                'filtres': _filter_state(self.body)}
+        _write(path, 'meta.json', json.dumps(meta, indent=2, ensure_ascii=False, default=str))
+        _prune()
+        return name
+
+
+def _write(path, filename, text):
+    with open(os.path.join(path, filename), 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def _prune(keep=PROFILE_KEEP):
+    names = sorted(os.listdir(PROFILE_DIR))
+    for old in names[:-keep]:
+        shutil.rmtree(os.path.join(PROFILE_DIR, old), ignore_errors=True)
+
+
+def list_profiles():
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    out = []
+    for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        try:
+            with open(os.path.join(PROFILE_DIR, name, 'meta.json'), encoding='utf-8') as f:
+                out.append((name, json.load(f)))
+        except (OSError, ValueError):
+            continue
+    return out
+
+
+# ════════════════════════════════════════════════════════════════
+# DÉCLENCHEURS
+# ════════════════════════════════════════════════════════════════
+def _mode(value):
+    value = (value or '').strip().lower()
+    if value in PROFILE_MODES:
+        return value
+    return 'sampling' if value in ('1', 'true', 'on', 'oui') else None
+
+
+def arm(mode, count):
+    with _armed_lock:
+        _armed['mode'], _armed['remaining'] = mode, max(0, int(count))
+
+
+def _requested_mode():
+    mode = _mode(request.headers.get('X-Assur-Profile')) or _mode(request.args.get('profil'))
+    if mode:
+        return mode
+    referrer = request.referrer
+    if referrer:
+        mode = _mode((parse_qs(urlparse(referrer).query).get('profil') or [None])[0])
+        if mode:
+            return mode
+    with _armed_lock:
+        if _armed['remaining'] > 0:
+            _armed['remaining'] -= 1
+            return _armed['mode']
+    return None
+
+
+# ════════════════════════════════════════════════════════════════
+# INSTALLATION SUR LE SERVEUR FLASK
+# ════════════════════════════════════════════════════════════════
+def install_profiler(server, policy=None):
+    policy = (policy or os.environ.get('ASSUR_PROFILING', 'local')).lower()
+    if policy in ('0', 'false', 'off'):
+        return
+
+    def local():
+        return request.remote_addr in LOOPBACK
+
+    @server.before_request
+    def _start_profile():
+        if not request.path.endswith('/_dash-update-component'):
+            return
+        if policy != 'all' and not local():
+            return
+        body = request.get_json(silent=True) or {}
+        if not PROFILE_TARGETS.search(body.get('output', '')):
+            return
+        mode = _requested_mode()
+        if not mode or not _busy.acquire(blocking=False):
+            return
+        session = ProfileSession(mode, body)
+        g.assur_profile = session
+        session.start()
+
+    @server.after_request
+    def _stop_profile(response):
+        session = g.pop('assur_profile', None)
+        if session is not None:
+            try:
+                name = session.finish(response.status_code)
+                response.headers['X-Assur-Profile-Id'] = name
+            finally:
+                _busy.release()
+        return response
+
+    @server.teardown_request
+    def _release_profile(exc):
+        # Requête interrompue avant after_request : on libère sans enregistrer
+        session = g.pop('assur_profile', None)
+        if session is not None:
+            if session.profiler:
+                session.profiler.disable()
+            if session.sampler:
+                session.sampler.stop()
+            if session.tracing:
+                tracemalloc.stop()
+            _busy.release()
+
+    # ── Page d'administration (machine locale uniquement) ──
+    @server.route('/admin/profils')
+    def admin_profiles():
+        if not local():
+            abort(403)
+        mode = _mode(request.args.get('armer'))
+        if mode:
+            arm(mode, request.args.get('n', 1))
+            return redirect('/admin/profils')
+        return _admin_page(list_profiles())
+
+    @server.route('/admin/profils/<name>/<filename>')
+    def admin_profile_file(name, filename):
+        if not local():
+            abort(403)
+        return send_from_directory(os.path.join(PROFILE_DIR, name), filename,
+                                   as_attachment=filename.endswith('.pstats'))
+
+
+def _esc(text):
+    return (str(text).replace('&', '&amp;').replace('<', '&lt;')
+            .replace('>', '&gt;').replace('"', '&quot;'))
+
+
+def _admin_page(profiles):
+    rows = []
+    for name, meta in profiles:
+        links = ' · '.join(f'<a href="/admin/profils/{_esc(name)}/{f}">{f}</a>'
+                           for f in meta.get('fichiers', []) + ['meta.json'])
+        filters = ', '.join(f"{_esc(k)} = {_esc(v)}" for k, v in meta.get('filtres', {}).items()
+                            if v not in (None, [], ''))
+        rows.append(
+            f"<tr><td>{_esc(meta.get('date'))}</td><td>{_esc(meta.get('callback'))}</td>"
+            f"<td>{_esc(meta.get('mode'))}</td><td class='num'>{meta.get('duree_ms', 0):,.0f} ms</td>"
+            f"<td class='num'>{meta.get('memoire_pic_kio', 0) / 1024:,.1f} Mo</td>"
+            f"<td>{meta.get('statut')}</td><td class='filtres'>{filters}</td><td>{links}</td></tr>")
+    with _armed_lock:
+        armed = (f"{_armed['remaining']} requête(s) armée(s) en mode {_armed['mode']}"
+                 if _armed['remaining'] else "Aucune requête armée")
+    return f"""<!DOCTYPE html><html lang="fr"><head><meta charset="utf-8">
+<title>AssurAnalytics — Profils</title>
+<style>
+ body {{ font-family: Segoe UI, Arial, sans-serif; margin: 24px; color: #1A237E; }}
+ table {{ border-collapse: collapse; width: 100%; font-size: 13px; }}
+ th {{ background: #1A237E; color: white; padding: 8px; text-align: left; }}
+ td {{ padding: 6px 8px; border-bottom: 1px solid #E0E0E0; vertical-align: top; }}
+ td.num {{ text-align: right; white-space: nowrap; }}
+ td.filtres {{ color: #546E7A; font-size: 12px; }}
+ .armer a {{ margin-right: 12px; }}
+</style></head><body>
+<h2>🔬 Profils des callbacks</h2>
+<p class="armer">{armed} —
+ armer : <a href="?armer=sampling&n=1">1 × échantillonneur</a>
+ <a href="?armer=sampling&n=5">5 × échantillonneur</a>
+ <a href="?armer=cprofile&n=1">1 × cProfile</a></p>
+<p>Sans armement : en-tête <code>X-Assur-Profile: sampling</code> ou
+ <code>?profil=sampling</code> dans l'URL du dashboard. Les fichiers
+ <code>speedscope.json</code> s'ouvrent sur https://www.speedscope.app.</p>
+<table><tr><th>Date</th><th>Callback</th><th>Mode</th><th>Durée</th><th>Mémoire pic</th>
+<th>Statut</th><th>Filtres</th><th>Fichiers</th></tr>
+{''.join(rows) or '<tr><td colspan="8">Aucun profil enregistré.</td></tr>'}
+</table></body></html>"""
@@ -0,0 +1,171 @@
+# =============================================================
+#  sampling.py  —  Échantillon stratifié & intervalles de confiance
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+#  Pendant le glissement des sliders, le tableau de bord est calculé sur un
+#  échantillon stratifié (type × région × tranche d'âge) tiré une fois au
+#  démarrage : la latence dépend de la taille de l'échantillon, pas du
+#  portefeuille. Chaque ligne porte le poids N_h / n_h de sa strate ; les
+#  KPIs sont des estimateurs de domaine (totaux et ratios) accompagnés d'un
+#  intervalle de confiance à 95 %. Le résultat exact est recalculé au relâchement.
+#  Les bandes affichées portent la mention « échantillon » : erreur d'échantillonnage,
+#  à distinguer de l'IC bootstrap du résultat exact (bootstrap.py).
+
+import os
+
+import numpy as np
+
+
+SAMPLE_SIZE = int(os.environ.get('ASSUR_SAMPLE_SIZE', 20_000))
+# En mode auto, l'échantillonnage n'est activé qu'au-delà de ce volume
+SAMPLING_MIN_ROWS = 200_000
+STRATA = ['type_assurance', 'region', 'tranche_age']
+Z_95 = 1.96
+CI_LABEL = "IC 95 % échantillon"
+
+
+# ════════════════════════════════════════════════════════════════
+# TIRAGE
+# ════════════════════════════════════════════════════════════════
+# Allocation proportionnelle, au moins 2 lignes par strate (variance estimable)
+def stratified_sample(df, size=SAMPLE_SIZE, seed=0):
+    strata = df.groupby(STRATA, observed=True, sort=True, dropna=False).ngroup().to_numpy()
+    sizes = np.bincount(strata)
+    alloc = np.minimum(sizes, np.maximum(2, np.round(size * sizes / len(df)).astype(np.int64)))
+
+    # Tri par (strate, clé aléatoire) puis les alloc[h] premières lignes de chaque strate
+    rng = np.random.default_rng(seed)
+    order = np.lexsort((rng.random(len(df)), strata))
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    rank = np.arange(len(df)) - starts[strata[order]]
+    rows = np.sort(order[rank < alloc[strata[order]]])
+
+    sample = df.iloc[rows].reset_index(drop=True)
+    sample['strate'] = strata[rows]
+    sample['poids'] = (sizes / alloc)[strata[rows]]
+    return sample, sizes, alloc
+
+
+# ════════════════════════════════════════════════════════════════
+# ESTIMATION
+# ════════════════════════════════════════════════════════════════
+class SampleEstimator:
+
+    def __init__(self, df, size=SAMPLE_SIZE, seed=0):
+        self.population = len(df)
+        self.sample, self.N_h, self.n_h = stratified_sample(df, size, seed)
+        self.strata = self.sample['strate'].to_numpy()
+        self.weights = self.sample['poids'].to_numpy()
+        self.fpc = 1 - self.n_h / self.N_h
+
+        s = self.sample
+        nb = s['nb_sinistres'].to_numpy(dtype=np.float64)
+        self.has_sin = (nb > 0).astype(np.float64)
+        self.values = {
+            'un':        np.ones(len(s)),
+            'nb':        nb,
+            'has_sin':   self.has_sin,
+            'cout':      s['montant_sinistres'].to_numpy(dtype=np.float64) * self.has_sin,
+            'prime':     s['montant_prime'].to_numpy(dtype=np.float64),
+            'bm':        s['bonus_malus'].to_numpy(dtype=np.float64),
+            'deficit':   (s['ratio_SP'].to_numpy(dtype=np.float64) > 1).astype(np.float64),
+        }
+        self.ratio_sp = s['ratio_SP'].to_numpy(dtype=np.float64)
+
+    # Total de z sur le domaine (z déjà nul hors domaine) et sa variance
+    def _total(self, z):
+        k = len(self.N_h)
+        n_h = self.n_h.astype(np.float64)
+        s1 = np.bincount(self.strata, weights=z, minlength=k)
+        s2 = np.bincount(self.strata, weights=z * z, minlength=k)
+        mean = s1 / n_h
+        var_h = np.where(n_h > 1, (s2 - n_h * mean ** 2) / np.maximum(n_h - 1, 1), 0.0)
+        total = float((self.N_h * mean).sum())
+        var = float((self.N_h ** 2 * self.fpc * np.maximum(var_h, 0) / n_h).sum())
+        return total, var
+
+    def total(self, mask, y):
+        est, var = self._total(y * mask)
+        return est, Z_95 * np.sqrt(var)
+
+    # Ratio Y/X sur le domaine (linéarisation de Taylor)
+    def ratio(self, mask, y, x=None):
+        x = np.ones(len(mask)) if x is None else x
+        yv, xv = y * mask, x * mask
+        ty, _ = self._total(yv)
+        tx, _ = self._total(xv)
+        if tx <= 0:
+            return np.nan, np.nan
+        r = ty / tx
+        _, var = self._total(yv - r * xv)
+        return r, Z_95 * np.sqrt(var) / tx
+
+    # Médiane pondérée interpolée ; IC de Woodruff (quantiles aux bornes de
+    # l'IC de F(médiane)), au moins aussi large que l'écart entre les deux
+    # observations qui encadrent la médiane
+    def median(self, mask, values):
+        ok = mask & ~np.isnan(values)
+        if not ok.any():
+            return np.nan, np.nan, np.nan
+        v, w = values[ok], self.weights[ok]
+        order = np.argsort(v, kind='stable')
+        v, w = v[order], w[order]
+        # Chaque observation placée au milieu de sa masse de poids cumulée
+        pos = (np.cumsum(w) - w / 2) / w.sum()
+
+        def quantile(p):
+            return float(np.interp(p, pos, v))
+
+        med = quantile(0.5)
+        _, half = self.ratio(ok.astype(np.float64), (values <= med).astype(np.float64))
+        half = 0.0 if np.isnan(half) else half
+        k = int(np.searchsorted(pos, 0.5))
+        below, above = v[max(k - 1, 0)], v[min(k, len(v) - 1)]
+        return (med, min(quantile(max(0.0, 0.5 - half)), below),
+                max(quantile(min(1.0, 0.5 + half)), above))
+
+
+# ════════════════════════════════════════════════════════════════
+# SORTIES KPI (valeur estimée + intervalle)
+# ════════════════════════════════════════════════════════════════
+def _pm(half, fmt):
+    return f"± {fmt.format(half)} ({CI_LABEL})" if np.isfinite(half) else ""
+
+
+def kpi_estimates(est, mask):
+    mask = mask.astype(np.float64)
+    v = est.values
+    n, n_ci = est.total(mask, v['un'])
+    nb, nb_ci = est.total(mask, v['nb'])
+    taux, taux_ci = est.ratio(mask, v['has_sin'])
+    cout, cout_ci = est.ratio(mask, v['cout'], v['has_sin'])
+    prime, prime_ci = est.ratio(mask, v['prime'])
+    bm, bm_ci = est.ratio(mask, v['bm'])
+    pdef, pdef_ci = est.ratio(mask, v['deficit'])
+    med, med_lo, med_hi = est.median(mask.astype(bool), est.ratio_sp)
+
+    def spaced(v):
+        return f"{v:,.0f}".replace(',', ' ')
+
+    ok = n > 0
+    return {
+        'kpi-total-assures':     f"≈ {spaced(n)}",
+        'kpi-total-sinistres':   f"≈ {spaced(nb)}",
+        'kpi-cout-moyen':        f"≈ {cout:,.0f} €" if ok and np.isfinite(cout) else "— €",
+        'kpi-prime-moy':         f"≈ {prime:,.0f} €" if ok else "— €",
+        'kpi-taux-sinistralite': f"≈ {taux*100:.1f}%" if ok else "—",
+        'kpi-ratio-sp':          f"≈ {med:.2f}x" if ok and np.isfinite(med) else "—",
+        'kpi-bm-moyen':          f"≈ {bm:.3f}" if ok else "—",
+        'kpi-pct-deficit':       f"≈ {pdef*100:.1f}%" if ok else "—",
+        'trend-assures':         f"🎯 Échantillon : {n/est.population*100:.0f}% du portefeuille",
+        'trend-sinistres':       "", 'trend-cout': "", 'trend-prime': "",
+        'ci-assures':            f"± {spaced(n_ci)} ({CI_LABEL})",
+        'ci-sinistres':          f"± {spaced(nb_ci)} ({CI_LABEL})",
+        'ci-cout':               _pm(cout_ci, '{:,.0f} €') if ok else "",
+        'ci-prime':              _pm(prime_ci, '{:,.0f} €') if ok else "",
+        'ci-taux-sinistralite':  _pm(taux_ci * 100, '{:.1f} pts') if ok else "",
+        'ci-ratio-sp':           f"{CI_LABEL} : {med_lo:.2f} – {med_hi:.2f}" if ok and np.isfinite(med) else "",
+        'ci-bm-moyen':           _pm(bm_ci, '{:.3f}') if ok else "",
+        'ci-pct-deficit':        _pm(pdef_ci * 100, '{:.1f} pts') if ok else "",
+    }
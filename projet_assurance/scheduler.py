@@ -0,0 +1,264 @@
+# =============================================================
+#  scheduler.py  —  Admission & priorités : interactif vs exports
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+#  Deux classes de travail par worker gunicorn :
+#   - interactif (update_all, comparaison) : au plus INTERACTIVE_SLOTS calculs
+#     simultanés ; une requête qui attend plus de INTERACTIVE_WAIT s est
+#     refusée (l'écran garde son état, un avis « serveur saturé » s'affiche)
+#     plutôt que d'empiler du retard ;
+#   - exports (Excel / HTML / PDF) : file bornée (EXPORT_QUEUE_MAX) traitée
+#     par EXPORT_SLOTS threads de fond, hors des threads de requête. Un export
+#     ne démarre pas tant que du travail interactif est en cours (au plus
+#     EXPORT_MAX_DEFER s de report, pour ne pas affamer la file).
+#  File pleine → l'interface affiche « file pleine » au lieu d'un timeout.
+#  L'état et le résultat de chaque export sont écrits dans .cache/exports/ :
+#  le navigateur peut les interroger depuis n'importe quel worker.
+#  Métriques (profondeur de file, temps d'attente) : /admin/ordonnanceur.
+
+import collections
+import json
+import os
+import pickle
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+from dash.exceptions import PreventUpdate
+from flask import abort, jsonify, request
+
+from cache import CACHE_DIR
+
+
+JOB_DIR = os.path.join(CACHE_DIR, 'exports')
+INTERACTIVE_SLOTS = int(os.environ.get('ASSUR_INTERACTIVE_SLOTS', 4))
+INTERACTIVE_WAIT = float(os.environ.get('ASSUR_INTERACTIVE_WAIT', 20))
+EXPORT_SLOTS = int(os.environ.get('ASSUR_EXPORT_SLOTS', 1))
+EXPORT_QUEUE_MAX = int(os.environ.get('ASSUR_EXPORT_QUEUE', 8))
+EXPORT_MAX_DEFER = 3.0
+JOB_TTL = 3600                          # résultats non récupérés purgés après 1 h
+WAIT_WINDOW = 500                       # temps d'attente conservés pour les percentiles
+LOOPBACK = ('127.0.0.1', '::1', 'localhost')
+
+
+# Requête interactive refusée faute de place : sans traitement, réponse vide
+# (PreventUpdate) ; les callbacks l'interceptent pour afficher un avis
+class ServerBusy(PreventUpdate):
+    pass
+
+
+class Scheduler:
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        # Écriture des positions hors du verrou principal ; un instantané plus
+        # ancien que le dernier publié est ignoré
+        self._status_lock = threading.Lock()
+        self._generation = self._published = 0
+        self._queue = collections.deque()
+        self._threads = []
+        self._pid = None
+        self.running = {'interactive': 0, 'export': 0}
+        self.waiting = {'interactive': 0}
+        self.waits = {k: collections.deque(maxlen=WAIT_WINDOW) for k in ('interactive', 'export')}
+        self.counters = {k: collections.Counter() for k in ('interactive', 'export')}
+
+    # ════════════════════════════════════════════════════════
+    # TRAVAIL INTERACTIF
+    # ════════════════════════════════════════════════════════
+    @contextmanager
+    def interactive(self):
+        t0 = time.perf_counter()
+        with self._cond:
+            self.waiting['interactive'] += 1
+            admitted = self._cond.wait_for(
+                lambda: self.running['interactive'] < INTERACTIVE_SLOTS, timeout=INTERACTIVE_WAIT)
+            self.waiting['interactive'] -= 1
+            if not admitted:
+                self.counters['interactive']['refusees'] += 1
+                self._cond.notify_all()
+                raise ServerBusy
+            self.running['interactive'] += 1
+            self.waits['interactive'].append(time.perf_counter() - t0)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.running['interactive'] -= 1
+                self.counters['interactive']['terminees'] += 1
+                self._cond.notify_all()
+
+    # ════════════════════════════════════════════════════════
+    # FILE D'EXPORTS
+    # ════════════════════════════════════════════════════════
+    def _start_threads(self):
+        # Threads démarrés dans le worker lui-même (pas dans le maître avant fork)
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._threads = [threading.Thread(target=self._export_loop, daemon=True,
+                                          name=f'export-{i}') for i in range(EXPORT_SLOTS)]
+        for t in self._threads:
+            t.start()
+
+    # fn() → dict dcc.Download ; renvoie l'identifiant du job, ou None si la file est pleine
+    def submit(self, kind, fn):
+        with self._cond:
+            self._start_threads()
+            if len(self._queue) >= EXPORT_QUEUE_MAX:
+                self.counters['export']['refusees'] += 1
+                return None
+            job = uuid.uuid4().hex
+            self._queue.append((job, kind, fn, time.perf_counter()))
+            self.counters['export']['soumises'] += 1
+            snapshot = self._positions()
+            self._cond.notify_all()
+        self._publish(*snapshot)
+        _prune_jobs()
+        return job
+
+    # Instantané numéroté des positions en file (sous le verrou principal)
+    def _positions(self):
+        self._generation += 1
+        return self._generation, [(job, {'etat': 'file', 'format': kind, 'position': pos})
+                                  for pos, (job, kind, _, _) in enumerate(self._queue, start=1)]
+
+    # Écriture des positions après libération du verrou principal
+    def _publish(self, generation, positions, started=None):
+        with self._status_lock:
+            if generation > self._published:
+                self._published = generation
+                for job, status in positions:
+                    _write_status(job, status)
+            if started:
+                _write_status(*started)
+
+    def _export_loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue)
+                # Priorité à l'interactif : report tant qu'une requête est en cours
+                deadline = time.monotonic() + EXPORT_MAX_DEFER
+                self._cond.wait_for(
+                    lambda: (self.running['interactive'] + self.waiting['interactive'] == 0
+                             or time.monotonic() >= deadline),
+                    timeout=EXPORT_MAX_DEFER)
+                if not self._queue:
+                    continue
+                job, kind, fn, t0 = self._queue.popleft()
+                self.waits['export'].append(time.perf_counter() - t0)
+                self.running['export'] += 1
+                snapshot = self._positions()
+            self._publish(*snapshot, started=(job, {'etat': 'en_cours', 'format': kind}))
+            try:
+                result = fn()
+                _write_result(job, result)
+                _write_status(job, {'etat': 'pret', 'format': kind})
+                outcome = 'terminees'
+            except Exception as e:
+                _write_status(job, {'etat': 'erreur', 'format': kind, 'message': str(e)})
+                outcome = 'erreurs'
+            with self._cond:
+                self.running['export'] -= 1
+                self.counters['export'][outcome] += 1
+                self._cond.notify_all()
+
+    # ════════════════════════════════════════════════════════
+    # MÉTRIQUES
+    # ════════════════════════════════════════════════════════
+    def metrics(self):
+        with self._cond:
+            out = {'pid': os.getpid(), 'file_exports': len(self._queue)}
+            for kind in ('interactive', 'export'):
+                waits = np.array(self.waits[kind]) * 1000
+                out[kind] = {
+                    'en_cours': self.running[kind],
+                    'en_attente': self.waiting.get(kind, len(self._queue)),
+                    'attente_p50_ms': round(float(np.percentile(waits, 50)), 1) if len(waits) else None,
+                    'attente_p95_ms': round(float(np.percentile(waits, 95)), 1) if len(waits) else None,
+                    **dict(self.counters[kind]),
+                }
+            out['limites'] = {'interactive': INTERACTIVE_SLOTS, 'export': EXPORT_SLOTS,
+                              'file_max': EXPORT_QUEUE_MAX}
+        return out
+
+
+# ════════════════════════════════════════════════════════════════
+# ÉTAT & RÉSULTATS DES JOBS (disque, partagés entre workers)
+# ════════════════════════════════════════════════════════════════
+def _job_path(job, ext):
+    return os.path.join(JOB_DIR, f"{job}.{ext}")
+
+
+def _write_status(job, status):
+    os.makedirs(JOB_DIR, exist_ok=True)
+    tmp = f"{_job_path(job, 'json')}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(status, f, ensure_ascii=False)
+    os.replace(tmp, _job_path(job, 'json'))
+
+
+def _write_result(job, result):
+    tmp = f"{_job_path(job, 'pkl')}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, _job_path(job, 'pkl'))
+
+
+def _valid(job):
+    return isinstance(job, str) and len(job) == 32 and all(c in '0123456789abcdef' for c in job)
+
+
+def job_status(job):
+    if not _valid(job):
+        return None
+    try:
+        with open(_job_path(job, 'json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# Résultat d'un job prêt ; les fichiers sont supprimés une fois remis
+def job_result(job):
+    if not _valid(job):
+        return None
+    try:
+        with open(_job_path(job, 'pkl'), 'rb') as f:
+            result = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    for ext in ('pkl', 'json'):
+        try:
+            os.remove(_job_path(job, ext))
+        except OSError:
+            pass
+    return result
+
+
+def _prune_jobs():
+    limit = time.time() - JOB_TTL
+    try:
+        for entry in os.scandir(JOB_DIR):
+            if entry.stat().st_mtime < limit:
+                os.remove(entry.path)
+    except OSError:
+        pass
+
+
+scheduler = Scheduler()
+
+
+# ════════════════════════════════════════════════════════════════
+# INSTALLATION SUR LE SERVEUR FLASK
+# ════════════════════════════════════════════════════════════════
+def install_scheduler(server):
+
+    @server.route('/admin/ordonnanceur')
+    def admin_scheduler():
+        if request.remote_addr not in LOOPBACK:
+            abort(403)
+        return jsonify(scheduler.metrics())
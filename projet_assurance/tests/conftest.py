@@ -0,0 +1,21 @@
+# =============================================================
+#  conftest.py  —  Fixtures communes des tests
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+#  Lancement : python -m pytest -q   (depuis projet_assurance/)
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# Portefeuille livré, enrichi comme dans l'application
+@pytest.fixture(scope='session')
+def portfolio():
+    from portfolio import load_portfolio, DATA_FILE
+    df, _ = load_portfolio(DATA_FILE)
+    return df
@@ -0,0 +1,38 @@
+# =============================================================
+#  test_bootstrap.py  —  IC bootstrap de la tranche d'âge à risque
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+
+import numpy as np
+
+from bootstrap import bootstrap_kpis, significance, top_age_band
+
+
+# Estimation = écart fréquence tranche − fréquence sélection, calculé à la main
+def test_top_band_gap(portfolio):
+    top, gap = top_age_band(portfolio)
+    freq = portfolio.groupby('tranche_age', observed=True)['nb_sinistres'].mean()
+    assert top == freq.idxmax()
+    assert np.isclose(gap, freq.max() - portfolio['nb_sinistres'].mean())
+    est, lo, hi = bootstrap_kpis(portfolio)['tranche']
+    assert np.isclose(est, gap) and lo <= est <= hi
+
+
+# Sélection étroite : la tranche en tête tient à quelques sinistres → non significatif
+def test_narrow_selection_not_significant(portfolio):
+    narrow = portfolio[portfolio['type_assurance'] == 'Auto'].head(40)
+    assert significance(bootstrap_kpis(narrow)['tranche'], 0) == 0
+
+
+# Au-delà de BOOT_ROWS : estimation sur toute la sélection, IC resserré
+def test_large_selection_subsampled(portfolio):
+    big = portfolio.sample(50_000, replace=True, random_state=1).reset_index(drop=True)
+    est, lo, hi = bootstrap_kpis(big)['tranche']
+    assert np.isclose(est, top_age_band(big)[1])
+    assert lo <= est <= hi and hi - lo < 0.1
+
+
+# Sans colonne tranche_age : pas d'intervalle
+def test_no_age_band(portfolio):
+    assert 'tranche' not in bootstrap_kpis(portfolio.drop(columns='tranche_age'))
@@ -0,0 +1,88 @@
+# =============================================================
+#  test_claims.py  —  Index CSR des sinistres contre pandas
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from claims import ClaimsIndex, NO_CAUSE
+
+
+# Table de faits synthétique : assurés sans sinistre, dates et causes
+# manquantes, sinistres orphelins (identifiant inconnu)
+def make_claims(policy_ids, seed=3):
+    rng = np.random.default_rng(seed)
+    m = 6000
+    ids = rng.choice(policy_ids[: len(policy_ids) * 2 // 3], m)
+    ids[:25] = policy_ids.max() + 17                       # orphelins
+    dates = pd.Timestamp('2021-01-01') + pd.to_timedelta(rng.integers(0, 1000, m), unit='D')
+    dates = pd.Series(dates.strftime('%Y-%m-%d'))
+    dates[rng.random(m) < 0.02] = None
+    cause = pd.Series(rng.choice(['Vol', 'Incendie', 'Collision', 'Dégât des eaux'], m))
+    cause[rng.random(m) < 0.05] = None
+    return pd.DataFrame({'id_assure': ids, 'date_sinistre': dates,
+                         'montant': rng.gamma(2.0, 1500.0, m).round(2), 'cause': cause})
+
+
+@pytest.fixture(scope='module', params=['denses', 'creux'])
+def case(request):
+    n = 2000
+    if request.param == 'denses':
+        policy_ids = np.arange(1, n + 1, dtype=np.int64)
+    else:                                                  # recherche dichotomique
+        policy_ids = np.random.default_rng(1).permutation(np.arange(n, dtype=np.int64) * 10**6 + 5)
+    claims = make_claims(policy_ids)
+    index = ClaimsIndex(claims, policy_ids)
+    known = claims[claims['id_assure'].isin(policy_ids)].copy()
+    known['row'] = pd.Index(policy_ids).get_indexer(known['id_assure'])
+    known['date'] = pd.to_datetime(known['date_sinistre'])
+    return index, claims, known, policy_ids
+
+
+def test_orphans(case):
+    index, claims, known, _ = case
+    assert index.orphans == len(claims) - len(known) == 25
+
+
+def test_rollup_matches_groupby(case):
+    index, _, known, policy_ids = case
+    out = index.rollup()
+    grouped = known.groupby('row').agg(nb=('montant', 'size'), montant=('montant', 'sum'),
+                                       last=('date', 'max')).reindex(range(len(policy_ids)))
+    assert np.array_equal(out['nb_sinistres'], grouped['nb'].fillna(0).astype(int))
+    np.testing.assert_allclose(out['montant_sinistres'], grouped['montant'].fillna(0).round(2))
+    assert out['date_derniere_sinistre'].equals(
+        grouped['last'].astype('datetime64[ns]').reset_index(drop=True).rename('date_derniere_sinistre'))
+
+
+@pytest.mark.parametrize('fraction', [0.0, 0.1, 0.5, 0.9, 1.0])
+def test_selection_series(case, fraction):
+    index, _, known, policy_ids = case
+    rows = np.flatnonzero(np.random.default_rng(11).random(len(policy_ids)) < fraction)
+    if fraction == 1.0:
+        rows = np.arange(len(policy_ids))
+    sel = known[known['row'].isin(rows)]
+
+    # Sinistres de la sélection par plages CSR
+    assert np.isclose(index.severity(rows).sum(), sel['montant'].sum())
+    assert len(index.claim_rows(rows)) == len(sel)
+
+    # Série mensuelle (chemin direct ou par complément)
+    monthly = index.monthly(rows)
+    expected = (sel.dropna(subset=['date']).assign(mois=lambda d: d['date'].dt.strftime('%Y-%m'))
+                .groupby('mois')['montant'].agg(['size', 'sum']))
+    assert list(monthly['mois']) == list(expected.index)
+    assert np.array_equal(monthly['nb'], expected['size'])
+    np.testing.assert_allclose(monthly['montant'], expected['sum'])
+
+    # Répartition par cause, cause manquante regroupée
+    causes = index.by_cause(rows)
+    expected = sel.assign(cause=sel['cause'].fillna(NO_CAUSE)).groupby('cause')['montant'].agg(['size', 'sum'])
+    expected = expected.reindex(causes.index)
+    assert len(causes) == sel['cause'].fillna(NO_CAUSE).nunique()
+    assert np.array_equal(causes['nb'], expected['size'])
+    np.testing.assert_allclose(causes['montant'], expected['sum'])
+    np.testing.assert_allclose(causes['cout_moyen'], expected['sum'] / expected['size'])
@@ -0,0 +1,138 @@
+# =============================================================
+#  test_crossfilter.py  —  Moteur crossfilter contre pandas
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from crossfilter import (portfolio_crossfilter, apply_filters, EnginePool,
+                         BRUSH_CATEGORIES, BRUSH_RANGES)
+
+
+# (type, sexe, région, nb sinistres, âge, B/M, sélection brossée)
+SCENARIOS = [
+    (None, None, None, None, None, None, {}),
+    (['Auto'], None, ['Dakar'], None, [18, 79], [0.5, 1.5], {}),
+    (None, ['feminin'], None, ['0', '4'], [30, 45], [0.8, 1.2], {}),
+    (['Vie', 'Santé'], None, None, ['1', '2'], [25, 70], None, {'bm_cat': ['Malus']}),
+    (None, None, None, None, [18, 79], [0.5, 1.5],
+     {'region': ['Thiès', 'Kaolack'], 'tranche_age': ['26-35'], 'montant_prime': [200, 900]}),
+    (['Habitation'], ['masculin'], None, None, [60, 79], None,
+     {'type_assurance': ['Habitation'], 'score_risque': [0.0, 1.0]}),
+    (None, None, None, None, [79, 79], [1.5, 1.5], {}),
+]
+
+
+# Même sémantique que apply_filters, écrite en pandas
+def reference_mask(df, type_vals, sexe_vals, region_vals, sinistres_vals, age_range, bm_range,
+                   selection, ignore=()):
+    m = pd.Series(True, index=df.index)
+    for col, vals in (('type_assurance', type_vals), ('sexe', sexe_vals), ('region', region_vals)):
+        if vals and col not in ignore:
+            m &= df[col].astype(str).isin(vals)
+    if sinistres_vals:
+        nb = df['nb_sinistres']
+        m &= np.logical_or.reduce([nb >= 4 if v == '4' else nb == int(v) for v in sinistres_vals])
+    if age_range:
+        m &= df['age'].between(*age_range)
+    if bm_range:
+        m &= df['bonus_malus'].between(*bm_range)
+    for col, vals in selection.items():
+        if f'brush:{col}' in ignore:
+            continue
+        if col in BRUSH_RANGES:
+            m &= df[col].between(*vals)
+        else:
+            m &= df[col].astype(str).isin([str(v) for v in vals])
+    return m.to_numpy()
+
+
+@pytest.fixture(scope='module')
+def base(portfolio):
+    return portfolio_crossfilter(portfolio)
+
+
+@pytest.mark.parametrize('filters', SCENARIOS)
+def test_mask_matches_pandas(portfolio, base, filters):
+    eng = base.fork()
+    apply_filters(eng, *filters)
+    assert np.array_equal(eng.mask(), reference_mask(portfolio, *filters))
+
+
+@pytest.mark.parametrize('filters', SCENARIOS)
+def test_groups_match_pandas(portfolio, base, filters):
+    eng = base.fork()
+    apply_filters(eng, *filters)
+    groups = {name: g.result() for name, g in eng.groups.items()}
+
+    # Groupe par type : ignore la brosse du type
+    rows = portfolio[reference_mask(portfolio, *filters, ignore=['brush:type_assurance'])]
+    expected = rows.groupby(rows['type_assurance'].astype(str)).agg(
+        count=('id_assure', 'size'), montant_sinistres=('montant_sinistres', 'sum'),
+        montant_prime=('montant_prime', 'sum'))
+    expected = expected.reindex(eng.levels['type_assurance'], fill_value=0)
+    for col in ('count', 'montant_sinistres', 'montant_prime'):
+        np.testing.assert_allclose(groups['type_assurance'][col], expected[col], atol=1e-6)
+
+    # Groupe par nombre de sinistres : ignore la brosse du nombre de sinistres
+    rows = portfolio[reference_mask(portfolio, *filters, ignore=['brush:nb_sinistres'])]
+    counts = np.bincount(rows['nb_sinistres'], minlength=len(eng.levels['nb_sinistres']))
+    np.testing.assert_allclose(groups['nb_sinistres']['count'], counts)
+
+    # Groupe tranche × type : ignore les deux brosses
+    rows = portfolio[reference_mask(portfolio, *filters,
+                                    ignore=['brush:tranche_age', 'brush:type_assurance'])]
+    n_types = len(eng.levels['type_assurance'])
+    age = pd.Categorical(rows['tranche_age'].astype(str),
+                         categories=eng.levels['tranche_age']).codes
+    typ = pd.Categorical(rows['type_assurance'].astype(str),
+                         categories=eng.levels['type_assurance']).codes
+    ok = (age >= 0) & (typ >= 0)
+    keys = age[ok].astype(np.int64) * n_types + typ[ok]
+    np.testing.assert_allclose(groups['tranche_type']['count'],
+                               np.bincount(keys, minlength=len(groups['tranche_type']['count'])))
+
+
+# Suite de mouvements incrémentaux = état recalculé depuis zéro
+def test_incremental_equals_fresh(portfolio, base):
+    eng = base.fork()
+    for filters in SCENARIOS + SCENARIOS[::-1]:
+        apply_filters(eng, *filters)
+    last = SCENARIOS[0]
+    fresh = base.fork()
+    apply_filters(fresh, *last)
+    assert np.array_equal(eng.mask(), fresh.mask())
+    for name, g in eng.groups.items():
+        for col, values in g.result().items():
+            np.testing.assert_allclose(values, fresh.groups[name].result()[col], atol=1e-6)
+
+
+# Deux sessions filtrent en alternance sans se perturber ; la base reste vierge
+def test_sessions_are_isolated(portfolio, base):
+    pool = EnginePool(base, size=4)
+    a, b = SCENARIOS[1], SCENARIOS[3]
+    for _ in range(3):
+        for key, filters in (('a', a), ('b', b)):
+            eng = pool.get(key)
+            apply_filters(eng, *filters)
+            assert np.array_equal(eng.mask(), reference_mask(portfolio, *filters))
+    assert base.mask().all()
+    assert pool.get('a') is pool.get('a')
+
+
+def test_pool_evicts_least_recent(base):
+    pool = EnginePool(base, size=2)
+    first = pool.get('a')
+    pool.get('b')
+    pool.get('a')
+    pool.get('c')                       # évince 'b', le moins récent
+    assert list(pool.engines) == ['a', 'c']
+    assert pool.get('a') is first
+
+
+def test_brush_dimensions_exist(base):
+    for col in BRUSH_CATEGORIES + BRUSH_RANGES:
+        assert f'brush:{col}' in base.dimensions
@@ -0,0 +1,57 @@
+# =============================================================
+#  test_montecarlo.py  —  Sévérité du Monte Carlo : coût d'un sinistre
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+
+import numpy as np
+import pandas as pd
+
+from claims import ClaimsIndex
+from montecarlo import segment_parameters
+
+
+# Espérance de la charge = sinistres attendus × coût moyen d'un sinistre
+def expected_loss(params):
+    return float((params['esperance'] * params['shape'] * params['scale']).sum())
+
+
+def test_severity_is_per_claim(portfolio):
+    params = segment_parameters(portfolio)
+    claimed = portfolio[portfolio['nb_sinistres'] > 0]
+    per_claim = claimed['montant_sinistres'].sum() / claimed['nb_sinistres'].sum()
+    mean = (params['esperance'] * params['shape'] * params['scale']).sum() / params['esperance'].sum()
+    assert np.isclose(mean, per_claim)
+
+
+def test_severity_from_claims_table():
+    rng = np.random.default_rng(4)
+    n = 400
+    df = pd.DataFrame({
+        'id_assure':      np.arange(1, n + 1),
+        'region':         rng.choice(['Dakar', 'Thiès'], n),
+        'type_assurance': rng.choice(['Auto', 'Vie'], n),
+        'montant_prime':  rng.uniform(200, 900, n),
+    })
+    claims = pd.DataFrame({'id_assure': rng.integers(1, n + 1, 3000),
+                           'date_sinistre': '2024-01-15',
+                           'montant': rng.gamma(2.0, 1000.0, 3000)})
+    index = ClaimsIndex(claims, df['id_assure'].to_numpy())
+    df = index.apply(df)
+    params = segment_parameters(df, index)
+
+    # Moments par segment = moments des montants individuels
+    seg = pd.DataFrame({'region': df['region'].to_numpy()[index.row],
+                        'type_assurance': df['type_assurance'].to_numpy()[index.row],
+                        'montant': index.amount})
+    stats = seg.groupby(['region', 'type_assurance'])['montant'].agg(['mean', 'var'])
+    for i, j, shape, scale in zip(params['region'], params['type'], params['shape'], params['scale']):
+        mean, var = stats.loc[(params['regions'][i], params['types'][j])]
+        assert np.isclose(shape * scale, mean)
+        assert np.isclose(shape * scale ** 2, var)
+
+    # Sélection (lignes = positions du portefeuille) : ses seuls sinistres
+    sub = df[df['region'] == 'Dakar']
+    params = segment_parameters(sub, index)
+    assert params['regions'] == ['Dakar']
+    assert np.isclose(expected_loss(params), sub['montant_sinistres'].sum(), rtol=1e-6)
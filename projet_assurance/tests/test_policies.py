@@ -0,0 +1,66 @@
+# =============================================================
+#  test_policies.py  —  Top N : parcours de l'ordre = sélection partielle
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from policies import PolicyIndex, TOP_METRICS
+
+
+# Valeurs à nombreux ex-aequo et S/P manquants
+@pytest.fixture(scope='module')
+def index_and_frame():
+    rng = np.random.default_rng(7)
+    n = 5000
+    ratio = rng.choice([0.0, 0.5, 1.0, 2.5, np.nan], n)
+    df = pd.DataFrame({
+        'id_assure':         np.arange(1, n + 1),
+        'montant_sinistres': rng.integers(0, 20, n) * 500.0,
+        'ratio_SP':          ratio,
+        'nb_sinistres':      rng.integers(0, 5, n),
+    })
+    return PolicyIndex(df), df
+
+
+# Référence : tri décroissant stable, manquants en dernier, ex-aequo par ligne
+def reference_top(df, mask, metric, n):
+    v = df[metric].to_numpy(dtype=np.float64)
+    rows = np.flatnonzero(mask)
+    key = np.where(np.isnan(v[rows]), -np.inf, v[rows])
+    return rows[np.lexsort((rows, -key))][:n]
+
+
+@pytest.mark.parametrize('metric', list(TOP_METRICS))
+@pytest.mark.parametrize('density', [1.0, 0.5, 0.08, 0.01, 0.001])
+@pytest.mark.parametrize('n', [1, 10, 50])
+def test_scan_equals_partition(index_and_frame, metric, density, n):
+    index, df = index_and_frame
+    rng = np.random.default_rng(int(density * 1000) + n)
+    mask = rng.random(index.n) < density
+    k = int(mask.sum())
+    m = min(n, k)
+    if m == 0:
+        assert len(index.top(mask, metric, n)) == 0
+        return
+    expected = reference_top(df, mask, metric, m)
+    assert np.array_equal(index._scan(mask, metric, m, k), expected)
+    assert np.array_equal(index._partition(np.flatnonzero(mask), metric, m), expected)
+    assert np.array_equal(index.top(mask, metric, n), expected)
+
+
+def test_rank_is_inverse_of_order(index_and_frame):
+    index, _ = index_and_frame
+    for metric in TOP_METRICS:
+        assert np.array_equal(index.order[metric][index.rank[metric]], np.arange(index.n))
+
+
+def test_row_lookup(index_and_frame):
+    index, _ = index_and_frame
+    assert index.row(1) == 0
+    assert index.row(5000) == 4999
+    assert index.row(999999) is None
+    assert index.row('abc') is None
@@ -0,0 +1,46 @@
+# =============================================================
+#  test_pricing.py  —  Décompte des déficitaires contre un comptage direct
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+
+import numpy as np
+import pytest
+
+from pricing import PricingModel
+
+
+@pytest.fixture(scope='module')
+def model(portfolio):
+    return PricingModel(portfolio)
+
+
+# ratio_SP / f_s > 1 compté contrat par contrat
+def brute_force(model, f):
+    ok = ~np.isnan(model.ratio)
+    deficit = ok & (model.ratio > np.where(ok, f[model.segment], 0))
+    return np.bincount(model.segment[deficit], minlength=model.size)
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_deficits_match_brute_force(model, seed):
+    rng = np.random.default_rng(seed)
+    f = rng.uniform(0.7, 1.3, model.size)
+    if seed == 0:
+        f = np.ones(model.size)
+    elif seed == 1:
+        f[:: 3] = 1e6                   # seuil au-delà du ratio maximal
+    elif seed == 2:
+        # Seuils exactement sur des ratios observés (ex-aequo : non déficitaire)
+        ok = ~np.isnan(model.ratio)
+        f[model.segment[ok]] = model.ratio[ok]
+    assert np.array_equal(model._deficits(f), brute_force(model, f))
+
+
+def test_simulate_percentages(model):
+    f = model.factors([{'type': ['Auto'], 'pct': 10}], {'Malus': 5})
+    out = model.simulate(f)
+    valid = (~np.isnan(model.ratio)).sum()
+    assert np.isclose(out['def_avant'], brute_force(model, np.ones(model.size)).sum() / valid * 100)
+    assert np.isclose(out['def_apres'], brute_force(model, f).sum() / valid * 100)
+    assert np.isclose(out['prime_apres'], (model.prime * f).sum())
@@ -0,0 +1,50 @@
+# =============================================================
+#  test_sampling.py  —  Médiane pondérée de l'échantillon et son IC
+#  Projet : Analyse des Sinistres & Profil des Assurés
+#  Auteur : Sona KOULIBALY
+# =============================================================
+
+import numpy as np
+import pytest
+
+from sampling import SampleEstimator, kpi_estimates, CI_LABEL
+
+
+@pytest.fixture(scope='module')
+def estimator(portfolio):
+    return SampleEstimator(portfolio, size=300)
+
+
+# Poids égaux : médiane interpolée = médiane usuelle (moyenne des deux centrales)
+def test_equal_weights_median(estimator):
+    est = object.__new__(SampleEstimator)
+    est.__dict__.update(estimator.__dict__)
+    est.weights = np.ones_like(estimator.weights)
+    values = np.array([1.0, 4.0, 2.0, 10.0, np.nan, 3.0] + [0.0] * (len(est.weights) - 6))
+    mask = np.zeros(len(values), dtype=bool)
+    mask[:6] = True
+    med, lo, hi = est.median(mask, values)
+    assert med == pytest.approx(3.0)
+    # Encadrée par les observations voisines 2 et 4
+    assert lo <= 2.0 and hi >= 4.0
+
+
+def test_median_interval_brackets_order_statistics(estimator):
+    values = estimator.ratio_sp
+    rng = np.random.default_rng(5)
+    for density in (0.02, 0.1, 0.5, 1.0):
+        mask = rng.random(len(values)) < density
+        ok = mask & ~np.isnan(values)
+        if ok.sum() < 2:
+            continue
+        med, lo, hi = estimator.median(mask, values)
+        v = np.sort(values[ok])
+        assert v[0] <= lo <= med <= hi <= v[-1]
+        assert lo <= v[v <= med].max() and hi >= v[v >= med].min()
+
+
+def test_sampling_bands_are_labelled(estimator):
+    out = kpi_estimates(estimator, np.ones(len(estimator.sample), dtype=bool))
+    for cid in ('ci-assures', 'ci-cout', 'ci-ratio-sp'):
+        assert CI_LABEL in out[cid]
+    assert 'bootstrap' not in CI_LABEL